@@ -0,0 +1,81 @@
+"""
+Imports folders or lists of .omni shots without the user interface, saving each shot to its own .c4d file.
+
+Run it with Cinema 4D's command-line Python, with the plugin installed so its tag is registered:
+
+    c4dpy batch_import.py /path/to/captures --output /path/to/scenes --report report.json
+
+Exits with status 1 when a shot failed.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib'))
+
+from batchImporter import run_batch
+from cameraFilter import SMOOTHING_METHODS
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(description="Batch import Omniscient shots into .c4d files.")
+    parser.add_argument("shots", nargs="+", help=".omni files or directories searched recursively for them")
+    parser.add_argument("--output", help="directory the .c4d files are saved to, defaults to next to each shot")
+    parser.add_argument("--report", help="write the batch report as JSON to this file")
+    parser.add_argument("--prefetch", type=int, default=2, help="number of shots prepared ahead of the one being imported")
+    parser.add_argument("--workers", type=int, help="number of processes decoding scans")
+    parser.add_argument("--no-scan-cache", action="store_true", help="don't keep decoded scans in the scan cache")
+    parser.add_argument("--scan-cache-dir", help="directory of the scan cache")
+    parser.add_argument("--scan-triangle-budget", type=int, help="triangle count above which scans get a viewport proxy")
+    parser.add_argument("--scan-tile-size", type=float, help="split scans into grid tiles of this size in meters")
+    parser.add_argument("--scan-lod-levels", type=int, help="levels of detail of every scan tile")
+    parser.add_argument("--scan-memory-budget", type=float,
+                        help="megabytes a scan may take while loading, larger scans are streamed into their object")
+    parser.add_argument("--position-tolerance", type=float, help="key simplification tolerance of the camera position")
+    parser.add_argument("--rotation-tolerance", type=float, help="key simplification tolerance of the camera rotation in degrees")
+    parser.add_argument("--camera-smoothing", choices=SMOOTHING_METHODS, help="smooth the baked camera's path")
+    parser.add_argument("--camera-smoothing-window", type=int, help="frames of the Savitzky-Golay smoothing window")
+    parser.add_argument("--camera-smoothing-cutoff", type=float, help="cutoff frequency in Hz of the one-euro smoothing")
+    parser.add_argument("--camera-outlier-threshold", type=float,
+                        help="replace camera frames deviating from their neighbors by this many robust standard deviations")
+    parser.add_argument("--trace", help="write a Chrome trace of every import to this directory")
+    parser.add_argument("--video-proxy", type=int, nargs="?", const=True,
+                        help="generate a downscaled copy of each video for the viewport, optionally of this width")
+    parser.add_argument("--camera-export", nargs="?", const=True,
+                        help="export each baked camera as .omnicam, .chan and CSV files, optionally to this directory")
+    return parser.parse_args(arguments)
+
+def main(arguments=None):
+    args = parse_arguments(sys.argv[1:] if arguments is None else arguments)
+    logging.basicConfig(level=logging.INFO)
+
+    import_options = {
+        "workers": args.workers,
+        "scan_cache": not args.no_scan_cache,
+        "scan_cache_dir": args.scan_cache_dir,
+        "scan_triangle_budget": args.scan_triangle_budget,
+        "scan_tile_size": args.scan_tile_size,
+        "scan_lod_levels": args.scan_lod_levels,
+        "scan_memory_budget": args.scan_memory_budget,
+        "position_tolerance": args.position_tolerance,
+        "rotation_tolerance": args.rotation_tolerance,
+        "camera_smoothing": args.camera_smoothing,
+        "camera_smoothing_window": args.camera_smoothing_window,
+        "camera_smoothing_cutoff": args.camera_smoothing_cutoff,
+        "camera_outlier_threshold": args.camera_outlier_threshold,
+        "trace": args.trace,
+        "video_proxy": args.video_proxy,
+        "camera_export": args.camera_export
+    }
+    report = run_batch(args.shots, output_directory=args.output, import_options=import_options,
+                       prefetch=args.prefetch, workers=args.workers)
+    print(report)
+
+    if args.report:
+        with open(args.report, "w") as file:
+            json.dump(report.to_dict(), file, indent=4)
+    return 1 if report.failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
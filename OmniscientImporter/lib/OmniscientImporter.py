@@ -1,12 +1,30 @@
 import c4d
-import json
 import logging
 import os
 from c4d import documents
-from cameraBaker import bake_alembic_camera_animation
-from videoBackground import create_background_with_video_material
+from cameraBaker import iter_bake_alembic_camera_animation, sample_camera_path
+from cameraExport import sidecar_base_path
+from cameraFilter import CameraFilterSettings
+from videoBackground import create_background_with_video_material, get_movie_info, update_video_material
+from videoProxy import proxy_width, start_video_proxy
 from projectSettings import set_project_settings_from_video
-from adjustScale import adjust_scale
+from adjustScale import adjust_scale, get_unit_scale_factor
+from importSession import ImportSession, iter_hierarchy
+from memoryBudget import MEGABYTE, MemoryMonitor, budget_bytes, exceeds_budget, stream_chunk_size
+from objReader import ObjReadError, count_obj_elements, iter_obj_blocks, read_obj
+from scanBuilder import (find_scan_tiles, import_point_cloud_object, iter_import_scan_object, iter_import_tiled_scan_object,
+                         iter_rebuild_scan_object, iter_stream_scan_object, rebuild_point_cloud_object, show_tile_level,
+                         tile_level_count, tile_radius)
+from scanCache import ScanCache
+from scanDecimation import decimate_mesh
+from scanDedup import ScanDeduplication, build_scan_instance, detach_instances
+from scanTiling import DEFAULT_LOD_LEVELS, camera_half_angle, level_for_distance, tile_scan, view_distances
+from shotDecoder import ShotDecoder, decode_point_cloud
+from shotManifest import preflight_shot
+from shotRecord import asset_key, compare_shot, find_shot_nodes, find_shot_tag, record_shot
+from importTrace import count, span, trace_directory, traced
+from importRunner import (ImportProgress, call_in_thread, cancel_imports, run_steps, running_import, start_import,
+                          wait_for, within)
 import plugin_version
 from OmniscientMessage import OMNISCIENT_DIALOG_EVENT_ID, DialogDataStorage
 
@@ -15,10 +33,28 @@ logger = logging.getLogger(__name__)
 
 OMNISCIENT_SCENE_CONTROL_TAG_ID = 1063027
 
-def get_object_dict(objects):
-    return {obj.GetGUID(): obj for obj in objects}
+# Options of imports started from Cinema 4D's interface, as opposed to scripts and batch imports
+INTERACTIVE_IMPORT_OPTIONS = {"video_proxy": True}
+
+# Called with the message of import errors instead of showing a dialog, set by headless callers such as batch imports
+error_reporter = None
+
+def set_error_reporter(reporter):
+    """Routes import error messages to reporter(message), None restores the message dialogs."""
+    global error_reporter
+    error_reporter = reporter
+
+def report_error(message):
+    if error_reporter is not None:
+        error_reporter(message)
+    else:
+        c4d.gui.MessageDialog(message)
 
 def process_import(doc, file_path, default_name, import_options=None):
+    run_steps(iter_process_import(doc, file_path, default_name, import_options))
+
+def iter_process_import(doc, file_path, default_name, import_options=None):
+    """Import step importing a scan, point cloud or camera, yielding while a scan is built or a camera baked."""
     if import_options is None:
         import_options = {}
 
@@ -26,12 +62,25 @@ def process_import(doc, file_path, default_name, import_options=None):
     is_camera = import_options.get("is_camera", False)
     camera_fps = import_options.get("camera_fps")
     video_fps = import_options.get("video_fps")
+    position_tolerance = import_options.get("position_tolerance")
+    rotation_tolerance = import_options.get("rotation_tolerance")
+    scan_loader = import_options.get("scan_loader", "native")
+    decoded = import_options.get("decoded")
+    triangle_budget = import_options.get("scan_triangle_budget")
+    tile_size = import_options.get("scan_tile_size")
+    lod_levels = import_options.get("scan_lod_levels") or DEFAULT_LOD_LEVELS
+    session = import_options.get("session") or ImportSession(doc)
+    target = import_options.get("target")
+    point_cloud = import_options.get("point_cloud", False)
+    camera_export = import_options.get("camera_export")
+    camera_filter = import_options.get("camera_filter")
+    stream_scan = import_options.get("stream_scan", False)
     
     # Check if the file is an Alembic file when importing a camera
     if is_camera and not file_path.lower().endswith('.abc'):
         error_message = "Camera import failed. The Omniscient importer requires the camera as an Alembic (.abc)"
         logger.error("{}: {}".format(error_message, file_path))
-        c4d.gui.MessageDialog(error_message)
+        report_error(error_message)
         return
     
     # Check if the file exists
@@ -42,32 +91,272 @@ def process_import(doc, file_path, default_name, import_options=None):
         else:
             error_message = "File '{}' not found.".format(os.path.basename(file_path))
         logger.error(error_message)
-        c4d.gui.MessageDialog(error_message)
+        report_error(error_message)
         return
     
+    if point_cloud:
+        import_point_cloud(doc, file_path, default_name, decoded=decoded, voxel_size=import_options.get("voxel_size"),
+                           session=session, target=target)
+        return
+
+    # Stream OBJ scans too large for the memory budget straight into their object. A failure is reported rather than
+    # falling back to an importer that loads the whole scan the budget was meant to avoid
+    if stream_scan and not is_camera and file_path.lower().endswith('.obj'):
+        yield from iter_import_scan_streaming(doc, file_path, default_name, import_options.get("scan_memory_budget"),
+                                              session=session, target=target, monitor=import_options.get("memory_monitor"))
+        return
+
+    # Decode OBJ scans natively, Cinema 4D's importer is kept as a fallback
+    if not is_camera and scan_loader == "native" and file_path.lower().endswith('.obj'):
+        if (yield from iter_import_scan_natively(doc, file_path, default_name, decoded=decoded,
+                                                 triangle_budget=triangle_budget, session=session, target=target,
+                                                 tile_size=tile_size, lod_levels=lod_levels)):
+            return
+
     # Adjust scales before attempting import
     adjust_scale('abc', 1.0, c4d.DOCUMENT_UNIT_M)
     adjust_scale('obj', 1.0, c4d.DOCUMENT_UNIT_M)
 
     # Import the file
-    objects_before_import = get_object_dict(doc.GetObjects())
-    if c4d.documents.MergeDocument(doc, file_path, c4d.SCENEFILTER_OBJECTS | c4d.SCENEFILTER_MATERIALS):
+    with span("merge", file=os.path.basename(file_path)):
+        new_objects = session.merge_file(file_path, c4d.SCENEFILTER_OBJECTS | c4d.SCENEFILTER_MATERIALS)
+    if new_objects is not None:
         logger.info("Successfully imported: {}".format(file_path))
-        objects_after_import = get_object_dict(doc.GetObjects())
-        new_objects_guids = objects_after_import.keys() - objects_before_import.keys()
-        new_objects = [objects_after_import[guid] for guid in new_objects_guids]
-        
         for obj in new_objects:
             obj.SetName(default_name)
-            if is_camera:
-                handle_camera_operations(doc, new_objects, camera_fps=camera_fps, video_fps=video_fps, bake_camera=bake_camera)
+            if not is_camera:
+                session.scans.append(obj)
+        if is_camera:
+            yield from iter_handle_camera_operations(doc, new_objects, camera_fps=camera_fps, video_fps=video_fps,
+                                                     bake_camera=bake_camera, camera_path=file_path,
+                                                     position_tolerance=position_tolerance,
+                                                     rotation_tolerance=rotation_tolerance,
+                                                     camera_samples=decoded.value if decoded is not None and decoded.ok else None,
+                                                     session=session, target_camera=target, camera_export=camera_export,
+                                                     camera_filter=camera_filter)
         c4d.EventAdd()
     else:
         logger.error("Failed to import: {}".format(file_path))
 
-def handle_camera_operations(doc, new_objects, camera_fps=None, video_fps=None, bake_camera=False):
-    """Handles camera-specific operations, adjusts settings, and optionally replaces the Alembic camera with a baked one."""
-    for obj in new_objects:
+def import_scan_natively(doc, file_path, default_name, decoded=None, triangle_budget=None, session=None, target=None,
+                         tile_size=None, lod_levels=DEFAULT_LOD_LEVELS):
+    """Imports an OBJ scan with the native reader. Returns False if the file could not be decoded.
+
+    decoded is an optional DecodedFile of the scan, when it was already read by a ShotDecoder. Scans with more
+    triangles than triangle_budget get a decimated proxy for the viewport, the full mesh is kept for rendering.
+    target is an optional polygon object of a previous import, whose geometry is replaced instead.
+    With a tile_size in document units, the scan is split into tiles under a null instead, each with up to
+    lod_levels levels of detail, see select_scan_tile_levels(). triangle_budget and target are then ignored.
+    """
+    return run_steps(iter_import_scan_natively(doc, file_path, default_name, decoded=decoded,
+                                               triangle_budget=triangle_budget, session=session, target=target,
+                                               tile_size=tile_size, lod_levels=lod_levels))
+
+def iter_import_scan_natively(doc, file_path, default_name, decoded=None, triangle_budget=None, session=None,
+                              target=None, tile_size=None, lod_levels=DEFAULT_LOD_LEVELS):
+    """Import step importing an OBJ scan with the native reader, see import_scan_natively()."""
+    if decoded is not None:
+        mesh, error = decoded.value, decoded.error
+    else:
+        scale = get_unit_scale_factor(doc, 1.0, c4d.DOCUMENT_UNIT_M)
+        try:
+            mesh, error = read_obj(file_path, scale=scale), None
+        except ObjReadError as e:
+            mesh, error = None, e
+    if error is not None:
+        logger.warning("Native scan import failed, using Cinema 4D's OBJ importer instead: {}".format(error))
+        return False
+
+    if tile_size:
+        with span("tile", tile_size=tile_size, lod_levels=lod_levels):
+            tiles = tile_scan(mesh, tile_size, lod_levels, default_name)
+        with span("build object", points=mesh.point_count, polygons=mesh.polygon_count, tiles=len(tiles)):
+            yield from iter_import_tiled_scan_object(doc, mesh, tiles, default_name, file_path, session=session)
+        count("polygons built", mesh.polygon_count)
+        count("tiles built", len(tiles))
+        logger.info("Successfully imported: {} ({} points, {} polygons in {} tiles)".format(
+            file_path, mesh.point_count, mesh.polygon_count, len(tiles)))
+        c4d.EventAdd()
+        return True
+
+    proxy_mesh = None
+    if triangle_budget:
+        with span("decimate", budget=int(triangle_budget)):
+            decimated, _ = decimate_mesh(mesh, int(triangle_budget), default_name)
+        if decimated is not mesh:
+            proxy_mesh = decimated
+
+    with span("build object", points=mesh.point_count, polygons=mesh.polygon_count):
+        if target is not None:
+            yield from iter_rebuild_scan_object(doc, target, mesh, proxy_mesh=proxy_mesh)
+            if session is not None:
+                session.record_object(target, "scan", asset=file_path)
+        else:
+            yield from iter_import_scan_object(doc, mesh, default_name, file_path, proxy_mesh=proxy_mesh, session=session)
+    count("polygons built", mesh.polygon_count)
+    logger.info("Successfully imported: {} ({} points, {} polygons)".format(file_path, mesh.point_count, mesh.polygon_count))
+    c4d.EventAdd()
+    return True
+
+def import_scan_streaming(doc, file_path, default_name, memory_budget, session=None, target=None, monitor=None):
+    """Imports an OBJ scan chunk by chunk within a memory budget. Returns False after reporting why it failed.
+
+    The file is counted first, then parsed in chunks sized by memory_budget in bytes, each written into the
+    object before the next one is read, see stream_scan_object(). The memory of the process is sampled after
+    every chunk by monitor, a MemoryMonitor created when not given. Streamed scans are not decimated, tiled or
+    added to the scan cache, as those need the whole mesh. target is an optional polygon object of a previous
+    import, which is replaced once the scan has been streamed and left untouched when it fails. Its geometry
+    stays in memory until then, next to the streamed scan's.
+    """
+    return run_steps(iter_import_scan_streaming(doc, file_path, default_name, memory_budget, session=session,
+                                                target=target, monitor=monitor))
+
+def iter_import_scan_streaming(doc, file_path, default_name, memory_budget, session=None, target=None, monitor=None):
+    """Import step streaming an OBJ scan, see import_scan_streaming()."""
+    if monitor is None:
+        monitor = MemoryMonitor()
+    scale = get_unit_scale_factor(doc, 1.0, c4d.DOCUMENT_UNIT_M)
+    with span("stream scan", budget=memory_budget) as stream_span:
+        try:
+            counts = count_obj_elements(file_path)
+            chunk_size = stream_chunk_size(memory_budget, counts)
+            blocks = iter_obj_blocks(file_path, scale, chunk_size=chunk_size, point_count=counts.points)
+            yield from iter_stream_scan_object(doc, blocks, counts, default_name, file_path, session=session,
+                                               target=target, on_block=lambda block: monitor.sample())
+        except (ObjReadError, ValueError, MemoryError) as e:
+            error_message = "Scan import failed. Streaming '{}' failed: {}".format(os.path.basename(file_path), e)
+            logger.error(error_message)
+            report_error(error_message)
+            return False
+        stream_span.set(chunk_size=chunk_size, points=counts.points, polygons=counts.polygons)
+    count("scans streamed")
+    count("polygons built", counts.polygons)
+    logger.info("Successfully imported: {} ({} points, {} polygons, streamed in chunks of {:.1f} MB)".format(
+        file_path, counts.points, counts.polygons, chunk_size / float(MEGABYTE)))
+    c4d.EventAdd()
+    return True
+
+def report_peak_memory(path, monitor, memory_budget, geometry_span):
+    """Logs the peak resident memory sampled while a geometry entry was imported and adds it to its trace span."""
+    monitor.sample()
+    if monitor.peak is None:
+        return
+    geometry_span.set(peak_resident_bytes=monitor.peak, resident_increase_bytes=monitor.increase)
+    logger.info("{}: peak resident memory {:.1f} MB, {:+.1f} MB while imported with a budget of {:.1f} MB".format(
+        os.path.basename(path), monitor.peak / float(MEGABYTE), monitor.increase / float(MEGABYTE),
+        memory_budget / float(MEGABYTE)))
+
+def streamed_scan_paths(scan_files, preflight, memory_budget):
+    """Returns the OBJ scans among scan_files that are expected to exceed memory_budget when loaded in full."""
+    return {path for path in scan_files if exceeds_budget(preflight.asset(path).size or 0, memory_budget)}
+
+def import_point_cloud(doc, file_path, default_name, decoded=None, voxel_size=None, session=None, target=None):
+    """Imports a PLY file or the vertices of an OBJ as a point cloud. Returns False if the file could not be decoded.
+
+    voxel_size is the edge length in document units of the voxel grid the points are downsampled with, None
+    keeps every point. decoded is an optional DecodedFile of the cloud, when it was already read and downsampled
+    by a ShotDecoder. target is an optional point object of a previous import, whose points are replaced instead.
+    """
+    if decoded is None:
+        decoded = decode_point_cloud(file_path, get_unit_scale_factor(doc, 1.0, c4d.DOCUMENT_UNIT_M), voxel_size)
+    if not decoded.ok:
+        error_message = "Point cloud import failed: {}".format(decoded.error)
+        logger.error(error_message)
+        report_error(error_message)
+        return False
+
+    cloud = decoded.value
+    with span("build object", points=cloud.point_count, source_points=cloud.source_point_count):
+        if target is not None:
+            rebuild_point_cloud_object(doc, target, cloud)
+            if session is not None:
+                session.record_object(target, "points", asset=file_path)
+        else:
+            import_point_cloud_object(doc, cloud, default_name, file_path, session=session)
+    count("points read", cloud.source_point_count)
+    count("points built", cloud.point_count)
+    logger.info("Successfully imported: {} ({} of {} points kept{})".format(
+        file_path, cloud.point_count, cloud.source_point_count,
+        ", voxel size {:g}".format(voxel_size) if voxel_size else ""))
+    c4d.EventAdd()
+    return True
+
+def scan_tile_size(import_options, scale):
+    """Returns the scan tile size of the import options in document units, or None when scans aren't tiled."""
+    tile_size = import_options.get("scan_tile_size")
+    return float(tile_size) * scale if tile_size else None
+
+def select_scan_tile_levels(doc, scans, decoded_camera):
+    """
+    Shows every tile of tiled scans at the level of detail its distance to the camera's path calls for.
+
+    Tiles the camera comes within one tile diameter of while they are in its view cone keep their full detail,
+    tiles further away or never in view show coarser levels in the editor. Renders always use full detail.
+
+    Parameters:
+    - doc: The document, its time range gives the frames of the camera path.
+    - scans: Scan objects of the shot, the ones that aren't tiled are skipped.
+    - decoded_camera: The DecodedFile of the shot's Alembic camera. Without it, all tiles keep full detail.
+    """
+    tiles = [tile for scan in scans for tile in find_scan_tiles(scan)]
+    if not tiles:
+        return
+    if decoded_camera is None or not decoded_camera.ok:
+        logger.warning("No camera path to select the levels of detail of {} scan tiles with.".format(len(tiles)))
+        return
+
+    with span("select tile levels", tiles=len(tiles)):
+        camera_samples = decoded_camera.value
+        fps = doc.GetFps()
+        frames = range(doc.GetMinTime().GetFrame(fps), doc.GetMaxTime().GetFrame(fps) + 1)
+        matrices = sample_camera_path(doc, camera_samples, frames)
+        render_data = doc.GetActiveRenderData()
+        aspect_ratio = float(render_data[c4d.RDATA_XRES] or 16) / float(render_data[c4d.RDATA_YRES] or 9)
+        half_angle = camera_half_angle(camera_samples.intrinsics_at_time(0.0), aspect_ratio)
+
+        centers = []
+        radii = []
+        for tile in tiles:
+            offset = tile.GetMg().off
+            centers.append((offset.x, offset.y, offset.z))
+            radii.append(tile_radius(tile))
+        levels = []
+        for tile, radius, distance in zip(tiles, radii, view_distances(centers, radii, matrices, half_angle)):
+            levels.append(level_for_distance(distance, 2.0 * radius, tile_level_count(tile)))
+            show_tile_level(tile, levels[-1])
+    logger.info("Scan tiles per level of detail: {}".format(
+        ", ".join("{}: {}".format(level, levels.count(level)) for level in sorted(set(levels)))))
+
+def point_cloud_voxel_size(entry, import_options, scale):
+    """Returns the voxel size of a point cloud GeometryEntry in document units, or None to keep every point."""
+    voxel_size = entry.voxel_size if entry.voxel_size is not None else import_options.get("point_voxel_size")
+    return float(voxel_size) * scale if voxel_size else None
+
+def handle_camera_operations(doc, new_objects, camera_fps=None, video_fps=None, bake_camera=False, camera_path=None,
+                             position_tolerance=None, rotation_tolerance=None, camera_samples=None, session=None,
+                             target_camera=None, camera_export=None, camera_filter=None):
+    """Handles camera-specific operations, adjusts settings, and optionally replaces the Alembic camera with a baked one.
+
+    When camera_path is given, the bake reads the samples straight from that Alembic file. The tolerances enable
+    key simplification of the baked tracks. camera_samples optionally holds the already decoded Alembic camera.
+    new_objects are searched including their children. The resulting camera is recorded in the ImportSession.
+    target_camera is an optional baked camera of a previous import to bake into, keeping its tags and the view.
+    camera_export is the camera_export import option, see import_omni_file(). camera_filter holds optional
+    CameraFilterSettings the baked path is cleaned up with.
+    """
+    run_steps(iter_handle_camera_operations(doc, new_objects, camera_fps=camera_fps, video_fps=video_fps,
+                                            bake_camera=bake_camera, camera_path=camera_path,
+                                            position_tolerance=position_tolerance, rotation_tolerance=rotation_tolerance,
+                                            camera_samples=camera_samples, session=session, target_camera=target_camera,
+                                            camera_export=camera_export, camera_filter=camera_filter))
+
+def iter_handle_camera_operations(doc, new_objects, camera_fps=None, video_fps=None, bake_camera=False, camera_path=None,
+                                  position_tolerance=None, rotation_tolerance=None, camera_samples=None, session=None,
+                                  target_camera=None, camera_export=None, camera_filter=None):
+    """Import step handling the camera operations, see handle_camera_operations(). Yields while a camera is baked."""
+    if session is None:
+        session = ImportSession(doc)
+    for obj in [obj for top_object in new_objects for obj in iter_hierarchy(top_object)]:
         if obj.GetType() == 1028083:  # Check if it's an Alembic camera
 
             # Adjust the Alembic camera settings first
@@ -77,38 +366,57 @@ def handle_camera_operations(doc, new_objects, camera_fps=None, video_fps=None,
             if bake_camera:
                 try:
                     # Bake the Alembic as a new camera
-                    new_camera = bake_alembic_camera_animation(doc, obj)
+                    with span("bake"):
+                        new_camera = yield from iter_bake_alembic_camera_animation(
+                            doc, obj, camera_path=camera_path, position_tolerance=position_tolerance,
+                            rotation_tolerance=rotation_tolerance, camera_samples=camera_samples,
+                            target_camera=target_camera, export_path=sidecar_base_path(camera_export, camera_path),
+                            camera_filter=camera_filter)
                     logger.info("Alembic camera animation baked to: {}".format(new_camera.GetName()))
-                    
-                    # Assign omniscient scene control tag to the new camera
-                    assign_omniscient_control_tag_to_camera(doc, [new_camera])
-                    
-                    # Make the viewport look through the Alembic camera
-                    make_viewport_look_through_camera(doc, new_camera)
+                    session.record_object(new_camera, "camera", asset=camera_path)
+
+                    if target_camera is None:
+                        # Assign omniscient scene control tag to the new camera
+                        with span("tag assignment"):
+                            assign_omniscient_control_tag_to_camera(doc, [new_camera], session=session)
+
+                        # Make the viewport look through the Alembic camera
+                        make_viewport_look_through_camera(doc, new_camera)
 
                     # Remove the Alembic camera, since it's replaced by the baked one
                     doc.AddUndo(c4d.UNDOTYPE_DELETE, obj)
                     obj.Remove()
+                    session.forget_object(obj)
                 except Exception as e:
                     logger.error("Error during camera processing: {}".format(e))
             else:
                 # If not baking, ensure the Alembic camera still receives any applicable updates
-                assign_omniscient_control_tag_to_camera(doc, [obj])
+                session.camera = obj
+                with span("tag assignment"):
+                    assign_omniscient_control_tag_to_camera(doc, [obj], session=session)
 
                 # Make the viewport look through the Alembic camera
                 make_viewport_look_through_camera(doc, obj)
 
     c4d.EventAdd()
 
-def assign_omniscient_control_tag_to_camera(doc, camera_objects):
-    """Assigns omniscient scene control tag to given camera objects."""
+def assign_omniscient_control_tag_to_camera(doc, camera_objects, session=None):
+    """Assigns omniscient scene control tag to given camera objects.
+
+    The tag is linked to the background of the session's shot and becomes the session's control tag, holding
+    the shot record. Without a session, the background is looked up by name.
+    """
     for camera in camera_objects:
         omniscient_control_tag = c4d.BaseTag(OMNISCIENT_SCENE_CONTROL_TAG_ID)
         camera.InsertTag(omniscient_control_tag)
         logger.info("OmniscientSceneControl assigned to: {}".format(camera.GetName()))
         
-        # Link background to tag, assuming one background object named 'Background_Omni'
-        background = doc.SearchObject('Background_Omni')
+        # Link background to tag
+        if session is not None:
+            session.control_tag = omniscient_control_tag
+            background = session.background
+        else:
+            background = doc.SearchObject('Background_Omni')
         if background:
             omniscient_control_tag[c4d.OMNISCIENTSCENECONTROL_BACKGROUND_LINK] = background
 
@@ -119,13 +427,14 @@ def adjust_alembic_camera_settings(doc, obj, animation_offset_frames=1, camera_f
         animation_offset = c4d.BaseTime(animation_offset_frames, doc.GetFps())
         obj[c4d.ALEMBIC_ANIMATION_OFFSET] = animation_offset
 
-        # Calculate the speed adjustment factor based on FPS values, if FPS values are provided
-        if camera_fps is not None and video_fps is not None:
-            speed_adjustment_factor = video_fps / camera_fps
-            obj[c4d.ALEMBIC_ANIMATION_SPEED] = speed_adjustment_factor
+        # The archive's sample times are the capture's timestamps, so the speed is left alone when the frame
+        # rates differ. The baked camera is resampled onto the video's frames instead
+        if camera_fps is not None and video_fps is not None and camera_fps != video_fps:
+            logger.info("Camera captured at {} fps, the video at {} fps.".format(camera_fps, video_fps))
 
 def update_project_settings(doc, width, height, fps):
     rd = doc.GetActiveRenderData()
+    doc.AddUndo(c4d.UNDOTYPE_CHANGE_SMALL, rd)
     rd[c4d.RDATA_XRES] = width
     rd[c4d.RDATA_YRES] = height
     rd[c4d.RDATA_FRAMERATE] = fps
@@ -141,6 +450,7 @@ def set_viewport_to_lines(doc):
         logger.error("No active BaseDraw found. Cannot set viewport to Lines mode.")
         return
 
+    doc.AddUndo(c4d.UNDOTYPE_CHANGE_SMALL, bd)
     bd[c4d.BASEDRAW_DATA_SDISPLAYACTIVE] = c4d.BASEDRAW_SDISPLAY_NOSHADING
 
     c4d.EventAdd()
@@ -156,74 +466,514 @@ def make_viewport_look_through_camera(doc, camera):
 
     c4d.EventAdd()
 
-def import_omni_file(doc, file_path):
-    logger.info("Selected .omni file: {}".format(file_path))
+def start_shot_video_proxy(session, manifest, option):
+    """
+    Starts generating the viewport proxy of the shot's video material in the background, if option asks for one.
+
+    Returns:
+    - The VideoProxyJob, or None.
+    """
+    width = proxy_width(option, manifest.width)
+    if width is None or not manifest.video_path:
+        return None
+    materials = [node for node in session.assets.get(manifest.video_path, []) if isinstance(node, c4d.BaseMaterial)]
+    if not materials:
+        return None
+    movie_info = get_movie_info(manifest.video_path)
+    return start_video_proxy(materials[0], manifest.video_path, width, frame_count=movie_info[0] if movie_info else None)
+
+def open_scan_cache(import_options):
+    """Returns the ScanCache configured by the import options, or None if it is disabled or unavailable."""
+    if not import_options.get("scan_cache", True):
+        return None
+    max_bytes = import_options.get("scan_cache_max_bytes")
     try:
-        with open(file_path, "r") as file:
-            omni_data = json.load(file)
-        logger.info("Parsed .omni data.")
+        if max_bytes is None:
+            return ScanCache(import_options.get("scan_cache_dir"))
+        return ScanCache(import_options.get("scan_cache_dir"), max_bytes=int(max_bytes))
+    except OSError as e:
+        logger.warning("Scan cache disabled: {}".format(e))
+        return None
+
+def check_manifest_version(manifest):
+    """Returns True if this plugin version can import the manifest, otherwise reports the required update."""
+    try:
+        plugin_version.check_plugin_version(manifest.minimum_plugin_version)
+    except plugin_version.UnsupportedVersionException as e:
+        if error_reporter is not None:
+            error_reporter(str(e))
+            return False
+        data_storage = DialogDataStorage.getInstance()
+        data_storage.set_data("Omniscient", str(e), e.update_url)
+        c4d.SpecialEventAdd(OMNISCIENT_DIALOG_EVENT_ID)
+        return False
+    return True
+
+def import_omni_file(doc, file_path, import_options=None):
+    """
+    Imports a .omni shot into the document.
+
+    Parameters:
+    - doc: The Cinema 4D document to import into.
+    - file_path: The path to the .omni file.
+    - import_options: Optional dict of import settings:
+        - position_tolerance: Positional error in document units up to which baked camera keys are simplified.
+        - rotation_tolerance: Angular error in degrees up to which baked camera keys are simplified.
+        - scan_loader: "native" (default) to decode OBJ scans with the built-in reader, "merge" to use
+          Cinema 4D's OBJ importer.
+        - workers: Number of worker processes decoding scans and the camera in parallel, defaults to one less
+          than the number of CPUs. 1 decodes everything on the main thread.
+        - scan_triangle_budget: Triangle count above which scans get a decimated viewport proxy, the
+          full-resolution scan is then only visible in renders. None (default) keeps scans as they are.
+        - scan_cache: Keep decoded scans in a persistent on-disk cache so reimports skip parsing, defaults to True.
+        - scan_cache_dir: Directory of the scan cache, defaults to the per-user cache directory.
+        - scan_cache_max_bytes: Size above which the least recently used cached scans are evicted.
+        - trace: True or a directory to write a Chrome trace of the import's stages, see importTrace. Defaults to
+          the OMNISCIENT_TRACE environment variable.
+        - video_proxy: True or a width in pixels to generate a downscaled copy of the video in the background,
+          which the viewport then shows instead of the video. Renders keep the video. Defaults to False.
+        - scan_tile_size: Edge length in meters of the grid tiles scans are split into, each tile a child object
+          of the scan's null with its own levels of detail. None (default) keeps every scan in one object.
+        - scan_lod_levels: Levels of detail of every tile including the full-resolution one, defaults to 3. The
+          editor shows tiles away from the camera's path at the coarser levels.
+        - point_voxel_size: Voxel size in meters point clouds are downsampled with, unless their geometry entry
+          in the manifest gives a voxel_size. None (default) keeps every point.
+        - scan_sharing: Scans whose files have the same content as a scan already in the document, imported with
+          the same scan options, become instances of it instead of being loaded again. Defaults to True.
+        - camera_export: True or a directory to export the baked camera as an .omnicam sidecar, a .chan and a
+          CSV file named after the camera's .abc, next to it by default. Imports finding an up-to-date .omnicam
+          read the camera from it instead of sampling the archive. Defaults to False.
+        - scan_memory_budget: Megabytes of memory an OBJ scan may take while it is loaded. Scans expected to need
+          more are streamed chunk by chunk straight into their object instead of being decoded in full, without
+          viewport proxy, tiles or scan cache. The peak resident memory of every geometry entry is logged. None
+          (default) loads every scan in full.
+        - camera_smoothing: "savgol" to smooth the baked camera's path with a Savitzky-Golay filter, "one_euro"
+          for a one-euro filter that smooths slow motion more than fast motion. None (default) keeps the path.
+        - camera_smoothing_window: Frames of the Savitzky-Golay window, defaults to 9.
+        - camera_smoothing_cutoff: Cutoff frequency in Hz of the one-euro filter at rest, defaults to 1.
+        - camera_outlier_threshold: Frames whose pose deviates from their neighbors' trend by more than this many
+          robust standard deviations are replaced by interpolating their neighbors, e.g. 3. None (default) keeps
+          every frame. The corrections of every frame are logged and exported with camera_export.
 
-        # Version check
-        minimum_required_version = omni_data.get("cinema4d", {}).get("minimum_plugin_version", "0.0.0")
+    Returns:
+    - True if the shot was imported, False if it could not be read or an error interrupted the import.
+    """
+    return run_steps(iter_import_steps(doc, file_path, import_options))
+
+def start_import_omni_file(doc, file_path, import_options=None):
+    """
+    Imports a .omni shot in the background of Cinema 4D's interface, see import_omni_file() and ImportJob.
+
+    The status bar shows the progress, Escape cancels the import and undoes what it changed. The document isn't
+    locked meanwhile: each slice of the import is an undo step of its own, between the user's edits.
+
+    Returns:
+    - The ImportJob.
+    """
+    return start_import(doc, os.path.basename(file_path), iter_import_steps(doc, file_path, import_options, background=True))
+
+def iter_import_steps(doc, file_path, import_options=None, background=False):
+    """
+    Imports a .omni shot step by step, see import_omni_file() for the parameters.
+
+    A generator yielding an ImportProgress between changes to the document, and while it waits for decoded
+    files. Its return value is the result of import_omni_file(). With background set, the manifest is read
+    and every file decoded on worker threads, so the steps never block the calling thread for long.
+    """
+    if import_options is None:
+        import_options = {}
+
+    logger.info("Selected .omni file: {}".format(file_path))
+    with traced(os.path.basename(file_path), trace_directory(import_options.get("trace"))):
         try:
-            plugin_version.check_plugin_version(minimum_required_version)
-        except plugin_version.UnsupportedVersionException as e:
-            data_storage = DialogDataStorage.getInstance()
-            data_storage.set_data("Omniscient", str(e), e.update_url)
-            c4d.SpecialEventAdd(OMNISCIENT_DIALOG_EVENT_ID)
-            return
-        
-        # Extract FPS values
-        video_fps = float(omni_data.get("data", {}).get("video", {}).get("fps")) if "fps" in omni_data.get("data", {}).get("video", {}) else None
-        camera_fps = float(omni_data.get("data", {}).get("camera", {}).get("fps")) if "fps" in omni_data.get("data", {}).get("camera", {}) else None
-
-        # Extract project settings from .omni data
-        video_data = omni_data.get("data", {}).get("video", {})
-        width = int(float(video_data.get("resolution", {}).get("width", "1920")))
-        height = int(float(video_data.get("resolution", {}).get("height", "1080")))
-        fps = float(video_data.get("fps", "30"))
-
-        # Update Cinema 4D project settings
-        update_project_settings(doc, width, height, fps)
-
-        # Create material from video and set project settings
-        video_path = os.path.join(os.path.dirname(file_path), video_data.get("relative_path", ""))
-        if os.path.exists(video_path):
-            create_background_with_video_material(doc, video_path)
-            set_project_settings_from_video(doc, video_path)
-        else:
-            error_message = "Video import failed. The video file '{}' needs to be in the same folder as the .omni file.".format(os.path.basename(video_path))
-            logger.error(error_message)
-            c4d.gui.MessageDialog(error_message)
-
-        # Handle geometry import
-        geometry_paths = omni_data.get("data", {}).get("geometry", {}).get("relative_path", [])
-        if geometry_paths:
-            for geo_path in geometry_paths:
-                if not geo_path.strip():
-                    logger.warning("Gometry path is empty.")
-                    continue 
-                obj_path = os.path.join(os.path.dirname(file_path), geo_path)
-                process_import(doc, obj_path, "Scan_Omni")
-
-        # Handle camera import
-        camera_path = omni_data.get("data", {}).get("camera", {}).get("relative_path", "")
-        if camera_path:
-            cam_path = os.path.join(os.path.dirname(file_path), camera_path)
-            camera_import_options = {
-                "is_camera": True,
-                "camera_fps": camera_fps,
-                "video_fps": video_fps,
-                "bake_camera": True
-            }
-            process_import(doc, cam_path, "Camera_Omni", import_options=camera_import_options)
-        
-        set_viewport_to_lines(doc)
+            # Validate the manifest and find every asset before the document is changed
+            with span("preflight"):
+                if background:
+                    preflight = (yield from wait_for(call_in_thread(preflight_shot, file_path), "Checking files")).result()
+                else:
+                    preflight = preflight_shot(file_path)
+            if not preflight.ok:
+                error_message = "Import of '{}' cancelled:\n{}".format(os.path.basename(file_path), "\n".join(preflight.problems))
+                logger.error(error_message)
+                report_error(error_message)
+                return False
+            manifest = preflight.manifest
+            logger.info("Parsed .omni data.")
+
+            # Version check
+            if not check_manifest_version(manifest):
+                return False
+            camera_filter = CameraFilterSettings.from_options(import_options)
+
+            geometry_files = manifest.scan_paths
+            cam_path = manifest.camera_path
+
+            # Scans with the content of scans already in the document, e.g. of another take on the same set, are
+            # shared instead of loaded again
+            sharing = None
+            shared_files = set()
+            if import_options.get("scan_sharing", True) and geometry_files:
+                with span("hash scans", files=len(geometry_files)):
+                    sharing = ScanDeduplication(doc, import_options, OMNISCIENT_SCENE_CONTROL_TAG_ID)
+                    assets = [preflight.asset(path) for path in geometry_files]
+                    if background:
+                        (yield from wait_for(call_in_thread(sharing.hash_scans, assets), "Hashing scans")).result()
+                    else:
+                        sharing.hash_scans(assets)
+                    shared_files = sharing.shared_paths(geometry_files)
+
+            # Start decoding scans, point clouds and camera while the document is being prepared
+            scan_loader = import_options.get("scan_loader", "native")
+            scan_files = [path for path in geometry_files if scan_loader == "native" and path.lower().endswith('.obj')
+                          and path not in shared_files]
+            # Scans too large for the memory budget are streamed while they are built instead of decoded ahead
+            memory_budget = budget_bytes(import_options.get("scan_memory_budget"))
+            streamed_files = streamed_scan_paths(scan_files, preflight, memory_budget)
+            scan_files = [path for path in scan_files if path not in streamed_files]
+            point_clouds = [entry for entry in manifest.geometry if entry.is_point_cloud]
+            camera_files = [cam_path] if cam_path else []
+            file_count = len(scan_files) + len(point_clouds) + len(camera_files)
+            session = ImportSession(doc)
+            scan_cache = open_scan_cache(import_options) if scan_files else None
+            # Video, geometry, camera and the scene's finishing touches
+            step_count = float(len(manifest.geometry) + (1 if cam_path else 0) + 2)
+            with ShotDecoder(file_count, workers=import_options.get("workers"), cache=scan_cache,
+                             background=background) as decoder:
+                with span("submit decoding", files=file_count, workers=decoder.workers):
+                    scale = get_unit_scale_factor(doc, 1.0, c4d.DOCUMENT_UNIT_M)
+                    for path in scan_files:
+                        decoder.submit_scan(path, scale, stat=preflight.asset(path).stat)
+                    for entry in point_clouds:
+                        decoder.submit_point_cloud(entry.path, scale, point_cloud_voxel_size(entry, import_options, scale))
+                    for path in camera_files:
+                        decoder.submit_camera(path)
+
+                yield ImportProgress("Creating video background", 0.0)
+                # Update Cinema 4D project settings
+                with span("project settings"):
+                    update_project_settings(doc, manifest.width, manifest.height, manifest.fps)
+
+                # Create material from video and set project settings
+                with span("video material"):
+                    create_background_with_video_material(doc, manifest.video_path, session=session)
+                with span("project settings from video"):
+                    set_project_settings_from_video(doc, manifest.video_path)
+                start_shot_video_proxy(session, manifest, import_options.get("video_proxy"))
 
-    except Exception as e:
-        logger.exception("An error occurred while processing the .omni file: ", exc_info=e)
+                # Handle geometry import, objects are built in manifest order
+                for index, entry in enumerate(manifest.geometry):
+                    obj_path = entry.path
+                    stage = "Geometry {} of {}".format(index + 1, len(manifest.geometry))
+                    fraction = (index + 1) / step_count
+                    yield ImportProgress(stage, fraction)
+                    monitor = MemoryMonitor() if memory_budget is not None else None
+                    with span("geometry", file=os.path.basename(obj_path)) as geometry_span:
+                        with span("wait for decoding") as wait_span:
+                            future = decoder.future(obj_path)
+                            if future is not None:
+                                yield from wait_for(future, "Decoding " + stage.lower(), fraction)
+                            decoded = decoder.result(obj_path)
+                            if decoded is not None:
+                                wait_span.set(decode_seconds=decoded.seconds)
+                        if entry.is_point_cloud:
+                            point_import_options = {
+                                "point_cloud": True,
+                                "voxel_size": point_cloud_voxel_size(entry, import_options, scale),
+                                "decoded": decoded,
+                                "session": session
+                            }
+                            yield from within(iter_process_import(doc, obj_path, "PointCloud_Omni", point_import_options),
+                                              stage, fraction, fraction + 1 / step_count)
+                            if monitor is not None:
+                                report_peak_memory(obj_path, monitor, memory_budget, geometry_span)
+                            continue
+                        source = sharing.source(obj_path) if sharing is not None else None
+                        if source is not None:
+                            build_scan_instance(doc, source, "Scan_Omni", obj_path, session=session)
+                            sharing.shared_scan(preflight.asset(obj_path))
+                            continue
+                        scan_import_options = {
+                            "scan_loader": scan_loader,
+                            "scan_triangle_budget": import_options.get("scan_triangle_budget"),
+                            "scan_tile_size": scan_tile_size(import_options, scale),
+                            "scan_lod_levels": import_options.get("scan_lod_levels") or DEFAULT_LOD_LEVELS,
+                            "decoded": decoded,
+                            "session": session,
+                            "stream_scan": obj_path in streamed_files,
+                            "scan_memory_budget": memory_budget,
+                            "memory_monitor": monitor
+                        }
+                        yield from within(iter_process_import(doc, obj_path, "Scan_Omni", scan_import_options),
+                                          stage, fraction, fraction + 1 / step_count)
+                        if monitor is not None:
+                            report_peak_memory(obj_path, monitor, memory_budget, geometry_span)
+                        if sharing is not None:
+                            built = session.assets.get(obj_path, [])
+                            sharing.add(obj_path, next((obj for obj in session.scans if obj in built), None))
+                if sharing is not None:
+                    sharing.report()
+
+                # Handle camera import
+                if cam_path:
+                    fraction = (len(manifest.geometry) + 1) / step_count
+                    yield ImportProgress("Baking camera", fraction)
+                    with span("camera", file=os.path.basename(cam_path)):
+                        with span("wait for decoding") as wait_span:
+                            future = decoder.future(cam_path)
+                            if future is not None:
+                                yield from wait_for(future, "Decoding camera", fraction)
+                            decoded = decoder.result(cam_path)
+                            if decoded is not None:
+                                wait_span.set(decode_seconds=decoded.seconds)
+                        camera_import_options = {
+                            "is_camera": True,
+                            "camera_fps": manifest.camera_fps,
+                            "video_fps": manifest.video_fps,
+                            "bake_camera": True,
+                            "position_tolerance": import_options.get("position_tolerance"),
+                            "rotation_tolerance": import_options.get("rotation_tolerance"),
+                            "camera_export": import_options.get("camera_export"),
+                            "camera_filter": camera_filter,
+                            "decoded": decoded,
+                            "session": session
+                        }
+                        yield from within(iter_process_import(doc, cam_path, "Camera_Omni", camera_import_options),
+                                          "Baking camera", fraction, fraction + 1 / step_count)
+                        select_scan_tile_levels(doc, session.scans, decoded)
+
+            yield ImportProgress("Finishing", (step_count - 1) / step_count)
+            set_viewport_to_lines(doc)
+
+            # Fingerprint the assets, so importing the shot again only rebuilds what changed
+            if session.control_tag is not None:
+                with span("record shot"):
+                    try:
+                        record_shot(session, preflight, session.control_tag, options=import_options)
+                    except OSError as e:
+                        logger.warning("Failed to record the shot's assets, it can't be reimported in place: {}".format(e))
+            return True
+
+        except Exception as e:
+            logger.exception("An error occurred while processing the .omni file: ", exc_info=e)
+            return False
+
+def _remove_nodes(doc, nodes):
+    for node in nodes:
+        # Scans shared with other shots stay in those shots as copies
+        if isinstance(node, c4d.BaseObject):
+            detach_instances(doc, node)
+        doc.AddUndo(c4d.UNDOTYPE_DELETE, node)
+        node.Remove()
+
+def reimport_shot_assets(doc, preflight, changes, nodes, options, session):
+    """
+    Rebuilds the objects of the changed assets of a shot, imports added assets and deletes removed ones.
+
+    Parameters:
+    - doc: The Cinema 4D document holding the shot.
+    - preflight: The successful ShotPreflight of the shot's manifest.
+    - changes: The ShotChanges since the shot was recorded.
+    - nodes: The shot's objects and materials per asset key, see find_shot_nodes().
+    - options: The import options, see import_omni_file().
+    - session: The ImportSession recording the rebuilt and new objects.
+    """
+    manifest = preflight.manifest
+    camera_filter = CameraFilterSettings.from_options(options)
+    scan_loader = options.get("scan_loader", "native")
+    scan_files = [path for path in manifest.scan_paths if scan_loader == "native" and path.lower().endswith('.obj')
+                  and changes.needs_update(asset_key("scan", path, manifest.directory))]
+    memory_budget = budget_bytes(options.get("scan_memory_budget"))
+    streamed_files = streamed_scan_paths(scan_files, preflight, memory_budget)
+    scan_files = [path for path in scan_files if path not in streamed_files]
+    point_clouds = [entry for entry in manifest.geometry if entry.is_point_cloud
+                    and changes.needs_update(asset_key("points", entry.path, manifest.directory))]
+    camera_files = [manifest.camera_path] if manifest.camera_path and changes.needs_update("camera") else []
+    # Tiled scans pick their levels of detail by the camera path, which is read even when the camera is kept
+    tiled = bool(options.get("scan_tile_size"))
+    camera_path_files = [manifest.camera_path] if manifest.camera_path and tiled and scan_files and not camera_files else []
+
+    scan_cache = open_scan_cache(options) if scan_files else None
+    file_count = len(scan_files) + len(point_clouds) + len(camera_files) + len(camera_path_files)
+    with ShotDecoder(file_count, workers=options.get("workers"), cache=scan_cache) as decoder:
+        scale = get_unit_scale_factor(doc, 1.0, c4d.DOCUMENT_UNIT_M)
+        for path in scan_files:
+            decoder.submit_scan(path, scale, stat=preflight.asset(path).stat)
+        for entry in point_clouds:
+            decoder.submit_point_cloud(entry.path, scale, point_cloud_voxel_size(entry, options, scale))
+        for path in camera_files + camera_path_files:
+            decoder.submit_camera(path)
+
+        # Objects of assets no longer in the manifest
+        for key in changes.removed:
+            with span("remove", asset=key):
+                _remove_nodes(doc, nodes.get(key, []))
+
+        if manifest.video_path and changes.needs_update("video"):
+            with span("video material"):
+                materials = [node for node in nodes.get("video", []) if isinstance(node, c4d.BaseMaterial)]
+                if materials and update_video_material(materials[0], manifest.video_path, doc):
+                    session.record_material(materials[0], asset=manifest.video_path)
+                else:
+                    _remove_nodes(doc, nodes.get("video", []))
+                    create_background_with_video_material(doc, manifest.video_path, session=session)
+            with span("project settings"):
+                update_project_settings(doc, manifest.width, manifest.height, manifest.fps)
+                set_project_settings_from_video(doc, manifest.video_path)
+            start_shot_video_proxy(session, manifest, options.get("video_proxy"))
+
+        for entry in manifest.geometry:
+            path = entry.path
+            key = asset_key(entry.role, path, manifest.directory)
+            if not changes.needs_update(key):
+                continue
+            monitor = MemoryMonitor() if memory_budget is not None else None
+            with span("geometry", file=os.path.basename(path)) as geometry_span:
+                decoded = decoder.result(path)
+                objects = [node for node in nodes.get(key, []) if isinstance(node, c4d.BaseObject)]
+                target = None
+                streamed = path in streamed_files
+                if (len(objects) == 1 and objects[0].GetType() == c4d.Opolygon
+                        and (streamed or decoded is not None and decoded.ok)
+                        and not (tiled and not entry.is_point_cloud and not streamed)):
+                    target = objects[0]
+                    detach_instances(doc, target)
+                else:
+                    # Geometry that can't be rebuilt in place is imported again
+                    _remove_nodes(doc, nodes.get(key, []))
+                if entry.is_point_cloud:
+                    point_import_options = {
+                        "point_cloud": True,
+                        "voxel_size": point_cloud_voxel_size(entry, options, scale),
+                        "decoded": decoded,
+                        "session": session,
+                        "target": target
+                    }
+                    process_import(doc, path, "PointCloud_Omni", import_options=point_import_options)
+                    if monitor is not None:
+                        report_peak_memory(path, monitor, memory_budget, geometry_span)
+                    continue
+                scan_import_options = {
+                    "scan_loader": scan_loader,
+                    "scan_triangle_budget": options.get("scan_triangle_budget"),
+                    "scan_tile_size": scan_tile_size(options, scale),
+                    "scan_lod_levels": options.get("scan_lod_levels") or DEFAULT_LOD_LEVELS,
+                    "decoded": decoded,
+                    "session": session,
+                    "target": target,
+                    "stream_scan": streamed,
+                    "scan_memory_budget": memory_budget,
+                    "memory_monitor": monitor
+                }
+                process_import(doc, path, "Scan_Omni", import_options=scan_import_options)
+                if monitor is not None:
+                    report_peak_memory(path, monitor, memory_budget, geometry_span)
+
+        decoded_camera = None
+        if camera_files:
+            with span("camera", file=os.path.basename(manifest.camera_path)):
+                cameras = [node for node in nodes.get("camera", []) if isinstance(node, c4d.BaseObject)
+                           and node.GetType() == c4d.Ocamera]
+                decoded_camera = decoder.result(manifest.camera_path)
+                camera_import_options = {
+                    "is_camera": True,
+                    "camera_fps": manifest.camera_fps,
+                    "video_fps": manifest.video_fps,
+                    "bake_camera": True,
+                    "position_tolerance": options.get("position_tolerance"),
+                    "rotation_tolerance": options.get("rotation_tolerance"),
+                    "camera_export": options.get("camera_export"),
+                    "camera_filter": camera_filter,
+                    "decoded": decoded_camera,
+                    "session": session,
+                    "target": cameras[0] if cameras else None
+                }
+                process_import(doc, manifest.camera_path, "Camera_Omni", import_options=camera_import_options)
+
+        # Rebuilt tiled scans, and the kept ones too when the camera moved
+        scans = list(session.scans)
+        if camera_files:
+            scans += [node for key in changes.unchanged if key.startswith("scan:") for node in nodes.get(key, [])]
+        elif camera_path_files:
+            decoded_camera = decoder.result(manifest.camera_path)
+        if decoded_camera is not None:
+            select_scan_tile_levels(doc, scans, decoded_camera)
+
+def reimport_omni_file(doc, file_path, import_options=None):
+    """
+    Updates a shot imported before from the same .omni file, rebuilding only the objects of the assets that changed.
+
+    The shot record in the shot's scene control tag tells which assets changed. Scans are rebuilt in place,
+    keeping their objects, materials, tags and every link to them, the camera is baked again into the same
+    camera and the video material is pointed at the new video. Assets added to the manifest are imported and
+    the objects of removed ones deleted. Scans that were imported with Cinema 4D's OBJ importer are replaced.
+    The whole reimport is a single undo step. Shots without a record are imported anew.
+
+    Parameters:
+    - doc: The Cinema 4D document holding the shot.
+    - file_path: The path to the .omni file.
+    - import_options: Optional dict of import settings, see import_omni_file(). Defaults to the options the shot
+      was imported with.
+
+    Returns:
+    - True if the shot is up to date, False if it could not be read or an error interrupted the reimport.
+    """
+    tag, record = find_shot_tag(doc, file_path, OMNISCIENT_SCENE_CONTROL_TAG_ID)
+    if record is None:
+        logger.info("No previous import of '{}' found, importing it.".format(file_path))
+        return import_omni_file(doc, file_path, import_options)
+    options = dict(record.options)
+    options.update(import_options or {})
+
+    logger.info("Reimporting .omni file: {}".format(file_path))
+    with traced(os.path.basename(file_path), trace_directory(options.get("trace"))):
+        try:
+            with span("preflight"):
+                preflight = preflight_shot(file_path)
+            if not preflight.ok:
+                error_message = "Reimport of '{}' cancelled:\n{}".format(os.path.basename(file_path), "\n".join(preflight.problems))
+                logger.error(error_message)
+                report_error(error_message)
+                return False
+            if not check_manifest_version(preflight.manifest):
+                return False
+
+            with span("compare"):
+                changes = compare_shot(record, preflight)
+            logger.info("Changes of '{}': {}".format(os.path.basename(file_path), changes))
+            if not changes.any:
+                return True
+
+            session = ImportSession(doc)
+            doc.StartUndo()
+            try:
+                reimport_shot_assets(doc, preflight, changes, find_shot_nodes(doc, record.shot_id), options, session)
+
+                # A camera imported anew carries its own scene control tag, which takes over the record
+                if session.control_tag is not None and session.control_tag is not tag:
+                    doc.AddUndo(c4d.UNDOTYPE_DELETE, tag)
+                    tag.Remove()
+                    tag = session.control_tag
+                elif session.background is not None:
+                    doc.AddUndo(c4d.UNDOTYPE_CHANGE_SMALL, tag)
+                    tag[c4d.OMNISCIENTSCENECONTROL_BACKGROUND_LINK] = session.background
+                with span("record shot"):
+                    record_shot(session, preflight, tag, shot_id=record.shot_id, options=options)
+            finally:
+                doc.EndUndo()
+            c4d.EventAdd()
+            return True
+
+        except Exception as e:
+            logger.exception("An error occurred while reimporting the .omni file: ", exc_info=e)
+            return False
 
 def main(doc):
+    # Running the command during an import offers to cancel it, otherwise the next shot is queued after it
+    job = running_import()
+    if job is not None and c4d.gui.QuestionDialog("'{}' is being imported.\nCancel the import?".format(job.name)):
+        cancel_imports()
+        return
+
     file_path = c4d.storage.LoadDialog(title="Select .omni File", flags=c4d.FILESELECT_LOAD, force_suffix="omni")
     
     # Check if a file was selected
@@ -232,6 +982,13 @@ def main(doc):
         if not file_path.lower().endswith('.omni'):
             c4d.gui.MessageDialog("Please select a file with the .omni extension.")
             return
-        import_omni_file(doc, file_path)
+        # Update a shot imported before instead of adding it again, if the user agrees
+        _, record = find_shot_tag(doc, file_path, OMNISCIENT_SCENE_CONTROL_TAG_ID)
+        if record is not None and c4d.gui.QuestionDialog(
+                "'{}' has been imported before.\nUpdate the existing shot, rebuilding only what changed?\n\n"
+                "Choose No to import another copy.".format(os.path.basename(file_path))):
+            reimport_omni_file(doc, file_path, dict(INTERACTIVE_IMPORT_OPTIONS))
+            return
+        start_import_omni_file(doc, file_path, dict(INTERACTIVE_IMPORT_OPTIONS))
     else:
         logger.error("No file selected.")
\ No newline at end of file
@@ -1,7 +1,10 @@
 import c4d
-import webbrowser
 
 OMNISCIENT_DIALOG_EVENT_ID = 1063030
+# Sent while video proxies are generated, the message plugin's ID
+VIDEO_PROXY_EVENT_ID = 1063029
+# Runs the next slice of a background import, the importer command's ID
+IMPORT_EVENT_ID = 1063004
 
 class DialogDataStorage:
     _instance = None
@@ -37,7 +40,17 @@ class OmniscientMessage(c4d.plugins.MessageData):
             dialog.Open(dlgtype=c4d.DLG_TYPE_MODAL, defaultw=400, defaulth=100)
             
             data_storage.clear_data()
-            
+
+        elif id == VIDEO_PROXY_EVENT_ID:
+            # Progress of the background video proxies, finished ones replace the video in the viewport. Imported
+            # here, the message plugin is registered at startup and should load nothing more
+            from videoProxy import update_video_proxies
+            update_video_proxies()
+
+        elif id == IMPORT_EVENT_ID:
+            from importRunner import update_imports
+            update_imports()
+
         return True
 
 class CustomDialog(c4d.gui.GeDialog):
@@ -78,6 +91,7 @@ class CustomDialog(c4d.gui.GeDialog):
             self.Close()
             return True
         elif id == self.ID_BUTTON_UPDATE and self.update_url:
+            import webbrowser
             webbrowser.open(self.update_url)
             self.Close()
             return True
@@ -1,36 +1,73 @@
 import c4d
 from c4d import plugins
 
+GRID_DISPLAY_FILTERS = (c4d.BASEDRAW_DISPLAYFILTER_GRID, c4d.BASEDRAW_DISPLAYFILTER_WORLDAXIS, c4d.BASEDRAW_DISPLAYFILTER_HORIZON)
+SAFE_FRAME_ATTRIBUTES = (c4d.BASEDRAW_DATA_SHOWSAFEFRAME,)
+# Document saves around which video materials are switched from their proxy to the original video and back
+_SAVE_TYPES_AFTER = (c4d.MSG_DOCUMENTINFO_TYPE_SAVE_AFTER, c4d.MSG_DOCUMENTINFO_TYPE_SAVEPROJECT_AFTER)
+_SAVE_TYPES = (c4d.MSG_DOCUMENTINFO_TYPE_SAVE_BEFORE, c4d.MSG_DOCUMENTINFO_TYPE_SAVEPROJECT_BEFORE) + _SAVE_TYPES_AFTER
+
+# Totals over all tags: scene evaluations, evaluations that recomputed the state, and parameters written
+execute_statistics = {"evaluations": 0, "recomputes": 0, "writes": 0}
+
+def reset_execute_statistics():
+    for key in execute_statistics:
+        execute_statistics[key] = 0
+
+def _guid(node):
+    return node.GetGUID() if node is not None else None
+
 class OmniscientSceneControl(plugins.TagData):
     def Init(self, node, isCloneInit=False):
         node[c4d.OMNISCIENTSCENECONTROL_BACKGROUND_VISIBILITY] = c4d.OMNISCIENTSCENECONTROL_VIEW_THROUGH_CAMERA
         node[c4d.OMNISCIENTSCENECONTROL_SAFE_FRAME_VISIBILITY] = c4d.OMNISCIENTSCENECONTROL_VIEW_THROUGH_CAMERA
         node[c4d.OMNISCIENTSCENECONTROL_VIEWPORT_GRID_VISIBILITY] = c4d.OMNISCIENTSCENECONTROL_ONLY_NOT_THROUGH_CAM
+        # Inputs of the last applied state, Execute does nothing while they are unchanged
+        self.applied_state = None
+        self.evaluations = 0
+        self.writes = 0
         return True
 
-    def apply_visibility_setting(self, doc, user_setting, base_draw, c4d_attributes, viewing_through_camera, obj=None):
+    def get_statistics(self):
+        """Returns the number of evaluations of this tag and the number of parameters it actually wrote."""
+        return {"evaluations": self.evaluations, "writes": self.writes}
+
+    def get_visibility_state(self, user_setting, viewing_through_camera):
         visibility_state_map = {
             c4d.OMNISCIENTSCENECONTROL_VIEW_THROUGH_CAMERA: viewing_through_camera,     # Through Camera
             c4d.OMNISCIENTSCENECONTROL_ALWAYS: True,                                    # Always
             c4d.OMNISCIENTSCENECONTROL_NEVER: False,                                    # Never
             c4d.OMNISCIENTSCENECONTROL_ONLY_NOT_THROUGH_CAM: not viewing_through_camera # Only When Not Viewing Through Camera
         }
-        visibility_state = visibility_state_map.get(user_setting, True)
+        return visibility_state_map.get(user_setting, True)
+
+    def set_if_different(self, node, attribute, value):
+        """Writes a parameter only if it differs, so unchanged values don't dirty the scene."""
+        if node[attribute] == value:
+            return
+        node[attribute] = value
+        self.writes += 1
+        execute_statistics["writes"] += 1
+
+    def apply_visibility_setting(self, doc, user_setting, base_draw, c4d_attributes, viewing_through_camera, obj=None):
+        visibility_state = self.get_visibility_state(user_setting, viewing_through_camera)
 
         visibility_mode = c4d.MODE_ON if visibility_state else c4d.MODE_OFF
 
         if obj:
-            obj[c4d.ID_BASEOBJECT_VISIBILITY_EDITOR] = visibility_mode
-            obj[c4d.ID_BASEOBJECT_VISIBILITY_RENDER] = visibility_mode
+            self.set_if_different(obj, c4d.ID_BASEOBJECT_VISIBILITY_EDITOR, visibility_mode)
+            self.set_if_different(obj, c4d.ID_BASEOBJECT_VISIBILITY_RENDER, visibility_mode)
         else:
             if base_draw and c4d_attributes:
                 for attr in c4d_attributes:
                     if attr is not None:
-                        base_draw[attr] = c4d.MODE_OFF if visibility_state else c4d.MODE_ON
+                        self.set_if_different(base_draw, attr, c4d.MODE_OFF if visibility_state else c4d.MODE_ON)
 
     def Execute(self, tag, doc, op, bt, priority, flags):
         if not tag:
             return False
+        self.evaluations += 1
+        execute_statistics["evaluations"] += 1
 
         # Check if the tag's host object is either an Alembic Generator or a Cinema 4D camera
         isCamera = op.GetType() in [1028083, 5103]  # IDs for Alembic Generator and Cinema 4D camera
@@ -40,24 +77,33 @@ class OmniscientSceneControl(plugins.TagData):
         if not bd:
             return True  # Early exit if there's no base draw available
 
-        activeCamera = bd.GetSceneCamera(doc) if bd.GetSceneCamera(doc) else bd.GetEditorCamera()
-        viewingThroughThisCamera = isCamera and (op == activeCamera or (op.GetDown() and op.GetDown() == activeCamera))
+        sceneCamera = bd.GetSceneCamera(doc)
+        activeCamera = sceneCamera if sceneCamera else bd.GetEditorCamera()
+        viewingThroughThisCamera = bool(isCamera and (op == activeCamera or (op.GetDown() and op.GetDown() == activeCamera)))
 
         # Retrieve user preferences for viewport grid, background, and safe frame visibility
         background_visibility_setting = tag[c4d.OMNISCIENTSCENECONTROL_BACKGROUND_VISIBILITY]
         safe_frame_visibility_setting = tag[c4d.OMNISCIENTSCENECONTROL_SAFE_FRAME_VISIBILITY]
         viewport_grid_visibility_setting = tag[c4d.OMNISCIENTSCENECONTROL_VIEWPORT_GRID_VISIBILITY]
+        background_object = tag[c4d.OMNISCIENTSCENECONTROL_BACKGROUND_LINK]
+
+        # Only recompute when the active camera, the viewport or the tag settings changed
+        state = (viewingThroughThisCamera, background_visibility_setting, safe_frame_visibility_setting,
+                 viewport_grid_visibility_setting, _guid(background_object), _guid(bd))
+        if state == self.applied_state:
+            return True
+        self.applied_state = state
+        execute_statistics["recomputes"] += 1
 
         # Control the viewport grid, world axis, and horizon visibility based on the user setting
         self.apply_visibility_setting(
             doc,
             viewport_grid_visibility_setting,
             bd,
-            [c4d.BASEDRAW_DISPLAYFILTER_GRID, c4d.BASEDRAW_DISPLAYFILTER_WORLDAXIS, c4d.BASEDRAW_DISPLAYFILTER_HORIZON],
+            GRID_DISPLAY_FILTERS,
             viewingThroughThisCamera
         )
         # Control the background object visibility based on the user setting
-        background_object = tag[c4d.OMNISCIENTSCENECONTROL_BACKGROUND_LINK]
         if background_object:
             self.apply_visibility_setting(
                 doc,
@@ -72,9 +118,36 @@ class OmniscientSceneControl(plugins.TagData):
             doc,
             safe_frame_visibility_setting,
             bd,
-            [c4d.BASEDRAW_DATA_SHOWSAFEFRAME],
+            SAFE_FRAME_ATTRIBUTES,
             viewingThroughThisCamera
         )
 
-        c4d.EventAdd() 
-        return True
\ No newline at end of file
+        # No EventAdd here, Execute runs within the scene evaluation that leads to the next redraw
+        return True
+
+    def Message(self, node, type, data):
+        # Renders use the full-resolution video, the viewport its proxy
+        if type == c4d.MSG_MULTI_RENDERNOTIFICATION and data is not None and data.get("doc") is not None:
+            # Imported here like the modules below, the tag is registered at startup and should load nothing more
+            from videoProxy import set_video_proxies
+            set_video_proxies(data["doc"], not data["start"])
+            return True
+        # Saved scenes reference the original video, the proxy frames only live in the per-user cache
+        if type == c4d.MSG_DOCUMENTINFO and data is not None and data.get("type") in _SAVE_TYPES:
+            doc = data.get("doc") or node.GetDocument()
+            if doc is not None:
+                from videoProxy import set_video_proxies
+                set_video_proxies(doc, data["type"] in _SAVE_TYPES_AFTER)
+            return True
+        # The Reimport Shot button updates the shot from its .omni file, rebuilding only what changed
+        if type == c4d.MSG_DESCRIPTION_COMMAND and data["id"][0].id == c4d.OMNISCIENTSCENECONTROL_REIMPORT:
+            from shotRecord import read_record
+            record = read_record(node)
+            doc = node.GetDocument()
+            if record is None or doc is None:
+                c4d.gui.MessageDialog("This tag holds no shot to reimport. Only shots imported with this version of the "
+                                      "importer can be reimported.")
+                return True
+            import OmniscientImporter as omniscient_importer
+            omniscient_importer.reimport_omni_file(doc, record.manifest_path)
+        return True
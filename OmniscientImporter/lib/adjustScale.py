@@ -33,4 +33,25 @@ def get_plugin_by_id(plugin_id, is_loader=False):
     plugin_type = c4d.PLUGINTYPE_SCENELOADER if is_loader else c4d.PLUGINTYPE_SCENESAVER
     plugin = plugins.FindPlugin(plugin_id, plugin_type)
     plugin.Message(c4d.MSG_RETRIEVEPRIVATEDATA, operation)
-    return operation.get("imexporter")
\ No newline at end of file
+    return operation.get("imexporter")
+
+# Length of one document unit in meters
+unit_lengths_in_meters = {
+    c4d.DOCUMENT_UNIT_KM: 1000.0,
+    c4d.DOCUMENT_UNIT_M: 1.0,
+    c4d.DOCUMENT_UNIT_CM: 0.01,
+    c4d.DOCUMENT_UNIT_MM: 0.001,
+    c4d.DOCUMENT_UNIT_UM: 0.000001,
+    c4d.DOCUMENT_UNIT_NM: 0.000000001,
+    c4d.DOCUMENT_UNIT_MILE: 1609.344,
+    c4d.DOCUMENT_UNIT_YARD: 0.9144,
+    c4d.DOCUMENT_UNIT_FOOT: 0.3048,
+    c4d.DOCUMENT_UNIT_INCH: 0.0254,
+}
+
+def get_unit_scale_factor(doc, scale=1.0, unit=c4d.DOCUMENT_UNIT_M):
+    """Returns the factor converting values given in (scale, unit) into the document's units."""
+    doc_scale, doc_unit = doc[c4d.DOCUMENT_DOCUNIT].GetUnitScale()
+    source_length = scale * unit_lengths_in_meters.get(unit, 1.0)
+    doc_length = doc_scale * unit_lengths_in_meters.get(doc_unit, 0.01)
+    return source_length / doc_length
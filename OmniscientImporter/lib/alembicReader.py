@@ -0,0 +1,600 @@
+import bisect
+import math
+import struct
+import sys
+from array import array
+
+OGAWA_MAGIC = b"Ogawa"
+OGAWA_FROZEN = 0xff
+
+ALEMBIC_XFORM_SCHEMA = "AbcGeom_Xform_v3"
+ALEMBIC_CAMERA_SCHEMA = "AbcGeom_Camera_v1"
+
+# Ogawa child offsets with the highest bit set point at data, the others at groups
+_DATA_FLAG = 0x8000000000000000
+_ACYCLIC_TIME_PER_CYCLE = sys.float_info.max / 32.0
+_CHRONO_EPSILON = 1e-9
+
+_COMPOUND_PROPERTY = 0
+_SCALAR_PROPERTY = 1
+_ARRAY_PROPERTY = 2
+
+# Alembic POD type index -> (struct format, byte size)
+_POD_FORMATS = {
+    0: ("?", 1),
+    1: ("B", 1),
+    2: ("b", 1),
+    3: ("H", 2),
+    4: ("h", 2),
+    5: ("I", 4),
+    6: ("i", 4),
+    7: ("Q", 8),
+    8: ("q", 8),
+    9: ("e", 2),
+    10: ("f", 4),
+    11: ("d", 8),
+}
+
+# Xform operation types (upper four bits of an encoded op) and their channel counts
+_XFORM_SCALE = 0
+_XFORM_TRANSLATE = 1
+_XFORM_ROTATE = 2
+_XFORM_MATRIX = 3
+_XFORM_ROTATE_X = 4
+_XFORM_ROTATE_Y = 5
+_XFORM_ROTATE_Z = 6
+_XFORM_CHANNELS = {
+    _XFORM_SCALE: 3,
+    _XFORM_TRANSLATE: 3,
+    _XFORM_ROTATE: 4,
+    _XFORM_MATRIX: 16,
+    _XFORM_ROTATE_X: 1,
+    _XFORM_ROTATE_Y: 1,
+    _XFORM_ROTATE_Z: 1,
+}
+
+IDENTITY_MATRIX = (1.0, 0.0, 0.0, 0.0,
+                   0.0, 1.0, 0.0, 0.0,
+                   0.0, 0.0, 1.0, 0.0,
+                   0.0, 0.0, 0.0, 1.0)
+
+# Order of the values stored in a camera's '.core' property
+CAMERA_CORE_FIELDS = (
+    "focal_length", "horizontal_aperture", "horizontal_film_offset",
+    "vertical_aperture", "vertical_film_offset", "lens_squeeze_ratio",
+    "overscan_left", "overscan_right", "overscan_top", "overscan_bottom",
+    "f_stop", "focus_distance", "shutter_open", "shutter_close",
+    "near_clipping_plane", "far_clipping_plane",
+)
+
+class AlembicReadError(Exception):
+    """Raised when an Alembic archive cannot be read without Cinema 4D's Alembic generator."""
+
+class TimeSampling:
+    """Maps Alembic sample indices to times in seconds (uniform, cyclic or acyclic)."""
+
+    def __init__(self, time_per_cycle=1.0, sample_times=(0.0,)):
+        self.time_per_cycle = time_per_cycle
+        self.sample_times = list(sample_times)
+        self.is_acyclic = time_per_cycle >= _ACYCLIC_TIME_PER_CYCLE
+        self.is_uniform = not self.is_acyclic and len(self.sample_times) == 1
+
+    def sample_time(self, index):
+        if self.is_uniform:
+            return self.sample_times[0] + index * self.time_per_cycle
+        if self.is_acyclic:
+            return self.sample_times[min(index, len(self.sample_times) - 1)]
+        cycle, offset = divmod(index, len(self.sample_times))
+        return self.sample_times[offset] + cycle * self.time_per_cycle
+
+    def sample_times_for(self, num_samples):
+        """Returns the times of the first num_samples samples."""
+        return array('d', (self.sample_time(i) for i in range(num_samples)))
+
+    def near_index(self, time, num_samples):
+        """Returns the index of the sample closest to the given time, like Alembic's kNearIndex."""
+        if num_samples <= 1:
+            return 0
+        last = num_samples - 1
+        if time <= self.sample_time(0):
+            return 0
+        if time >= self.sample_time(last):
+            return last
+
+        if self.is_uniform:
+            floor_index = int(math.floor((time + _CHRONO_EPSILON - self.sample_times[0]) / self.time_per_cycle))
+        elif self.is_acyclic:
+            floor_index = bisect.bisect_right(self.sample_times, time + _CHRONO_EPSILON, 0, num_samples) - 1
+        else:
+            low, high = 0, last
+            while low < high:
+                middle = (low + high + 1) // 2
+                if self.sample_time(middle) <= time + _CHRONO_EPSILON:
+                    low = middle
+                else:
+                    high = middle - 1
+            floor_index = low
+        floor_index = max(0, min(floor_index, last))
+        if floor_index == last:
+            return last
+
+        floor_time = self.sample_time(floor_index)
+        ceil_time = self.sample_time(floor_index + 1)
+        return floor_index if time - floor_time < ceil_time - time else floor_index + 1
+
+class SampledProperty:
+    """Decoded samples of a scalar Alembic property, one row of `width` values per stored sample."""
+
+    def __init__(self, values, width, num_samples, first_changed, last_changed, time_sampling):
+        self.values = values
+        self.width = width
+        self.num_samples = num_samples
+        self.first_changed = first_changed
+        self.last_changed = last_changed
+        self.time_sampling = time_sampling
+
+    @property
+    def is_constant(self):
+        return len(self.values) <= self.width
+
+    def stored_index(self, index):
+        """Maps a logical sample index to the index of the sample that is actually stored."""
+        if index < self.first_changed or (self.first_changed == 0 and self.last_changed == 0):
+            return 0
+        if index >= self.last_changed:
+            return self.last_changed - self.first_changed + 1
+        return index - self.first_changed + 1
+
+    def row(self, index):
+        start = self.stored_index(index) * self.width
+        return self.values[start:start + self.width]
+
+    def row_at_time(self, time):
+        return self.row(self.time_sampling.near_index(time, self.num_samples))
+
+class XformTrack:
+    """The local matrices of one Alembic xform, one per stored sample."""
+
+    def __init__(self, name, matrices, inherits, samples):
+        self.name = name
+        self.matrices = matrices
+        self.inherits = inherits
+        self.samples = samples
+
+    def matrix_at_time(self, time):
+        if self.samples is None or len(self.matrices) == 1:
+            return self.matrices[0]
+        return self.matrices[self.samples.stored_index(self.samples.time_sampling.near_index(time, self.samples.num_samples))]
+
+    def sample_times(self):
+        if self.samples is None:
+            return array('d')
+        return self.samples.time_sampling.sample_times_for(self.samples.num_samples)
+
+class CameraSamples:
+    """Transform chain and intrinsics of the first camera found in an Alembic archive."""
+
+    def __init__(self, camera_path, xforms, core):
+        self.camera_path = camera_path
+        self.xforms = xforms
+        self.core = core
+
+    @property
+    def is_animated(self):
+        return any(xform.samples is not None and len(xform.matrices) > 1 for xform in self.xforms)
+
+    def sample_times(self):
+        """Returns the sorted union of the sample times of every animated xform in the chain."""
+        times = set()
+        for xform in self.xforms:
+            if xform.samples is not None and len(xform.matrices) > 1:
+                times.update(xform.sample_times())
+        return array('d', sorted(times))
+
+    def world_matrices(self, times):
+        """
+        Evaluates the camera's world matrix at each of the given times.
+
+        Parameters:
+        - times: Iterable of Alembic times in seconds.
+
+        Returns:
+        - array('d') holding one row-major (row-vector convention) 4x4 matrix per time.
+        """
+        matrices = array('d')
+        constant = [xform for xform in self.xforms if xform.samples is None or len(xform.matrices) == 1]
+        if len(constant) == len(self.xforms):
+            world = _chain_matrices([xform.matrices[0] for xform in self.xforms], [xform.inherits for xform in self.xforms])
+            for _ in times:
+                matrices.extend(world)
+            return matrices
+
+        inherits = [xform.inherits for xform in self.xforms]
+        for time in times:
+            matrices.extend(_chain_matrices([xform.matrix_at_time(time) for xform in self.xforms], inherits))
+        return matrices
+
+    def intrinsics_at_time(self, time):
+        """Returns a dict of the camera's '.core' values at the given time, or None if the camera has none."""
+        if self.core is None:
+            return None
+        return dict(zip(CAMERA_CORE_FIELDS, self.core.row_at_time(time)))
+
+    def focal_lengths(self, times):
+        """Returns the focal length in millimeters at each of the given times, or None if it is not animated."""
+        if self.core is None or self.core.is_constant:
+            return None
+        return array('d', (self.core.row_at_time(time)[0] for time in times))
+
+    def focal_length_samples(self):
+        """Returns the sample times and focal lengths in millimeters as stored, or None if it is not animated."""
+        if self.core is None or self.core.is_constant:
+            return None
+        times = self.core.time_sampling.sample_times_for(self.core.num_samples)
+        return times, array('d', (self.core.row(index)[0] for index in range(self.core.num_samples)))
+
+class _Node:
+    """An object or compound property of the archive: its Ogawa group and its child headers."""
+
+    def __init__(self, name, metadata, group):
+        self.name = name
+        self.metadata = metadata
+        self.group = group
+
+class OgawaArchive:
+    """Minimal read-only access to the Ogawa container and the Alembic layout stored in it."""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        if len(buffer) < 16 or bytes(buffer[:5]) != OGAWA_MAGIC:
+            raise AlembicReadError("Not an Ogawa Alembic archive (HDF5 archives are not supported).")
+        if buffer[5] != OGAWA_FROZEN:
+            raise AlembicReadError("The Alembic archive was not closed properly.")
+
+        root = self.read_group(struct.unpack_from("<Q", buffer, 8)[0])
+        if len(root) < 5:
+            raise AlembicReadError("The Alembic archive is missing its root data.")
+        self.root = root
+        self.time_samplings = self._read_time_samplings(self.read_data(root[4]))
+        self.indexed_metadata = [{}]
+        if len(root) > 5:
+            self.indexed_metadata = self._read_indexed_metadata(self.read_data(root[5]))
+
+    @staticmethod
+    def is_data(child):
+        return bool(child & _DATA_FLAG)
+
+    def read_group(self, offset):
+        if offset == 0:
+            return ()
+        (count,) = struct.unpack_from("<Q", self.buffer, offset)
+        return struct.unpack_from("<{}Q".format(count), self.buffer, offset + 8)
+
+    def read_data(self, child):
+        offset = child & ~_DATA_FLAG
+        if offset == 0:
+            return memoryview(b"")
+        (size,) = struct.unpack_from("<Q", self.buffer, offset)
+        return memoryview(self.buffer)[offset + 8:offset + 8 + size]
+
+    def top_object(self):
+        return _Node("ABC", {}, self.read_group(self.root[2]))
+
+    def child_objects(self, node):
+        """Returns the child objects of an object node."""
+        group = node.group
+        if len(group) < 2 or not self.is_data(group[-1]):
+            return []
+        headers = self._read_object_headers(self.read_data(group[-1]))
+        children = []
+        for index, (name, metadata) in enumerate(headers):
+            child = group[index + 1]
+            if index + 1 < len(group) - 1 and not self.is_data(child):
+                children.append(_Node(name, metadata, self.read_group(child)))
+        return children
+
+    def properties(self, node):
+        """Returns {name: (header, child)} for the top-level properties of an object node."""
+        if not node.group or self.is_data(node.group[0]):
+            return {}
+        return self.compound_properties(self.read_group(node.group[0]))
+
+    def compound_properties(self, group):
+        """Returns {name: (header, child)} for the properties of a compound property group."""
+        if not group or not self.is_data(group[-1]):
+            return {}
+        headers = self._read_property_headers(self.read_data(group[-1]))
+        return {header["name"]: (header, group[index]) for index, header in enumerate(headers) if index < len(group) - 1}
+
+    def read_scalar_property(self, header, child):
+        """Decodes every stored sample of a scalar property into a SampledProperty."""
+        if header["type"] != _SCALAR_PROPERTY:
+            raise AlembicReadError("Property '{}' is not a scalar property.".format(header["name"]))
+        pod_format, pod_size = _POD_FORMATS.get(header["pod"], (None, 0))
+        if pod_format is None:
+            raise AlembicReadError("Property '{}' has an unsupported data type.".format(header["name"]))
+
+        width = header["extent"]
+        row_format = "<{}{}".format(width, pod_format)
+        values = []
+        for sample in self.read_group(child):
+            data = self.read_data(sample)
+            if len(data) < 16 + width * pod_size:
+                raise AlembicReadError("Property '{}' has a truncated sample.".format(header["name"]))
+            # Every sample starts with a 16 byte digest of its content
+            values.extend(struct.unpack_from(row_format, data, 16))
+        if not values:
+            raise AlembicReadError("Property '{}' has no samples.".format(header["name"]))
+
+        time_sampling = self.time_samplings[header["time_sampling"]] if header["time_sampling"] < len(self.time_samplings) else TimeSampling()
+        return SampledProperty(values, width, header["next_sample_index"], header["first_changed"], header["last_changed"], time_sampling)
+
+    def read_array_property_rows(self, header, child):
+        """Decodes every stored sample of a float64 array property, returning (rows, header)."""
+        pod_format, pod_size = _POD_FORMATS.get(header["pod"], (None, 0))
+        if pod_format is None:
+            raise AlembicReadError("Property '{}' has an unsupported data type.".format(header["name"]))
+        group = self.read_group(child)
+        rows = []
+        # Array samples are stored as (data, dimensions) pairs
+        for index in range(0, len(group), 2):
+            data = self.read_data(group[index])
+            count = max(0, len(data) - 16) // pod_size
+            rows.append(list(struct.unpack_from("<{}{}".format(count, pod_format), data, 16)) if count else [])
+        return rows
+
+    def _read_time_samplings(self, data):
+        # Index 0 is the implicit identity time sampling
+        samplings = [TimeSampling()]
+        position = 0
+        while position < len(data):
+            position += 4  # max sample count, not needed for reading
+            (time_per_cycle,) = struct.unpack_from("<d", data, position)
+            position += 8
+            (count,) = struct.unpack_from("<I", data, position)
+            position += 4
+            times = struct.unpack_from("<{}d".format(count), data, position)
+            position += 8 * count
+            samplings.append(TimeSampling(time_per_cycle, times))
+        return samplings
+
+    def _read_indexed_metadata(self, data):
+        metadata = [{}]
+        position = 0
+        while position < len(data):
+            size = data[position]
+            position += 1
+            metadata.append(parse_metadata(bytes(data[position:position + size])))
+            position += size
+        return metadata
+
+    def _metadata_at(self, index):
+        return self.indexed_metadata[index] if index < len(self.indexed_metadata) else {}
+
+    def _read_object_headers(self, data):
+        headers = []
+        # The last 32 bytes hold the data and children digests
+        end = len(data) - 32
+        position = 0
+        while position < end:
+            (name_size,) = struct.unpack_from("<I", data, position)
+            position += 4
+            name = bytes(data[position:position + name_size]).decode("utf-8")
+            position += name_size
+            metadata_index = data[position]
+            position += 1
+            if metadata_index == 0xff:
+                (metadata_size,) = struct.unpack_from("<I", data, position)
+                position += 4
+                metadata = parse_metadata(bytes(data[position:position + metadata_size]))
+                position += metadata_size
+            else:
+                metadata = self._metadata_at(metadata_index)
+            headers.append((name, metadata))
+        return headers
+
+    def _read_property_headers(self, data):
+        headers = []
+        position = 0
+        while position < len(data):
+            (info,) = struct.unpack_from("<I", data, position)
+            position += 4
+            size_hint = (info & 0x000c) >> 2
+            header = {"type": info & 0x0003, "time_sampling": 0, "pod": None, "extent": 0,
+                      "next_sample_index": 0, "first_changed": 0, "last_changed": 0}
+
+            def read_hinted():
+                nonlocal position
+                if size_hint == 0:
+                    value = data[position]
+                    position += 1
+                elif size_hint == 1:
+                    (value,) = struct.unpack_from("<H", data, position)
+                    position += 2
+                else:
+                    (value,) = struct.unpack_from("<I", data, position)
+                    position += 4
+                return value
+
+            if header["type"] != _COMPOUND_PROPERTY:
+                header["pod"] = (info & 0x00f0) >> 4
+                header["extent"] = (info & 0xff000) >> 12
+                header["next_sample_index"] = read_hinted()
+                if info & 0x0200:
+                    header["first_changed"] = read_hinted()
+                    header["last_changed"] = read_hinted()
+                elif not info & 0x0800:
+                    header["first_changed"] = 1
+                    header["last_changed"] = header["next_sample_index"] - 1
+                if info & 0x0100:
+                    header["time_sampling"] = read_hinted()
+
+            name_size = read_hinted()
+            header["name"] = bytes(data[position:position + name_size]).decode("utf-8")
+            position += name_size
+
+            metadata_index = (info & 0xff00000) >> 20
+            if metadata_index == 0xff:
+                metadata_size = read_hinted()
+                header["metadata"] = parse_metadata(bytes(data[position:position + metadata_size]))
+                position += metadata_size
+            else:
+                header["metadata"] = self._metadata_at(metadata_index)
+            headers.append(header)
+        return headers
+
+def parse_metadata(raw):
+    """Parses Alembic's 'key=value;key=value' metadata strings into a dict."""
+    metadata = {}
+    for entry in raw.decode("utf-8", "replace").split(";"):
+        if "=" in entry:
+            key, value = entry.split("=", 1)
+            metadata[key] = value
+    return metadata
+
+def multiply_matrices(a, b):
+    """Multiplies two row-major 4x4 matrices given as flat sequences of 16 values."""
+    return tuple(
+        a[row * 4] * b[column] + a[row * 4 + 1] * b[4 + column] + a[row * 4 + 2] * b[8 + column] + a[row * 4 + 3] * b[12 + column]
+        for row in range(4) for column in range(4)
+    )
+
+def _axis_angle_matrix(x, y, z, degrees):
+    length = math.sqrt(x * x + y * y + z * z) or 1.0
+    x, y, z = x / length, y / length, z / length
+    angle = math.radians(degrees)
+    sine, cosine = math.sin(angle), math.cos(angle)
+    t = 1.0 - cosine
+    return (x * x * t + cosine, x * y * t + z * sine, x * z * t - y * sine, 0.0,
+            x * y * t - z * sine, y * y * t + cosine, y * z * t + x * sine, 0.0,
+            x * z * t + y * sine, y * z * t - x * sine, z * z * t + cosine, 0.0,
+            0.0, 0.0, 0.0, 1.0)
+
+def xform_ops_to_matrix(ops, channels):
+    """
+    Builds the local matrix of an xform sample, following Alembic's XformSample::getMatrix.
+
+    Parameters:
+    - ops: Encoded xform operations (type in the upper four bits).
+    - channels: The channel values of all operations, in order.
+
+    Returns:
+    - A row-major 4x4 matrix as a tuple of 16 floats.
+    """
+    result = IDENTITY_MATRIX
+    position = 0
+    for op in ops:
+        op_type = op >> 4
+        count = _XFORM_CHANNELS.get(op_type)
+        if count is None:
+            raise AlembicReadError("Unknown xform operation {}.".format(op))
+        values = channels[position:position + count]
+        if len(values) < count:
+            values = list(values) + [0.0] * (count - len(values))
+        position += count
+
+        if op_type == _XFORM_MATRIX:
+            matrix = tuple(values)
+        elif op_type == _XFORM_TRANSLATE:
+            matrix = IDENTITY_MATRIX[:12] + (values[0], values[1], values[2], 1.0)
+        elif op_type == _XFORM_SCALE:
+            matrix = (values[0], 0.0, 0.0, 0.0, 0.0, values[1], 0.0, 0.0, 0.0, 0.0, values[2], 0.0, 0.0, 0.0, 0.0, 1.0)
+        elif op_type == _XFORM_ROTATE:
+            matrix = _axis_angle_matrix(values[0], values[1], values[2], values[3])
+        elif op_type == _XFORM_ROTATE_X:
+            matrix = _axis_angle_matrix(1.0, 0.0, 0.0, values[0])
+        elif op_type == _XFORM_ROTATE_Y:
+            matrix = _axis_angle_matrix(0.0, 1.0, 0.0, values[0])
+        else:
+            matrix = _axis_angle_matrix(0.0, 0.0, 1.0, values[0])
+        result = multiply_matrices(matrix, result)
+    return result
+
+def _chain_matrices(locals_, inherits):
+    """Combines the local matrices of an xform chain (root first) into a world matrix."""
+    world = IDENTITY_MATRIX
+    for local, inherit in zip(locals_, inherits):
+        world = multiply_matrices(local, world) if inherit else local
+    return world
+
+def _read_xform(archive, node):
+    properties = archive.properties(node)
+    if ".xform" not in properties:
+        return None
+    _, child = properties[".xform"]
+    xform_properties = archive.compound_properties(archive.read_group(child))
+
+    inherits = True
+    if ".inherits" in xform_properties:
+        inherits_header, inherits_child = xform_properties[".inherits"]
+        inherits = bool(archive.read_scalar_property(inherits_header, inherits_child).values[0])
+
+    ops = []
+    if ".ops" in xform_properties:
+        ops_header, ops_child = xform_properties[".ops"]
+        ops = archive.read_scalar_property(ops_header, ops_child).row(0)
+
+    if ".vals" not in xform_properties:
+        return XformTrack(node.name, [xform_ops_to_matrix(ops, [])], inherits, None)
+
+    vals_header, vals_child = xform_properties[".vals"]
+    if vals_header["type"] == _SCALAR_PROPERTY:
+        vals = archive.read_scalar_property(vals_header, vals_child)
+        rows = [vals.values[i:i + vals.width] for i in range(0, len(vals.values), vals.width)]
+    else:
+        rows = archive.read_array_property_rows(vals_header, vals_child)
+        time_sampling = archive.time_samplings[vals_header["time_sampling"]] if vals_header["time_sampling"] < len(archive.time_samplings) else TimeSampling()
+        vals = SampledProperty(rows, 1, vals_header["next_sample_index"], vals_header["first_changed"], vals_header["last_changed"], time_sampling)
+    return XformTrack(node.name, [xform_ops_to_matrix(ops, row) for row in rows], inherits, vals)
+
+def _read_camera_core(archive, node):
+    properties = archive.properties(node)
+    if ".geom" not in properties:
+        return None
+    geom_properties = archive.compound_properties(archive.read_group(properties[".geom"][1]))
+    if ".core" not in geom_properties:
+        return None
+    return archive.read_scalar_property(*geom_properties[".core"])
+
+def _find_camera(archive, node, path, xforms):
+    for child in archive.child_objects(node):
+        schema = child.metadata.get("schema", "")
+        child_path = path + "/" + child.name
+        if schema == ALEMBIC_CAMERA_SCHEMA:
+            return child_path, child, xforms
+        chain = xforms
+        if schema == ALEMBIC_XFORM_SCHEMA:
+            xform = _read_xform(archive, child)
+            if xform is not None:
+                chain = xforms + [xform]
+        found = _find_camera(archive, child, child_path, chain)
+        if found is not None:
+            return found
+    return None
+
+def read_camera_samples(file_path):
+    """
+    Reads the transform chain and intrinsics of the first camera in an Alembic (.abc) archive.
+
+    Parameters:
+    - file_path: The path to the Alembic file.
+
+    Returns:
+    - CameraSamples for the camera.
+
+    Raises:
+    - AlembicReadError if the archive cannot be read or holds no camera.
+    """
+    try:
+        with open(file_path, "rb") as file:
+            buffer = file.read()
+        archive = OgawaArchive(buffer)
+        found = _find_camera(archive, archive.top_object(), "", [])
+        if found is None:
+            raise AlembicReadError("No camera found in '{}'.".format(file_path))
+        camera_path, camera_node, xforms = found
+        return CameraSamples(camera_path, xforms, _read_camera_core(archive, camera_node))
+    except AlembicReadError:
+        raise
+    except (OSError, struct.error, IndexError, KeyError, ValueError, UnicodeDecodeError) as e:
+        raise AlembicReadError("Failed to read '{}': {}".format(file_path, e)) from e
@@ -0,0 +1,204 @@
+import c4d
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import OmniscientImporter as omniscient_importer
+from adjustScale import get_unit_scale_factor
+from memoryBudget import budget_bytes, exceeds_budget
+from shotDecoder import cache_scan, create_executor, default_worker_count, scan_settings
+from shotManifest import preflight_shot
+from videoProbe import probe_movie
+from videoProxy import set_video_proxies, wait_for_video_proxies
+
+logger = logging.getLogger(__name__)
+
+OMNI_EXTENSION = ".omni"
+
+class ShotResult:
+    """Outcome of importing one shot of a batch."""
+
+    def __init__(self, path, output_path=None, errors=None, seconds=0.0):
+        self.path = path
+        self.output_path = output_path
+        self.errors = errors if errors is not None else []
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return not self.errors
+
+class BatchReport:
+    """Throughput and failures of a batch import."""
+
+    def __init__(self, results, seconds):
+        self.results = results
+        self.seconds = seconds
+
+    @property
+    def failures(self):
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def shots_per_minute(self):
+        return len(self.results) * 60.0 / self.seconds if self.seconds else 0.0
+
+    def to_dict(self):
+        return {
+            "shots": len(self.results),
+            "failed": len(self.failures),
+            "seconds": self.seconds,
+            "shots_per_minute": self.shots_per_minute,
+            "results": [{"path": result.path, "output_path": result.output_path, "ok": result.ok,
+                         "errors": result.errors, "seconds": result.seconds} for result in self.results]
+        }
+
+    def __str__(self):
+        lines = ["{} shots in {:.1f} s ({:.1f} shots/min), {} succeeded, {} failed".format(
+            len(self.results), self.seconds, self.shots_per_minute, len(self.results) - len(self.failures), len(self.failures))]
+        for result in self.failures:
+            lines.append("  FAILED {}: {}".format(result.path, "; ".join(result.errors)))
+        return "\n".join(lines)
+
+def find_shots(paths):
+    """Expands directories into the .omni files they contain, recursively, and keeps .omni files as they are."""
+    shots = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                shots.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(OMNI_EXTENSION))
+        else:
+            shots.append(path)
+    return shots
+
+def output_path_for(shot_path, output_directory):
+    """Returns the .c4d path a shot is saved to, next to the shot when output_directory is None."""
+    name = os.path.splitext(os.path.basename(shot_path))[0] + ".c4d"
+    return os.path.join(output_directory or os.path.dirname(shot_path), name)
+
+def prefetch_shot(shot_path, scale, cache, executor, memory_budget=None):
+    """
+    Does the document-independent work of a shot ahead of its import: runs its pre-flight, probes the video and
+    decodes the scans into the scan cache, so the import finds them there. Scans exceeding memory_budget in bytes
+    are skipped, the import streams them from their files.
+
+    Returns:
+    - List of problems found, the import reports them again in detail.
+    """
+    preflight = preflight_shot(shot_path)
+    if not preflight.ok:
+        return preflight.problems
+    manifest = preflight.manifest
+    problems = []
+    probe_movie(manifest.video_path)
+
+    if cache is None:
+        return problems
+    pending = []
+    for scan_path in manifest.scan_paths:
+        if not scan_path.lower().endswith(".obj") or exceeds_budget(preflight.asset(scan_path).size or 0, memory_budget):
+            continue
+        try:
+            cache_entry = cache.entry_path(scan_path, scan_settings(scale), stat=preflight.asset(scan_path).stat)
+        except OSError as e:
+            problems.append("Failed to hash '{}': {}".format(scan_path, e))
+            continue
+        if not os.path.isfile(cache_entry):
+            pending.append(executor.submit(cache_scan, scan_path, scale, cache_entry))
+    for future in pending:
+        try:
+            decoded = future.result()
+        except Exception as e:
+            # The import decodes the scan itself when it is missing from the cache
+            problems.append("Decoding ahead failed: {}".format(e))
+            continue
+        if not decoded.ok:
+            problems.append(str(decoded.error))
+    return problems
+
+def import_shot(shot_path, output_path, import_options):
+    """Imports one shot into a new document and saves it. Returns the errors, empty on success."""
+    errors = []
+    omniscient_importer.set_error_reporter(errors.append)
+    doc = c4d.documents.BaseDocument()
+    try:
+        doc.SetDocumentName(os.path.basename(output_path))
+        doc.SetDocumentPath(os.path.dirname(output_path))
+        if not omniscient_importer.import_omni_file(doc, shot_path, import_options) and not errors:
+            errors.append("Import failed, see the log for details.")
+        # Without the interface there are no core messages, proxies are applied before the scene is saved and
+        # switched back to the original video, saved scenes never reference the per-user proxy cache
+        wait_for_video_proxies()
+        set_video_proxies(doc, False)
+        if not errors:
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            if not c4d.documents.SaveDocument(doc, output_path, c4d.SAVEDOCUMENTFLAGS_DONTADDTORECENTLIST, c4d.FORMAT_C4DEXPORT):
+                errors.append("Failed to save '{}'.".format(output_path))
+    except Exception as e:
+        logger.exception("Unexpected error while importing {}".format(shot_path))
+        errors.append(str(e))
+    finally:
+        omniscient_importer.set_error_reporter(None)
+        c4d.documents.KillDocument(doc)
+    return errors
+
+def run_batch(shots, output_directory=None, import_options=None, prefetch=2, workers=None):
+    """
+    Imports a list of shots, each into its own document saved as .c4d, continuing past failed shots.
+
+    While a shot is imported, manifest parsing, video probing and scan decoding of the next shots run ahead in
+    the background. Decoded scans are handed over through the scan cache, so it must not be disabled for the
+    decoding to run ahead.
+
+    Parameters:
+    - shots: Paths of .omni files, or directories containing them.
+    - output_directory: Directory the .c4d files are saved to, defaults to next to each shot.
+    - import_options: Import options passed to import_omni_file for every shot.
+    - prefetch: Number of shots prepared ahead of the one being imported, 0 disables it.
+    - workers: Number of processes decoding scans ahead, defaults to one less than the number of CPUs.
+
+    Returns:
+    - The BatchReport.
+    """
+    import_options = dict(import_options or {})
+    shots = find_shots(shots)
+    start = time.perf_counter()
+
+    cache = omniscient_importer.open_scan_cache(import_options) if prefetch > 0 else None
+    scale = get_unit_scale_factor(c4d.documents.BaseDocument(), 1.0, c4d.DOCUMENT_UNIT_M)
+    memory_budget = budget_bytes(import_options.get("scan_memory_budget"))
+    decode_executor = create_executor(workers or default_worker_count(os.cpu_count() or 2)) if cache is not None else None
+    prefetch_executor = ThreadPoolExecutor(max_workers=prefetch) if prefetch > 0 else None
+    prefetched = {}
+
+    def schedule(index):
+        if prefetch_executor is not None and index < len(shots) and index not in prefetched:
+            prefetched[index] = prefetch_executor.submit(prefetch_shot, shots[index], scale, cache, decode_executor,
+                                                         memory_budget)
+
+    results = []
+    try:
+        for index, shot_path in enumerate(shots):
+            for ahead in range(index, index + prefetch + 1):
+                schedule(ahead)
+            shot_start = time.perf_counter()
+            output_path = output_path_for(shot_path, output_directory)
+            logger.info("Importing shot {}/{}: {}".format(index + 1, len(shots), shot_path))
+
+            # The scans of this shot must be in the cache before the import looks for them
+            if index in prefetched:
+                for problem in prefetched.pop(index).result():
+                    logger.warning("{}: {}".format(shot_path, problem))
+
+            errors = import_shot(shot_path, output_path, import_options)
+            results.append(ShotResult(shot_path, output_path if not errors else None, errors, time.perf_counter() - shot_start))
+    finally:
+        if prefetch_executor is not None:
+            prefetch_executor.shutdown(wait=True, cancel_futures=True)
+        if decode_executor is not None:
+            decode_executor.shutdown(wait=True, cancel_futures=True)
+
+    report = BatchReport(results, time.perf_counter() - start)
+    logger.info(str(report))
+    return report
@@ -1,16 +1,19 @@
 import c4d
+import logging
+from array import array
+import alembicReader
+from adjustScale import get_unit_scale_factor
+from cameraExport import CORRECTIONS_SUFFIX, export_baked_camera, load_baked_camera, source_stamp
+from cameraFilter import filter_camera
+from cameraResampler import frame_times, resample_matrices, resample_values
+from cameraTransforms import MATRIX_STRIDE, matrices_to_position_hpb, mirror_z
+from importRunner import ImportProgress, run_steps, within
+from importTrace import count, span
+from trackWriter import get_parameter_curve, iter_write_curves, iter_write_transform_tracks
 
-def CreateKey(doc, curve, time, value, interpolation=c4d.CINTERPOLATION_LINEAR):
-    """Creates a Key on the given curve at the given time with a given value and with the given interpolation."""
-    keyDict = curve.AddKey(time)
-    if keyDict is None:
-        raise MemoryError("Failed to create a key")
-    key = keyDict["key"]
-    keyIndex = keyDict["nidx"]
-    key.SetValue(curve, value)
-    curve.SetKeyDefault(doc, keyIndex)
-    key.SetInterpolation(curve, interpolation)
-    return key, keyIndex
+logger = logging.getLogger(__name__)
+
+ALEMBIC_GENERATOR_ID = 1028083
 
 def set_camera_properties(new_camera, alembic_camera):
     """Sets the properties of the new camera based on the Alembic camera."""
@@ -41,45 +44,252 @@ def set_camera_properties(new_camera, alembic_camera):
     projection_id = get_property(alembic_camera, 1057516, 5103, 1001)
     new_camera[c4d.CAMERA_PROJECTION] = projection_id
 
-def bake_alembic_camera_animation(doc, alembic_camera):
-    if alembic_camera.GetType() != 1028083:
-        raise ValueError('Selected object is not an Alembic camera.')
-    
-    original_time = doc.GetTime()
-    
-    new_camera = c4d.BaseObject(c4d.Ocamera)
-    new_camera.SetName(alembic_camera.GetName())
+def stack_matrix_to_c4d(matrices, index=0):
+    """Returns the matrix at the given index of a matrix stack as a c4d.Matrix."""
+    m = matrices[index * MATRIX_STRIDE:(index + 1) * MATRIX_STRIDE]
+    return c4d.Matrix(c4d.Vector(m[12], m[13], m[14]),
+                      c4d.Vector(m[0], m[1], m[2]),
+                      c4d.Vector(m[4], m[5], m[6]),
+                      c4d.Vector(m[8], m[9], m[10]))
 
-    set_camera_properties(new_camera, alembic_camera)
+def append_c4d_matrix(matrices, matrix):
+    """Appends a c4d.Matrix to a matrix stack."""
+    v1, v2, v3, off = matrix.v1, matrix.v2, matrix.v3, matrix.off
+    matrices.extend((v1.x, v1.y, v1.z, 0.0, v2.x, v2.y, v2.z, 0.0, v3.x, v3.y, v3.z, 0.0, off.x, off.y, off.z, 1.0))
+
+def get_alembic_time_mapping(alembic_camera):
+    """Returns the animation offset in seconds and the speed of an Alembic generator."""
+    offset = alembic_camera[c4d.ALEMBIC_ANIMATION_OFFSET]
+    return (offset.Get() if offset is not None else 0.0), (alembic_camera[c4d.ALEMBIC_ANIMATION_SPEED] or 1.0)
+
+def get_alembic_frame_times(doc, alembic_camera, frames):
+    """
+    Maps document frames to Alembic times using the generator's animation offset.
+
+    A speed set on the generator by hand is applied as well, the importer leaves it at 1 as the archive's
+    sample times are the capture's actual timestamps.
+    """
+    offset_seconds, speed = get_alembic_time_mapping(alembic_camera)
+    times = frame_times(frames, doc.GetFps(), offset_seconds)
+    if speed != 1.0:
+        times = array('d', (time * speed for time in times))
+    return times
+
+def bake_alembic_camera_animation(doc, alembic_camera, camera_path=None, position_tolerance=None, rotation_tolerance=None,
+                                  camera_samples=None, target_camera=None, export_path=None, camera_filter=None):
+    """
+    Bakes the animation of an Alembic camera into a new camera object, or into an existing one.
+
+    Parameters:
+    - doc: The Cinema 4D document holding the Alembic camera.
+    - alembic_camera: The Alembic generator of the camera.
+    - camera_path: Optional path to the camera's .abc file. When given, the samples are read straight from the
+      archive instead of evaluating the scene for every frame. Falls back to scene evaluation if it cannot be read.
+    - position_tolerance: Optional positional error in document units up to which redundant keys are dropped.
+    - rotation_tolerance: Optional angular error in degrees up to which redundant keys are dropped.
+    - camera_samples: Optional CameraSamples already read from camera_path, e.g. by a decode worker.
+    - target_camera: Optional camera, already in the document, to bake into instead of a new one. Its
+      animation tracks are replaced, its tags and the links to it are kept.
+    - export_path: Optional path without suffix to export the baked camera to, see cameraExport. When a sidecar
+      baked from the same camera file for the same frames is already there, it is read instead of sampling.
+    - camera_filter: Optional CameraFilterSettings to remove outliers from and smooth the sampled path with,
+      before its keys are written. The corrections are logged and exported with the camera.
+
+    Returns:
+    - The baked camera.
+    """
+    return run_steps(iter_bake_alembic_camera_animation(doc, alembic_camera, camera_path=camera_path,
+                                                        position_tolerance=position_tolerance,
+                                                        rotation_tolerance=rotation_tolerance,
+                                                        camera_samples=camera_samples, target_camera=target_camera,
+                                                        export_path=export_path, camera_filter=camera_filter))
+
+def iter_bake_alembic_camera_animation(doc, alembic_camera, camera_path=None, position_tolerance=None,
+                                       rotation_tolerance=None, camera_samples=None, target_camera=None,
+                                       export_path=None, camera_filter=None):
+    """
+    Import step baking an Alembic camera, see bake_alembic_camera_animation(). Yields after every frame sampled by
+    evaluating the scene and every FRAMES_PER_STEP frames of written keys. The camera's undo entry is added
+    before its keys are written, so undoing it removes them as well.
+    """
+    if alembic_camera.GetType() != ALEMBIC_GENERATOR_ID:
+        raise ValueError('Selected object is not an Alembic camera.')
 
-    doc.InsertObject(new_camera)
-    doc.StartUndo()
-    doc.AddUndo(c4d.UNDOTYPE_NEW, new_camera)
     startFrame = doc.GetMinTime().GetFrame(doc.GetFps())
     endFrame = doc.GetMaxTime().GetFrame(doc.GetFps())
-    tracks = {}
-    for frame in range(startFrame, endFrame + 1):
-        time = c4d.BaseTime(frame, doc.GetFps())
-        doc.SetTime(time)
-        doc.ExecutePasses(None, True, True, True, c4d.BUILDFLAGS_NONE)
-        new_camera.SetMg(alembic_camera.GetMg())
-        for descId, value in [(c4d.ID_BASEOBJECT_POSITION, alembic_camera.GetMg().off),
-                              (c4d.ID_BASEOBJECT_ROTATION, c4d.utils.MatrixToHPB(alembic_camera.GetMg()))]:
-            for i, component in enumerate("xyz"):
-                vector_id = c4d.DescLevel(descId, c4d.DTYPE_VECTOR, 0)
-                real_id = c4d.DescLevel(i+1000, c4d.DTYPE_REAL, 0)
-                trackId = c4d.DescID(vector_id, real_id)
-                key = (descId, i)
-                if key not in tracks:
-                    track = c4d.CTrack(new_camera, trackId)
-                    new_camera.InsertTrackSorted(track)
-                    tracks[key] = track.GetCurve()
-                curve = tracks[key]
-                CreateKey(doc, curve, time, value[i])
+    frames = range(startFrame, endFrame + 1)
+
+    baked = None
+    sidecar_metadata = None
+    scale = get_unit_scale_factor(doc, 1.0, c4d.DOCUMENT_UNIT_M)
+    if export_path and camera_path:
+        offset_seconds, speed = get_alembic_time_mapping(alembic_camera)
+        sidecar_metadata = {"source": source_stamp(camera_path), "time_mapping": {"offset": offset_seconds, "speed": speed},
+                            "camera_filter": camera_filter.to_dict() if camera_filter is not None else None}
+        baked = load_baked_camera(export_path, doc.GetFps(), frames, sidecar_metadata["source"],
+                                  sidecar_metadata["time_mapping"], scale, sidecar_metadata["camera_filter"])
+
+    if baked is None and camera_samples is None and camera_path:
+        try:
+            camera_samples = alembicReader.read_camera_samples(camera_path)
+        except alembicReader.AlembicReadError as e:
+            logger.warning("Reading the camera directly failed, baking through scene evaluation instead: {}".format(e))
+
+    if target_camera is not None:
+        new_camera = target_camera
+    else:
+        new_camera = c4d.BaseObject(c4d.Ocamera)
+        new_camera.SetName(alembic_camera.GetName())
+
+    focal_lengths = None
+    with span("sample camera", frames=len(frames), from_archive=camera_samples is not None, from_sidecar=baked is not None):
+        if baked is not None:
+            matrices, focal_lengths = baked
+            count("frames from sidecar", len(frames))
+            logger.info("Read {} frames of '{}' from its sidecar instead of sampling.".format(len(frames), camera_path))
+        elif camera_samples is not None:
+            matrices, focal_lengths = sample_camera_from_archive(doc, alembic_camera, camera_samples, frames)
+        else:
+            matrices = yield from within(iter_sample_camera_by_evaluation(doc, alembic_camera, frames), end=0.5)
+
+    # A camera read from its sidecar was filtered before it was exported
+    filter_report = None
+    if camera_filter is not None and baked is None:
+        with span("filter camera", smoothing=camera_filter.smoothing) as filter_span:
+            matrices, filter_report = filter_camera(matrices, doc.GetFps(), camera_filter, scale)
+            filter_span.set(outliers=len(filter_report.outliers))
+        count("camera outliers", len(filter_report.outliers))
+        logger.info("Filtered the camera '{}': {}".format(alembic_camera.GetName(), filter_report.summary(frames)))
+    positions, rotations = matrices_to_position_hpb(matrices)
+
+    doc.StartUndo()
+    if target_camera is not None:
+        doc.AddUndo(c4d.UNDOTYPE_CHANGE, new_camera)
+        for track in new_camera.GetCTracks():
+            track.Remove()
+    else:
+        doc.InsertObject(new_camera)
+        doc.AddUndo(c4d.UNDOTYPE_NEW, new_camera)
+    set_camera_properties(new_camera, alembic_camera)
+    if len(matrices):
+        new_camera.SetMg(stack_matrix_to_c4d(matrices, 0))
     doc.EndUndo()
-    
-    # Reset the timeline to its original position
-    doc.SetTime(original_time)
+
+    with span("write tracks"):
+        end = 0.95 if focal_lengths is not None else 1.0
+        yield from within(iter_write_transform_tracks(doc, new_camera, frames, positions, rotations,
+                                                      position_tolerance=position_tolerance,
+                                                      rotation_tolerance=rotation_tolerance), start=0.5, end=end)
+        if focal_lengths is not None:
+            fps = doc.GetFps()
+            curves = [(get_parameter_curve(new_camera, c4d.CAMERA_FOCUS), focal_lengths, None)]
+            yield from within(iter_write_curves(curves, [c4d.BaseTime(frame, fps) for frame in frames]), start=end)
+
+    if sidecar_metadata is not None and baked is None:
+        with span("export camera"):
+            export_camera(doc, new_camera, export_path, frames, matrices, focal_lengths, sidecar_metadata,
+                          filter_report)
     c4d.EventAdd()
-    
-    return new_camera
\ No newline at end of file
+
+    return new_camera
+
+def export_camera(doc, camera, export_path, frames, matrices, focal_lengths=None, metadata=None, filter_report=None):
+    """
+    Exports a baked camera's frames with its focal length, aperture and film offsets, see export_baked_camera().
+
+    focal_lengths are the animated focal lengths of the frames, None uses the camera's constant one. The
+    CameraFilterReport of a filtered camera is written next to it as CSV. Failing to write the files is logged,
+    the camera is baked all the same.
+    """
+    render_data = doc.GetActiveRenderData()
+    aspect_ratio = float(render_data[c4d.RDATA_XRES] or 16) / float(render_data[c4d.RDATA_YRES] or 9)
+    metadata = dict(metadata or {}, camera=camera.GetName(), projection=camera[c4d.CAMERA_PROJECTION])
+    scale = get_unit_scale_factor(doc, 1.0, c4d.DOCUMENT_UNIT_M)
+    try:
+        export_baked_camera(export_path, doc.GetFps(), frames, matrices,
+                            focal_lengths if focal_lengths is not None else float(camera[c4d.CAMERA_FOCUS] or 0.0),
+                            aperture=float(camera[c4d.CAMERAOBJECT_APERTURE] or 0.0),
+                            film_offset_x=float(camera[c4d.CAMERAOBJECT_FILM_OFFSET_X] or 0.0),
+                            film_offset_y=float(camera[c4d.CAMERAOBJECT_FILM_OFFSET_Y] or 0.0),
+                            scale=scale, aspect_ratio=aspect_ratio,
+                            metadata=metadata)
+        if filter_report is not None:
+            filter_report.write_csv(export_path + CORRECTIONS_SUFFIX, frames, scale)
+    except OSError as e:
+        logger.warning("Failed to export the camera to '{}': {}".format(export_path, e))
+
+def sample_camera_from_archive(doc, alembic_camera, camera_samples, frames):
+    """
+    Samples the camera from the Alembic archive for every frame, without evaluating the scene.
+
+    The archive's samples are resampled onto the frames by their own timestamps: positions are interpolated
+    linearly and rotations by slerp, so a camera captured at another or a variable frame rate gets exactly one
+    pose per frame without drifting against the video.
+
+    Returns:
+    - Tuple of the matrix stack in document space and the focal lengths (None when not animated).
+    """
+    alembic_times = get_alembic_frame_times(doc, alembic_camera, frames)
+    scale = get_unit_scale_factor(doc, 1.0, c4d.DOCUMENT_UNIT_M)
+    sample_times = camera_samples.sample_times()
+    matrices = mirror_z(_resample_world_matrices(camera_samples, sample_times, alembic_times), scale)
+
+    focal_lengths = None
+    focal_length_samples = camera_samples.focal_length_samples()
+    if focal_length_samples is not None:
+        focal_lengths = resample_values(focal_length_samples[0], focal_length_samples[1], alembic_times)
+    count("frames sampled", len(alembic_times))
+    count("camera samples", len(sample_times))
+
+    logger.info("Resampled {} samples of '{}' onto {} frames from the Alembic archive.".format(
+        len(sample_times), camera_samples.camera_path, len(alembic_times)))
+    return matrices, focal_lengths
+
+def _resample_world_matrices(camera_samples, sample_times, times):
+    if len(sample_times) > 1:
+        return resample_matrices(sample_times, camera_samples.world_matrices(sample_times), times)
+    return camera_samples.world_matrices(times)
+
+def sample_camera_path(doc, camera_samples, frames, animation_offset_frames=1):
+    """
+    Samples the camera's matrices in document space from CameraSamples, without an Alembic generator.
+
+    The frames map to Alembic times with the animation offset the importer gives the generator, so the path
+    matches the baked camera.
+
+    Returns:
+    - The matrix stack, one matrix per frame.
+    """
+    fps = doc.GetFps()
+    times = frame_times(frames, fps, float(animation_offset_frames) / fps)
+    scale = get_unit_scale_factor(doc, 1.0, c4d.DOCUMENT_UNIT_M)
+    return mirror_z(_resample_world_matrices(camera_samples, camera_samples.sample_times(), times), scale)
+
+def sample_camera_by_evaluation(doc, alembic_camera, frames):
+    """
+    Samples the camera by evaluating the scene at every frame and reading the Alembic generator's matrix.
+
+    Returns:
+    - The matrix stack of the camera.
+    """
+    return run_steps(iter_sample_camera_by_evaluation(doc, alembic_camera, frames))
+
+def iter_sample_camera_by_evaluation(doc, alembic_camera, frames):
+    """
+    Import step sampling the camera by evaluating the scene, see sample_camera_by_evaluation(). Yields after
+    every frame, the document's time is restored when it is done or closed early.
+    """
+    original_time = doc.GetTime()
+
+    matrices = array('d')
+    try:
+        for number, frame in enumerate(frames, 1):
+            doc.SetTime(c4d.BaseTime(frame, doc.GetFps()))
+            doc.ExecutePasses(None, True, True, True, c4d.BUILDFLAGS_NONE)
+            append_c4d_matrix(matrices, alembic_camera.GetMg())
+            yield ImportProgress("Sampling frame {} of {}".format(number, len(frames)), float(number) / len(frames))
+    finally:
+        # Reset the timeline to its original position
+        doc.SetTime(original_time)
+    count("frames evaluated", len(frames))
+    return matrices
@@ -0,0 +1,352 @@
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from cameraTransforms import MATRIX_STRIDE, matrix_count, matrices_to_position_hpb, mirror_z, unwrap_hpb
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the record layout changes, readers reject other versions
+SIDECAR_VERSION = 1
+SIDECAR_MAGIC = b"OMNICAM\0"
+SIDECAR_SUFFIX = ".omnicam"
+CHAN_SUFFIX = ".chan"
+CSV_SUFFIX = ".csv"
+CORRECTIONS_SUFFIX = ".corrections.csv"
+# Frames converted and written per block
+CHUNK_FRAMES = 4096
+
+# Values of every frame's record, all float64. The matrix is the camera's world matrix as in a matrix stack
+# without its constant column: rows X, Y and Z axis, then the position.
+CHANNELS = ("frame",
+            "m00", "m01", "m02", "m10", "m11", "m12", "m20", "m21", "m22", "tx", "ty", "tz",
+            "focal_length", "aperture", "film_offset_x", "film_offset_y")
+# Index in a matrix stack of the matrix channels m00 to tz
+_MATRIX_INDICES = (0, 1, 2, 4, 5, 6, 8, 9, 10, 12, 13, 14)
+_RECORD_STRIDE = len(CHANNELS)
+_ALIGNMENT = 8
+# magic, version, metadata length, frame count, channel count; always little-endian
+_HEADER = struct.Struct("<8sIIQI")
+
+CSV_COLUMNS = ("frame", "tx", "ty", "tz", "rx", "ry", "rz", "focal_length", "aperture", "film_offset_x",
+               "film_offset_y", "vertical_fov")
+CHAN_COLUMNS = ("frame", "tx", "ty", "tz", "rx", "ry", "rz", "vertical_fov")
+
+class CameraSidecarError(Exception):
+    """Raised when a camera sidecar cannot be read."""
+
+def sidecar_base_path(export, camera_path):
+    """
+    Returns the path, without suffix, the sidecars of a camera are written to, or None when they aren't.
+
+    Parameters:
+    - export: The camera_export import option, True for next to the camera's .abc or a directory.
+    - camera_path: The path to the camera's .abc file.
+    """
+    if not export or not camera_path:
+        return None
+    name = os.path.splitext(os.path.basename(camera_path))[0]
+    directory = export if isinstance(export, str) else os.path.dirname(camera_path)
+    return os.path.join(directory, name)
+
+def source_stamp(camera_path):
+    """Returns the size and modification time of the camera file a sidecar was baked from."""
+    stat = os.stat(camera_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _temporary_path(path):
+    """Unique sibling path to write to before an atomic rename, per process and thread."""
+    return "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+
+def _align(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+def _column(values, start, end):
+    """Returns values[start:end] as array('d'), repeating values if it is a single number."""
+    if isinstance(values, (int, float)):
+        return array('d', [values]) * (end - start)
+    return array('d', values[start:end])
+
+class CameraSidecarWriter:
+    """
+    Streams a baked camera into a sidecar file, one block of frames at a time.
+
+    Layout: a fixed header, JSON metadata, then one record of CHANNELS per frame, aligned to 8 bytes so the
+    records can be memory-mapped and used in place. Values are little-endian float64. The frame count in the
+    header is written when the writer closes, the file then replaces path atomically. Use as a context manager,
+    an exception inside the with block leaves path untouched.
+
+    Parameters:
+    - path: The sidecar's path.
+    - fps: Frame rate of the frames.
+    - metadata: Optional dict stored with the records, e.g. the camera's projection and units.
+    """
+
+    def __init__(self, path, fps, metadata=None):
+        self.path = path
+        self.frame_count = 0
+        self._temporary_path = _temporary_path(path)
+        encoded = json.dumps(dict(metadata or {}, fps=fps, channels=CHANNELS), sort_keys=True).encode("utf-8")
+        self._file = open(self._temporary_path, "wb")
+        self._file.write(_HEADER.pack(SIDECAR_MAGIC, SIDECAR_VERSION, len(encoded), 0, _RECORD_STRIDE))
+        self._file.write(encoded)
+        self._file.write(b"\0" * (_align(self._file.tell()) - self._file.tell()))
+
+    def write(self, frames, matrices, focal_lengths, aperture=0.0, film_offset_x=0.0, film_offset_y=0.0):
+        """
+        Appends frames to the sidecar, in blocks of CHUNK_FRAMES.
+
+        Every value is copied column by column with slice assignments into the block's records, no per-frame
+        objects are made.
+
+        Parameters:
+        - frames: The frame numbers.
+        - matrices: Matrix stack with one matrix per frame.
+        - focal_lengths, aperture, film_offset_x, film_offset_y: A value per frame, or one number for all frames.
+        """
+        count = len(frames)
+        if matrix_count(matrices) != count:
+            raise ValueError("Got {} matrices for {} frames.".format(matrix_count(matrices), count))
+        columns = (frames, focal_lengths, aperture, film_offset_x, film_offset_y)
+        for start in range(0, count, CHUNK_FRAMES):
+            end = min(count, start + CHUNK_FRAMES)
+            block = matrices[start * MATRIX_STRIDE:end * MATRIX_STRIDE]
+            records = array('d', bytes(8 * _RECORD_STRIDE * (end - start)))
+            records[0::_RECORD_STRIDE] = _column(frames, start, end)
+            for channel, index in enumerate(_MATRIX_INDICES, 1):
+                records[channel::_RECORD_STRIDE] = block[index::MATRIX_STRIDE]
+            for channel, values in enumerate(columns[1:], 1 + len(_MATRIX_INDICES)):
+                records[channel::_RECORD_STRIDE] = _column(values, start, end)
+            if sys.byteorder != "little":
+                records.byteswap()
+            self._file.write(memoryview(records).cast("B"))
+            self.frame_count += end - start
+
+    def close(self):
+        """Writes the frame count and moves the sidecar to its path."""
+        self._file.seek(struct.calcsize("<8sII"))
+        self._file.write(struct.pack("<Q", self.frame_count))
+        self._file.close()
+        os.replace(self._temporary_path, self.path)
+
+    def discard(self):
+        self._file.close()
+        os.remove(self._temporary_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+class CameraSidecar:
+    """
+    A camera sidecar, memory-mapped.
+
+    Attributes:
+    - path: The sidecar's path.
+    - metadata: Dict of the metadata written with the records, including fps and channels.
+    - frame_count: Number of frames.
+    - records: memoryview of float64 holding the records of all frames, see CHANNELS.
+    """
+
+    def __init__(self, path, metadata, frame_count, records):
+        self.path = path
+        self.metadata = metadata
+        self.frame_count = frame_count
+        self.records = records
+
+    @property
+    def fps(self):
+        return self.metadata["fps"]
+
+    def channel(self, name):
+        """Returns the values of a channel of CHANNELS for every frame, as a strided view into the records."""
+        return self.records[CHANNELS.index(name)::_RECORD_STRIDE]
+
+    def matrices(self):
+        """Returns the camera's matrix stack, one matrix per frame."""
+        result = array('d', bytes(8 * MATRIX_STRIDE * self.frame_count))
+        for channel, index in enumerate(_MATRIX_INDICES, 1):
+            result[index::MATRIX_STRIDE] = array('d', self.records[channel::_RECORD_STRIDE])
+        result[15::MATRIX_STRIDE] = array('d', [1.0]) * self.frame_count
+        return result
+
+    def matches(self, fps, frames, source=None, time_mapping=None, camera_filter=None):
+        """
+        Tells whether the sidecar holds exactly these frames, baked from the given source and time mapping and
+        filtered the same way.
+
+        Parameters:
+        - fps, frames: The frame rate and the frame numbers.
+        - source: Optional source_stamp() of the camera file, compared to the one the sidecar was baked from.
+        - time_mapping: Optional dict of how frames map to the camera's sample times, compared the same way.
+        - camera_filter: Dict of the CameraFilterSettings the camera was filtered with, None when it wasn't.
+        """
+        if self.fps != fps or self.frame_count != len(frames):
+            return False
+        if source is not None and self.metadata.get("source") != source:
+            return False
+        if time_mapping is not None and self.metadata.get("time_mapping") != time_mapping:
+            return False
+        if self.metadata.get("camera_filter") != camera_filter:
+            return False
+        recorded = self.channel("frame")
+        return not frames or (recorded[0] == frames[0] and recorded[-1] == frames[-1])
+
+def read_camera_sidecar(path):
+    """
+    Memory-maps a camera sidecar and returns a CameraSidecar whose records are a view into the mapping.
+
+    Raises:
+    - CameraSidecarError if the file cannot be read or isn't a sidecar of this version.
+    """
+    try:
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, metadata_length, frame_count, stride = _HEADER.unpack_from(mapped, 0)
+        if magic != SIDECAR_MAGIC or version != SIDECAR_VERSION or stride != _RECORD_STRIDE:
+            raise CameraSidecarError("'{}' is not a camera sidecar of version {}.".format(path, SIDECAR_VERSION))
+        offset = _HEADER.size
+        metadata = json.loads(mapped[offset:offset + metadata_length].decode("utf-8"))
+        offset = _align(offset + metadata_length)
+        size = frame_count * stride * 8
+        if offset + size > len(mapped):
+            raise CameraSidecarError("'{}' ends before its {} frames.".format(path, frame_count))
+    except (OSError, ValueError, struct.error) as e:
+        raise CameraSidecarError("Failed to read '{}': {}".format(path, e)) from e
+    if sys.byteorder == "little":
+        records = memoryview(mapped)[offset:offset + size].cast("d")
+    else:
+        swapped = array('d', mapped[offset:offset + size])
+        swapped.byteswap()
+        records = memoryview(swapped)
+    return CameraSidecar(path, metadata, frame_count, records)
+
+def _vertical_fov(focal_length, aperture, aspect_ratio):
+    if not focal_length or not aperture:
+        return 0.0
+    return math.degrees(2.0 * math.atan(aperture / aspect_ratio * 0.5 / focal_length))
+
+def iter_text_lines(sidecar, columns=CSV_COLUMNS, separator=" ", aspect_ratio=16.0 / 9.0):
+    """
+    Yields the frames of a right-handed sidecar as text lines of the given CSV_COLUMNS, a block of frames at a time.
+
+    Rotations are Euler angles in degrees for the ZXY rotation order, the default of Nuke's cameras, kept
+    continuous from frame to frame. The vertical field of view in degrees follows from the focal length, the
+    horizontal aperture and aspect_ratio.
+    """
+    line_format = separator.join("{:g}" if column == "frame" else "{:.6f}" for column in columns)
+    previous = None
+    for start in range(0, sidecar.frame_count, CHUNK_FRAMES):
+        end = min(sidecar.frame_count, start + CHUNK_FRAMES)
+        records = sidecar.records[start * _RECORD_STRIDE:end * _RECORD_STRIDE]
+        matrices = array('d', bytes(8 * MATRIX_STRIDE * (end - start)))
+        for channel, index in enumerate(_MATRIX_INDICES, 1):
+            matrices[index::MATRIX_STRIDE] = array('d', records[channel::_RECORD_STRIDE])
+        # Heading, pitch and bank of a right-handed matrix are its Y, X and Z angles in ZXY order
+        (tx, ty, tz), rotations = matrices_to_position_hpb(matrices, unwrap=False)
+        if previous is not None:
+            # Continue unwrapping from the last frame of the block before
+            rotations = [array('d', [angle]) + values for angle, values in zip(previous, rotations)]
+        unwrap_hpb(rotations)
+        if previous is not None:
+            rotations = [values[1:] for values in rotations]
+        previous = [values[-1] for values in rotations]
+        heading, pitch, bank = ([math.degrees(angle) for angle in values] for values in rotations)
+
+        values = {"frame": records[0::_RECORD_STRIDE], "tx": tx, "ty": ty, "tz": tz, "rx": pitch, "ry": heading,
+                  "rz": bank}
+        for name in CSV_COLUMNS[7:-1]:
+            values[name] = records[CHANNELS.index(name)::_RECORD_STRIDE]
+        values["vertical_fov"] = [_vertical_fov(focal_length, aperture, aspect_ratio)
+                                  for focal_length, aperture in zip(values["focal_length"], values["aperture"])]
+        yield "".join(line_format.format(*row) + "\n" for row in zip(*(values[column] for column in columns)))
+
+def _write_text(path, sidecar, columns, separator, aspect_ratio, header=False):
+    temporary_path = _temporary_path(path)
+    with open(temporary_path, "w") as file:
+        if header:
+            file.write(separator.join(columns) + "\n")
+        for block in iter_text_lines(sidecar, columns, separator, aspect_ratio):
+            file.write(block)
+    os.replace(temporary_path, path)
+
+def write_chan(path, sidecar, aspect_ratio=16.0 / 9.0):
+    """Writes a right-handed sidecar as a .chan file of CHAN_COLUMNS, as imported by Nuke's and Houdini's cameras."""
+    _write_text(path, sidecar, CHAN_COLUMNS, " ", aspect_ratio)
+
+def write_csv(path, sidecar, aspect_ratio=16.0 / 9.0):
+    """Writes a right-handed sidecar as CSV with a header row of CSV_COLUMNS."""
+    _write_text(path, sidecar, CSV_COLUMNS, ",", aspect_ratio, header=True)
+
+def export_baked_camera(base_path, fps, frames, matrices, focal_lengths, aperture=0.0, film_offset_x=0.0,
+                        film_offset_y=0.0, scale=1.0, aspect_ratio=16.0 / 9.0, metadata=None):
+    """
+    Writes a baked camera as a binary sidecar, a .chan and a CSV file, for tools that can't read the baked tracks.
+
+    The sidecars are in the Alembic archive's space: right-handed, Y up and in meters. The binary sidecar is
+    written first, block by block, and the text files are then streamed from its memory mapping.
+
+    Parameters:
+    - base_path: Path of the files without suffix, see sidecar_base_path().
+    - fps, frames: The frame rate and the frame numbers.
+    - matrices: Matrix stack of the camera in document space, one matrix per frame.
+    - focal_lengths: Focal length in millimeters per frame, or one number for all frames.
+    - aperture: Horizontal film width in millimeters.
+    - film_offset_x, film_offset_y: Film offsets as fractions of the film width and height.
+    - scale: Factor converting meters into document units, as used to import the camera.
+    - aspect_ratio: Width over height of the image, used for the vertical field of view.
+    - metadata: Optional dict stored with the binary sidecar, e.g. its source_stamp().
+
+    Returns:
+    - The CameraSidecar written.
+    """
+    path = base_path + SIDECAR_SUFFIX
+    metadata = dict(metadata or {}, units="m", space="right-handed, y up", aspect_ratio=aspect_ratio,
+                    focal_animated=not isinstance(focal_lengths, (int, float)))
+    with CameraSidecarWriter(path, fps, metadata) as writer:
+        for start in range(0, len(frames), CHUNK_FRAMES):
+            end = min(len(frames), start + CHUNK_FRAMES)
+            # Back from Cinema 4D's left-handed space into the archive's
+            block = mirror_z(matrices[start * MATRIX_STRIDE:end * MATRIX_STRIDE], 1.0 / scale)
+            focal_block = focal_lengths if isinstance(focal_lengths, (int, float)) else focal_lengths[start:end]
+            writer.write(frames[start:end], block, focal_block, aperture, film_offset_x, film_offset_y)
+    sidecar = read_camera_sidecar(path)
+    write_chan(base_path + CHAN_SUFFIX, sidecar, aspect_ratio)
+    write_csv(base_path + CSV_SUFFIX, sidecar, aspect_ratio)
+    logger.info("Exported {} camera frames to '{}'.".format(sidecar.frame_count, path))
+    return sidecar
+
+def load_baked_camera(base_path, fps, frames, source=None, time_mapping=None, scale=1.0, camera_filter=None):
+    """
+    Reads a camera back from its binary sidecar, when it holds exactly these frames of the same source.
+
+    Parameters:
+    - base_path: Path of the sidecar without suffix, see sidecar_base_path().
+    - fps, frames, source, time_mapping, camera_filter: See CameraSidecar.matches().
+    - scale: Factor converting meters into document units.
+
+    Returns:
+    - Tuple of the matrix stack in document space and the focal lengths (None when not animated), or None.
+    """
+    path = base_path + SIDECAR_SUFFIX
+    if not os.path.isfile(path):
+        return None
+    try:
+        sidecar = read_camera_sidecar(path)
+    except CameraSidecarError as e:
+        logger.warning("Ignoring the camera sidecar: {}".format(e))
+        return None
+    if not sidecar.matches(fps, frames, source, time_mapping, camera_filter):
+        return None
+    focal_lengths = array('d', sidecar.channel("focal_length")) if sidecar.metadata.get("focal_animated") else None
+    return mirror_z(sidecar.matrices(), scale), focal_lengths
@@ -0,0 +1,416 @@
+import heapq
+import math
+import time
+from array import array
+from functools import partial
+from operator import add, mul
+from cameraResampler import matrix_to_quaternion, quaternion_to_rows, slerp
+from cameraTransforms import MATRIX_STRIDE, matrix_count
+
+SMOOTHING_METHODS = ("savgol", "one_euro")
+# Savitzky-Golay smoothing fits a quadratic to a sliding window of frames
+DEFAULT_SAVGOL_WINDOW = 9
+SAVGOL_ORDER = 2
+# One-euro smoothing: cutoff frequency in Hz at rest, how much it rises per meter or radian per second of motion,
+# and the cutoff frequency of the motion's speed itself
+DEFAULT_ONE_EURO_CUTOFF = 1.0
+ONE_EURO_BETA = 0.5
+ONE_EURO_SPEED_CUTOFF = 1.0
+# Frames of the sliding prediction poses are compared against to find outliers
+OUTLIER_WINDOW = 7
+# Scales a median absolute deviation to the standard deviation of normally distributed noise
+MAD_TO_SIGMA = 1.4826
+# Deviations up to these are never outliers, so a camera without noise keeps all its frames
+MIN_OUTLIER_DISTANCE = 0.001
+MIN_OUTLIER_ANGLE = math.radians(0.05)
+
+class CameraFilterSettings:
+    """
+    How the baked camera's path is cleaned up before its keys are written, see filter_camera().
+
+    Attributes:
+    - smoothing: "savgol", "one_euro" or None to keep the path as sampled.
+    - window: Frames in the Savitzky-Golay window, odd.
+    - cutoff: Cutoff frequency in Hz of the one-euro filter at rest, lower smooths more.
+    - outlier_threshold: Deviations from the sliding prediction, in robust standard deviations, above which a frame
+      is replaced by interpolating its neighbors. None keeps every frame.
+    """
+
+    def __init__(self, smoothing=None, window=DEFAULT_SAVGOL_WINDOW, cutoff=DEFAULT_ONE_EURO_CUTOFF,
+                 outlier_threshold=None):
+        if smoothing is not None and smoothing not in SMOOTHING_METHODS:
+            raise ValueError("Unknown camera smoothing '{}', expected one of: {}.".format(
+                smoothing, ", ".join(SMOOTHING_METHODS)))
+        self.smoothing = smoothing
+        self.window = max(3, int(window) | 1)
+        self.cutoff = float(cutoff)
+        self.outlier_threshold = float(outlier_threshold) if outlier_threshold else None
+
+    @classmethod
+    def from_options(cls, options):
+        """Returns the settings of the camera_* import options, or None when they don't filter the camera."""
+        options = options or {}
+        settings = cls(options.get("camera_smoothing") or None,
+                       options.get("camera_smoothing_window") or DEFAULT_SAVGOL_WINDOW,
+                       options.get("camera_smoothing_cutoff") or DEFAULT_ONE_EURO_CUTOFF,
+                       options.get("camera_outlier_threshold"))
+        return settings if settings.enabled else None
+
+    @property
+    def enabled(self):
+        return self.smoothing is not None or self.outlier_threshold is not None
+
+    def to_dict(self):
+        """Returns the settings as a dict for JSON, e.g. to tell whether a sidecar was filtered the same way."""
+        settings = {"smoothing": self.smoothing, "outlier_threshold": self.outlier_threshold}
+        if self.smoothing == "savgol":
+            settings["window"] = self.window
+        elif self.smoothing == "one_euro":
+            settings["cutoff"] = self.cutoff
+        return settings
+
+class CameraFilterReport:
+    """
+    How far filter_camera() moved every frame of the camera.
+
+    Attributes:
+    - position_corrections: array('d') of the distance each frame's position moved, in document units.
+    - rotation_corrections: array('d') of the angle each frame's rotation turned, in degrees.
+    - outliers: Indices of the frames replaced as outliers.
+    - seconds: Time the filter took.
+    """
+
+    def __init__(self, position_corrections, rotation_corrections, outliers, seconds=0.0):
+        self.position_corrections = position_corrections
+        self.rotation_corrections = rotation_corrections
+        self.outliers = outliers
+        self.seconds = seconds
+
+    def summary(self, frames):
+        """Returns a one-line description of the corrections, frames being the frame number of every index."""
+        if not len(self.position_corrections):
+            return "no frames"
+        worst = max(range(len(self.position_corrections)), key=self.position_corrections.__getitem__)
+        return ("{} outliers replaced{}, mean correction {:.3f} units and {:.3f} degrees, largest {:.3f} units at "
+                "frame {} and {:.3f} degrees, in {:.2f} s").format(
+            len(self.outliers),
+            " (frames {})".format(", ".join(str(frames[index]) for index in self.outliers[:10])) if self.outliers else "",
+            sum(self.position_corrections) / len(self.position_corrections),
+            sum(self.rotation_corrections) / len(self.rotation_corrections),
+            self.position_corrections[worst], frames[worst], max(self.rotation_corrections), self.seconds)
+
+    def write_csv(self, path, frames, scale=1.0):
+        """
+        Writes the correction of every frame as CSV: frame, position correction in meters, rotation correction
+        in degrees and 1 for outliers. scale converts meters into document units.
+        """
+        outliers = set(self.outliers)
+        with open(path, "w") as file:
+            file.write("frame,position_correction,rotation_correction,outlier\n")
+            for index, frame in enumerate(frames):
+                file.write("{},{:.9g},{:.9g},{}\n".format(frame, self.position_corrections[index] / scale,
+                                                          self.rotation_corrections[index], int(index in outliers)))
+
+def decompose_poses(matrices):
+    """
+    Splits a matrix stack into columns of positions, rotations and axis lengths.
+
+    Returns:
+    - Tuple of three array('d') of x, y and z, four array('d') of the unit quaternions' w, x, y and z, and the
+      axis lengths of every matrix, see matrix_to_quaternion(). Consecutive quaternions are kept in the same
+      hemisphere, so the columns are continuous and can be filtered like any other value.
+    """
+    count = matrix_count(matrices)
+    positions = tuple(array('d', matrices[12 + axis::MATRIX_STRIDE]) for axis in range(3))
+    quaternions = tuple(array('d', bytes(8 * count)) for _ in range(4))
+    scales = []
+    qw, qx, qy, qz = quaternions
+    previous = (1.0, 0.0, 0.0, 0.0)
+    for index in range(count):
+        (w, x, y, z), axis_scales = matrix_to_quaternion(matrices, index * MATRIX_STRIDE)
+        if w * previous[0] + x * previous[1] + y * previous[2] + z * previous[3] < 0.0:
+            w, x, y, z = -w, -x, -y, -z
+        qw[index], qx[index], qy[index], qz[index] = previous = (w, x, y, z)
+        scales.append(axis_scales)
+    return positions, quaternions, scales
+
+def _invert(matrix):
+    """Inverts a small square matrix of lists by Gauss-Jordan elimination."""
+    size = len(matrix)
+    rows = [list(row) + [1.0 if column == index else 0.0 for column in range(size)] for index, row in enumerate(matrix)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda row: abs(rows[row][column]))
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        divisor = rows[column][column]
+        rows[column] = [value / divisor for value in rows[column]]
+        for row in range(size):
+            if row != column and rows[row][column]:
+                factor = rows[row][column]
+                rows[row] = [value - factor * pivot_value for value, pivot_value in zip(rows[row], rows[column])]
+    return [row[size:] for row in rows]
+
+def savgol_coefficients(window, order=SAVGOL_ORDER):
+    """
+    Returns the Savitzky-Golay weights of a window: for every frame of the window, the weights of the window's
+    values that evaluate the polynomial of the given order fitted to them at that frame.
+    """
+    half = window // 2
+    offsets = range(-half, half + 1)
+    terms = order + 1
+    # Normal equations of the least squares fit
+    inverse = _invert([[float(sum(t ** (i + j) for t in offsets)) for j in range(terms)] for i in range(terms)])
+    weights = []
+    for position in offsets:
+        row = [sum(position ** i * inverse[i][j] for i in range(terms)) for j in range(terms)]
+        weights.append(tuple(sum(row[j] * t ** j for j in range(terms)) for t in offsets))
+    return weights
+
+def savgol_filter(values, window, order=SAVGOL_ORDER):
+    """
+    Smooths a column of values with a Savitzky-Golay filter, keeping peaks and slopes better than an average.
+
+    Frames within half a window of either end use the polynomial of the first or last full window. The inner
+    frames are a weighted sum of shifted slices of the column, one slice per weight.
+
+    Returns:
+    - A new array('d').
+    """
+    count = len(values)
+    window = min(window, count if count % 2 else count - 1)
+    result = array('d', values)
+    if window <= order:
+        return result
+    weights = savgol_coefficients(window, order)
+    half = window // 2
+    inner = count - 2 * half
+    smoothed = [0.0] * inner
+    for offset, weight in enumerate(weights[half]):
+        smoothed = list(map(add, smoothed, map(partial(mul, weight), values[offset:offset + inner])))
+    result[half:half + inner] = array('d', smoothed)
+    last = count - window
+    for position in range(half):
+        result[position] = sum(weight * value for weight, value in zip(weights[position], values[:window]))
+        end = half + 1 + position
+        result[last + end] = sum(weight * value for weight, value in zip(weights[end], values[last:]))
+    return result
+
+def _smoothing_factor(cutoff, period):
+    return 1.0 / (1.0 + 1.0 / (2.0 * math.pi * cutoff * period))
+
+def one_euro_filter(columns, fps, cutoff=DEFAULT_ONE_EURO_CUTOFF, beta=ONE_EURO_BETA, speed_scale=1.0):
+    """
+    Smooths columns that together make up one vector with a one-euro filter: an exponential smoothing whose
+    cutoff frequency rises with the speed of the vector, so slow motion loses its jitter and fast motion lags little.
+
+    Parameters:
+    - columns: Sequences of the vector's components, one value per frame.
+    - fps: Frames per second of the values.
+    - cutoff: Cutoff frequency in Hz at rest.
+    - beta: How much the cutoff frequency rises per unit of speed.
+    - speed_scale: Factor converting the change of the vector per second into the unit of the speed.
+
+    Returns:
+    - The smoothed columns, each a new array('d').
+    """
+    result = [array('d', column) for column in columns]
+    count = len(result[0]) if result else 0
+    if count < 2:
+        return result
+    period = 1.0 / fps
+    speed_factor = _smoothing_factor(ONE_EURO_SPEED_CUTOFF, period)
+    previous = [column[0] for column in result]
+    speed = 0.0
+    for index in range(1, count):
+        values = [column[index] for column in columns]
+        change = math.sqrt(sum((value - last) ** 2 for value, last in zip(values, previous)))
+        speed += speed_factor * (change * fps * speed_scale - speed)
+        factor = _smoothing_factor(cutoff + beta * speed, period)
+        previous = [last + factor * (value - last) for value, last in zip(values, previous)]
+        for column, value in zip(result, previous):
+            column[index] = value
+    return result
+
+def _interpolation_pairs(half):
+    """Returns (offset before, offset after, fraction) of every pair of neighbors in a window around a frame."""
+    return [(before, after, float(before) / (before + after))
+            for before in range(1, half + 1) for after in range(1, half + 1)]
+
+def sliding_prediction(values, window=OUTLIER_WINDOW):
+    """
+    Returns for every frame at least half a window in from either end the trend of the other frames of the window
+    around it: the median of the linear interpolations between every neighbor before it and every neighbor after it.
+    Unlike their median, this follows a moving camera, and a pop among the neighbors only shifts a minority of the
+    interpolations instead of the prediction of every frame near it.
+    """
+    half = window // 2
+    count = len(values)
+    interpolations = [[first + (second - first) * fraction
+                       for first, second in zip(values[half - before:count - half - before],
+                                                values[half + after:count - half + after])]
+                      for before, after, fraction in _interpolation_pairs(half)]
+    return array('d', map(_median, zip(*interpolations)))
+
+def _prediction(values, index, half):
+    """Returns the sliding_prediction() of a single frame."""
+    return _median([values[index - before] + (values[index + after] - values[index - before]) * fraction
+                    for before, after, fraction in _interpolation_pairs(half)])
+
+def _median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else 0.5 * (ordered[middle - 1] + ordered[middle])
+
+def _deviation(position, quaternion, predicted_position, predicted_quaternion):
+    """Returns the distance and angle between a pose and its prediction."""
+    distance = math.sqrt(sum((value - predicted) ** 2 for value, predicted in zip(position, predicted_position)))
+    # The component-wise interpolation of nearby quaternions in one hemisphere is close to their mean rotation
+    length = math.sqrt(sum(value * value for value in predicted_quaternion)) or 1.0
+    dot = sum(value * predicted for value, predicted in zip(quaternion, predicted_quaternion))
+    return distance, 2.0 * math.acos(min(1.0, abs(dot) / length))
+
+def find_outliers(positions, quaternions, threshold, scale=1.0, window=OUTLIER_WINDOW):
+    """
+    Finds the frames whose pose jumps away from its neighbors, e.g. single-frame pops of a tracking glitch.
+
+    Every frame is compared against the sliding_prediction() of its neighbors, per position axis and quaternion
+    component. A frame deviates when its distance or angle to that prediction exceeds threshold times the median of
+    these deviations over the whole path, scaled to a standard deviation, and the MIN_OUTLIER_* floors. The frame
+    that deviates most is an outlier and replaced by its prediction before its neighbors are compared again, so a pop
+    never makes the good frames next to it outliers too. Frames within half a window of either end have no window
+    around them and are never outliers.
+
+    Parameters:
+    - positions, quaternions: Columns as returned by decompose_poses().
+    - threshold: Robust standard deviations above which a frame is an outlier, e.g. 3.
+    - scale: Factor converting meters into document units, for MIN_OUTLIER_DISTANCE.
+    - window: Frames of the sliding prediction.
+
+    Returns:
+    - Sorted list of the outliers' frame indices.
+    """
+    half = window // 2
+    count = len(positions[0])
+    if count < window:
+        return []
+    # Copies in which the outliers found so far are replaced by their prediction
+    columns = [array('d', column) for column in positions] + [array('d', column) for column in quaternions]
+    predictions = [sliding_prediction(column, window) for column in columns]
+    deviations = [_deviation(pose[:3], pose[3:], predicted[:3], predicted[3:])
+                  for pose, predicted in zip(zip(*(column[half:count - half] for column in columns)), zip(*predictions))]
+    distance_limit = threshold * max(MAD_TO_SIGMA * _median([deviation[0] for deviation in deviations]),
+                                     MIN_OUTLIER_DISTANCE * scale)
+    angle_limit = threshold * max(MAD_TO_SIGMA * _median([deviation[1] for deviation in deviations]), MIN_OUTLIER_ANGLE)
+
+    def excess(deviation):
+        return max(deviation[0] / distance_limit, deviation[1] / angle_limit)
+
+    def measure(index):
+        predicted = [_prediction(column, index, half) for column in columns]
+        return excess(_deviation([column[index] for column in columns[:3]], [column[index] for column in columns[3:]],
+                                 predicted[:3], predicted[3:]))
+
+    # Worst frame first, a frame's excess changes when an outlier within half a window of it is replaced
+    excesses = {half + index: excess(deviation) for index, deviation in enumerate(deviations)}
+    candidates = [(-value, index) for index, value in excesses.items() if value > 1.0]
+    heapq.heapify(candidates)
+    outliers = set()
+    while candidates:
+        value, index = heapq.heappop(candidates)
+        if -value != excesses[index]:
+            continue
+        outliers.add(index)
+        excesses[index] = 0.0
+        for column in columns:
+            column[index] = _prediction(column, index, half)
+        for neighbor in range(max(half, index - half), min(count - half, index + half + 1)):
+            if neighbor not in outliers:
+                excesses[neighbor] = measure(neighbor)
+                if excesses[neighbor] > 1.0:
+                    heapq.heappush(candidates, (-excesses[neighbor], neighbor))
+    return sorted(outliers)
+
+def replace_outliers(positions, quaternions, outliers):
+    """
+    Replaces the poses of the outlier frames in place, interpolating between the closest frames that aren't
+    outliers: linearly for positions, by slerp for rotations. Outliers at either end hold the closest frame.
+    """
+    count = len(positions[0])
+    flagged = set(outliers)
+    if len(flagged) >= count:
+        return
+    index = 0
+    while index < count:
+        if index not in flagged:
+            index += 1
+            continue
+        end = index
+        while end < count and end in flagged:
+            end += 1
+        before = index - 1 if index > 0 else end
+        after = end if end < count else before
+        quaternion_before = tuple(column[before] for column in quaternions)
+        quaternion_after = tuple(column[after] for column in quaternions)
+        for frame in range(index, end):
+            fraction = float(frame - before) / (after - before) if after != before else 0.0
+            for column in positions:
+                column[frame] = column[before] + (column[after] - column[before]) * fraction
+            for column, value in zip(quaternions, slerp(quaternion_before, quaternion_after, fraction)):
+                column[frame] = value
+        index = end
+
+def _pose_matrix(position, quaternion, scales):
+    """Returns the matrix of a position, a quaternion that is normalized first and the axis lengths."""
+    length = math.sqrt(sum(value * value for value in quaternion)) or 1.0
+    (xx, xy, xz), (yx, yy, yz), (zx, zy, zz) = quaternion_to_rows([value / length for value in quaternion], scales)
+    return array('d', (xx, xy, xz, 0.0, yx, yy, yz, 0.0, zx, zy, zz, 0.0, position[0], position[1], position[2], 1.0))
+
+def filter_camera(matrices, fps, settings, scale=1.0):
+    """
+    Removes outliers from a camera path and smooths it, as set by CameraFilterSettings.
+
+    The path is split into columns of positions and quaternions once, every stage runs on whole columns and the
+    matrices are rebuilt at the end with their original axis lengths. Outliers are replaced first, so a pop
+    doesn't spread over its neighbors when the path is smoothed. Rotations are filtered as quaternions kept in
+    one hemisphere, then normalized again.
+
+    Parameters:
+    - matrices: The camera's matrix stack in document space, one matrix per frame.
+    - fps: Frames per second of the path.
+    - settings: CameraFilterSettings.
+    - scale: Factor converting meters into document units.
+
+    Returns:
+    - Tuple of the filtered matrix stack and a CameraFilterReport.
+    """
+    start = time.perf_counter()
+    count = matrix_count(matrices)
+    original_positions, original_quaternions, scales = decompose_poses(matrices)
+    positions = [array('d', column) for column in original_positions]
+    quaternions = [array('d', column) for column in original_quaternions]
+
+    outliers = []
+    if settings.outlier_threshold is not None:
+        outliers = find_outliers(positions, quaternions, settings.outlier_threshold, scale)
+        replace_outliers(positions, quaternions, outliers)
+
+    if settings.smoothing == "savgol":
+        positions = [savgol_filter(column, settings.window) for column in positions]
+        quaternions = [savgol_filter(column, settings.window) for column in quaternions]
+    elif settings.smoothing == "one_euro":
+        positions = one_euro_filter(positions, fps, settings.cutoff, speed_scale=1.0 / scale)
+        # The change of a unit quaternion is about half the angle it turns by
+        quaternions = one_euro_filter(quaternions, fps, settings.cutoff, speed_scale=2.0)
+
+    result = array('d', matrices)
+    changed = range(count) if settings.smoothing is not None else outliers
+    for index in changed:
+        result[index * MATRIX_STRIDE:(index + 1) * MATRIX_STRIDE] = _pose_matrix(
+            [column[index] for column in positions], [column[index] for column in quaternions], scales[index])
+
+    sqrt, acos, degrees = math.sqrt, math.acos, math.degrees
+    position_corrections = array('d', (sqrt((x - ox) * (x - ox) + (y - oy) * (y - oy) + (z - oz) * (z - oz))
+                                       for x, y, z, ox, oy, oz in zip(*positions, *original_positions)))
+    rotation_corrections = array('d', (degrees(2.0 * acos(min(1.0, abs(w * ow + x * ox + y * oy + z * oz)
+                                                                  / (sqrt(w * w + x * x + y * y + z * z) or 1.0))))
+                                       for w, x, y, z, ow, ox, oy, oz in zip(*quaternions, *original_quaternions)))
+    return result, CameraFilterReport(position_corrections, rotation_corrections, outliers, time.perf_counter() - start)
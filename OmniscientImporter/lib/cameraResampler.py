@@ -0,0 +1,165 @@
+import math
+from array import array
+from bisect import bisect_right
+from cameraTransforms import MATRIX_STRIDE, matrix_count
+
+# Below this cosine between two rotations, slerp falls back to a normalized lerp
+_SLERP_LINEAR_DOT = 0.9995
+_TIME_EPSILON = 1e-9
+
+def frame_times(frames, fps, offset_seconds=0.0):
+    """Returns the time in seconds of each frame of a grid at fps, shifted by offset_seconds."""
+    return array('d', (float(frame) / fps - offset_seconds for frame in frames))
+
+def matrix_to_quaternion(matrices, base=0):
+    """
+    Splits one matrix of a stack into a rotation and the lengths of its axes.
+
+    Parameters:
+    - matrices: The matrix stack.
+    - base: Index of the matrix's first value in the stack.
+
+    Returns:
+    - Tuple of the unit quaternion (w, x, y, z) and the scale of the X, Y and Z axes. A mirrored matrix gets a
+      negative Z scale, so the quaternion always describes a proper rotation.
+    """
+    ax, ay, az = matrices[base], matrices[base + 1], matrices[base + 2]
+    bx, by, bz = matrices[base + 4], matrices[base + 5], matrices[base + 6]
+    cx, cy, cz = matrices[base + 8], matrices[base + 9], matrices[base + 10]
+    scale_x = math.sqrt(ax * ax + ay * ay + az * az)
+    scale_y = math.sqrt(bx * bx + by * by + bz * bz)
+    scale_z = math.sqrt(cx * cx + cy * cy + cz * cz)
+    if ax * (by * cz - bz * cy) - ay * (bx * cz - bz * cx) + az * (bx * cy - by * cx) < 0.0:
+        scale_z = -scale_z
+    inverse_x = 1.0 / scale_x if scale_x else 0.0
+    inverse_y = 1.0 / scale_y if scale_y else 0.0
+    inverse_z = 1.0 / scale_z if scale_z else 0.0
+    m00, m01, m02 = ax * inverse_x, ay * inverse_x, az * inverse_x
+    m10, m11, m12 = bx * inverse_y, by * inverse_y, bz * inverse_y
+    m20, m21, m22 = cx * inverse_z, cy * inverse_z, cz * inverse_z
+
+    trace = m00 + m11 + m22
+    if trace > 0.0:
+        s = 2.0 * math.sqrt(trace + 1.0)
+        w, x, y, z = 0.25 * s, (m21 - m12) / s, (m02 - m20) / s, (m10 - m01) / s
+    elif m00 > m11 and m00 > m22:
+        s = 2.0 * math.sqrt(max(0.0, 1.0 + m00 - m11 - m22))
+        w, x, y, z = (m21 - m12) / s, 0.25 * s, (m01 + m10) / s, (m02 + m20) / s
+    elif m11 > m22:
+        s = 2.0 * math.sqrt(max(0.0, 1.0 + m11 - m00 - m22))
+        w, x, y, z = (m02 - m20) / s, (m01 + m10) / s, 0.25 * s, (m12 + m21) / s
+    else:
+        s = 2.0 * math.sqrt(max(0.0, 1.0 + m22 - m00 - m11))
+        w, x, y, z = (m10 - m01) / s, (m02 + m20) / s, (m12 + m21) / s, 0.25 * s
+    length = math.sqrt(w * w + x * x + y * y + z * z)
+    if length == 0.0:
+        return (1.0, 0.0, 0.0, 0.0), [scale_x, scale_y, scale_z]
+    return (w / length, x / length, y / length, z / length), [scale_x, scale_y, scale_z]
+
+def quaternion_to_rows(quaternion, scales=(1.0, 1.0, 1.0)):
+    """Returns the three axis rows of the rotation of a unit quaternion, scaled, the inverse of matrix_to_quaternion."""
+    w, x, y, z = quaternion
+    sx, sy, sz = scales
+    return (
+        (sx * (1.0 - 2.0 * (y * y + z * z)), sx * 2.0 * (x * y - z * w), sx * 2.0 * (x * z + y * w)),
+        (sy * 2.0 * (x * y + z * w), sy * (1.0 - 2.0 * (x * x + z * z)), sy * 2.0 * (y * z - x * w)),
+        (sz * 2.0 * (x * z - y * w), sz * 2.0 * (y * z + x * w), sz * (1.0 - 2.0 * (x * x + y * y))),
+    )
+
+def _normalized(quaternion):
+    length = math.sqrt(sum(value * value for value in quaternion))
+    if length == 0.0:
+        return (1.0, 0.0, 0.0, 0.0)
+    return tuple(value / length for value in quaternion)
+
+def slerp(a, b, t):
+    """Spherical linear interpolation between two unit quaternions along the shorter arc."""
+    dot = sum(x * y for x, y in zip(a, b))
+    if dot < 0.0:
+        b = tuple(-value for value in b)
+        dot = -dot
+    if dot > _SLERP_LINEAR_DOT:
+        return _normalized(tuple(x + (y - x) * t for x, y in zip(a, b)))
+    angle = math.acos(dot)
+    sin_angle = math.sin(angle)
+    weight_a = math.sin((1.0 - t) * angle) / sin_angle
+    weight_b = math.sin(t * angle) / sin_angle
+    return tuple(weight_a * x + weight_b * y for x, y in zip(a, b))
+
+def _bracket(sample_times, time):
+    """Returns (index, fraction) of the sample interval holding time, clamped to the first and last sample."""
+    last = len(sample_times) - 1
+    if time <= sample_times[0] + _TIME_EPSILON:
+        return 0, 0.0
+    if time >= sample_times[last] - _TIME_EPSILON:
+        return last, 0.0
+    index = bisect_right(sample_times, time) - 1
+    duration = sample_times[index + 1] - sample_times[index]
+    fraction = (time - sample_times[index]) / duration if duration > 0.0 else 0.0
+    if fraction <= _TIME_EPSILON:
+        return index, 0.0
+    return index, fraction
+
+def resample_matrices(sample_times, matrices, target_times):
+    """
+    Resamples a matrix stack from its own sample times onto other times, e.g. the frames of a video.
+
+    Offsets and axis lengths are interpolated linearly, rotations by slerp. Targets before the first or after the
+    last sample hold that sample, targets on a sample get it unchanged. The sample times don't need to be evenly
+    spaced, so variable frame rate captures are resampled by their actual timestamps.
+
+    Parameters:
+    - sample_times: Sorted times of the matrices in seconds.
+    - matrices: The matrix stack, one matrix per sample time.
+    - target_times: Times in seconds to produce a matrix for.
+
+    Returns:
+    - A new matrix stack with one matrix per target time.
+    """
+    if matrix_count(matrices) != len(sample_times):
+        raise ValueError("Got {} matrices for {} sample times.".format(matrix_count(matrices), len(sample_times)))
+    result = array('d')
+    if not len(sample_times):
+        return result
+
+    # Quaternions are decomposed once per sample, on first use
+    rotations = {}
+    def rotation(index):
+        if index not in rotations:
+            rotations[index] = matrix_to_quaternion(matrices, index * MATRIX_STRIDE)
+        return rotations[index]
+
+    for time in target_times:
+        index, fraction = _bracket(sample_times, time)
+        base = index * MATRIX_STRIDE
+        if fraction == 0.0:
+            result.extend(matrices[base:base + MATRIX_STRIDE])
+            continue
+
+        (quaternion_a, scales_a), (quaternion_b, scales_b) = rotation(index), rotation(index + 1)
+        rows = quaternion_to_rows(slerp(quaternion_a, quaternion_b, fraction),
+                                  [a + (b - a) * fraction for a, b in zip(scales_a, scales_b)])
+        for row in rows:
+            result.extend(row)
+            result.append(0.0)
+        following = base + MATRIX_STRIDE
+        for axis in range(3):
+            a = matrices[base + 12 + axis]
+            result.append(a + (matrices[following + 12 + axis] - a) * fraction)
+        result.append(1.0)
+    return result
+
+def resample_values(sample_times, values, target_times):
+    """Linearly resamples a sequence of values from its sample times onto target_times, like resample_matrices."""
+    if len(values) != len(sample_times):
+        raise ValueError("Got {} values for {} sample times.".format(len(values), len(sample_times)))
+    result = array('d')
+    if not len(sample_times):
+        return result
+    for time in target_times:
+        index, fraction = _bracket(sample_times, time)
+        if fraction == 0.0:
+            result.append(values[index])
+        else:
+            result.append(values[index] + (values[index + 1] - values[index]) * fraction)
+    return result
@@ -0,0 +1,150 @@
+import math
+from array import array
+
+# Matrix stacks are flat array('d') holding 16 values per matrix: row-major 4x4 in the row-vector convention
+# shared by Alembic and Cinema 4D, i.e. rows 0-2 are the X, Y and Z axes and row 3 is the offset.
+MATRIX_STRIDE = 16
+
+_GIMBAL_EPSILON = 1e-7
+_TWO_PI = 2.0 * math.pi
+
+def matrix_count(matrices):
+    return len(matrices) // MATRIX_STRIDE
+
+def mirror_z(matrices, scale=1.0):
+    """
+    Converts a stack of right-handed (Alembic) matrices into left-handed (Cinema 4D) ones by mirroring Z.
+
+    Parameters:
+    - matrices: The matrix stack.
+    - scale: Factor applied to the offsets, e.g. to convert meters into document units.
+
+    Returns:
+    - A new matrix stack.
+    """
+    result = array('d', matrices)
+    for base in range(0, len(result), MATRIX_STRIDE):
+        result[base + 2] = -result[base + 2]
+        result[base + 6] = -result[base + 6]
+        result[base + 8] = -result[base + 8]
+        result[base + 9] = -result[base + 9]
+        result[base + 12] *= scale
+        result[base + 13] *= scale
+        result[base + 14] = -result[base + 14] * scale
+    return result
+
+def matrices_to_position_hpb(matrices, unwrap=True):
+    """
+    Converts a stack of matrices into positions and HPB rotations in one pass.
+
+    Matches c4d.utils.MatrixToHPB for the default HPB rotation order. The axes do not need to be normalized.
+
+    Parameters:
+    - matrices: The matrix stack.
+    - unwrap: Keep the rotation continuous from frame to frame (see unwrap_hpb).
+
+    Returns:
+    - Tuple (positions, rotations), each three array('d') holding the x/y/z resp. heading/pitch/bank per matrix.
+    """
+    px, py, pz = array('d'), array('d'), array('d')
+    heading, pitch, bank = array('d'), array('d'), array('d')
+    sqrt, asin, atan2 = math.sqrt, math.asin, math.atan2
+
+    for base in range(0, len(matrices), MATRIX_STRIDE):
+        x1, y1, z1 = matrices[base], matrices[base + 1], matrices[base + 2]
+        y2 = matrices[base + 5]
+        x3, y3, z3 = matrices[base + 8], matrices[base + 9], matrices[base + 10]
+
+        length1 = sqrt(x1 * x1 + y1 * y1 + z1 * z1) or 1.0
+        length2 = sqrt(matrices[base + 4] ** 2 + y2 * y2 + matrices[base + 6] ** 2) or 1.0
+        length3 = sqrt(x3 * x3 + y3 * y3 + z3 * z3) or 1.0
+        y3 /= length3
+
+        if y3 > 1.0 - _GIMBAL_EPSILON or y3 < -1.0 + _GIMBAL_EPSILON:
+            # Looking straight up or down: heading and bank share an axis, put everything into the heading
+            p = -math.pi / 2.0 if y3 > 0.0 else math.pi / 2.0
+            h = atan2(-z1 / length1, x1 / length1)
+            b = 0.0
+        else:
+            p = asin(-y3)
+            h = atan2(x3 / length3, z3 / length3)
+            b = atan2(y1 / length1, y2 / length2)
+
+        px.append(matrices[base + 12])
+        py.append(matrices[base + 13])
+        pz.append(matrices[base + 14])
+        heading.append(h)
+        pitch.append(p)
+        bank.append(b)
+
+    rotations = (heading, pitch, bank)
+    if unwrap:
+        unwrap_hpb(rotations)
+    return (px, py, pz), rotations
+
+def _wrap_near(angle, reference):
+    """Returns the angle shifted by whole turns to be as close as possible to the reference."""
+    return angle - _TWO_PI * round((angle - reference) / _TWO_PI)
+
+def unwrap_hpb(rotations):
+    """
+    Makes a sequence of HPB rotations continuous, in place.
+
+    For every frame both equivalent HPB triples, (h, p, b) and (h + pi, pi - p, b + pi), are shifted by whole
+    turns towards the previous frame and the closer one is kept. This removes the +-pi flips of atan2 as well as
+    the flips between the two Euler solutions near a pitch of +-90 degrees.
+
+    Parameters:
+    - rotations: Three mutable sequences holding heading, pitch and bank in radians.
+
+    Returns:
+    - The number of frames that were changed.
+    """
+    heading, pitch, bank = rotations
+    changed = 0
+    for index in range(1, len(heading)):
+        previous_h, previous_p, previous_b = heading[index - 1], pitch[index - 1], bank[index - 1]
+        h, p, b = heading[index], pitch[index], bank[index]
+
+        first = (_wrap_near(h, previous_h), _wrap_near(p, previous_p), _wrap_near(b, previous_b))
+        second = (_wrap_near(h + math.pi, previous_h), _wrap_near(math.pi - p, previous_p), _wrap_near(b + math.pi, previous_b))
+        first_distance = abs(first[0] - previous_h) + abs(first[1] - previous_p) + abs(first[2] - previous_b)
+        second_distance = abs(second[0] - previous_h) + abs(second[1] - previous_p) + abs(second[2] - previous_b)
+        best = first if first_distance <= second_distance else second
+
+        if best != (h, p, b):
+            heading[index], pitch[index], bank[index] = best
+            changed += 1
+    return changed
+
+def position_hpb_to_matrices(positions, rotations):
+    """
+    Builds a matrix stack from positions and HPB rotations, the inverse of matrices_to_position_hpb.
+
+    Matches c4d.utils.HPBToMatrix for the default HPB rotation order.
+
+    Returns:
+    - A matrix stack.
+    """
+    px, py, pz = positions
+    heading, pitch, bank = rotations
+    matrices = array('d')
+    sin, cos = math.sin, math.cos
+    for index in range(len(heading)):
+        h, p, b = heading[index], pitch[index], bank[index]
+        sh, ch = sin(h), cos(h)
+        sp, cp = sin(p), cos(p)
+        sb, cb = sin(b), cos(b)
+        matrices.extend((
+            ch * cb + sh * sp * sb, cp * sb, -sh * cb + ch * sp * sb, 0.0,
+            -ch * sb + sh * sp * cb, cp * cb, sh * sb + ch * sp * cb, 0.0,
+            sh * cp, -sp, ch * cp, 0.0,
+            px[index], py[index], pz[index], 1.0,
+        ))
+    return matrices
+
+def max_matrix_difference(a, b):
+    """Returns the largest absolute difference between two matrix stacks of the same size."""
+    if len(a) != len(b):
+        raise ValueError("Matrix stacks differ in size: {} vs {} values.".format(len(a), len(b)))
+    return max((abs(x - y) for x, y in zip(a, b)), default=0.0)
@@ -0,0 +1,276 @@
+import c4d
+import logging
+import threading
+import time
+from concurrent.futures import Future, wait
+from OmniscientMessage import IMPORT_EVENT_ID
+
+logger = logging.getLogger(__name__)
+
+# Main thread time spent on an import per turn of Cinema 4D's event loop
+SLICE_SECONDS = 0.05
+# How often a waiting import checks its workers and the Escape key
+POLL_SECONDS = 0.1
+# Changes to the node of an undo step's last entry that tell the user's later edits of the node from the step itself
+_UNDO_DIRTY_FLAGS = c4d.DIRTYFLAGS_DATA | c4d.DIRTYFLAGS_MATRIX
+
+class ImportProgress:
+    """
+    Yielded by import steps between changes to the document.
+
+    Attributes:
+    - stage: What the import is doing, shown in the status bar.
+    - fraction: How far the import is, from 0 to 1.
+    - waiting: Optional concurrent.futures.Future the import waits for before it can go on.
+    """
+
+    __slots__ = ("stage", "fraction", "waiting")
+
+    def __init__(self, stage, fraction=0.0, waiting=None):
+        self.stage = stage
+        self.fraction = fraction
+        self.waiting = waiting
+
+def wait_for(future, stage, fraction=0.0):
+    """Import step yielding until a Future is done, then returning the Future. Use with 'yield from'."""
+    while not future.done():
+        yield ImportProgress(stage, fraction, waiting=future)
+    return future
+
+def within(steps, stage=None, start=0.0, end=1.0):
+    """
+    Import step running steps as part of a larger one, with their fraction mapped from 0..1 onto start..end and
+    their stage shown after the optional stage. Returns their result. Use with 'yield from'.
+    """
+    try:
+        while True:
+            try:
+                progress = next(steps)
+            except StopIteration as stop:
+                return stop.value
+            inner_stage = progress.stage if stage is None else "{}: {}".format(stage, progress.stage)
+            yield ImportProgress(inner_stage, start + (end - start) * progress.fraction, progress.waiting)
+    finally:
+        steps.close()
+
+def call_in_thread(function, *args):
+    """Runs function(*args) on a daemon thread. Returns a Future of its result."""
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(function(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="Omniscient import", daemon=True).start()
+    return future
+
+def run_steps(steps):
+    """Runs import steps to completion on the calling thread, blocking wherever they wait. Returns their result."""
+    while True:
+        try:
+            progress = next(steps)
+        except StopIteration as stop:
+            return stop.value
+        if progress.waiting is not None:
+            wait([progress.waiting])
+
+class ImportJob:
+    """
+    Runs import steps on the main thread, a slice at a time, while Cinema 4D keeps handling the interface.
+
+    File reading and decoding happen on worker threads and processes, the steps only wait for them between the
+    changes to the document. Every slice of steps runs in its own undo group, so no group stays open while
+    Cinema 4D handles the interface and edits the user makes meanwhile remain their own undo steps. A cancelled job
+    undoes the steps that changed the document, as long as they are still on top of the undo stack.
+
+    Parameters:
+    - doc: The document imported into.
+    - name: Name of the import shown in the status bar, usually the shot's file name.
+    - steps: Generator of ImportProgress, returning the import's result.
+    """
+
+    def __init__(self, doc, name, steps):
+        self.doc = doc
+        self.name = name
+        self.steps = steps
+        self.progress = ImportProgress("Starting")
+        self.result = None
+        self.finished = False
+        self.cancelled = False
+        # Undo steps of the job on top of the document's undo stack, and the top one as _undo_top() identified it
+        self._undo_count = 0
+        self._undo_mark = None
+        # Undo steps of the job that the user's edits came after, which a cancel keeps
+        self._kept_steps = 0
+
+    def advance(self, seconds=SLICE_SECONDS):
+        """
+        Runs steps for about the given time. Must be called on the main thread.
+
+        Returns:
+        - True if the job still has work to do right away, False when it waits for a worker or has finished.
+        """
+        if self.finished:
+            return False
+        if not self._document_alive():
+            logger.warning("The document '{}' was imported into has been closed, stopping the import.".format(self.name))
+            self.steps.close()
+            self.finished = True
+            self.result = False
+            return False
+        try:
+            return self._in_undo_group(self._run_slice, seconds)
+        except StopIteration as stop:
+            self.result = stop.value
+        except Exception as e:
+            logger.exception("An error occurred while importing '{}': ".format(self.name), exc_info=e)
+            self.result = False
+        self.finished = True
+        return False
+
+    def _run_slice(self, seconds):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            self.progress = next(self.steps)
+            if self.progress.waiting is not None:
+                return False
+        return True
+
+    def cancel(self):
+        """Stops the job and undoes what it changed in the document. Must be called on the main thread."""
+        if self.finished:
+            return
+        self.cancelled = True
+        # Leaves the steps' with blocks, which shuts their workers down
+        self._in_undo_group(self.steps.close)
+        self.finished = True
+        self._undo_steps()
+        self.result = False
+        logger.info("Cancelled the import of '{}'.".format(self.name))
+
+    def _document_alive(self):
+        return self.doc is not None and self.doc.IsAlive()
+
+    def _undo_top(self):
+        """
+        Returns what identifies the undo step on top of the document's undo stack, or None without one.
+
+        GetUndoPtr() only returns the node of the step's last entry, which a later step of the user can be for as
+        well. The node's dirty count and its place in the document tell such an edit of the node apart.
+        """
+        node = self.doc.GetUndoPtr()
+        if node is None:
+            return None
+        return node, node.GetDirty(_UNDO_DIRTY_FLAGS), node.GetDocument(), node.GetUp(), node.GetPred()
+
+    def _check_undo_stack(self):
+        """Keeps the job's undo steps for good once the user changed the document after the last of them."""
+        if self._undo_count and self._undo_top() != self._undo_mark:
+            self._kept_steps += self._undo_count
+            self._undo_count = 0
+
+    def _in_undo_group(self, function, *args):
+        """Calls function(*args) in an undo group of its own, counting the group when it added undo entries."""
+        if not self._document_alive():
+            return function(*args)
+        self._check_undo_stack()
+        before = self._undo_top()
+        self.doc.StartUndo()
+        try:
+            return function(*args)
+        finally:
+            if self._document_alive():
+                self.doc.EndUndo()
+                after = self._undo_top()
+                if after is not None and after != before:
+                    self._undo_count += 1
+                    self._undo_mark = after
+
+    def _undo_steps(self):
+        """
+        Undoes the job's undo groups, newest first. Groups the user changed the document after are kept, so their
+        edits are never undone.
+        """
+        if not self._document_alive():
+            return
+        self._check_undo_stack()
+        for _ in range(self._undo_count):
+            self.doc.DoUndo(False)
+        self._undo_count = 0
+        if self._kept_steps:
+            logger.warning("'{}' was changed during the import, {} steps of the import were kept, undo them by hand.".format(
+                self.name, self._kept_steps))
+
+# Jobs started on the main thread, the first one runs and the others wait for it
+_jobs = []
+_poll_timer = None
+
+def start_import(doc, name, steps):
+    """
+    Queues import steps to run in the background of Cinema 4D's interface, see ImportJob.
+
+    Returns:
+    - The ImportJob.
+    """
+    job = ImportJob(doc, name, steps)
+    _jobs.append(job)
+    c4d.SpecialEventAdd(IMPORT_EVENT_ID)
+    return job
+
+def running_import():
+    """Returns the ImportJob running now, or None."""
+    return _jobs[0] if _jobs else None
+
+def escape_pressed():
+    state = c4d.BaseContainer()
+    return c4d.gui.GetInputState(c4d.BFM_INPUT_KEYBOARD, c4d.KEY_ESC, state) and state[c4d.BFM_INPUT_VALUE]
+
+def _schedule(delay):
+    """Sends the next IMPORT_EVENT_ID right away or after delay seconds."""
+    global _poll_timer
+    if delay <= 0.0:
+        c4d.SpecialEventAdd(IMPORT_EVENT_ID)
+    elif _poll_timer is None or not _poll_timer.is_alive():
+        _poll_timer = threading.Timer(delay, c4d.SpecialEventAdd, (IMPORT_EVENT_ID,))
+        _poll_timer.daemon = True
+        _poll_timer.start()
+
+def update_imports():
+    """
+    Runs a slice of the current import, shows its progress in the status bar and schedules the next slice.
+    Escape cancels the import. Called on the main thread for every IMPORT_EVENT_ID core message.
+
+    Returns:
+    - The job that finished or was cancelled in this call, or None.
+    """
+    job = running_import()
+    if job is None:
+        return None
+    if escape_pressed():
+        job.cancel()
+    else:
+        busy = job.advance()
+        if not job.finished:
+            percent = int(100 * job.progress.fraction)
+            c4d.StatusSetText("Importing {}: {}... {}% (Esc to cancel)".format(job.name, job.progress.stage, percent))
+            c4d.StatusSetBar(percent)
+            _schedule(0.0 if busy else POLL_SECONDS)
+            return None
+
+    _jobs.remove(job)
+    c4d.StatusClear()
+    c4d.EventAdd()
+    if _jobs:
+        _schedule(0.0)
+    return job
+
+def cancel_imports():
+    """Cancels the running and the queued imports. Must be called on the main thread."""
+    while _jobs:
+        _jobs.pop(0).cancel()
+    c4d.StatusClear()
+    c4d.EventAdd()
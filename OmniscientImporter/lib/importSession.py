@@ -0,0 +1,133 @@
+import c4d
+import logging
+
+logger = logging.getLogger(__name__)
+
+def iter_hierarchy(obj):
+    """Yields obj and all of its descendants, depth first, without recursion."""
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        yield current
+        child = current.GetDown()
+        children = []
+        while child is not None:
+            children.append(child)
+            child = child.GetNext()
+        stack.extend(reversed(children))
+
+class ImportSession:
+    """
+    Records the objects and materials created by the import of one shot.
+
+    Steps register what they create, so later steps get the shot's camera, background and scans as direct
+    references instead of searching the document by name, which costs a walk over every object and can pick up
+    another shot's objects. Files that go through Cinema 4D's importers are loaded into a temporary document
+    and moved over, which tells exactly which objects they created without snapshotting the document.
+
+    Parameters:
+    - doc: The document the shot is imported into.
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.objects = []
+        self.materials = []
+        self.scans = []
+        self.point_clouds = []
+        self.camera = None
+        self.background = None
+        self.control_tag = None
+        # Path of each shot file -> the objects and materials created from it
+        self.assets = {}
+
+    def _record_asset(self, node, asset):
+        if asset is not None:
+            self.assets.setdefault(asset, []).append(node)
+
+    def record_object(self, obj, role=None, asset=None):
+        """
+        Registers a top-level object created by the import.
+
+        Parameters:
+        - obj: The created object.
+        - role: Optional "scan", "points", "camera" or "background", exposing the object as that part of the shot.
+        - asset: Optional path of the shot file the object was created from.
+        """
+        if obj is None:
+            return
+        self.objects.append(obj)
+        self._record_asset(obj, asset)
+        if role == "scan":
+            self.scans.append(obj)
+        elif role == "points":
+            self.point_clouds.append(obj)
+        elif role == "camera":
+            self.camera = obj
+        elif role == "background":
+            self.background = obj
+        elif role is not None:
+            raise ValueError("Unknown object role '{}'.".format(role))
+
+    def record_material(self, material, asset=None):
+        if material is not None:
+            self.materials.append(material)
+            self._record_asset(material, asset)
+
+    def forget_object(self, obj):
+        """Unregisters an object removed again during the import, such as a replaced Alembic camera."""
+        self.objects = [recorded for recorded in self.objects if recorded is not obj]
+        self.scans = [scan for scan in self.scans if scan is not obj]
+        self.point_clouds = [cloud for cloud in self.point_clouds if cloud is not obj]
+        for asset, nodes in self.assets.items():
+            self.assets[asset] = [node for node in nodes if node is not obj]
+        if self.camera is obj:
+            self.camera = None
+        if self.background is obj:
+            self.background = None
+
+    def iter_objects(self):
+        """Yields every object created by the import, including the children of the recorded objects."""
+        for obj in self.objects:
+            for descendant in iter_hierarchy(obj):
+                yield descendant
+
+    def merge_file(self, file_path, flags=c4d.SCENEFILTER_OBJECTS | c4d.SCENEFILTER_MATERIALS):
+        """
+        Imports a file with Cinema 4D's importers and records what it created.
+
+        Returns:
+        - The created top-level objects, or None if the file could not be loaded.
+        """
+        loaded = c4d.documents.LoadDocument(file_path, flags)
+        if loaded is None:
+            return None
+
+        # Materials first, so links from texture tags resolve once the objects arrive
+        materials = []
+        material = loaded.GetFirstMaterial()
+        while material is not None:
+            materials.append(material)
+            material = material.GetNext()
+        for material in materials:
+            material.Remove()
+            self.doc.InsertMaterial(material)
+            self.doc.AddUndo(c4d.UNDOTYPE_NEW, material)
+            self.record_material(material, asset=file_path)
+
+        objects = []
+        obj = loaded.GetFirstObject()
+        while obj is not None:
+            objects.append(obj)
+            obj = obj.GetNext()
+        previous = None
+        for obj in objects:
+            obj.Remove()
+            self.doc.InsertObject(obj, pred=previous)
+            self.doc.AddUndo(c4d.UNDOTYPE_NEW, obj)
+            self.record_object(obj, asset=file_path)
+            previous = obj
+
+        c4d.documents.KillDocument(loaded)
+        logger.info("Imported {} objects and {} materials from {}".format(len(objects), len(materials), file_path))
+        return objects
@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Environment variable enabling traces: "1" writes them to the default directory, any other value is the directory
+TRACE_ENV = "OMNISCIENT_TRACE"
+TRACE_SUFFIX = ".trace.json"
+
+# The trace being recorded, per thread, so background work of other shots doesn't end up in it
+_state = threading.local()
+
+class _NoSpan:
+    """Span returned while tracing is off, entering and leaving it does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set(self, **args):
+        pass
+
+_NO_SPAN = _NoSpan()
+
+class Span:
+    """A timed, possibly nested, stage of a trace. Arguments are shown with the span in the trace viewer."""
+
+    __slots__ = ("trace", "name", "args", "start", "depth")
+
+    def __init__(self, trace, name, args):
+        self.trace = trace
+        self.name = name
+        self.args = args
+        self.start = 0.0
+        self.depth = 0
+
+    def __enter__(self):
+        self.depth = self.trace.depth
+        self.trace.depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        self.trace.depth -= 1
+        if exc_type is not None:
+            self.args["error"] = "{}: {}".format(exc_type.__name__, exc_value)
+        self.trace.add_span(self.name, self.start, end, self.depth, self.args)
+        return False
+
+    def set(self, **args):
+        """Adds arguments known only once the span is running, such as the number of items processed."""
+        self.args.update(args)
+
+class Trace:
+    """
+    Spans and counters of one import, exportable as a Chrome trace (chrome://tracing, ui.perfetto.dev).
+
+    Parameters:
+    - name: Name of the trace, usually the shot's file name.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self.depth = 0
+        self.events = []
+        self.spans = []
+        self.counters = {}
+
+    def _timestamp(self, seconds):
+        return (seconds - self.origin) * 1000000.0
+
+    def add_span(self, name, start, end, depth, args):
+        self.spans.append((name, depth, end - start))
+        event = {"name": name, "cat": "import", "ph": "X", "ts": self._timestamp(start),
+                 "dur": (end - start) * 1000000.0, "pid": self.pid, "tid": self.tid}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def count(self, name, value=1):
+        total = self.counters.get(name, 0) + value
+        self.counters[name] = total
+        self.events.append({"name": name, "ph": "C", "ts": self._timestamp(time.perf_counter()), "pid": self.pid,
+                            "tid": self.tid, "args": {name: total}})
+
+    def to_dict(self):
+        metadata = {"name": "process_name", "ph": "M", "pid": self.pid, "tid": self.tid,
+                    "args": {"name": "Omniscient import {}".format(self.name)}}
+        return {"traceEvents": [metadata] + self.events, "displayTimeUnit": "ms",
+                "otherData": {"shot": self.name, "counters": self.counters}}
+
+    def summary(self):
+        """Returns a one-line summary: total time, the time of each top-level stage and the counters."""
+        total = sum(duration for _, depth, duration in self.spans if depth == 0)
+        stages = {}
+        for name, depth, duration in self.spans:
+            if depth == 1:
+                count, seconds = stages.get(name, (0, 0.0))
+                stages[name] = (count + 1, seconds + duration)
+        parts = ["{}{} {}".format(name, " x{}".format(count) if count > 1 else "", _format_seconds(seconds))
+                 for name, (count, seconds) in stages.items()]
+        parts += ["{} {}".format(name, _format_bytes(value) if name.startswith("bytes") else value)
+                  for name, value in self.counters.items()]
+        return "{} {}: {}".format(self.name, _format_seconds(total), ", ".join(parts))
+
+    def write(self, path):
+        temporary_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(temporary_path, "w") as file:
+            json.dump(self.to_dict(), file)
+        os.replace(temporary_path, path)
+
+def _format_seconds(seconds):
+    return "{:.2f} s".format(seconds) if seconds >= 1.0 else "{:.1f} ms".format(seconds * 1000.0)
+
+def _format_bytes(value):
+    return "{:.1f} MB".format(value / 1024.0 / 1024.0)
+
+def default_trace_directory():
+    return os.path.join(tempfile.gettempdir(), "omniscient_traces")
+
+def trace_directory(option=None):
+    """
+    Returns the directory traces are written to, or None when tracing is off.
+
+    Parameters:
+    - option: The "trace" import option: True for the default directory, or a directory. When None, the
+      OMNISCIENT_TRACE environment variable decides.
+    """
+    if option is None:
+        option = os.environ.get(TRACE_ENV, "")
+        if option.strip().lower() in ("", "0", "false", "off"):
+            return None
+        if option.strip().lower() in ("1", "true", "on"):
+            option = True
+    if option is True:
+        return default_trace_directory()
+    return option or None
+
+def active_trace():
+    """Returns the Trace recorded on this thread, or None."""
+    return getattr(_state, "trace", None)
+
+def span(name, **args):
+    """Returns a context manager timing a stage of the current trace, doing nothing when tracing is off."""
+    trace = getattr(_state, "trace", None)
+    if trace is None:
+        return _NO_SPAN
+    return Span(trace, name, args)
+
+def count(name, value=1):
+    """Adds value to a counter of the current trace, such as keys written or bytes read."""
+    trace = getattr(_state, "trace", None)
+    if trace is not None:
+        trace.count(name, value)
+
+class traced:
+    """
+    Context manager recording a trace of the enclosed import and writing it when it ends.
+
+    The trace is written to the directory as <name>-<time>.trace.json and a one-line summary is logged. Does
+    nothing when the directory is None, or when a trace is already recorded on this thread, whose spans the
+    enclosed ones then become part of.
+
+    Parameters:
+    - name: Name of the trace and of its root span, usually the shot's file name.
+    - directory: Directory the trace is written to, see trace_directory().
+    """
+
+    def __init__(self, name, directory):
+        self.name = name
+        self.directory = directory
+        self.trace = None
+        self.span = _NO_SPAN
+        self.path = None
+
+    def __enter__(self):
+        if self.directory is None or active_trace() is not None:
+            return self
+        self.trace = Trace(self.name)
+        _state.trace = self.trace
+        self.span = Span(self.trace, "import", {"shot": self.name})
+        self.span.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.trace is None:
+            return False
+        self.span.__exit__(exc_type, exc_value, traceback)
+        _state.trace = None
+        now = time.time()
+        name = "{}-{}-{:03d}{}".format(os.path.splitext(self.name)[0], time.strftime("%Y%m%d-%H%M%S", time.localtime(now)),
+                                       int(now * 1000) % 1000, TRACE_SUFFIX)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self.path = os.path.join(self.directory, name)
+            self.trace.write(self.path)
+            logger.info("Trace {} written to {}".format(self.trace.summary(), self.path))
+        except OSError as e:
+            logger.warning("Failed to write the import trace: {}".format(e))
+        return False
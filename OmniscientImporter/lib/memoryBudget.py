@@ -0,0 +1,117 @@
+import ctypes
+import os
+import sys
+
+MEGABYTE = 1024 * 1024
+
+# Memory a scan takes while it is decoded in full and built, per byte of its OBJ file: the decoded arrays, their
+# copy sent back by the decode worker and the Python objects written into the polygon object and its tags
+FULL_IMPORT_BYTES_PER_FILE_BYTE = 6.0
+# Memory taken while a chunk of an OBJ file is parsed and written into the object, per byte of the chunk: the
+# chunk's lines, tokens and numbers as Python objects. Both factors were measured on the benchmark's synthetic scans.
+STREAM_BYTES_PER_CHUNK_BYTE = 24.0
+# Texture vertices and normals are kept until the object is built, as float32
+UV_BYTES = 2 * 4
+NORMAL_BYTES = 3 * 4
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 16 * MEGABYTE
+
+def _resident_bytes_linux():
+    with open("/proc/self/statm", "rb") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+class _ProcessMemoryCounters(ctypes.Structure):
+    _fields_ = [("cb", ctypes.c_uint32), ("PageFaultCount", ctypes.c_uint32),
+                ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+def _resident_bytes_windows():
+    counters = _ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    kernel32 = ctypes.windll.kernel32
+    kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+    if not kernel32.K32GetProcessMemoryInfo(ctypes.c_void_p(kernel32.GetCurrentProcess()), ctypes.byref(counters),
+                                            counters.cb):
+        return None
+    return counters.WorkingSetSize
+
+class _MachTaskBasicInfo(ctypes.Structure):
+    _fields_ = [("virtual_size", ctypes.c_uint64), ("resident_size", ctypes.c_uint64),
+                ("resident_size_max", ctypes.c_uint64), ("user_time", ctypes.c_int32 * 2),
+                ("system_time", ctypes.c_int32 * 2), ("policy", ctypes.c_int32), ("suspend_count", ctypes.c_int32)]
+
+_MACH_TASK_BASIC_INFO = 20
+
+def _resident_bytes_macos():
+    libc = ctypes.CDLL("/usr/lib/libSystem.B.dylib")
+    info = _MachTaskBasicInfo()
+    count = ctypes.c_uint32(ctypes.sizeof(info) // 4)
+    task = ctypes.c_uint32.in_dll(libc, "mach_task_self_")
+    if libc.task_info(task, _MACH_TASK_BASIC_INFO, ctypes.byref(info), ctypes.byref(count)) != 0:
+        return None
+    return info.resident_size
+
+def resident_bytes():
+    """Returns the resident memory of this process in bytes, or None where it can't be measured."""
+    try:
+        if sys.platform.startswith("linux"):
+            return _resident_bytes_linux()
+        if sys.platform.startswith("win"):
+            return _resident_bytes_windows()
+        if sys.platform == "darwin":
+            return _resident_bytes_macos()
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    return None
+
+class MemoryMonitor:
+    """
+    Tracks the peak resident memory of the process while a piece of work runs, by sampling it.
+
+    Call sample() where the work holds the most memory, e.g. after every chunk it processed.
+
+    Attributes:
+    - start: Resident bytes when the monitor was created, None where memory can't be measured.
+    - peak: Largest resident bytes sampled so far.
+    """
+
+    def __init__(self):
+        self.start = resident_bytes()
+        self.peak = self.start
+
+    def sample(self):
+        if self.start is None:
+            return
+        current = resident_bytes()
+        if current is not None and current > self.peak:
+            self.peak = current
+
+    @property
+    def increase(self):
+        """Bytes the peak lies above the start, None where memory can't be measured."""
+        return None if self.start is None else self.peak - self.start
+
+def budget_bytes(megabytes):
+    """Returns a memory budget given in megabytes in bytes, or None without a budget."""
+    return int(float(megabytes) * MEGABYTE) if megabytes else None
+
+def exceeds_budget(file_size, budget):
+    """Tells whether importing an OBJ file of file_size bytes in full is expected to take more than budget bytes."""
+    return budget is not None and file_size * FULL_IMPORT_BYTES_PER_FILE_BYTE > budget
+
+def stream_chunk_size(budget, counts):
+    """
+    Returns the size of the chunks an OBJ file is streamed in to stay within a memory budget.
+
+    The texture vertices and normals are kept for the whole import, the chunks get what remains of the budget,
+    within MIN_CHUNK_SIZE and MAX_CHUNK_SIZE.
+
+    Parameters:
+    - budget: Memory budget in bytes.
+    - counts: ObjCounts of the file.
+    """
+    kept = counts.uvs * UV_BYTES + counts.normals * NORMAL_BYTES
+    chunk_size = int((budget - kept) / STREAM_BYTES_PER_CHUNK_BYTE)
+    return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, chunk_size))
@@ -0,0 +1,414 @@
+import math
+import mmap
+import os
+from array import array
+
+# Size of the slices the memory-mapped file is parsed in, cut at the next line break.
+# Small slices keep the short-lived per-line Python objects from dominating peak memory.
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+class ObjReadError(Exception):
+    """Raised when an OBJ file cannot be decoded by the native reader."""
+
+class ScanMesh:
+    """
+    Decoded scan geometry in compact typed arrays, already converted into Cinema 4D space.
+
+    Attributes:
+    - points: array('f') with x, y, z per point.
+    - polygons: array('i') with four point indices per polygon (c == d for triangles).
+    - uvs: array('f') with u, v per texture vertex.
+    - polygon_uvs: array('i') with four texture vertex indices per polygon, empty without UVs.
+    - normals: array('f') with x, y, z per normal, of unit length.
+    - polygon_normals: array('i') with four normal indices per polygon, empty without normals.
+    - material_libraries: Names of the .mtl files referenced by the OBJ.
+    - materials: Names of the materials used by the faces, in order of first use.
+    """
+
+    def __init__(self):
+        self.points = array('f')
+        self.polygons = array('i')
+        self.uvs = array('f')
+        self.polygon_uvs = array('i')
+        self.normals = array('f')
+        self.polygon_normals = array('i')
+        self.material_libraries = []
+        self.materials = []
+
+    @property
+    def point_count(self):
+        return len(self.points) // 3
+
+    @property
+    def polygon_count(self):
+        return len(self.polygons) // 4
+
+    @property
+    def nbytes(self):
+        return sum(len(values) * values.itemsize for values in (self.points, self.polygons, self.uvs,
+                                                               self.polygon_uvs, self.normals, self.polygon_normals))
+
+def iter_chunks(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields the file's content in slices of about chunk_size bytes that end on a line break."""
+    with open(file_path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            start = 0
+            while start < size:
+                end = min(start + chunk_size, size)
+                if end < size:
+                    line_break = mapped.find(b"\n", end)
+                    end = size if line_break < 0 else line_break + 1
+                yield mapped[start:end]
+                start = end
+
+def _parse_floats(lines, width, prefix_length):
+    """Converts the first `width` numbers of each line to floats, skipping the line's keyword."""
+    text = b" ".join([line[prefix_length:] for line in lines])
+    # A total token count can't tell a line missing values from one with extra values, every line is checked
+    if _has_tokens(lines, text, width + 1):
+        tokens = text.split()
+        if len(tokens) == width * len(lines):
+            return list(map(float, tokens))
+    # Lines with extra (e.g. vertex colors) or missing values
+    values = []
+    for line in lines:
+        numbers = line[prefix_length:].split()[:width]
+        numbers += [b"0"] * (width - len(numbers))
+        values.extend(map(float, numbers))
+    return values
+
+def _normalize(values):
+    """Scales x, y, z triples to unit length, exporters often write longer or shorter normals. Zero ones are kept."""
+    lengths = [math.sqrt(x * x + y * y + z * z) or 1.0 for x, y, z in zip(values[0::3], values[1::3], values[2::3])]
+    for axis in range(3):
+        values[axis::3] = [value / length for value, length in zip(values[axis::3], lengths)]
+    return values
+
+def _has_tokens(lines, text, count):
+    """
+    Returns True if every line has at most count tokens, the keyword included. Lines separated by single spaces
+    are checked by counting them, others are split. With a matching total, every line has exactly count tokens.
+    """
+    spaced = not (b"\t" in text or b"\x0b" in text or b"\x0c" in text)
+    spaces = count - 1
+    for line in lines:
+        if not (spaced and line.count(b" ") == spaces) and len(line.split()) != count:
+            return False
+    return True
+
+def _resolve_indices(values, total):
+    """Turns 1-based (or negative, relative) OBJ indices into 0-based ones."""
+    if min(values, default=1) > 0:
+        return [value - 1 for value in values]
+    return [value - 1 if value > 0 else total + value for value in values]
+
+def _reverse_winding(indices, corners):
+    """Reorders uniform triangles or quads to the reversed winding used by Cinema 4D, four indices per polygon."""
+    count = len(indices) // corners
+    result = [0] * (count * 4)
+    if corners == 3:
+        result[0::4] = indices[0::3]
+        result[1::4] = indices[2::3]
+        result[2::4] = indices[1::3]
+        result[3::4] = indices[1::3]
+    else:
+        result[0::4] = indices[0::4]
+        result[1::4] = indices[3::4]
+        result[2::4] = indices[2::4]
+        result[3::4] = indices[1::4]
+    return result
+
+class _ObjParser:
+    def __init__(self, scale, read_uvs, read_normals):
+        self.mesh = ScanMesh()
+        self.scale = scale
+        self.read_uvs = read_uvs
+        self.read_normals = read_normals
+        self.point_total = 0
+        self.uv_total = 0
+        self.normal_total = 0
+        # Whether the faces have texture coordinates and normals, set by the first face
+        self.layout = None
+
+    def parse_chunk(self, chunk):
+        point_lines = []
+        uv_lines = []
+        normal_lines = []
+        # Faces are grouped by the element counts they were defined after, for relative indices
+        face_groups = []
+        face_lines = None
+        mesh = self.mesh
+        for line in chunk.splitlines():
+            keyword = line[:2]
+            if keyword == b"v ":
+                point_lines.append(line)
+                self.point_total += 1
+                face_lines = None
+            elif keyword == b"f ":
+                if face_lines is None:
+                    face_lines = []
+                    face_groups.append((self.point_total, self.uv_total, self.normal_total, face_lines))
+                face_lines.append(line)
+            elif keyword == b"vt":
+                uv_lines.append(line)
+                self.uv_total += 1
+                face_lines = None
+            elif keyword == b"vn":
+                normal_lines.append(line)
+                self.normal_total += 1
+                face_lines = None
+            elif line.startswith(b"usemtl"):
+                name = line[6:].strip().decode("utf-8", "replace")
+                if name not in mesh.materials:
+                    mesh.materials.append(name)
+            elif line.startswith(b"mtllib"):
+                mesh.material_libraries.append(line[6:].strip().decode("utf-8", "replace"))
+
+        if point_lines:
+            values = _parse_floats(point_lines, 3, 2)
+            if self.scale != 1.0:
+                scale = self.scale
+                values = [value * scale for value in values]
+            # OBJ is right-handed, Cinema 4D left-handed
+            values[2::3] = [-value for value in values[2::3]]
+            mesh.points.extend(values)
+        if uv_lines and self.read_uvs:
+            values = _parse_floats(uv_lines, 2, 3)
+            # OBJ's V axis points up, Cinema 4D's down
+            values[1::2] = [1.0 - value for value in values[1::2]]
+            mesh.uvs.extend(values)
+        if normal_lines and self.read_normals:
+            values = _parse_floats(normal_lines, 3, 3)
+            values[2::3] = [-value for value in values[2::3]]
+            mesh.normals.extend(_normalize(values))
+
+        for point_total, uv_total, normal_total, lines in face_groups:
+            if not self._add_uniform_faces(lines, point_total, uv_total, normal_total):
+                for line in lines:
+                    self._add_face(line, point_total, uv_total, normal_total)
+
+    def _add_uniform_faces(self, lines, point_total, uv_total, normal_total):
+        """Decodes a block of faces in bulk if all of them are triangles or all are quads of the same layout."""
+        first = lines[0].split()
+        corners = len(first) - 1
+        if corners not in (3, 4):
+            return False
+        layout = first[1]
+        has_uvs = b"/" in layout and b"//" not in layout
+        has_normals = layout.count(b"/") == 2
+        fields = 1 + has_uvs + has_normals
+
+        # Every line needs the corner count and slashes of the first, a total token count can't tell a pentagon
+        # next to a triangle from two quads
+        slashes = layout.count(b"/") * corners
+        double_slashes = layout.count(b"//") * corners
+        for line in lines:
+            if line.count(b"/") != slashes or line.count(b"//") != double_slashes:
+                return False
+        text = b" ".join([line[2:] for line in lines])
+        if not _has_tokens(lines, text, corners + 1):
+            return False
+        tokens = text.replace(b"//", b" ").replace(b"/", b" ").split()
+        if len(tokens) != len(lines) * corners * fields:
+            return False
+        values = list(map(int, tokens))
+
+        mesh = self.mesh
+        uvs = has_uvs and self.read_uvs
+        normals = has_normals and self.read_normals
+        self._check_attributes(uvs, normals)
+
+        mesh.polygons.extend(_reverse_winding(_resolve_indices(values[0::fields], point_total), corners))
+        if uvs:
+            mesh.polygon_uvs.extend(_reverse_winding(_resolve_indices(values[1::fields], uv_total), corners))
+        if normals:
+            mesh.polygon_normals.extend(_reverse_winding(_resolve_indices(values[fields - 1::fields], normal_total), corners))
+        return True
+
+    def _check_attributes(self, has_uvs, has_normals):
+        if self.layout is None:
+            self.layout = (has_uvs, has_normals)
+            return
+        if has_uvs != self.layout[0]:
+            raise ObjReadError("Faces mix polygons with and without texture coordinates.")
+        if has_normals != self.layout[1]:
+            raise ObjReadError("Faces mix polygons with and without normals.")
+
+    def _add_face(self, line, point_total, uv_total, normal_total):
+        parts = line.split()[1:]
+        if len(parts) < 3:
+            return
+
+        points = []
+        uvs = []
+        normals = []
+        for part in parts:
+            fields = part.split(b"/")
+            points.append(int(fields[0]))
+            if len(fields) > 1 and fields[1]:
+                uvs.append(int(fields[1]))
+            if len(fields) > 2 and fields[2]:
+                normals.append(int(fields[2]))
+
+        points = _resolve_indices(points, point_total)
+        uvs = _resolve_indices(uvs, uv_total) if self.read_uvs and len(uvs) == len(points) else None
+        normals = _resolve_indices(normals, normal_total) if self.read_normals and len(normals) == len(points) else None
+        self._check_attributes(uvs is not None, normals is not None)
+
+        mesh = self.mesh
+        for corners in _split_face(len(points)):
+            # Mirroring Z flips the winding, reverse it to keep the normals pointing outwards
+            mesh.polygons.extend([points[i] for i in corners])
+            if uvs is not None:
+                mesh.polygon_uvs.extend([uvs[i] for i in corners])
+            if normals is not None:
+                mesh.polygon_normals.extend([normals[i] for i in corners])
+
+_TRIANGLE = ((0, 2, 1, 1),)
+_QUAD = ((0, 3, 2, 1),)
+
+def _split_face(corner_count):
+    """Returns reversed corner orders of the triangles and quads a face is split into (n-gons are fanned)."""
+    if corner_count == 3:
+        return _TRIANGLE
+    if corner_count == 4:
+        return _QUAD
+    return [(0, i + 1, i, i) for i in range(1, corner_count - 1)]
+
+def read_obj(file_path, scale=1.0, read_uvs=True, read_normals=True, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams an OBJ file into a ScanMesh without going through Cinema 4D's importer.
+
+    Parameters:
+    - file_path: The path to the OBJ file.
+    - scale: Factor converting OBJ units into document units.
+    - read_uvs: Decode texture coordinates.
+    - read_normals: Decode vertex normals.
+    - chunk_size: Approximate size in bytes of the slices the memory-mapped file is parsed in.
+
+    Returns:
+    - The decoded ScanMesh.
+
+    Raises:
+    - ObjReadError if the file cannot be read or decoded.
+    """
+    parser = _ObjParser(scale, read_uvs, read_normals)
+    try:
+        for chunk in iter_chunks(file_path, chunk_size):
+            parser.parse_chunk(chunk)
+    except ObjReadError:
+        raise
+    except (OSError, ValueError, IndexError) as e:
+        raise ObjReadError("Failed to read '{}': {}".format(file_path, e)) from e
+
+    mesh = parser.mesh
+    _check_indices(mesh, file_path, mesh.point_count)
+    return mesh
+
+def _check_indices(mesh, file_path, point_count=None):
+    """Raises ObjReadError if a polygon references a point, texture vertex or normal the mesh doesn't have."""
+    for indices, total, elements in ((mesh.polygons, point_count, "points"),
+                                     (mesh.polygon_uvs, len(mesh.uvs) // 2, "texture coordinates"),
+                                     (mesh.polygon_normals, len(mesh.normals) // 3, "normals")):
+        if indices and total is not None and (min(indices) < 0 or max(indices) >= total):
+            raise ObjReadError("'{}' has faces referencing missing {}.".format(file_path, elements))
+
+class ObjCounts:
+    """Number of points, texture vertices, normals and polygons of an OBJ file, see count_obj_elements()."""
+
+    def __init__(self, points=0, uvs=0, normals=0, polygons=0):
+        self.points = points
+        self.uvs = uvs
+        self.normals = normals
+        self.polygons = polygons
+
+def _count_polygons(face_lines):
+    """Returns the number of polygons faces are split into, see _split_face()."""
+    polygons = 0
+    for line in face_lines:
+        corners = len(line.split()) - 1
+        polygons += corners - 2 if corners > 4 else corners >= 3
+    return polygons
+
+def count_obj_elements(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Counts the elements of an OBJ file without decoding them, so objects can be created at their final size.
+
+    Raises:
+    - ObjReadError if the file cannot be read.
+    """
+    counts = ObjCounts()
+    try:
+        for chunk in iter_chunks(file_path, chunk_size):
+            # Chunks start at a line, so every element but the first follows a line break
+            counts.points += chunk.count(b"\nv ") + chunk.startswith(b"v ")
+            counts.uvs += chunk.count(b"\nvt ") + chunk.startswith(b"vt ")
+            counts.normals += chunk.count(b"\nvn ") + chunk.startswith(b"vn ")
+            if b"f " in chunk:
+                counts.polygons += _count_polygons([line for line in chunk.splitlines() if line[:2] == b"f "])
+    except OSError as e:
+        raise ObjReadError("Failed to read '{}': {}".format(file_path, e)) from e
+    return counts
+
+def iter_obj_blocks(file_path, scale=1.0, read_uvs=True, read_normals=True, chunk_size=DEFAULT_CHUNK_SIZE,
+                    point_count=None):
+    """
+    Streams an OBJ file as one ScanMesh per chunk, so an object can be built without holding the whole mesh.
+
+    The same ScanMesh is yielded for every chunk. Its points and polygons (with their texture and normal indices)
+    are those of the chunk only and are released before the next chunk is parsed, the polygons index the points
+    of the whole file. Its uvs and normals keep every texture vertex and normal read so far, as any face may use
+    them, and its materials those used so far.
+
+    Parameters:
+    - file_path, scale, read_uvs, read_normals, chunk_size: See read_obj().
+    - point_count: Optional number of points in the file, see count_obj_elements(), to check the faces against.
+
+    Raises:
+    - ObjReadError if the file cannot be read or decoded.
+    """
+    parser = _ObjParser(scale, read_uvs, read_normals)
+    mesh = parser.mesh
+    try:
+        for chunk in iter_chunks(file_path, chunk_size):
+            parser.parse_chunk(chunk)
+            chunk = None
+            _check_indices(mesh, file_path, point_count)
+            yield mesh
+            mesh.points = array('f')
+            mesh.polygons = array('i')
+            mesh.polygon_uvs = array('i')
+            mesh.polygon_normals = array('i')
+    except ObjReadError:
+        raise
+    except (OSError, ValueError, IndexError) as e:
+        raise ObjReadError("Failed to read '{}': {}".format(file_path, e)) from e
+
+def read_mtl(file_path):
+    """
+    Reads the diffuse color and texture of each material in an .mtl file.
+
+    Returns:
+    - Dict of material name -> {"color": (r, g, b) or None, "texture": absolute path or None}.
+    """
+    materials = {}
+    current = None
+    directory = os.path.dirname(file_path)
+    with open(file_path, "r", encoding="utf-8", errors="replace") as file:
+        for line in file:
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0] == "newmtl" and len(parts) > 1:
+                current = materials.setdefault(" ".join(parts[1:]), {"color": None, "texture": None})
+            elif current is None:
+                continue
+            elif parts[0] == "Kd" and len(parts) >= 4:
+                current["color"] = tuple(float(value) for value in parts[1:4])
+            elif parts[0] == "map_Kd" and len(parts) > 1:
+                # Options such as '-s 1 1 1' may precede the file name
+                current["texture"] = os.path.join(directory, parts[-1])
+    return materials
@@ -0,0 +1,294 @@
+import math
+import mmap
+import os
+import struct
+from array import array
+from itertools import chain
+from operator import itemgetter
+from objReader import iter_chunks
+
+# Number of points decoded per struct call or per block of ASCII lines
+CHUNK_POINTS = 65536
+
+_PLY_TYPES = {
+    "char": "b", "int8": "b", "uchar": "B", "uint8": "B",
+    "short": "h", "int16": "h", "ushort": "H", "uint16": "H",
+    "int": "i", "int32": "i", "uint": "I", "uint32": "I",
+    "float": "f", "float32": "f", "double": "d", "float64": "d",
+}
+# Full intensity of integer color channels, floating point colors are already 0-1
+_COLOR_RANGES = {"b": 127.0, "B": 255.0, "h": 32767.0, "H": 65535.0, "i": 2147483647.0, "I": 4294967295.0}
+_COLOR_NAMES = (("red", "green", "blue"), ("r", "g", "b"), ("diffuse_red", "diffuse_green", "diffuse_blue"))
+
+class PointCloudReadError(Exception):
+    """Raised when a point cloud file cannot be decoded."""
+
+class PointCloud:
+    """
+    Decoded point cloud in compact typed arrays, already converted into Cinema 4D space.
+
+    Attributes:
+    - points: array('f') with x, y, z per point.
+    - colors: array('f') with r, g, b from 0 to 1 per point, empty without colors.
+    - source_point_count: Number of points in the file, before downsampling.
+    """
+
+    def __init__(self, points=None, colors=None, source_point_count=None):
+        self.points = points if points is not None else array('f')
+        self.colors = colors if colors is not None else array('f')
+        self.source_point_count = self.point_count if source_point_count is None else source_point_count
+
+    @property
+    def point_count(self):
+        return len(self.points) // 3
+
+    @property
+    def nbytes(self):
+        return (len(self.points) + len(self.colors)) * 4
+
+class _PlyElement:
+    def __init__(self, name, count):
+        self.name = name
+        self.count = count
+        # (name, struct type) of scalar properties, (name, count type, item type) of lists
+        self.properties = []
+
+    @property
+    def has_lists(self):
+        return any(len(prop) == 3 for prop in self.properties)
+
+    def record_format(self):
+        return "".join(prop[1] for prop in self.properties)
+
+def _read_ply_header(mapped):
+    """Returns (format, elements, offset of the data) of a PLY file."""
+    end = mapped.find(b"end_header")
+    if not mapped[:3] == b"ply" or end < 0:
+        raise PointCloudReadError("Not a PLY file.")
+    data_offset = mapped.find(b"\n", end) + 1
+    file_format = None
+    elements = []
+    for line in mapped[:end].decode("ascii", "replace").splitlines()[1:]:
+        parts = line.split()
+        if not parts or parts[0] in ("comment", "obj_info"):
+            continue
+        if parts[0] == "format" and len(parts) > 1:
+            file_format = parts[1]
+        elif parts[0] == "element" and len(parts) == 3:
+            elements.append(_PlyElement(parts[1], int(parts[2])))
+        elif parts[0] == "property" and elements:
+            if parts[1] == "list" and len(parts) == 5:
+                elements[-1].properties.append((parts[4], _PLY_TYPES[parts[2]], _PLY_TYPES[parts[3]]))
+            elif len(parts) == 3:
+                elements[-1].properties.append((parts[2], _PLY_TYPES[parts[1]]))
+            else:
+                raise PointCloudReadError("Unsupported property line '{}'.".format(line))
+    if file_format not in ("ascii", "binary_little_endian", "binary_big_endian"):
+        raise PointCloudReadError("Unsupported PLY format '{}'.".format(file_format))
+    return file_format, elements, data_offset
+
+def _vertex_columns(element):
+    """Returns the property indices of x, y, z and of the colors (None without) and the color range."""
+    names = [prop[0] for prop in element.properties]
+    try:
+        position = [names.index(axis) for axis in ("x", "y", "z")]
+    except ValueError:
+        raise PointCloudReadError("The vertices have no x, y and z.")
+    for channels in _COLOR_NAMES:
+        if all(channel in names for channel in channels):
+            color = [names.index(channel) for channel in channels]
+            return position, color, _COLOR_RANGES.get(element.properties[color[0]][1], 1.0)
+    return position, None, 1.0
+
+class _PointWriter:
+    """Converts decoded columns into Cinema 4D space and appends them to a PointCloud."""
+
+    def __init__(self, scale, has_colors, color_range):
+        self.cloud = PointCloud()
+        self.scale = scale
+        self.has_colors = has_colors
+        self.color_range = color_range
+
+    def add(self, values, stride, position, color=None):
+        """Appends the points of a flat sequence holding `stride` values per point."""
+        points = array('f', bytes(4 * 3 * (len(values) // stride)))
+        for axis, column in enumerate(position):
+            coordinates = values[column::stride]
+            if self.scale != 1.0:
+                coordinates = [value * self.scale for value in coordinates]
+            # PLY and OBJ are right-handed, Cinema 4D left-handed
+            if axis == 2:
+                coordinates = [-value for value in coordinates]
+            points[axis::3] = array('f', coordinates)
+        self.cloud.points.extend(points)
+
+        if self.has_colors:
+            colors = array('f', bytes(len(points) * 4))
+            for channel, column in enumerate(color):
+                channel_values = values[column::stride]
+                if self.color_range != 1.0:
+                    channel_values = [value / self.color_range for value in channel_values]
+                colors[channel::3] = array('f', channel_values)
+            self.cloud.colors.extend(colors)
+
+def _read_ply_binary(mapped, file_format, elements, offset, writer, vertex, position, color):
+    byte_order = "<" if file_format == "binary_little_endian" else ">"
+    for element in elements:
+        if element is vertex:
+            break
+        if element.has_lists:
+            raise PointCloudReadError("Elements with lists before the vertices are not supported.")
+        offset += element.count * struct.calcsize(byte_order + element.record_format())
+
+    record = vertex.record_format()
+    stride = len(vertex.properties)
+    record_size = struct.calcsize(byte_order + record)
+    if offset + vertex.count * record_size > len(mapped):
+        raise PointCloudReadError("The file ends before its {} vertices.".format(vertex.count))
+    chunk_format = struct.Struct(byte_order + record * CHUNK_POINTS)
+    for start in range(0, vertex.count, CHUNK_POINTS):
+        count = min(CHUNK_POINTS, vertex.count - start)
+        unpack = chunk_format if count == CHUNK_POINTS else struct.Struct(byte_order + record * count)
+        writer.add(unpack.unpack_from(mapped, offset + start * record_size), stride, position, color)
+
+def _read_ply_ascii(mapped, elements, offset, writer, vertex, position, color):
+    lines = iter(mapped[offset:].splitlines())
+    for element in elements:
+        if element is vertex:
+            break
+        for _ in range(element.count):
+            next(lines, None)
+
+    stride = len(vertex.properties)
+    remaining = vertex.count
+    while remaining > 0:
+        block = [line for _, line in zip(range(min(CHUNK_POINTS, remaining)), lines)]
+        if not block:
+            raise PointCloudReadError("The file ends before its {} vertices.".format(vertex.count))
+        tokens = b" ".join(block).split()
+        if len(tokens) != stride * len(block):
+            raise PointCloudReadError("Vertex lines don't hold {} values each.".format(stride))
+        writer.add(list(map(float, tokens)), stride, position, color)
+        remaining -= len(block)
+
+def read_ply(file_path, scale=1.0):
+    """
+    Reads the vertices, and their colors if any, of an ASCII or binary PLY file into a PointCloud.
+
+    Faces and other elements are ignored. Binary vertices are unpacked by struct in blocks of CHUNK_POINTS.
+
+    Parameters:
+    - file_path: The path to the PLY file.
+    - scale: Factor converting file units into document units.
+
+    Raises:
+    - PointCloudReadError if the file cannot be read or decoded.
+    """
+    try:
+        with open(file_path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                raise PointCloudReadError("'{}' is empty.".format(file_path))
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                file_format, elements, offset = _read_ply_header(mapped)
+                vertex = next((element for element in elements if element.name == "vertex"), None)
+                if vertex is None:
+                    raise PointCloudReadError("'{}' has no vertices.".format(file_path))
+                if vertex.has_lists:
+                    raise PointCloudReadError("Vertices with list properties are not supported.")
+                position, color, color_range = _vertex_columns(vertex)
+                writer = _PointWriter(scale, color is not None, color_range)
+                if file_format == "ascii":
+                    _read_ply_ascii(mapped, elements, offset, writer, vertex, position, color)
+                else:
+                    _read_ply_binary(mapped, file_format, elements, offset, writer, vertex, position, color)
+    except PointCloudReadError:
+        raise
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        raise PointCloudReadError("Failed to read '{}': {}".format(file_path, e)) from e
+    writer.cloud.source_point_count = writer.cloud.point_count
+    return writer.cloud
+
+def read_obj_points(file_path, scale=1.0):
+    """
+    Reads the vertices of an OBJ file into a PointCloud, ignoring faces.
+
+    Vertex colors written as 'v x y z r g b' are kept when every vertex has them.
+
+    Raises:
+    - PointCloudReadError if the file cannot be read or decoded.
+    """
+    writer = _PointWriter(scale, True, 1.0)
+    colors_complete = True
+    try:
+        for chunk in iter_chunks(file_path):
+            lines = [line[2:] for line in chunk.splitlines() if line[:2] == b"v "]
+            if not lines:
+                continue
+            rows = [line.split() for line in lines]
+            # A chunk is read in bulk only when every line has a color, a token count alone can't tell where a
+            # line missing its color is made up for by one with extra values
+            if all(len(row) == 6 for row in rows):
+                writer.add(list(map(float, chain.from_iterable(rows))), 6, (0, 1, 2), (3, 4, 5))
+                continue
+            # Lines without colors or with extra values
+            colors_complete = False
+            writer.has_colors = False
+            values = []
+            for row in rows:
+                numbers = row[:3]
+                numbers += [b"0"] * (3 - len(numbers))
+                values.extend(map(float, numbers))
+            writer.add(values, 3, (0, 1, 2))
+    except (OSError, ValueError) as e:
+        raise PointCloudReadError("Failed to read '{}': {}".format(file_path, e)) from e
+    cloud = writer.cloud
+    if not colors_complete:
+        cloud.colors = array('f')
+    cloud.source_point_count = cloud.point_count
+    return cloud
+
+def read_point_cloud(file_path, scale=1.0):
+    """Reads a PLY file or the vertices of an OBJ file into a PointCloud, see read_ply() and read_obj_points()."""
+    if file_path.lower().endswith(".ply"):
+        return read_ply(file_path, scale)
+    if file_path.lower().endswith(".obj"):
+        return read_obj_points(file_path, scale)
+    raise PointCloudReadError("'{}' is neither a PLY nor an OBJ file.".format(os.path.basename(file_path)))
+
+def _gather(values, indices):
+    if len(indices) == 1:
+        return array('f', [values[indices[0]]])
+    return array('f', itemgetter(*indices)(values))
+
+def voxel_downsample(cloud, voxel_size):
+    """
+    Keeps one point per occupied cell of a voxel grid.
+
+    The cell of every point is computed with map() over whole columns and the points are deduplicated by a dict
+    of cell -> point index, so the grid is built in one pass without a Python loop per point. The last point
+    read in each cell is kept with its original color, the points keep the order of the file.
+
+    Parameters:
+    - cloud: The PointCloud.
+    - voxel_size: Edge length of the cells in document units, None or 0 keeps every point.
+
+    Returns:
+    - A new PointCloud, or cloud itself when nothing is downsampled. Its source_point_count is the count of cloud.
+    """
+    if not voxel_size or voxel_size <= 0.0 or cloud.point_count < 2:
+        return cloud
+    inverse = 1.0 / voxel_size
+    points = cloud.points
+    cells = zip(*(map(math.floor, map(inverse.__mul__, points[axis::3])) for axis in range(3)))
+    indices = sorted(dict(zip(cells, range(cloud.point_count))).values())
+    if len(indices) == cloud.point_count:
+        return cloud
+
+    result = PointCloud(array('f', bytes(len(indices) * 3 * 4)), source_point_count=cloud.source_point_count)
+    for axis in range(3):
+        result.points[axis::3] = _gather(points[axis::3], indices)
+    if cloud.colors:
+        result.colors = array('f', bytes(len(indices) * 3 * 4))
+        for channel in range(3):
+            result.colors[channel::3] = _gather(cloud.colors[channel::3], indices)
+    return result
@@ -22,6 +22,7 @@ def set_project_settings_from_video(doc, video_path):
     start_frame = c4d.BaseTime(1, fps_int)
     end_frame = c4d.BaseTime(frame_count, fps_int) 
 
+    doc.AddUndo(c4d.UNDOTYPE_CHANGE_SMALL, doc)
     doc.SetFps(fps_int)
     doc.SetLoopMinTime(start_frame)
     doc.SetLoopMaxTime(end_frame)
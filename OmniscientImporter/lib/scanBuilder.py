@@ -0,0 +1,601 @@
+import c4d
+import logging
+import os
+from array import array
+from importRunner import ImportProgress, run_steps, within
+from objReader import read_mtl
+from shotRecord import mark_node, read_marker
+
+logger = logging.getLogger(__name__)
+
+# Normal tags store each normal component as a 16 bit integer scaled by this factor
+NORMAL_TAG_SCALE = 32000.0
+# Points or polygons written between the import steps building a scan
+ELEMENTS_PER_STEP = 10000
+
+PROXY_ROLE = "proxy"
+POINTS_DISPLAY_ROLE = "points display"
+TILE_ROLE = "tile"
+LOD_ROLE = "lod"
+
+# Container ID of the bounds in the data of scan tiles
+TILE_DATA_ID = 1063028
+TILE_RADIUS = 1
+
+def build_polygon_object(mesh, name):
+    """
+    Builds a polygon object, including UVW and normal tags, from a decoded ScanMesh.
+
+    Parameters:
+    - mesh: The decoded ScanMesh.
+    - name: Name of the new object.
+
+    Returns:
+    - The new PolygonObject, not yet inserted into a document.
+    """
+    return run_steps(iter_build_polygon_object(mesh, name))
+
+def iter_build_polygon_object(mesh, name):
+    """Import step building a polygon object from a ScanMesh, see build_polygon_object()."""
+    point_count = mesh.point_count
+    obj = c4d.PolygonObject(point_count, mesh.polygon_count)
+    if obj is None:
+        raise MemoryError("Failed to create a polygon object with {} points.".format(point_count))
+    obj.SetName(name)
+    yield from iter_fill_polygon_object(obj, mesh)
+
+    phong_tag = obj.MakeTag(c4d.Tphong)
+    if phong_tag is not None:
+        phong_tag[c4d.PHONGTAG_PHONG_ANGLELIMIT] = True
+
+    obj.Message(c4d.MSG_UPDATE)
+    return obj
+
+def fill_polygon_object(obj, mesh):
+    """Writes the points, polygons, UVWs and normals of a ScanMesh into a polygon object of matching size."""
+    run_steps(iter_fill_polygon_object(obj, mesh))
+
+def iter_fill_polygon_object(obj, mesh):
+    """
+    Import step filling a polygon object, see fill_polygon_object(). Yields every ELEMENTS_PER_STEP points, and
+    every ELEMENTS_PER_STEP polygons once for their polygons and once for each of their UVWs and normals.
+    """
+    point_count = mesh.point_count
+    polygon_count = mesh.polygon_count
+    passes = 1.0 + bool(mesh.polygon_uvs) + bool(mesh.polygon_normals)
+    # Points count half a pass, a scan has about half as many points as triangles
+    point_share = 0.5 / (passes + 0.5)
+    polygon_share = 1.0 - point_share
+
+    points = mesh.points
+    Vector = c4d.Vector
+    point_list = []
+    for start, stop in _element_steps(point_count):
+        point_list.extend([Vector(points[i], points[i + 1], points[i + 2]) for i in range(start * 3, stop * 3, 3)])
+        yield ImportProgress("Point {} of {}".format(stop, point_count), point_share * stop / point_count)
+    obj.SetAllPoints(point_list)
+    del point_list
+
+    polygons = mesh.polygons
+    CPolygon = c4d.CPolygon
+    set_polygon = obj.SetPolygon
+    for start, stop in _element_steps(polygon_count):
+        for index in range(start, stop):
+            base = index * 4
+            set_polygon(index, CPolygon(polygons[base], polygons[base + 1], polygons[base + 2], polygons[base + 3]))
+        yield ImportProgress("Polygon {} of {}".format(stop, polygon_count),
+                             point_share + polygon_share * stop / polygon_count / passes)
+
+    done = 1
+    if mesh.polygon_uvs:
+        uvw_tag = c4d.UVWTag(polygon_count)
+        for start, stop in _element_steps(polygon_count):
+            write_uvw_block(uvw_tag, mesh.uvs, mesh.polygon_uvs[start * 4:stop * 4], start)
+            yield ImportProgress("UVWs of polygon {} of {}".format(stop, polygon_count),
+                                 point_share + polygon_share * (done + stop / polygon_count) / passes)
+        obj.InsertTag(uvw_tag)
+        done += 1
+    if mesh.polygon_normals:
+        normal_tag = c4d.NormalTag(polygon_count)
+        for start, stop in _element_steps(polygon_count):
+            write_normal_block(normal_tag, mesh.normals, mesh.polygon_normals[start * 4:stop * 4], start)
+            yield ImportProgress("Normals of polygon {} of {}".format(stop, polygon_count),
+                                 point_share + polygon_share * (done + stop / polygon_count) / passes)
+        obj.InsertTag(normal_tag)
+
+def _element_steps(count):
+    """Yields the start and stop index of every ELEMENTS_PER_STEP of count points or polygons."""
+    for start in range(0, count, ELEMENTS_PER_STEP):
+        yield start, min(start + ELEMENTS_PER_STEP, count)
+
+def _write_tag_data(tag, values, polygon_offset=0):
+    """Writes packed records, one per polygon, straight into a variable tag's memory from polygon_offset on."""
+    data = tag.GetLowlevelDataAddressW()
+    if data is None:
+        raise MemoryError("Failed to access the data of {}.".format(tag.GetName()))
+    packed = memoryview(values).cast("B")
+    start = polygon_offset * tag.GetDataSize()
+    data[start:start + len(packed)] = packed
+
+def write_uvw_block(tag, uvs, polygon_uvs, polygon_offset=0):
+    """Writes the texture coordinates of consecutive polygons into a UVW tag, from polygon_offset on."""
+    # Each polygon holds four UVW vectors, in single or double precision depending on the version
+    values = array("f" if tag.GetDataSize() == 4 * 3 * 4 else "d", bytes(len(polygon_uvs) * tag.GetDataSize() // 4))
+    values[0::3] = array(values.typecode, [uvs[index * 2] for index in polygon_uvs])
+    values[1::3] = array(values.typecode, [uvs[index * 2 + 1] for index in polygon_uvs])
+    _write_tag_data(tag, values, polygon_offset)
+
+def write_normal_block(tag, normals, polygon_normals, polygon_offset=0):
+    """
+    Writes the normals of consecutive polygons into a normal tag, from polygon_offset on. The normals are of unit
+    length, see objReader.ScanMesh, so their scaled components fit the tag's 16-bit integers.
+    """
+    values = array('h', bytes(len(polygon_normals) * 3 * 2))
+    for axis in range(3):
+        values[axis::3] = array('h', [int(normals[index * 3 + axis] * NORMAL_TAG_SCALE) for index in polygon_normals])
+    _write_tag_data(tag, values, polygon_offset)
+
+def build_uvw_tag(mesh):
+    """Builds a UVW tag holding the texture coordinates of every polygon corner."""
+    tag = c4d.UVWTag(mesh.polygon_count)
+    write_uvw_block(tag, mesh.uvs, mesh.polygon_uvs)
+    return tag
+
+def build_normal_tag(mesh):
+    """Builds a normal tag holding the normal of every polygon corner."""
+    tag = c4d.NormalTag(mesh.polygon_count)
+    write_normal_block(tag, mesh.normals, mesh.polygon_normals)
+    return tag
+
+def build_scan_material(doc, mesh, obj_path):
+    """
+    Creates the material of the scan from its .mtl file and returns it, or None if the scan has none.
+
+    Only the first used material is created, scans exported by Omniscient use a single one.
+    """
+    if not mesh.materials or not mesh.material_libraries:
+        return None
+    if len(mesh.materials) > 1:
+        logger.warning("Scan uses {} materials, only '{}' is imported.".format(len(mesh.materials), mesh.materials[0]))
+
+    directory = os.path.dirname(obj_path)
+    definition = None
+    for library in mesh.material_libraries:
+        library_path = os.path.join(directory, library)
+        if os.path.isfile(library_path):
+            definition = read_mtl(library_path).get(mesh.materials[0])
+            if definition is not None:
+                break
+    if definition is None:
+        return None
+
+    mat = c4d.BaseMaterial(c4d.Mmaterial)
+    mat.SetName(mesh.materials[0])
+    if definition["texture"]:
+        shader = c4d.BaseShader(c4d.Xbitmap)
+        shader[c4d.BITMAPSHADER_FILENAME] = definition["texture"]
+        mat.InsertShader(shader)
+        mat[c4d.MATERIAL_COLOR_SHADER] = shader
+    elif definition["color"]:
+        mat[c4d.MATERIAL_COLOR_COLOR] = c4d.Vector(*definition["color"])
+    doc.InsertMaterial(mat)
+    return mat
+
+def _add_texture_tag(obj, material):
+    texture_tag = obj.MakeTag(c4d.Ttexture)
+    texture_tag.SetMaterial(material)
+    texture_tag[c4d.TEXTURETAG_PROJECTION] = c4d.TEXTURETAG_PROJECTION_UVW
+
+def import_scan_object(doc, mesh, name, obj_path, proxy_mesh=None, session=None):
+    """
+    Inserts a decoded scan into the document together with its material.
+
+    With a proxy_mesh, the full-resolution object is only visible in renders and the proxy, inserted as its
+    child, only in the editor. The created object and material are recorded in the optional ImportSession.
+
+    Returns:
+    - The inserted polygon object.
+    """
+    return run_steps(iter_import_scan_object(doc, mesh, name, obj_path, proxy_mesh=proxy_mesh, session=session))
+
+def iter_import_scan_object(doc, mesh, name, obj_path, proxy_mesh=None, session=None):
+    """Import step inserting a scan, see import_scan_object(). The scan is built before the document is changed."""
+    end = 0.9 if proxy_mesh is not None else 1.0
+    obj = yield from within(iter_build_polygon_object(mesh, name), end=end)
+    proxy = None
+    if proxy_mesh is not None:
+        proxy = yield from within(iter_build_proxy_object(obj, proxy_mesh, name), start=end)
+
+    doc.StartUndo()
+    material = build_scan_material(doc, mesh, obj_path)
+    if material is not None:
+        doc.AddUndo(c4d.UNDOTYPE_NEW, material)
+        for target in (obj, proxy):
+            if target is not None:
+                _add_texture_tag(target, material)
+
+    doc.InsertObject(obj)
+    doc.AddUndo(c4d.UNDOTYPE_NEW, obj)
+    doc.EndUndo()
+    if session is not None:
+        session.record_material(material, asset=obj_path)
+        session.record_object(obj, "scan", asset=obj_path)
+    return obj
+
+def build_proxy_object(obj, proxy_mesh, name):
+    """Builds the viewport proxy of a scan under it, the scan itself is then only visible in renders."""
+    return run_steps(iter_build_proxy_object(obj, proxy_mesh, name))
+
+def iter_build_proxy_object(obj, proxy_mesh, name):
+    """Import step building the viewport proxy of a scan, see build_proxy_object()."""
+    proxy = yield from iter_build_polygon_object(proxy_mesh, "{}_Proxy".format(name))
+    mark_node(proxy, role=PROXY_ROLE)
+    obj[c4d.ID_BASEOBJECT_VISIBILITY_EDITOR] = c4d.OBJECT_OFF
+    # Explicitly on, so the proxy stays visible under its hidden parent
+    proxy[c4d.ID_BASEOBJECT_VISIBILITY_EDITOR] = c4d.OBJECT_ON
+    proxy[c4d.ID_BASEOBJECT_VISIBILITY_RENDER] = c4d.OBJECT_OFF
+    proxy.InsertUnder(obj)
+    return proxy
+
+def find_proxy_object(obj):
+    """Returns the viewport proxy built under a scan, or None."""
+    child = obj.GetDown()
+    while child is not None:
+        marker = read_marker(child)
+        if marker is not None and marker[2] == PROXY_ROLE:
+            return child
+        child = child.GetNext()
+    return None
+
+def _remove_proxy_object(doc, obj):
+    old_proxy = find_proxy_object(obj)
+    if old_proxy is not None:
+        doc.AddUndo(c4d.UNDOTYPE_DELETE, old_proxy)
+        old_proxy.Remove()
+        obj[c4d.ID_BASEOBJECT_VISIBILITY_EDITOR] = c4d.OBJECT_UNDEF
+
+def _remove_tags(obj, tag_types):
+    for tag_type in tag_types:
+        tag = obj.GetTag(tag_type)
+        while tag is not None:
+            tag.Remove()
+            tag = obj.GetTag(tag_type)
+
+def rebuild_scan_object(doc, obj, mesh, proxy_mesh=None):
+    """
+    Replaces the geometry of an imported scan in place, keeping the object, its material, its other tags and
+    every link to it.
+
+    The UVW and normal tags are rebuilt with the geometry. The viewport proxy is rebuilt, added or removed to
+    match proxy_mesh.
+    """
+    return run_steps(iter_rebuild_scan_object(doc, obj, mesh, proxy_mesh=proxy_mesh))
+
+def iter_rebuild_scan_object(doc, obj, mesh, proxy_mesh=None):
+    """
+    Import step replacing the geometry of an imported scan, see rebuild_scan_object(). The object's undo entry is
+    added before the first step, so undoing it restores the whole object.
+    """
+    end = 0.9 if proxy_mesh is not None else 1.0
+    doc.AddUndo(c4d.UNDOTYPE_CHANGE, obj)
+    if not obj.ResizeObject(mesh.point_count, mesh.polygon_count):
+        raise MemoryError("Failed to resize '{}' to {} points.".format(obj.GetName(), mesh.point_count))
+    _remove_tags(obj, (c4d.Tuvw, c4d.Tnormal))
+    yield from within(iter_fill_polygon_object(obj, mesh), end=end)
+    obj.Message(c4d.MSG_UPDATE)
+
+    _remove_proxy_object(doc, obj)
+    if proxy_mesh is not None:
+        proxy = yield from within(iter_build_proxy_object(obj, proxy_mesh, obj.GetName()), start=end)
+        texture_tag = obj.GetTag(c4d.Ttexture)
+        if texture_tag is not None:
+            _add_texture_tag(proxy, texture_tag.GetMaterial())
+        doc.AddUndo(c4d.UNDOTYPE_NEW, proxy)
+    return obj
+
+def stream_scan_object(doc, blocks, counts, name, obj_path, session=None, target=None, on_block=None):
+    """
+    Builds a scan from the blocks of a streamed OBJ file, writing each block into the object before the next one
+    is read, so the whole decoded mesh is never held in memory.
+
+    The object, its UVW and its normal tag are created at their final size from the counts of the file, then
+    filled block by block. Scans built this way get no viewport proxy. A target is only replaced once every block
+    has been written, so a failure leaves it untouched. Until then the document holds the target's geometry next
+    to the new object's, a reimport thus briefly needs memory for both scans on top of the streaming budget.
+
+    Parameters:
+    - doc: The document to insert the scan into.
+    - blocks: Iterable of ScanMesh holding consecutive points and polygons, see objReader.iter_obj_blocks().
+    - counts: The ObjCounts of the file.
+    - name: Name of the new object.
+    - obj_path: The path to the OBJ file, its material is looked up next to it.
+    - session: Optional ImportSession the object and material are recorded in.
+    - target: Optional polygon object of a previous import, which the new object replaces, taking over its
+      parameters, tags, children and every link to it, see swap_scan_object().
+    - on_block: Optional function called with every block once it has been written.
+
+    Returns:
+    - The inserted polygon object.
+
+    Raises:
+    - ValueError if the blocks hold more or fewer points or polygons than counted.
+    """
+    return run_steps(iter_stream_scan_object(doc, blocks, counts, name, obj_path, session=session, target=target,
+                                             on_block=on_block))
+
+def iter_stream_scan_object(doc, blocks, counts, name, obj_path, session=None, target=None, on_block=None):
+    """Import step building a streamed scan, see stream_scan_object(). Yields after every block."""
+    obj = c4d.PolygonObject(counts.points, counts.polygons)
+    if obj is None:
+        raise MemoryError("Failed to create a polygon object with {} points.".format(counts.points))
+    obj.SetName(name)
+
+    Vector = c4d.Vector
+    CPolygon = c4d.CPolygon
+    set_point = obj.SetPoint
+    set_polygon = obj.SetPolygon
+    uvw_tag = None
+    normal_tag = None
+    point_offset = 0
+    polygon_offset = 0
+    mesh = None
+    for mesh in blocks:
+        if point_offset + mesh.point_count > counts.points or polygon_offset + mesh.polygon_count > counts.polygons:
+            raise ValueError("'{}' holds more elements than counted, it may have changed.".format(obj_path))
+        points = mesh.points
+        for index, x, y, z in zip(range(point_offset, point_offset + mesh.point_count),
+                                  points[0::3], points[1::3], points[2::3]):
+            set_point(index, Vector(x, y, z))
+        polygons = mesh.polygons
+        for index, a, b, c, d in zip(range(polygon_offset, polygon_offset + mesh.polygon_count),
+                                     polygons[0::4], polygons[1::4], polygons[2::4], polygons[3::4]):
+            set_polygon(index, CPolygon(a, b, c, d))
+        if mesh.polygon_uvs:
+            if uvw_tag is None:
+                uvw_tag = c4d.UVWTag(counts.polygons)
+                obj.InsertTag(uvw_tag)
+            write_uvw_block(uvw_tag, mesh.uvs, mesh.polygon_uvs, polygon_offset)
+        if mesh.polygon_normals:
+            if normal_tag is None:
+                normal_tag = c4d.NormalTag(counts.polygons)
+                obj.InsertTag(normal_tag)
+            write_normal_block(normal_tag, mesh.normals, mesh.polygon_normals, polygon_offset)
+        point_offset += mesh.point_count
+        polygon_offset += mesh.polygon_count
+        if on_block is not None:
+            on_block(mesh)
+        yield ImportProgress("Polygon {} of {}".format(polygon_offset, counts.polygons),
+                             float(polygon_offset) / max(counts.polygons, 1))
+    if point_offset != counts.points or polygon_offset != counts.polygons:
+        raise ValueError("'{}' holds {} points and {} polygons, {} and {} were counted.".format(
+            obj_path, point_offset, polygon_offset, counts.points, counts.polygons))
+    obj.Message(c4d.MSG_UPDATE)
+
+    if target is not None:
+        swap_scan_object(doc, target, obj)
+    else:
+        phong_tag = obj.MakeTag(c4d.Tphong)
+        if phong_tag is not None:
+            phong_tag[c4d.PHONGTAG_PHONG_ANGLELIMIT] = True
+        doc.StartUndo()
+        material = build_scan_material(doc, mesh, obj_path) if mesh is not None else None
+        if material is not None:
+            doc.AddUndo(c4d.UNDOTYPE_NEW, material)
+            _add_texture_tag(obj, material)
+        doc.InsertObject(obj)
+        doc.AddUndo(c4d.UNDOTYPE_NEW, obj)
+        doc.EndUndo()
+        if session is not None:
+            session.record_material(material, asset=obj_path)
+    if session is not None:
+        session.record_object(obj, "scan", asset=obj_path)
+    return obj
+
+def swap_scan_object(doc, target, obj):
+    """
+    Puts a scan built from scratch in the place of the imported scan it replaces, within an undo group.
+
+    The new object takes over the target's parameters and markers, its tags other than UVW and normals, its
+    children other than the viewport proxy, and every link to it. The target is deleted.
+    """
+    doc.StartUndo()
+    doc.AddUndo(c4d.UNDOTYPE_CHANGE, target)
+    obj.SetData(target.GetData())
+    proxy = find_proxy_object(target)
+    if proxy is not None:
+        obj[c4d.ID_BASEOBJECT_VISIBILITY_EDITOR] = c4d.OBJECT_UNDEF
+    # Inserted in reverse in front of the new UVW and normal tags, keeping their order
+    for tag in reversed(target.GetTags()):
+        if tag.GetType() not in (c4d.Tuvw, c4d.Tnormal):
+            tag.Remove()
+            obj.InsertTag(tag)
+    for child in target.GetChildren():
+        if child is not proxy:
+            doc.AddUndo(c4d.UNDOTYPE_HIERARCHY_PSR, child)
+            child.Remove()
+            child.InsertUnderLast(obj)
+    doc.InsertObject(obj, parent=target.GetUp(), pred=target)
+    doc.AddUndo(c4d.UNDOTYPE_NEW, obj)
+    obj.SetMg(target.GetMg())
+    target.TransferGoal(obj, True)
+    doc.AddUndo(c4d.UNDOTYPE_DELETE, target)
+    target.Remove()
+    doc.EndUndo()
+
+def build_tile_object(tile, name, material=None):
+    """
+    Builds the object of one ScanTile: its full-detail mesh, placed at the tile's center with its bounding radius
+    stored in its data, and one editor-only child per LOD level. Only the full-detail mesh renders.
+    """
+    obj = build_polygon_object(tile.mesh, name)
+    obj.SetMg(c4d.Matrix(c4d.Vector(*tile.center)))
+    mark_node(obj, role=TILE_ROLE)
+    bounds = c4d.BaseContainer()
+    bounds.SetFloat(TILE_RADIUS, tile.radius)
+    obj.GetDataInstance().SetContainer(TILE_DATA_ID, bounds)
+    if material is not None:
+        _add_texture_tag(obj, material)
+
+    for level, mesh in enumerate(tile.levels[1:], 1):
+        lod = build_polygon_object(mesh, "{}_LOD{}".format(name, level))
+        mark_node(lod, role=LOD_ROLE)
+        lod[c4d.ID_BASEOBJECT_VISIBILITY_EDITOR] = c4d.OBJECT_OFF
+        lod[c4d.ID_BASEOBJECT_VISIBILITY_RENDER] = c4d.OBJECT_OFF
+        if material is not None:
+            _add_texture_tag(lod, material)
+        lod.InsertUnderLast(obj)
+    return obj
+
+def import_tiled_scan_object(doc, mesh, tiles, name, obj_path, session=None):
+    """
+    Inserts a scan split into ScanTiles as a null holding one object per tile, together with the scan's material.
+
+    Every tile shows its full detail until show_tile_level() picks another level. The null and the material are
+    recorded in the optional ImportSession.
+
+    Returns:
+    - The inserted null.
+    """
+    return run_steps(iter_import_tiled_scan_object(doc, mesh, tiles, name, obj_path, session=session))
+
+def iter_import_tiled_scan_object(doc, mesh, tiles, name, obj_path, session=None):
+    """
+    Import step inserting a tiled scan, see import_tiled_scan_object(). Yields after every tile, which are built
+    before the document is changed and get the material's texture tags once it has been created.
+    """
+    null = c4d.BaseObject(c4d.Onull)
+    null.SetName(name)
+    for number, tile in enumerate(tiles, 1):
+        build_tile_object(tile, "{}_Tile_{}".format(name, tile.index)).InsertUnderLast(null)
+        yield ImportProgress("Tile {} of {}".format(number, len(tiles)), float(number) / len(tiles))
+
+    doc.StartUndo()
+    material = build_scan_material(doc, mesh, obj_path)
+    if material is not None:
+        doc.AddUndo(c4d.UNDOTYPE_NEW, material)
+        for tile_object in null.GetChildren():
+            for obj in [tile_object] + tile_object.GetChildren():
+                _add_texture_tag(obj, material)
+    doc.InsertObject(null)
+    doc.AddUndo(c4d.UNDOTYPE_NEW, null)
+    doc.EndUndo()
+    if session is not None:
+        session.record_material(material, asset=obj_path)
+        session.record_object(null, "scan", asset=obj_path)
+    return null
+
+def _children_with_role(obj, role):
+    children = []
+    child = obj.GetDown()
+    while child is not None:
+        marker = read_marker(child)
+        if marker is not None and marker[2] == role:
+            children.append(child)
+        child = child.GetNext()
+    return children
+
+def find_scan_tiles(obj):
+    """Returns the tile objects of a tiled scan, empty for other objects."""
+    return _children_with_role(obj, TILE_ROLE)
+
+def tile_radius(tile):
+    bounds = tile.GetDataInstance().GetContainerInstance(TILE_DATA_ID)
+    return bounds.GetFloat(TILE_RADIUS) if bounds is not None else 0.0
+
+def tile_level_count(tile):
+    return 1 + len(_children_with_role(tile, LOD_ROLE))
+
+def show_tile_level(tile, level):
+    """Makes the editor show a tile at an LOD level, 0 being full detail. Renders keep the full detail."""
+    lods = _children_with_role(tile, LOD_ROLE)
+    level = min(level, len(lods))
+    tile[c4d.ID_BASEOBJECT_VISIBILITY_EDITOR] = c4d.OBJECT_UNDEF if level == 0 else c4d.OBJECT_OFF
+    for index, lod in enumerate(lods, 1):
+        # Explicitly on, so the level stays visible under its hidden tile
+        lod[c4d.ID_BASEOBJECT_VISIBILITY_EDITOR] = c4d.OBJECT_ON if index == level else c4d.OBJECT_OFF
+
+def build_vertex_color_tag(cloud):
+    """Builds a per-point vertex color tag holding the colors of a PointCloud."""
+    point_count = cloud.point_count
+    tag = c4d.VertexColorTag(point_count)
+    tag.SetPerPointMode(True)
+    # One RGBA color of single precision floats per point
+    values = array('f', bytes(point_count * 4 * 4))
+    for channel in range(3):
+        values[channel::4] = cloud.colors[channel::3]
+    values[3::4] = array('f', [1.0]) * point_count
+    data = tag.GetLowlevelDataAddressW()
+    if data is None:
+        raise MemoryError("Failed to access the data of {}.".format(tag.GetName()))
+    packed = values.tobytes()
+    data[:len(packed)] = packed
+    return tag
+
+def fill_point_object(obj, cloud):
+    """Writes the points and colors of a PointCloud into a polygon object without polygons of matching size."""
+    points = cloud.points
+    Vector = c4d.Vector
+    obj.SetAllPoints([Vector(points[i], points[i + 1], points[i + 2]) for i in range(0, len(points), 3)])
+    tag = obj.GetTag(c4d.Tvertexcolor)
+    while tag is not None:
+        tag.Remove()
+        tag = obj.GetTag(c4d.Tvertexcolor)
+    if cloud.colors:
+        obj.InsertTag(build_vertex_color_tag(cloud))
+
+def build_point_object(cloud, name):
+    """
+    Builds a polygon object holding only the points of a PointCloud, with their colors in a vertex color tag.
+
+    Returns:
+    - The new PolygonObject, not yet inserted into a document.
+    """
+    obj = c4d.PolygonObject(cloud.point_count, 0)
+    if obj is None:
+        raise MemoryError("Failed to create a point object with {} points.".format(cloud.point_count))
+    obj.SetName(name)
+    fill_point_object(obj, cloud)
+    obj.Message(c4d.MSG_UPDATE)
+    return obj
+
+def build_points_display(obj, name):
+    """
+    Builds a Matrix object under a point object with a matrix at each of its points, which shows the points in
+    the viewport and can drive clones.
+    """
+    display = c4d.BaseObject(c4d.Omgmatrix)
+    display.SetName("{}_Display".format(name))
+    display[c4d.ID_MG_MOTIONGENERATOR_MODE] = c4d.ID_MG_MOTIONGENERATOR_MODE_OBJECT
+    display[c4d.MG_OBJECT_LINK] = obj
+    display[c4d.MG_POLY_MODE_] = c4d.MG_POLY_MODE_VERTEX
+    mark_node(display, role=POINTS_DISPLAY_ROLE)
+    display.InsertUnder(obj)
+    return display
+
+def import_point_cloud_object(doc, cloud, name, path, session=None):
+    """
+    Inserts a decoded point cloud into the document as a point object with a Matrix object displaying it.
+
+    The created object is recorded in the optional ImportSession.
+
+    Returns:
+    - The inserted point object.
+    """
+    obj = build_point_object(cloud, name)
+    build_points_display(obj, name)
+    doc.StartUndo()
+    doc.InsertObject(obj)
+    doc.AddUndo(c4d.UNDOTYPE_NEW, obj)
+    doc.EndUndo()
+    if session is not None:
+        session.record_object(obj, "points", asset=path)
+    return obj
+
+def rebuild_point_cloud_object(doc, obj, cloud):
+    """Replaces the points and colors of an imported point cloud in place, keeping the object and its display."""
+    doc.AddUndo(c4d.UNDOTYPE_CHANGE, obj)
+    if not obj.ResizeObject(cloud.point_count, 0):
+        raise MemoryError("Failed to resize '{}' to {} points.".format(obj.GetName(), cloud.point_count))
+    fill_point_object(obj, cloud)
+    obj.Message(c4d.MSG_UPDATE)
+    return obj
@@ -0,0 +1,302 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from importTrace import count
+from objReader import ScanMesh
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the entry layout or the decoded geometry changes, older entries are then ignored
+CACHE_VERSION = 2
+CACHE_MAGIC = b"OMNISCAN"
+ENTRY_SUFFIX = ".scan"
+HASH_INDEX_NAME = "hashes.json"
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024
+
+_HASH_BLOCK_SIZE = 4 * 1024 * 1024
+_ALIGNMENT = 8
+_ARRAY_FIELDS = ("points", "polygons", "uvs", "polygon_uvs", "normals", "polygon_normals")
+# magic, version, byte order, metadata length, then (typecode, item count) per array
+_HEADER = struct.Struct("<8sIBI" + "cQ" * len(_ARRAY_FIELDS))
+
+def default_cache_directory():
+    """Returns the per-user cache directory of the plugin."""
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "Omniscient", "Cache", "scans")
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~"), "Library", "Caches", "Omniscient", "scans")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "omniscient", "scans")
+
+def hash_file(path):
+    """Returns the BLAKE2b digest of a file's content."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Hashes of this session by absolute path, with the size and mtime they were taken at
+_session_hashes = {}
+_session_lock = threading.Lock()
+
+def session_hash(path, stat=None):
+    """
+    Returns hash_file() of a file, hashing it only once per session while its size and mtime are unchanged.
+
+    stat optionally holds the file's os.stat result when the caller already has it.
+    """
+    if stat is None:
+        stat = os.stat(path)
+    key = os.path.abspath(path)
+    with _session_lock:
+        known = _session_hashes.get(key)
+    if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+        return known[2]
+    content_hash = hash_file(path)
+    count("bytes hashed", stat.st_size)
+    remember_session_hash(key, stat, content_hash)
+    return content_hash
+
+def remember_session_hash(path, stat, content_hash):
+    """Records a hash taken elsewhere for session_hash()."""
+    with _session_lock:
+        _session_hashes[os.path.abspath(path)] = (stat.st_size, stat.st_mtime_ns, content_hash)
+
+def settings_digest(settings):
+    """Returns a short digest of the import settings a scan was decoded with."""
+    encoded = json.dumps(dict(settings, cache_version=CACHE_VERSION), sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+def _temporary_path(path):
+    """Unique sibling path to write to before an atomic rename, per process and thread."""
+    return "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+
+def _align(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+def write_entry(path, mesh):
+    """
+    Writes a decoded mesh as a cache entry, atomically.
+
+    Layout: a fixed header, JSON metadata (materials), then each array's raw bytes aligned to 8 bytes so they
+    can be memory-mapped and used in place.
+    """
+    metadata = json.dumps({"materials": mesh.materials, "material_libraries": mesh.material_libraries}).encode("utf-8")
+    arrays = [getattr(mesh, field) for field in _ARRAY_FIELDS]
+    header_values = [CACHE_MAGIC, CACHE_VERSION, 1 if sys.byteorder == "little" else 0, len(metadata)]
+    for values in arrays:
+        header_values += [memoryview(values).format.encode("ascii"), len(values)]
+
+    temporary_path = _temporary_path(path)
+    with open(temporary_path, "wb") as file:
+        file.write(_HEADER.pack(*header_values))
+        file.write(metadata)
+        for values in arrays:
+            file.write(b"\0" * (_align(file.tell()) - file.tell()))
+            file.write(memoryview(values).cast("B"))
+    os.replace(temporary_path, path)
+
+def read_entry(path):
+    """Memory-maps a cache entry and returns a ScanMesh whose arrays are views into the mapping, or None."""
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        fields = _HEADER.unpack_from(mapped, 0)
+    except struct.error:
+        mapped.close()
+        return None
+    magic, version, little_endian, metadata_length = fields[:4]
+    if magic != CACHE_MAGIC or version != CACHE_VERSION or bool(little_endian) != (sys.byteorder == "little"):
+        mapped.close()
+        return None
+
+    offset = _HEADER.size
+    if offset + metadata_length > len(mapped):
+        mapped.close()
+        return None
+    metadata = json.loads(mapped[offset:offset + metadata_length].decode("utf-8"))
+    offset += metadata_length
+
+    # Locate every array before creating views, a truncated entry is a miss and the mapping can still be closed
+    layout = []
+    for index, field in enumerate(_ARRAY_FIELDS):
+        typecode = fields[4 + index * 2].decode("ascii")
+        offset = _align(offset)
+        size = fields[5 + index * 2] * _item_size(typecode)
+        if size < 0 or offset + size > len(mapped):
+            mapped.close()
+            return None
+        layout.append((field, typecode, offset, size))
+        offset += size
+
+    mesh = ScanMesh()
+    mesh.materials = metadata.get("materials", [])
+    mesh.material_libraries = metadata.get("material_libraries", [])
+    view = memoryview(mapped)
+    for field, typecode, offset, size in layout:
+        setattr(mesh, field, view[offset:offset + size].cast(typecode))
+    return mesh
+
+def _item_size(typecode):
+    """Returns the item size of an array typecode written by write_entry(), or -1 for anything else."""
+    return struct.calcsize(typecode) if typecode in "bBhHiIlLqQfd" else -1
+
+class ScanCache:
+    """
+    Persistent cache of decoded scans.
+
+    Entries are keyed by the scan's content hash and the settings it was decoded with. Content hashes are
+    remembered per path, size and modification time, so unchanged files are not hashed again. Hits are memory-
+    mapped and skip text parsing entirely. The least recently used entries are evicted above max_bytes.
+
+    Parameters:
+    - directory: Cache directory, defaults to the per-user cache directory.
+    - max_bytes: Size cap of all entries together.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_directory()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        # Guards the hash index, batch imports hash scans from several threads
+        self._lock = threading.Lock()
+        self._hashes = self._load_hash_index()
+
+    def _hash_index_path(self):
+        return os.path.join(self.directory, HASH_INDEX_NAME)
+
+    def _load_hash_index(self):
+        try:
+            with open(self._hash_index_path(), "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_hash_index(self):
+        temporary_path = _temporary_path(self._hash_index_path())
+        try:
+            with open(temporary_path, "w") as file:
+                with self._lock:
+                    json.dump(self._hashes, file)
+            os.replace(temporary_path, self._hash_index_path())
+        except OSError as e:
+            logger.warning("Failed to save the scan cache index: {}".format(e))
+
+    def content_hash(self, path, stat=None):
+        """
+        Returns the content hash of a file, reusing the remembered one while size and mtime are unchanged.
+
+        stat optionally holds the file's os.stat result when the caller already has it.
+        """
+        if stat is None:
+            stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            known = self._hashes.get(key)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            remember_session_hash(key, stat, known["hash"])
+            return known["hash"]
+        content_hash = session_hash(path, stat)
+        with self._lock:
+            self._hashes[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": content_hash}
+        self._save_hash_index()
+        return content_hash
+
+    def entry_path(self, path, settings, stat=None):
+        """Returns the path of the cache entry of a scan decoded with the given settings."""
+        name = "{}-{}{}".format(self.content_hash(path, stat), settings_digest(settings), ENTRY_SUFFIX)
+        return os.path.join(self.directory, name)
+
+    def load(self, entry_path):
+        """Returns the cached ScanMesh of an entry, or None on a miss."""
+        if not os.path.isfile(entry_path):
+            self.misses += 1
+            return None
+        try:
+            mesh = read_entry(entry_path)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable scan cache entry '{}': {}".format(entry_path, e))
+            mesh = None
+        if mesh is None:
+            self.misses += 1
+            return None
+        # The modification time doubles as the last use for LRU eviction
+        try:
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return mesh
+
+    def entries(self):
+        """Returns (path, size, last use) of every entry, least recently used first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(ENTRY_SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits max_bytes. Returns the bytes freed."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for path, size, _ in entries:
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                freed += size
+            except OSError:
+                # Still memory-mapped by a scan in use (Windows), try again next time
+                continue
+        if freed:
+            logger.info("Evicted {:.1f} MB from the scan cache.".format(freed / 1024.0 / 1024.0))
+        return freed
+
+    def invalidate(self, path=None):
+        """
+        Removes cached entries.
+
+        Parameters:
+        - path: Only remove the entries decoded from this scan. Removes everything when None.
+
+        Returns:
+        - The number of entries removed.
+        """
+        prefix = None
+        if path is not None:
+            with self._lock:
+                known = self._hashes.pop(os.path.abspath(path), None)
+            if known is None:
+                return 0
+            prefix = known["hash"] + "-"
+        else:
+            with self._lock:
+                self._hashes = {}
+        self._save_hash_index()
+
+        removed = 0
+        for entry_path, _, _ in self.entries():
+            if prefix is None or os.path.basename(entry_path).startswith(prefix):
+                try:
+                    os.remove(entry_path)
+                    removed += 1
+                except OSError:
+                    continue
+        return removed
@@ -0,0 +1,170 @@
+import logging
+import math
+import time
+from array import array
+from objReader import ScanMesh
+
+logger = logging.getLogger(__name__)
+
+# Grid refinements allowed when the first cell size misses the budget by more than the tolerance
+MAX_REFINEMENTS = 3
+BUDGET_TOLERANCE = 0.25
+# Cell coordinates are packed into one integer with this many bits per axis
+CELL_BITS = 21
+
+class DecimationReport:
+    """Statistics of one decimated scan."""
+
+    def __init__(self, name, source_triangles, result_triangles, cell_size, seconds):
+        self.name = name
+        self.source_triangles = source_triangles
+        self.result_triangles = result_triangles
+        self.cell_size = cell_size
+        self.seconds = seconds
+
+    @property
+    def reduction_ratio(self):
+        """Fraction of the source triangles that were removed."""
+        if not self.source_triangles:
+            return 0.0
+        return 1.0 - float(self.result_triangles) / self.source_triangles
+
+    def __str__(self):
+        return "{}: {} -> {} triangles ({:.1%} fewer), cell size {:.6g}, {:.2f} s".format(
+            self.name, self.source_triangles, self.result_triangles, self.reduction_ratio, self.cell_size, self.seconds)
+
+def triangle_count(mesh):
+    """Number of triangles of a ScanMesh, counting quads as two."""
+    polygons = mesh.polygons
+    quads = sum(1 for c, d in zip(polygons[2::4], polygons[3::4]) if c != d)
+    return mesh.polygon_count + quads
+
+def _bounds(points):
+    xs, ys, zs = points[0::3], points[1::3], points[2::3]
+    return (min(xs), min(ys), min(zs)), (max(xs), max(ys), max(zs))
+
+def min_cell_size(minimum, maximum):
+    """
+    Smallest cell size whose cell coordinates fit CELL_BITS bits on every axis of the bounds.
+
+    One bit is left spare so rounding at the far end of the bounds cannot carry into the next axis.
+    """
+    return max(high - low for low, high in zip(minimum, maximum)) / float(1 << (CELL_BITS - 1))
+
+def _cluster_points(points, minimum, cell_size):
+    """Returns the cluster index of every point and the number of clusters, for cubic cells of cell_size."""
+    inverse = 1.0 / cell_size
+    min_x, min_y, min_z = minimum
+    # cell_size is never below min_cell_size(), so the axes cannot overlap
+    keys = [(int((x - min_x) * inverse) << 2 * CELL_BITS) | (int((y - min_y) * inverse) << CELL_BITS)
+            | int((z - min_z) * inverse)
+            for x, y, z in zip(points[0::3], points[1::3], points[2::3])]
+    clusters = {}
+    indices = [clusters.setdefault(key, len(clusters)) for key in keys]
+    return indices, len(clusters)
+
+def _initial_cell_size(minimum, maximum, target_points):
+    """Cell size giving target_points occupied cells on a height-field like scan filling its bounding box."""
+    extent = [max(high - low, 1e-9) for low, high in zip(minimum, maximum)]
+    area = extent[0] * extent[1] + extent[1] * extent[2] + extent[2] * extent[0]
+    # Twice the largest face area bounds the scan surface, halving it keeps the estimate on the coarse side
+    return max(math.sqrt(area / 2.0 / max(target_points, 1)), min_cell_size(minimum, maximum))
+
+def decimate_mesh(mesh, triangle_budget, name="Scan", log_report=True):
+    """
+    Reduces a ScanMesh to about triangle_budget triangles by vertex clustering.
+
+    Points are snapped to a uniform grid whose cell size is fitted to the budget, each cell is replaced by the
+    average of its points and polygons collapsing to a line or a point are dropped. Texture and normal indices
+    of the remaining corners are kept, so the proxy shares the UVs and normals of the source.
+
+    Parameters:
+    - mesh: The decoded ScanMesh.
+    - triangle_budget: Approximate number of triangles of the result.
+    - name: Name used in the report.
+    - log_report: Log the report, callers decimating many meshes log a summary instead.
+
+    Returns:
+    - (ScanMesh, DecimationReport). The source mesh itself is returned when it is already within the budget.
+    """
+    start = time.perf_counter()
+    source_triangles = triangle_count(mesh)
+    if triangle_budget <= 0 or source_triangles <= triangle_budget or mesh.point_count == 0:
+        return mesh, DecimationReport(name, source_triangles, source_triangles, 0.0, time.perf_counter() - start)
+
+    points = mesh.points
+    minimum, maximum = _bounds(points)
+    # Closed and height-field meshes have about twice as many triangles as points
+    target_points = triangle_budget // 2
+    cell_size = _initial_cell_size(minimum, maximum, target_points)
+    indices, cluster_count = _cluster_points(points, minimum, cell_size)
+    for _ in range(MAX_REFINEMENTS):
+        if abs(cluster_count - target_points) <= target_points * BUDGET_TOLERANCE:
+            break
+        # Occupied cells of a surface scale with the inverse square of the cell size
+        cell_size = max(cell_size * math.sqrt(float(cluster_count) / target_points), min_cell_size(minimum, maximum))
+        indices, cluster_count = _cluster_points(points, minimum, cell_size)
+
+    result = _collapse(mesh, indices, cluster_count)
+    report = DecimationReport(name, source_triangles, triangle_count(result), cell_size, time.perf_counter() - start)
+    if log_report:
+        logger.info(str(report))
+    return result, report
+
+def _collapse(mesh, indices, cluster_count):
+    """Builds the clustered mesh from the cluster index of every source point."""
+    sums = [0.0] * (cluster_count * 3)
+    counts = [0] * cluster_count
+    points = mesh.points
+    for point, cluster in enumerate(indices):
+        base = cluster * 3
+        source = point * 3
+        sums[base] += points[source]
+        sums[base + 1] += points[source + 1]
+        sums[base + 2] += points[source + 2]
+        counts[cluster] += 1
+
+    result = ScanMesh()
+    result.points = array('f', [value / counts[i // 3] for i, value in enumerate(sums)])
+    result.uvs = mesh.uvs
+    result.normals = mesh.normals
+    result.material_libraries = mesh.material_libraries
+    result.materials = mesh.materials
+
+    polygons = mesh.polygons
+    polygon_uvs = mesh.polygon_uvs
+    polygon_normals = mesh.polygon_normals
+    has_uvs = bool(polygon_uvs)
+    has_normals = bool(polygon_normals)
+    kept_polygons = []
+    kept_uvs = []
+    kept_normals = []
+    for base in range(0, len(polygons), 4):
+        a, b, c, d = indices[polygons[base]], indices[polygons[base + 1]], indices[polygons[base + 2]], indices[polygons[base + 3]]
+        triangle = polygons[base + 2] == polygons[base + 3]
+        if triangle:
+            if a == b or b == c or a == c:
+                continue
+            corners = (0, 1, 2, 2)
+        else:
+            # Drop the collapsed corners of a quad, keeping their order
+            clusters = (a, b, c, d)
+            corners = [0]
+            for corner in (1, 2, 3):
+                if clusters[corner] != clusters[corners[-1]] and (corner < 3 or d != a):
+                    corners.append(corner)
+            # Fewer than three corners left, or two opposite corners merged and folded the quad onto itself
+            if len(corners) < 3 or len({clusters[corner] for corner in corners}) < len(corners):
+                continue
+            if len(corners) == 3:
+                corners.append(corners[2])
+        kept_polygons.extend([indices[polygons[base + corner]] for corner in corners])
+        if has_uvs:
+            kept_uvs.extend([polygon_uvs[base + corner] for corner in corners])
+        if has_normals:
+            kept_normals.extend([polygon_normals[base + corner] for corner in corners])
+
+    result.polygons = array('i', kept_polygons)
+    result.polygon_uvs = array('i', kept_uvs)
+    result.polygon_normals = array('i', kept_normals)
+    return result
@@ -0,0 +1,176 @@
+import c4d
+import json
+import logging
+from importTrace import count
+from shotRecord import ASSET_MARKER_ID, asset_content_hash, iter_document_objects, mark_node, read_marker, read_record
+
+logger = logging.getLogger(__name__)
+
+# Import options that change how a scan is built, scans are only shared between imports that agree on them
+SCAN_BUILD_OPTIONS = ("scan_loader", "scan_triangle_budget", "scan_tile_size", "scan_lod_levels", "scan_memory_budget")
+
+def scan_build_key(options):
+    """Returns the scan build options of import options as a string, comparable between imports."""
+    return json.dumps({name: options[name] for name in SCAN_BUILD_OPTIONS if options and options.get(name) is not None},
+                      sort_keys=True)
+
+class ScanIndex:
+    """
+    The scans in a document by content hash and build options, so a scan imported again can be shared instead.
+
+    Scans are found through the shot records of the document's scene control tags, whose fingerprints hold the
+    content hash of every scan file, and the markers of the scans' objects. Instances are never indexed, only
+    the objects they link to.
+    """
+
+    def __init__(self):
+        self.scans = {}
+
+    @classmethod
+    def from_document(cls, doc, tag_type):
+        """Indexes the scans of every shot imported into doc, tag_type being the scene control tag's type."""
+        index = cls()
+        records = []
+        objects = {}
+        for obj in iter_document_objects(doc):
+            for tag in obj.GetTags():
+                if tag.GetType() == tag_type:
+                    record = read_record(tag)
+                    if record is not None:
+                        records.append(record)
+            marker = read_marker(obj)
+            if marker is not None and marker[2] == "scan" and obj.GetType() != c4d.Oinstance:
+                objects.setdefault((marker[0], marker[1]), obj)
+        for record in records:
+            build_key = scan_build_key(record.options)
+            for key, fingerprint in record.fingerprints.items():
+                obj = objects.get((record.shot_id, key))
+                if obj is not None and key.startswith("scan:"):
+                    index.add(fingerprint.content_hash, build_key, obj)
+        return index
+
+    def add(self, content_hash, build_key, obj):
+        self.scans.setdefault((content_hash, build_key), obj)
+
+    def find(self, content_hash, build_key):
+        """Returns the object of a scan with this content built with these options, or None."""
+        obj = self.scans.get((content_hash, build_key))
+        # The scan may have been deleted since it was indexed
+        if obj is not None and obj.GetDocument() is None:
+            del self.scans[(content_hash, build_key)]
+            return None
+        return obj
+
+class ScanDeduplication:
+    """
+    Which scans of an import are already in the document and how much loading that saves.
+
+    Parameters:
+    - doc: The document imported into.
+    - options: The import options, only scans built with the same SCAN_BUILD_OPTIONS are shared.
+    - tag_type: The scene control tag's type, see ScanIndex.from_document().
+    """
+
+    def __init__(self, doc, options, tag_type):
+        self.index = ScanIndex.from_document(doc, tag_type)
+        self.build_key = scan_build_key(options)
+        self.hashes = {}
+        self.shared = []
+        self.shared_bytes = 0
+
+    def hash_scans(self, assets):
+        """
+        Hashes the files of the scans' AssetInfos in full, with the same scanCache.hash_file() digest the scan cache and
+        the shot records use, see shotRecord.asset_content_hash().
+        """
+        for asset in assets:
+            self.hashes[asset.path] = asset_content_hash(asset)
+
+    def shared_paths(self, paths):
+        """Returns the paths whose scan will be shared, as it is already imported or repeats an earlier path's content."""
+        shared = set()
+        hashes = set()
+        for path in dict.fromkeys(paths):
+            content_hash = self.hashes.get(path)
+            if content_hash is None:
+                continue
+            if content_hash in hashes or self.index.find(content_hash, self.build_key) is not None:
+                shared.add(path)
+            hashes.add(content_hash)
+        return shared
+
+    def source(self, path):
+        """Returns the object of an already imported scan with the content of path, or None."""
+        content_hash = self.hashes.get(path)
+        return self.index.find(content_hash, self.build_key) if content_hash is not None else None
+
+    def add(self, path, obj):
+        """Indexes the object built from path, so later scans with the same content share it."""
+        content_hash = self.hashes.get(path)
+        if content_hash is not None and obj is not None:
+            self.index.add(content_hash, self.build_key, obj)
+
+    def shared_scan(self, asset):
+        """Counts a scan that is shared instead of loaded."""
+        self.shared.append(asset.path)
+        self.shared_bytes += asset.size or 0
+
+    def report(self):
+        count("scans shared", len(self.shared))
+        count("bytes shared", self.shared_bytes)
+        if self.shared:
+            logger.info("Shared {} of {} scans with scans already imported, skipping {:.1f} MB of OBJ files.".format(
+                len(self.shared), len(self.hashes), self.shared_bytes / (1024.0 * 1024.0)))
+
+def build_scan_instance(doc, source, name, obj_path, session=None):
+    """
+    Inserts an instance object of an already imported scan, recorded as the scan of obj_path in the session.
+
+    Renders use a render instance, so the mesh is kept in memory once however often it is shared.
+
+    Returns:
+    - The inserted instance object.
+    """
+    instance = c4d.BaseObject(c4d.Oinstance)
+    instance.SetName(name)
+    instance[c4d.INSTANCEOBJECT_LINK] = source
+    instance[c4d.INSTANCEOBJECT_RENDERINSTANCE_MODE] = c4d.INSTANCEOBJECT_RENDERINSTANCE_MODE_RENDERINSTANCE
+    doc.InsertObject(instance)
+    doc.AddUndo(c4d.UNDOTYPE_NEW, instance)
+    if session is not None:
+        session.record_object(instance, "scan", asset=obj_path)
+    return instance
+
+def find_instances(doc, source):
+    """Returns the instance objects linking to source."""
+    return [obj for obj in iter_document_objects(doc)
+            if obj.GetType() == c4d.Oinstance and obj[c4d.INSTANCEOBJECT_LINK] is source]
+
+def detach_instances(doc, source):
+    """
+    Replaces the instances of a scan by copies of it, before the scan is rebuilt or deleted.
+
+    The scan may change with the shot it belongs to, while the shots sharing it keep their own file. The copies
+    take over the instances' names, positions and markers, so the other shots still find their scan.
+
+    Returns:
+    - The number of instances replaced.
+    """
+    instances = find_instances(doc, source)
+    for instance in instances:
+        copy = source.GetClone(c4d.COPYFLAGS_NONE)
+        copy.SetName(instance.GetName())
+        # The copy would otherwise carry the marker of the source's shot
+        marker = read_marker(instance)
+        if marker is not None:
+            mark_node(copy, *marker)
+        else:
+            copy.GetDataInstance().RemoveData(ASSET_MARKER_ID)
+        doc.InsertObject(copy, pred=instance)
+        doc.AddUndo(c4d.UNDOTYPE_NEW, copy)
+        copy.SetMg(instance.GetMg())
+        doc.AddUndo(c4d.UNDOTYPE_DELETE, instance)
+        instance.Remove()
+    if instances:
+        logger.info("Replaced {} instances of '{}' by copies.".format(len(instances), source.GetName()))
+    return len(instances)
@@ -0,0 +1,216 @@
+import logging
+import math
+import time
+from array import array
+from operator import itemgetter
+from cameraTransforms import MATRIX_STRIDE, matrix_count
+from objReader import ScanMesh
+from scanDecimation import CELL_BITS, decimate_mesh, min_cell_size, triangle_count
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOD_LEVELS = 3
+# Every LOD level keeps about this fraction of the triangles of the level before
+LOD_REDUCTION = 0.25
+# Tiles below this triangle count get no further LOD levels
+MIN_LOD_TRIANGLES = 64
+# Frames of the camera path checked against the tiles, evenly spread over the shot
+MAX_SELECTION_FRAMES = 500
+# Tiles in view within this many tile diameters of the camera keep their full detail
+FULL_DETAIL_DIAMETERS = 2.0
+# View cone half angle used when the camera has no intrinsics
+DEFAULT_HALF_ANGLE = math.radians(45.0)
+
+class ScanTile:
+    """
+    One grid cell of a tiled scan.
+
+    Attributes:
+    - index: Position of the tile in the tiling.
+    - center: Center of the tile's bounding box in document space, the points of its meshes are relative to it.
+    - radius: Radius of the sphere around center holding every point of the tile.
+    - levels: The tile's ScanMesh at full detail, followed by its LOD levels, each coarser than the one before.
+    """
+
+    def __init__(self, index, center, radius, levels):
+        self.index = index
+        self.center = center
+        self.radius = radius
+        self.levels = levels
+
+    @property
+    def mesh(self):
+        return self.levels[0]
+
+def _tile_mesh(mesh, polygon_indices, columns):
+    """Builds the ScanMesh of the given polygons with their points relative to their bounding box center."""
+    polygons = mesh.polygons
+    remap = {}
+    tile_polygons = array('i')
+    for index in polygon_indices:
+        base = index * 4
+        tile_polygons.extend([remap.setdefault(corner, len(remap)) for corner in polygons[base:base + 4]])
+
+    order = list(remap)
+    gather = itemgetter(*order) if len(order) > 1 else (lambda values: (values[order[0]],))
+    axes = [gather(column) for column in columns]
+    minimum = [min(values) for values in axes]
+    maximum = [max(values) for values in axes]
+    center = tuple((low + high) * 0.5 for low, high in zip(minimum, maximum))
+    radius = 0.5 * math.sqrt(sum((high - low) ** 2 for low, high in zip(minimum, maximum)))
+
+    tile = ScanMesh()
+    tile.points = array('f', bytes(len(order) * 3 * 4))
+    for axis, values in enumerate(axes):
+        offset = center[axis]
+        tile.points[axis::3] = array('f', [value - offset for value in values])
+    tile.polygons = tile_polygons
+    # Texture and normal indices keep pointing into the arrays of the whole scan
+    if mesh.polygon_uvs:
+        tile.polygon_uvs = array('i', [uv for index in polygon_indices for uv in mesh.polygon_uvs[index * 4:index * 4 + 4]])
+        tile.uvs = mesh.uvs
+    if mesh.polygon_normals:
+        tile.polygon_normals = array('i', [normal for index in polygon_indices
+                                           for normal in mesh.polygon_normals[index * 4:index * 4 + 4]])
+        tile.normals = mesh.normals
+    tile.material_libraries = mesh.material_libraries
+    tile.materials = mesh.materials
+    return tile, center, radius
+
+def split_mesh(mesh, tile_size):
+    """
+    Splits a ScanMesh into the cells of a uniform grid.
+
+    Polygons go to the cell of their first corner and are never cut, so tiles overlap by at most one polygon
+    at their borders and their bounds are computed from the points they actually hold.
+
+    Parameters:
+    - mesh: The decoded ScanMesh.
+    - tile_size: Edge length of the grid cells in document units.
+
+    Returns:
+    - List of ScanTile with only their full-detail level, in the grid's x, y, z order.
+    """
+    points = mesh.points
+    if mesh.polygon_count == 0:
+        return []
+    columns = [points[axis::3] for axis in range(3)]
+    minimum = [min(column) for column in columns]
+    maximum = [max(column) for column in columns]
+    smallest = min_cell_size(minimum, maximum)
+    if tile_size < smallest:
+        logger.warning("Tile size {:.6g} is too small for the scan bounds, using {:.6g}".format(tile_size, smallest))
+        tile_size = smallest
+    inverse = 1.0 / tile_size
+    min_x, min_y, min_z = minimum
+    # Cell coordinates are packed into one integer, CELL_BITS bits per axis
+    cells = [(int((x - min_x) * inverse) << 2 * CELL_BITS) | (int((y - min_y) * inverse) << CELL_BITS)
+             | int((z - min_z) * inverse)
+             for x, y, z in zip(*columns)]
+    groups = {}
+    for index, first in enumerate(mesh.polygons[0::4]):
+        groups.setdefault(cells[first], []).append(index)
+
+    tiles = []
+    for cell in sorted(groups):
+        tile_mesh, center, radius = _tile_mesh(mesh, groups[cell], columns)
+        tiles.append(ScanTile(len(tiles), center, radius, [tile_mesh]))
+    return tiles
+
+def add_lod_levels(tile, level_count, name="Scan"):
+    """Appends decimated levels to a ScanTile until it has level_count levels or is too small to reduce."""
+    triangles = triangle_count(tile.mesh)
+    while len(tile.levels) < level_count:
+        triangles = int(triangles * LOD_REDUCTION)
+        if triangles < MIN_LOD_TRIANGLES:
+            break
+        level, _ = decimate_mesh(tile.levels[-1], triangles, "{} LOD{}".format(name, len(tile.levels)), log_report=False)
+        if level is tile.levels[-1]:
+            break
+        tile.levels.append(level)
+
+def tile_scan(mesh, tile_size, level_count=DEFAULT_LOD_LEVELS, name="Scan"):
+    """
+    Splits a ScanMesh into grid tiles and gives each tile up to level_count levels of detail.
+
+    Parameters:
+    - mesh: The decoded ScanMesh.
+    - tile_size: Edge length of the tiles in document units.
+    - level_count: Number of levels per tile including the full-detail one, 1 disables LOD levels.
+    - name: Name used in the log.
+
+    Returns:
+    - List of ScanTile.
+    """
+    start = time.perf_counter()
+    tiles = split_mesh(mesh, tile_size)
+    for tile in tiles:
+        add_lod_levels(tile, level_count, name)
+    logger.info("{}: split into {} tiles with {} LOD meshes in {:.2f} s".format(
+        name, len(tiles), sum(len(tile.levels) - 1 for tile in tiles), time.perf_counter() - start))
+    return tiles
+
+def camera_half_angle(intrinsics, aspect_ratio=16.0 / 9.0):
+    """
+    Returns the half angle in radians of the cone around a camera's view, through the corners of its film.
+
+    Parameters:
+    - intrinsics: Dict of the camera's Alembic '.core' values, see CameraSamples.intrinsics_at_time(), or None.
+    - aspect_ratio: Width over height of the image, used when the intrinsics give no vertical aperture.
+    """
+    if not intrinsics or not intrinsics.get("focal_length") or not intrinsics.get("horizontal_aperture"):
+        return DEFAULT_HALF_ANGLE
+    # Apertures are in centimeters, the focal length in millimeters
+    width = intrinsics["horizontal_aperture"] * 10.0
+    height = intrinsics.get("vertical_aperture", 0.0) * 10.0 or width / aspect_ratio
+    return math.atan(math.hypot(width, height) * 0.5 / intrinsics["focal_length"])
+
+def view_distances(centers, radii, camera_matrices, half_angle, max_frames=MAX_SELECTION_FRAMES):
+    """
+    Returns how close the camera gets to each bounding sphere while the sphere is inside its view cone.
+
+    Parameters:
+    - centers: (x, y, z) of every sphere in document space.
+    - radii: Radius of every sphere.
+    - camera_matrices: Matrix stack of the camera in document space, one matrix per frame, looking along +Z.
+    - half_angle: Half angle of the view cone in radians.
+    - max_frames: Frames checked at most, evenly spread over the stack.
+
+    Returns:
+    - List of distances from the camera to the sphere's surface, 0 inside the sphere and math.inf when the
+      sphere is never in view.
+    """
+    distances = [math.inf] * len(centers)
+    frames = matrix_count(camera_matrices)
+    step = max(1, int(math.ceil(frames / float(max_frames))))
+    for frame in range(0, frames, step):
+        base = frame * MATRIX_STRIDE
+        fx, fy, fz = camera_matrices[base + 8:base + 11]
+        length = math.sqrt(fx * fx + fy * fy + fz * fz) or 1.0
+        fx, fy, fz = fx / length, fy / length, fz / length
+        px, py, pz = camera_matrices[base + 12:base + 15]
+        for index, ((cx, cy, cz), radius) in enumerate(zip(centers, radii)):
+            vx, vy, vz = cx - px, cy - py, cz - pz
+            distance = math.sqrt(vx * vx + vy * vy + vz * vz)
+            if distance <= radius:
+                distances[index] = 0.0
+                continue
+            if distance - radius >= distances[index]:
+                continue
+            # Angle between the view axis and the sphere's center, less the angle the sphere covers
+            cosine = max(-1.0, min(1.0, (vx * fx + vy * fy + vz * fz) / distance))
+            if math.acos(cosine) - math.asin(radius / distance) <= half_angle:
+                distances[index] = distance - radius
+    return distances
+
+def level_for_distance(distance, tile_diameter, level_count):
+    """
+    Returns the LOD level of a tile at a view distance: full detail within FULL_DETAIL_DIAMETERS tile diameters,
+    one level coarser every time the distance doubles, and the coarsest level for tiles never in view.
+    """
+    near = FULL_DETAIL_DIAMETERS * tile_diameter
+    if level_count <= 1 or distance <= near:
+        return 0
+    if math.isinf(distance) or near <= 0.0:
+        return level_count - 1
+    return min(level_count - 1, 1 + int(math.log2(distance / near)))
@@ -0,0 +1,208 @@
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from alembicReader import AlembicReadError, read_camera_samples
+from importTrace import count
+from objReader import ObjReadError, read_obj
+from pointCloudReader import PointCloudReadError, read_point_cloud, voxel_downsample
+from scanCache import write_entry
+
+logger = logging.getLogger(__name__)
+
+# Environment variable pointing at a Python interpreter to run decode workers with
+PYTHON_EXECUTABLE_ENV = "OMNISCIENT_PYTHON"
+
+class DecodedFile:
+    """Outcome of decoding one file: the decoded value or the error that prevented it."""
+
+    def __init__(self, path, value=None, error=None, seconds=0.0, bytes_read=0):
+        self.path = path
+        self.value = value
+        self.error = error
+        self.seconds = seconds
+        self.bytes_read = bytes_read
+
+    @property
+    def ok(self):
+        return self.error is None
+
+def _timed(function, path, *args):
+    start = time.perf_counter()
+    try:
+        value = function(path, *args)
+    except (ObjReadError, AlembicReadError, PointCloudReadError) as e:
+        return DecodedFile(path, error=e, seconds=time.perf_counter() - start)
+    return DecodedFile(path, value=value, seconds=time.perf_counter() - start, bytes_read=os.path.getsize(path))
+
+def decode_scan(path, scale, cache_entry=None):
+    """
+    Worker entry point decoding an OBJ scan, importable without c4d.
+
+    When cache_entry is given, the decoded scan is also written to that scan cache entry.
+    """
+    decoded = _timed(read_obj, path, scale)
+    if cache_entry is not None and decoded.ok:
+        try:
+            write_entry(cache_entry, decoded.value)
+        except OSError as e:
+            logger.warning("Failed to cache the decoded scan '{}': {}".format(path, e))
+    return decoded
+
+def cache_scan(path, scale, cache_entry):
+    """Worker entry point decoding an OBJ scan into the scan cache only, without sending the mesh back."""
+    decoded = decode_scan(path, scale, cache_entry)
+    decoded.value = None
+    return decoded
+
+def scan_settings(scale):
+    """Import settings a scan is decoded with, part of its scan cache key."""
+    return {"scale": scale, "read_uvs": True, "read_normals": True, "ngons": "fan"}
+
+def decode_camera(path):
+    """Worker entry point decoding an Alembic camera, importable without c4d."""
+    return _timed(read_camera_samples, path)
+
+def _read_downsampled(path, scale, voxel_size):
+    return voxel_downsample(read_point_cloud(path, scale), voxel_size)
+
+def decode_point_cloud(path, scale, voxel_size=None):
+    """Worker entry point reading a PLY or OBJ point cloud and downsampling it by voxel_size, importable without c4d."""
+    return _timed(_read_downsampled, path, scale, voxel_size)
+
+def find_worker_executable():
+    """
+    Returns a Python interpreter that can run decode workers in separate processes, or None.
+
+    Inside Cinema 4D sys.executable is the application itself, so separate processes are only used when it is
+    a plain Python interpreter or when OMNISCIENT_PYTHON points at one.
+    """
+    executable = os.environ.get(PYTHON_EXECUTABLE_ENV)
+    if executable and os.path.isfile(executable):
+        return executable
+    if sys.executable and os.path.basename(sys.executable).lower().startswith("python"):
+        return sys.executable
+    return None
+
+def default_worker_count(file_count):
+    return max(1, min(file_count, (os.cpu_count() or 2) - 1))
+
+def create_executor(workers):
+    """Returns a process pool running decode workers, or a thread pool when no separate interpreter is available."""
+    executable = find_worker_executable()
+    if executable is not None:
+        context = multiprocessing.get_context("spawn")
+        context.set_executable(executable)
+        logger.info("Decoding shot files with {} worker processes.".format(workers))
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    logger.info("No separate Python interpreter available, decoding shot files with {} threads.".format(workers))
+    return ThreadPoolExecutor(max_workers=workers)
+
+class ShotDecoder:
+    """
+    Decodes the files of a shot ahead of the document work.
+
+    Files are submitted as soon as the manifest is known and decoded in a process pool (a thread pool when no
+    separate interpreter is available) while the main thread keeps working. result() hands back the decoded
+    files in whatever order the caller asks for them, so objects can be built in manifest order. With a single
+    file or a single worker, decoding happens lazily on the calling thread, unless background is set.
+
+    Parameters:
+    - file_count: Number of files that will be submitted.
+    - workers: Maximum number of workers, defaults to one less than the number of CPUs.
+    - cache: Optional ScanCache. Cached scans are loaded without decoding, decoded ones are added to it.
+    - background: Decode on a worker thread even with a single file or worker, so the calling thread never
+      decodes, see future().
+    """
+
+    def __init__(self, file_count, workers=None, cache=None, background=False):
+        self.workers = default_worker_count(file_count) if workers is None else max(1, int(workers))
+        self.executor = None
+        self.cache = cache
+        self.pending = {}
+        self.ready = {}
+        if file_count > 1 and self.workers > 1:
+            self.executor = create_executor(min(self.workers, file_count))
+        elif background and file_count > 0:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.pending.clear()
+        self.ready.clear()
+        if self.cache is not None:
+            self.cache.evict()
+
+    def submit_scan(self, path, scale=1.0, stat=None):
+        """Submits an OBJ scan. stat optionally holds the scan's os.stat result, saving a stat for the cache key."""
+        cache_entry = None
+        if self.cache is not None and path not in self.ready:
+            start = time.perf_counter()
+            try:
+                cache_entry = self.cache.entry_path(path, scan_settings(scale), stat=stat)
+                mesh = self.cache.load(cache_entry)
+            except OSError as e:
+                logger.warning("Scan cache unavailable for '{}': {}".format(path, e))
+                cache_entry, mesh = None, None
+            if mesh is not None:
+                logger.info("Loaded '{}' from the scan cache.".format(os.path.basename(path)))
+                count("scan cache hits")
+                self.ready[path] = DecodedFile(path, value=mesh, seconds=time.perf_counter() - start)
+                return
+        self._submit(path, decode_scan, path, scale, cache_entry)
+
+    def submit_point_cloud(self, path, scale=1.0, voxel_size=None):
+        """Submits a point cloud, downsampled by voxel_size in document units when given."""
+        self._submit(path, decode_point_cloud, path, scale, voxel_size)
+
+    def submit_camera(self, path):
+        self._submit(path, decode_camera, path)
+
+    def _submit(self, key, function, *args):
+        if key in self.pending:
+            return
+        future = None
+        if self.executor is not None:
+            try:
+                future = self.executor.submit(function, *args)
+            except (BrokenProcessPool, RuntimeError) as e:
+                logger.warning("Decode pool unavailable, decoding '{}' on the main thread: {}".format(key, e))
+        self.pending[key] = (future, function, args)
+
+    def future(self, path):
+        """Returns the Future of a path being decoded by a worker, or None when result() won't wait for a worker."""
+        future = self.pending[path][0] if path in self.pending else None
+        return None if future is None or future.done() else future
+
+    def result(self, path):
+        """Returns the DecodedFile of a submitted path, waiting for it if needed, or None if it was not submitted."""
+        if path in self.ready:
+            return self.ready.pop(path)
+        if path not in self.pending:
+            return None
+        future, function, args = self.pending.pop(path)
+        decoded = None
+        if future is not None:
+            try:
+                decoded = future.result()
+            except Exception as e:
+                # A worker failing for any reason, a broken pool, a pickling error or a bug in the decoder, only
+                # costs the parallelism, the main thread decodes the file and reports read errors itself
+                logger.warning("Decode worker failed for '{}', decoding on the main thread: {}".format(path, e),
+                               exc_info=e)
+        if decoded is None:
+            decoded = function(*args)
+        # Counted here, workers in other processes don't add to the trace of the import
+        count("bytes read", decoded.bytes_read)
+        return decoded
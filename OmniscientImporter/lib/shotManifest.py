@@ -0,0 +1,341 @@
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from stat import S_ISREG
+from importTrace import span
+
+logger = logging.getLogger(__name__)
+
+# Threads stating the assets of a shot, stats mostly wait on the file system (network shares)
+MAX_STAT_WORKERS = 8
+
+_VERSION_PATTERN = re.compile(r"^\d+\.\d+\.\d+$")
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+_NUMBER = {"type": "number"}
+_PATH = {"type": str}
+
+# Modes a geometry file can be imported in, the default depends on its extension, see default_import_mode()
+IMPORT_MODES = ("mesh", "points")
+
+# A geometry file is given by its path, or by an object with its path and how to import it
+_GEOMETRY_ENTRY = {
+    "one_of": [
+        _PATH,
+        {
+            "type": dict,
+            "required": ["relative_path"],
+            "properties": {
+                "relative_path": _PATH,
+                "import_as": {"type": "choice", "choices": IMPORT_MODES},
+                "voxel_size": _NUMBER
+            }
+        }
+    ]
+}
+
+# Expected layout of a .omni manifest, only what the importer reads is checked
+MANIFEST_SCHEMA = {
+    "type": dict,
+    "required": ["data"],
+    "properties": {
+        "version": {"type": str},
+        "cinema4d": {
+            "type": dict,
+            "properties": {"minimum_plugin_version": {"type": "version"}}
+        },
+        "data": {
+            "type": dict,
+            "required": ["video"],
+            "properties": {
+                "video": {
+                    "type": dict,
+                    "required": ["relative_path"],
+                    "properties": {
+                        "relative_path": _PATH,
+                        "fps": _NUMBER,
+                        "resolution": {"type": dict, "properties": {"width": _NUMBER, "height": _NUMBER}}
+                    }
+                },
+                "camera": {"type": dict, "properties": {"relative_path": _PATH, "fps": _NUMBER}},
+                "geometry": {"type": dict, "properties": {"relative_path": {"type": list, "items": _GEOMETRY_ENTRY}}}
+            }
+        }
+    }
+}
+
+class ManifestError(Exception):
+    """Raised when a .omni manifest cannot be read or does not match MANIFEST_SCHEMA."""
+
+    def __init__(self, file_path, problems):
+        self.file_path = file_path
+        self.problems = problems
+        super().__init__("Invalid .omni file '{}':\n{}".format(os.path.basename(file_path), "\n".join(problems)))
+
+def _describe(value):
+    text = json.dumps(value)
+    return text if len(text) <= 40 else text[:37] + "..."
+
+def _check_number(value):
+    if isinstance(value, bool):
+        return False
+    try:
+        return float(value) > 0
+    except (TypeError, ValueError):
+        return False
+
+def validate(value, schema, location="manifest"):
+    """
+    Checks a decoded manifest against a schema like MANIFEST_SCHEMA.
+
+    Returns:
+    - List of problems, each naming the offending key, empty if the manifest is valid.
+    """
+    if "one_of" in schema:
+        results = [validate(value, option, location) for option in schema["one_of"]]
+        if any(not problems for problems in results):
+            return []
+        # The alternative of the value's type explains best what is wrong
+        typed = [problems for option, problems in zip(schema["one_of"], results)
+                 if isinstance(option["type"], type) and isinstance(value, option["type"])]
+        return (typed or results)[-1]
+    expected = schema["type"]
+    if expected == "number":
+        # Numbers may be written as strings, as in older manifests
+        return [] if _check_number(value) else ["{}: expected a positive number, got {}".format(location, _describe(value))]
+    if expected == "version":
+        if isinstance(value, str) and _VERSION_PATTERN.match(value):
+            return []
+        return ["{}: expected a version like '1.0.0', got {}".format(location, _describe(value))]
+    if expected == "choice":
+        if value in schema["choices"]:
+            return []
+        return ["{}: expected one of {}, got {}".format(location, ", ".join(schema["choices"]), _describe(value))]
+    if not isinstance(value, expected):
+        return ["{}: expected {}, got {}".format(location, {dict: "an object", list: "a list", str: "a string"}[expected], _describe(value))]
+
+    problems = []
+    if expected is dict:
+        for key in schema.get("required", []):
+            if key not in value:
+                problems.append("{}.{}: missing".format(location, key))
+        for key, child_schema in schema.get("properties", {}).items():
+            if key in value:
+                problems.extend(validate(value[key], child_schema, "{}.{}".format(location, key)))
+    elif expected is list and "items" in schema:
+        for index, item in enumerate(value):
+            problems.extend(validate(item, schema["items"], "{}[{}]".format(location, index)))
+    return problems
+
+class AssetInfo:
+    """
+    A file referenced by a manifest, with its stat result or the error that prevented it, and its content hash
+    once a shot record or the scan sharing computed it.
+    """
+
+    def __init__(self, role, path, stat=None, error=None):
+        self.role = role
+        self.path = path
+        self.stat = stat
+        self.error = error
+        self.content_hash = None
+
+    @property
+    def exists(self):
+        return self.stat is not None
+
+    @property
+    def size(self):
+        return self.stat.st_size if self.stat is not None else None
+
+    @property
+    def mtime_ns(self):
+        return self.stat.st_mtime_ns if self.stat is not None else None
+
+def default_import_mode(path):
+    """PLY files are imported as point clouds, everything else as meshes."""
+    return "points" if path.lower().endswith(".ply") else "mesh"
+
+class GeometryEntry:
+    """A geometry file of a manifest: its path, whether it is imported as a mesh or as points and its voxel size."""
+
+    def __init__(self, path, import_as=None, voxel_size=None):
+        self.path = path
+        self.import_as = import_as or default_import_mode(path)
+        self.voxel_size = float(voxel_size) if voxel_size is not None else None
+
+    @property
+    def is_point_cloud(self):
+        return self.import_as == "points"
+
+    @property
+    def role(self):
+        return "points" if self.is_point_cloud else "scan"
+
+class ShotManifest:
+    """The settings and asset paths of a validated .omni manifest."""
+
+    def __init__(self, file_path, data):
+        self.file_path = file_path
+        self.data = data
+        self.directory = os.path.dirname(file_path)
+        shot_data = data.get("data", {})
+        video = shot_data.get("video", {})
+        camera = shot_data.get("camera", {})
+
+        self.minimum_plugin_version = data.get("cinema4d", {}).get("minimum_plugin_version", "0.0.0")
+        self.video_fps = float(video["fps"]) if "fps" in video else None
+        self.camera_fps = float(camera["fps"]) if "fps" in camera else None
+        self.fps = float(video.get("fps", "30"))
+        self.width = int(float(video.get("resolution", {}).get("width", "1920")))
+        self.height = int(float(video.get("resolution", {}).get("height", "1080")))
+
+        self.video_path = self.resolve(video.get("relative_path", ""))
+        self.camera_path = self.resolve(camera.get("relative_path", ""))
+        self.geometry = []
+        for entry in shot_data.get("geometry", {}).get("relative_path", []):
+            geo_path = entry if isinstance(entry, str) else entry["relative_path"]
+            if not geo_path.strip():
+                logger.warning("Gometry path is empty.")
+                continue
+            if isinstance(entry, str):
+                self.geometry.append(GeometryEntry(self.resolve(geo_path)))
+            else:
+                self.geometry.append(GeometryEntry(self.resolve(geo_path), entry.get("import_as"), entry.get("voxel_size")))
+        self.scan_paths = [entry.path for entry in self.geometry if not entry.is_point_cloud]
+        self.point_cloud_paths = [entry.path for entry in self.geometry if entry.is_point_cloud]
+
+    def resolve(self, relative_path):
+        return os.path.join(self.directory, relative_path) if relative_path else None
+
+    def assets(self):
+        """Returns (role, path) of every file the shot references."""
+        assets = []
+        if self.video_path:
+            assets.append(("video", self.video_path))
+        if self.camera_path:
+            assets.append(("camera", self.camera_path))
+        assets.extend((entry.role, entry.path) for entry in self.geometry)
+        return assets
+
+    def geometry_entry(self, path):
+        return next((entry for entry in self.geometry if entry.path == path), None)
+
+    def asset_settings(self, path):
+        """Manifest settings of one asset the objects built from it depend on, None if there are none."""
+        entry = self.geometry_entry(path)
+        if entry is None or not entry.is_point_cloud:
+            return None
+        return {"voxel_size": entry.voxel_size}
+
+def read_manifest(file_path):
+    """
+    Reads and validates a .omni manifest.
+
+    Trailing commas, which some exports contain, are tolerated.
+
+    Raises:
+    - ManifestError listing every problem found.
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            text = file.read()
+    except OSError as e:
+        raise ManifestError(file_path, ["Cannot read the file: {}".format(e)]) from e
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        try:
+            data = json.loads(_TRAILING_COMMA.sub(r"\1", text))
+        except ValueError:
+            raise ManifestError(file_path, ["Not valid JSON: {}".format(e)]) from e
+        logger.warning("'{}' contains trailing commas.".format(file_path))
+
+    problems = validate(data, MANIFEST_SCHEMA)
+    if problems:
+        raise ManifestError(file_path, problems)
+    return ShotManifest(file_path, data)
+
+def _stat_asset(role, path):
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        return AssetInfo(role, path, error=e)
+    if not S_ISREG(stat.st_mode):
+        return AssetInfo(role, path, error=IsADirectoryError("'{}' is not a file".format(path)))
+    return AssetInfo(role, path, stat=stat)
+
+def resolve_assets(manifest):
+    """Stats every asset of a manifest concurrently. Returns a dict of path -> AssetInfo, in manifest order."""
+    assets = manifest.assets()
+    if len(assets) <= 1:
+        return {path: _stat_asset(role, path) for role, path in assets}
+    with ThreadPoolExecutor(max_workers=min(MAX_STAT_WORKERS, len(assets))) as executor:
+        results = list(executor.map(lambda asset: _stat_asset(*asset), assets))
+    return {info.path: info for info in results}
+
+class ShotPreflight:
+    """
+    Outcome of the pre-flight of a shot: its manifest, the stat of every asset, the problems that prevent the
+    import, and how long each stage took.
+    """
+
+    def __init__(self, manifest, assets, problems, timings):
+        self.manifest = manifest
+        self.assets = assets
+        self.problems = problems
+        self.timings = timings
+
+    @property
+    def ok(self):
+        return not self.problems
+
+    def asset(self, path):
+        return self.assets.get(path)
+
+    def format_timings(self):
+        return ", ".join("{} {:.1f} ms".format(stage, seconds * 1000.0) for stage, seconds in self.timings.items())
+
+_MISSING_MESSAGES = {
+    "video": "The video file '{}' needs to be in the same folder as the .omni file.",
+    "camera": "The camera file '{}' needs to be in the same folder as the .omni file.",
+    "scan": "The scan '{}' needs to be in the same folder as the .omni file.",
+    "points": "The point cloud '{}' needs to be in the same folder as the .omni file."
+}
+
+def preflight_shot(file_path):
+    """
+    Reads, validates and resolves a shot before anything in the document is changed.
+
+    Returns:
+    - The ShotPreflight. Its problems list unreadable or invalid manifests and missing assets.
+    """
+    timings = {}
+    start = time.perf_counter()
+    try:
+        with span("manifest"):
+            manifest = read_manifest(file_path)
+    except ManifestError as e:
+        timings["manifest"] = time.perf_counter() - start
+        return ShotPreflight(None, {}, e.problems, timings)
+    timings["manifest"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with span("assets", count=len(manifest.assets())):
+        assets = resolve_assets(manifest)
+    timings["assets"] = time.perf_counter() - start
+
+    problems = [_MISSING_MESSAGES[info.role].format(os.path.basename(info.path)) for info in assets.values() if not info.exists]
+    if manifest.video_path is None:
+        problems.append("The .omni file names no video file.")
+    if manifest.camera_path and not manifest.camera_path.lower().endswith(".abc"):
+        problems.append("The Omniscient importer requires the camera as an Alembic (.abc).")
+    for path in manifest.point_cloud_paths:
+        if not path.lower().endswith((".ply", ".obj")):
+            problems.append("The point cloud '{}' needs to be a PLY or OBJ file.".format(os.path.basename(path)))
+    preflight = ShotPreflight(manifest, assets, problems, timings)
+    logger.info("Pre-flight of {}: {} assets, {}".format(os.path.basename(file_path), len(assets), preflight.format_timings()))
+    return preflight
@@ -0,0 +1,308 @@
+import c4d
+import hashlib
+import json
+import logging
+import os
+import uuid
+from importSession import iter_hierarchy
+from scanCache import session_hash
+
+logger = logging.getLogger(__name__)
+
+# Container ID of the shot record in the scene control tag's data, the tag's plugin ID
+SHOT_RECORD_ID = 1063027
+# Container ID of the asset marker in the data of imported objects and materials, the importer's plugin ID
+ASSET_MARKER_ID = 1063004
+RECORD_VERSION = 1
+
+MARKER_SHOT_ID = 1
+MARKER_ASSET = 2
+MARKER_ROLE = 3
+
+# Videos up to this size are hashed whole, larger ones by evenly spaced blocks
+FULL_HASH_LIMIT = 64 * 1024 * 1024
+_SAMPLE_BLOCKS = 16
+_SAMPLE_BLOCK_SIZE = 1024 * 1024
+
+def fingerprint_hash(path, size):
+    """
+    Returns a content hash of a video for change detection.
+
+    Files above FULL_HASH_LIMIT are hashed by 16 evenly spaced 1 MB blocks and their size, which catches
+    re-encodes without reading gigabytes of video. Scans are hashed whole, see asset_content_hash().
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        if size <= FULL_HASH_LIMIT:
+            for block in iter(lambda: file.read(_SAMPLE_BLOCK_SIZE * 4), b""):
+                digest.update(block)
+        else:
+            digest.update(str(size).encode("ascii"))
+            step = (size - _SAMPLE_BLOCK_SIZE) // (_SAMPLE_BLOCKS - 1)
+            for index in range(_SAMPLE_BLOCKS):
+                file.seek(index * step)
+                digest.update(file.read(_SAMPLE_BLOCK_SIZE))
+    return digest.hexdigest()
+
+def asset_content_hash(asset):
+    """
+    Returns the content hash of a pre-flight's AssetInfo, hashing the file only once per pre-flight.
+
+    The video is hashed by fingerprint_hash(). Every other asset is hashed whole by scanCache.session_hash(),
+    a sampled hash would miss a same-size re-export of a scan.
+    """
+    if asset.content_hash is None:
+        if asset.role == "video":
+            asset.content_hash = fingerprint_hash(asset.path, asset.size)
+        else:
+            asset.content_hash = session_hash(asset.path, asset.stat)
+    return asset.content_hash
+
+class AssetFingerprint:
+    """
+    Path relative to the manifest, size, modification time and content hash of an imported file, and the
+    manifest settings of the asset, see ShotManifest.asset_settings().
+    """
+
+    def __init__(self, path, size, mtime_ns, content_hash, settings=None):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.content_hash = content_hash
+        self.settings = settings
+
+    @classmethod
+    def from_asset(cls, asset, directory, settings=None):
+        """Fingerprints an AssetInfo of a pre-flight, reading the file for its hash."""
+        return cls(relative_asset_path(asset.path, directory), asset.size, asset.mtime_ns, asset_content_hash(asset),
+                   settings)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["path"], data["size"], data["mtime_ns"], data["hash"], data.get("settings"))
+
+    def to_dict(self):
+        data = {"path": self.path, "size": self.size, "mtime_ns": self.mtime_ns, "hash": self.content_hash}
+        if self.settings is not None:
+            data["settings"] = self.settings
+        return data
+
+    def matches(self, asset, directory):
+        """
+        Returns True if the AssetInfo of a pre-flight has the same content.
+
+        The file is only hashed when its size matches but its modification time or path changed.
+        """
+        path = relative_asset_path(asset.path, directory)
+        if not asset.exists or asset.size != self.size:
+            return False
+        if asset.mtime_ns == self.mtime_ns and path == self.path:
+            return True
+        return asset_content_hash(asset) == self.content_hash
+
+def relative_asset_path(path, directory):
+    return os.path.relpath(path, directory).replace(os.sep, "/")
+
+def asset_key(role, path, directory):
+    """Key of an asset in a shot record: the role for the video and camera, role and relative path for geometry."""
+    if role in ("scan", "points"):
+        return role + ":" + relative_asset_path(path, directory)
+    return role
+
+def manifest_settings(manifest):
+    """Manifest settings the imported objects depend on besides the files themselves."""
+    return {"fps": manifest.fps, "video_fps": manifest.video_fps, "camera_fps": manifest.camera_fps,
+            "width": manifest.width, "height": manifest.height}
+
+# Import options that change the objects built from the assets or the files written next to them, reused when the
+# shot is reimported
+RECORDED_OPTIONS = ("scan_loader", "scan_triangle_budget", "position_tolerance", "rotation_tolerance", "video_proxy",
+                    "point_voxel_size", "scan_tile_size", "scan_lod_levels", "scan_sharing",
+                    "camera_export", "scan_memory_budget", "camera_smoothing", "camera_smoothing_window",
+                    "camera_smoothing_cutoff", "camera_outlier_threshold")
+
+def recorded_options(options):
+    return {name: options[name] for name in RECORDED_OPTIONS if options and options.get(name) is not None}
+
+def _normalized_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+class ShotRecord:
+    """
+    What an import created a shot from: the manifest, its settings, the import options the objects were built
+    with and a fingerprint per asset.
+
+    Stored as JSON in the data of the shot's scene control tag. The objects and materials created from each
+    asset carry a marker with the record's shot_id and the asset's key, so a reimport finds them again.
+    """
+
+    def __init__(self, shot_id, manifest_path, settings, fingerprints, options=None):
+        self.shot_id = shot_id
+        self.manifest_path = manifest_path
+        self.settings = settings
+        self.fingerprints = fingerprints
+        self.options = options or {}
+
+    @classmethod
+    def create(cls, preflight, shot_id=None, options=None):
+        """Fingerprints every asset of a successful pre-flight."""
+        manifest = preflight.manifest
+        fingerprints = {}
+        for role, path in manifest.assets():
+            fingerprints[asset_key(role, path, manifest.directory)] = AssetFingerprint.from_asset(
+                preflight.asset(path), manifest.directory, manifest.asset_settings(path))
+        return cls(shot_id or uuid.uuid4().hex, os.path.abspath(manifest.file_path), manifest_settings(manifest), fingerprints,
+                   recorded_options(options))
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        if data.get("version") != RECORD_VERSION:
+            raise ValueError("Unsupported shot record version {}.".format(data.get("version")))
+        fingerprints = {key: AssetFingerprint.from_dict(value) for key, value in data["assets"].items()}
+        return cls(data["shot_id"], data["manifest"], data["settings"], fingerprints, data.get("options"))
+
+    def to_json(self):
+        return json.dumps({"version": RECORD_VERSION, "shot_id": self.shot_id, "manifest": self.manifest_path,
+                           "settings": self.settings, "options": self.options, "assets": {key: value.to_dict() for key, value in self.fingerprints.items()}})
+
+    def is_for(self, manifest_path):
+        return _normalized_path(self.manifest_path) == _normalized_path(manifest_path)
+
+class ShotChanges:
+    """Assets of a shot that were added, removed, changed or kept since it was recorded."""
+
+    def __init__(self, added, removed, changed, unchanged, settings_changed):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.unchanged = unchanged
+        self.settings_changed = settings_changed
+
+    def needs_update(self, key):
+        """Returns True if the objects of an asset must be rebuilt, including video and camera on new settings."""
+        if key in self.changed or key in self.added:
+            return True
+        return self.settings_changed and key in ("video", "camera")
+
+    @property
+    def any(self):
+        return bool(self.added or self.removed or self.changed or self.settings_changed)
+
+    def __str__(self):
+        parts = []
+        for label, keys in (("added", self.added), ("removed", self.removed), ("changed", self.changed), ("unchanged", self.unchanged)):
+            if keys:
+                parts.append("{}: {}".format(label, ", ".join(keys)))
+        if self.settings_changed:
+            parts.append("manifest settings changed")
+        return "; ".join(parts) or "nothing to update"
+
+def compare_shot(record, preflight):
+    """Compares a ShotRecord against the pre-flight of the shot's current manifest. Returns the ShotChanges."""
+    manifest = preflight.manifest
+    current = {asset_key(role, path, manifest.directory): path for role, path in manifest.assets()}
+    added, changed, unchanged = [], [], []
+    for key, path in current.items():
+        fingerprint = record.fingerprints.get(key)
+        if fingerprint is None:
+            added.append(key)
+        elif fingerprint.settings == manifest.asset_settings(path) and fingerprint.matches(preflight.asset(path), manifest.directory):
+            unchanged.append(key)
+        else:
+            changed.append(key)
+    removed = [key for key in record.fingerprints if key not in current]
+    return ShotChanges(added, removed, changed, unchanged, record.settings != manifest_settings(manifest))
+
+def mark_node(node, shot_id="", key="", role=""):
+    """Stores the shot, asset key and role of an imported object or material in its data."""
+    marker = c4d.BaseContainer()
+    marker.SetString(MARKER_SHOT_ID, shot_id)
+    marker.SetString(MARKER_ASSET, key)
+    marker.SetString(MARKER_ROLE, role)
+    node.GetDataInstance().SetContainer(ASSET_MARKER_ID, marker)
+
+def read_marker(node):
+    """Returns (shot_id, asset key, role) of a marked node, or None."""
+    marker = node.GetDataInstance().GetContainerInstance(ASSET_MARKER_ID)
+    if marker is None:
+        return None
+    return marker.GetString(MARKER_SHOT_ID), marker.GetString(MARKER_ASSET), marker.GetString(MARKER_ROLE)
+
+def write_record(tag, record):
+    tag.GetDataInstance().SetString(SHOT_RECORD_ID, record.to_json())
+
+def read_record(tag):
+    """Returns the ShotRecord stored in a scene control tag, or None."""
+    text = tag.GetDataInstance().GetString(SHOT_RECORD_ID)
+    if not text:
+        return None
+    try:
+        return ShotRecord.from_json(text)
+    except (ValueError, KeyError) as e:
+        logger.warning("Ignoring the unreadable shot record of '{}': {}".format(tag.GetName(), e))
+        return None
+
+def iter_document_objects(doc):
+    obj = doc.GetFirstObject()
+    while obj is not None:
+        for descendant in iter_hierarchy(obj):
+            yield descendant
+        obj = obj.GetNext()
+
+def find_shot_tag(doc, manifest_path, tag_type):
+    """Returns (tag, ShotRecord) of the shot imported from a manifest, or (None, None)."""
+    for obj in iter_document_objects(doc):
+        for tag in obj.GetTags():
+            if tag.GetType() != tag_type:
+                continue
+            record = read_record(tag)
+            if record is not None and record.is_for(manifest_path):
+                return tag, record
+    return None, None
+
+def find_shot_nodes(doc, shot_id):
+    """
+    Returns the objects and materials created for a shot, as a dict of asset key -> nodes.
+
+    Only top-level nodes of each asset are returned, not the children of marked objects.
+    """
+    nodes = {}
+    for obj in iter_document_objects(doc):
+        marker = read_marker(obj)
+        if marker is not None and marker[0] == shot_id:
+            nodes.setdefault(marker[1], []).append(obj)
+    material = doc.GetFirstMaterial()
+    while material is not None:
+        marker = read_marker(material)
+        if marker is not None and marker[0] == shot_id:
+            nodes.setdefault(marker[1], []).append(material)
+        material = material.GetNext()
+    return nodes
+
+def record_shot(session, preflight, tag, shot_id=None, options=None):
+    """
+    Fingerprints a shot's assets, marks what the ImportSession created from each and stores the record in tag.
+
+    Parameters:
+    - session: The ImportSession of the import, or of the reimport with only the rebuilt nodes.
+    - preflight: The successful ShotPreflight of the manifest.
+    - tag: The shot's scene control tag.
+    - shot_id: The ID of an existing record to update, a new one is created when None.
+    - options: The import options the shot was built with, see RECORDED_OPTIONS.
+
+    Returns:
+    - The ShotRecord.
+    """
+    record = ShotRecord.create(preflight, shot_id, options)
+    manifest = preflight.manifest
+    roles = {path: role for role, path in manifest.assets()}
+    for path, nodes in session.assets.items():
+        role = roles.get(path)
+        if role is None:
+            continue
+        key = asset_key(role, path, manifest.directory)
+        for node in nodes:
+            mark_node(node, record.shot_id, key, role)
+    write_record(tag, record)
+    return record
@@ -0,0 +1,246 @@
+import c4d
+import logging
+import math
+from bisect import bisect_left
+from importRunner import ImportProgress, run_steps
+from importTrace import count
+
+logger = logging.getLogger(__name__)
+
+VECTOR_COMPONENTS = "xyz"
+# Frames whose keys are written between the import steps of a bake
+FRAMES_PER_STEP = 100
+
+class TrackReport:
+    """Key statistics of one written track."""
+
+    def __init__(self, name, source_keys, written_keys, max_deviation):
+        self.name = name
+        self.source_keys = source_keys
+        self.written_keys = written_keys
+        self.max_deviation = max_deviation
+
+    @property
+    def reduction_ratio(self):
+        """Fraction of the source keys that were dropped by simplification."""
+        if not self.source_keys:
+            return 0.0
+        return 1.0 - float(self.written_keys) / self.source_keys
+
+    def __str__(self):
+        return "{}: {} -> {} keys ({:.1%} fewer), max deviation {:.6g}".format(
+            self.name, self.source_keys, self.written_keys, self.reduction_ratio, self.max_deviation)
+
+def get_component_curve(obj, tracks, desc_id, component):
+    """Returns the curve animating one component of a vector parameter, creating its track on first use."""
+    key = (desc_id, component)
+    if key not in tracks:
+        vector_id = c4d.DescLevel(desc_id, c4d.DTYPE_VECTOR, 0)
+        real_id = c4d.DescLevel(component + 1000, c4d.DTYPE_REAL, 0)
+        track = c4d.CTrack(obj, c4d.DescID(vector_id, real_id))
+        obj.InsertTrackSorted(track)
+        tracks[key] = track.GetCurve()
+    return tracks[key]
+
+def get_parameter_curve(obj, param_id, dtype=c4d.DTYPE_REAL):
+    """Returns the curve of a new track animating a single real parameter."""
+    track = c4d.CTrack(obj, c4d.DescID(c4d.DescLevel(param_id, dtype, 0)))
+    obj.InsertTrackSorted(track)
+    return track.GetCurve()
+
+def simplify_indices(times, components, tolerance, euclidean=True):
+    """
+    Ramer-Douglas-Peucker simplification of a sampled curve against linear interpolation in time.
+
+    Parameters:
+    - times: Sample times, strictly increasing.
+    - components: Sequences of values sharing the key times (e.g. the x, y and z of a position).
+    - tolerance: Largest allowed deviation between a dropped sample and the interpolated curve.
+    - euclidean: Measure the deviation as the Euclidean distance over all components when True,
+      otherwise as the largest per-component deviation.
+
+    Returns:
+    - Sorted list of the indices to keep. The first and last sample are always kept.
+    """
+    sample_count = len(times)
+    if sample_count <= 2 or not tolerance or tolerance <= 0:
+        return list(range(sample_count))
+
+    keep = bytearray(sample_count)
+    keep[0] = keep[sample_count - 1] = 1
+    limit = tolerance * tolerance if euclidean else tolerance
+    stack = [(0, sample_count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start_time = times[first]
+        duration = times[last] - start_time
+        starts = [values[first] for values in components]
+        deltas = [values[last] - values[first] for values in components]
+        pairs = list(zip(components, starts, deltas))
+
+        worst_index = -1
+        worst_error = limit
+        for index in range(first + 1, last):
+            fraction = (times[index] - start_time) / duration
+            if euclidean:
+                error = 0.0
+                for values, start, delta in pairs:
+                    difference = start + delta * fraction - values[index]
+                    error += difference * difference
+            else:
+                error = max(abs(start + delta * fraction - values[index]) for values, start, delta in pairs)
+            if error > worst_error:
+                worst_error = error
+                worst_index = index
+
+        if worst_index >= 0:
+            keep[worst_index] = 1
+            stack.append((first, worst_index))
+            stack.append((worst_index, last))
+    return [index for index in range(sample_count) if keep[index]]
+
+def max_deviation(times, values, indices):
+    """Returns the largest deviation between the samples and the linear curve through the kept indices."""
+    deviation = 0.0
+    for first, last in zip(indices, indices[1:]):
+        start_time = times[first]
+        duration = times[last] - start_time
+        start = values[first]
+        delta = values[last] - start
+        for index in range(first + 1, last):
+            error = abs(start + delta * (times[index] - start_time) / duration - values[index])
+            if error > deviation:
+                deviation = error
+    return deviation
+
+def write_curve_keys(curve, base_times, values, indices=None, interpolation=c4d.CINTERPOLATION_LINEAR):
+    """
+    Writes keys to a curve, after the keys it already holds.
+
+    AddKey() gives keys the interpolation Cinema 4D uses for new keys. The first written key tells whether that
+    differs from interpolation, only then is the interpolation set key by key.
+
+    Parameters:
+    - curve: The CCurve to fill.
+    - base_times: BaseTime per sample, shared by all curves of a bake.
+    - values: Value per sample.
+    - indices: Optional indices of the samples to write, all samples when None.
+    - interpolation: Interpolation of the written keys.
+
+    Returns:
+    - The number of keys written.
+    """
+    if indices is None:
+        indices = range(len(values))
+
+    written = 0
+    set_interpolation = None
+    for index in indices:
+        # The whole track is covered by the undo of the object it belongs to
+        key_dict = curve.AddKey(base_times[index], False)
+        if key_dict is None:
+            raise MemoryError("Failed to create a key")
+        key = key_dict["key"]
+        key.SetValue(curve, values[index])
+        if set_interpolation is None:
+            set_interpolation = key.GetInterpolation() != interpolation
+        if set_interpolation:
+            key.SetInterpolation(curve, interpolation)
+        written += 1
+    count("keys written", written)
+    return written
+
+def iter_write_curves(curves, base_times):
+    """
+    Import step writing the keys of several curves sharing their frames, FRAMES_PER_STEP frames of every curve at
+    a time, yielding an ImportProgress after each.
+
+    Parameters:
+    - curves: Tuple of a CCurve, its values and its optional sorted indices to write per curve, see write_curve_keys().
+    - base_times: BaseTime per sample.
+
+    Returns:
+    - The number of keys written per curve.
+    """
+    frame_count = len(base_times)
+    positions = [0] * len(curves)
+    written = [0] * len(curves)
+    for start in range(0, frame_count, FRAMES_PER_STEP):
+        stop = min(start + FRAMES_PER_STEP, frame_count)
+        for number, (curve, values, indices) in enumerate(curves):
+            if indices is None:
+                indices = range(len(values))
+            end = bisect_left(indices, stop, positions[number])
+            written[number] += write_curve_keys(curve, base_times, values, indices[positions[number]:end])
+            positions[number] = end
+        yield ImportProgress("Writing frame {} of {}".format(stop, frame_count), float(stop) / frame_count)
+    return written
+
+def vector_track_curves(obj, tracks, desc_id, times, components, tolerance=None, euclidean=True):
+    """
+    Returns the curve, values and indices to write per component track of a vector parameter, see
+    iter_write_curves(). With a tolerance, the components are simplified as one curve.
+    """
+    indices = simplify_indices(times, components, tolerance, euclidean) if tolerance else None
+    return [(get_component_curve(obj, tracks, desc_id, component), values, indices)
+            for component, values in enumerate(components)]
+
+def vector_track_reports(name, times, curves, written):
+    """Returns a TrackReport per component track written from vector_track_curves()."""
+    reports = []
+    for component, ((curve, values, indices), keys) in enumerate(zip(curves, written)):
+        deviation = max_deviation(times, values, indices) if indices is not None else 0.0
+        reports.append(TrackReport("{}.{}".format(name, VECTOR_COMPONENTS[component]), len(values), keys, deviation))
+    return reports
+
+def write_vector_tracks(obj, tracks, desc_id, name, base_times, times, components, tolerance=None, euclidean=True):
+    """
+    Writes the three component tracks of a vector parameter, optionally simplified as one curve.
+
+    Returns:
+    - A TrackReport per component.
+    """
+    curves = vector_track_curves(obj, tracks, desc_id, times, components, tolerance, euclidean)
+    return vector_track_reports(name, times, curves, run_steps(iter_write_curves(curves, base_times)))
+
+def write_transform_tracks(doc, obj, frames, positions, rotations, position_tolerance=None, rotation_tolerance=None):
+    """
+    Writes baked position and rotation tracks to an object in bulk.
+
+    Parameters:
+    - doc: The document the object belongs to.
+    - obj: The object receiving the tracks.
+    - frames: Document frame per sample.
+    - positions: Three sequences holding the x, y and z position per sample.
+    - rotations: Three sequences holding the heading, pitch and bank in radians per sample.
+    - position_tolerance: Optional largest positional error in document units allowed when dropping keys.
+    - rotation_tolerance: Optional largest angular error in degrees allowed when dropping keys.
+
+    Returns:
+    - List of TrackReport, one per written track.
+    """
+    return run_steps(iter_write_transform_tracks(doc, obj, frames, positions, rotations,
+                                                 position_tolerance=position_tolerance,
+                                                 rotation_tolerance=rotation_tolerance))
+
+def iter_write_transform_tracks(doc, obj, frames, positions, rotations, position_tolerance=None, rotation_tolerance=None):
+    """Import step writing baked position and rotation tracks, see write_transform_tracks() and iter_write_curves()."""
+    fps = doc.GetFps()
+    base_times = [c4d.BaseTime(frame, fps) for frame in frames]
+    times = [float(frame) / fps for frame in frames]
+    angle_tolerance = math.radians(rotation_tolerance) if rotation_tolerance else None
+
+    tracks = {}
+    position_curves = vector_track_curves(obj, tracks, c4d.ID_BASEOBJECT_POSITION, times, positions,
+                                          position_tolerance, euclidean=True)
+    rotation_curves = vector_track_curves(obj, tracks, c4d.ID_BASEOBJECT_ROTATION, times, rotations,
+                                          angle_tolerance, euclidean=False)
+    written = yield from iter_write_curves(position_curves + rotation_curves, base_times)
+    reports = vector_track_reports("Position", times, position_curves, written[:3])
+    reports += vector_track_reports("Rotation", times, rotation_curves, written[3:])
+
+    for report in reports:
+        logger.info(str(report))
+    return reports
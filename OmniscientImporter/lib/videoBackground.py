@@ -1,20 +1,31 @@
 import c4d
 import os
 import logging
+from videoProbe import MovieInfo, probe_movie
+from videoProxy import forget_proxy
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def get_movie_info(video_path: str):
     """
-    Uses Cinema 4D's MovieLoader to get frame count and fps of a movie file.
-    
+    Gets frame count and fps of a movie file.
+
+    The values are read from the container headers when possible, Cinema 4D's MovieLoader is only opened when
+    that fails. Results are memoized per file, so repeated calls within and across imports probe once.
+
     Parameters:
     - video_path: The path to the video file.
     
     Returns:
     - Tuple of frame count and fps if successful, None otherwise.
     """
+    info = probe_movie(video_path, fallback=load_movie_info)
+    if info is None:
+        return None
+    return info.frame_count, info.fps
+
+def load_movie_info(video_path: str):
+    """Uses Cinema 4D's MovieLoader to get the MovieInfo of a movie file, None if it cannot be opened."""
     ml = c4d.bitmaps.MovieLoader()
     if not ml.Open(video_path):
         logger.error("Failed to open video file: {}".format(video_path))
@@ -22,7 +33,7 @@ def get_movie_info(video_path: str):
     
     frame_count, fps = ml.GetInfo()
     ml.Close()
-    return frame_count, fps
+    return MovieInfo(frame_count, fps, frame_count / fps if fps else 0.0, source="MovieLoader")
 
 def calculate_and_set_frame_range(shader: c4d.BaseShader, video_path: str, doc: c4d.documents.BaseDocument):
     """
@@ -58,12 +69,14 @@ def calculate_and_set_frame_range(shader: c4d.BaseShader, video_path: str, doc:
     # Set the shader fps to match the video fps
     shader[c4d.BITMAPSHADER_TIMING_FPS] = fps
 
-def create_background_with_video_material(doc, video_path: str):
+def create_background_with_video_material(doc, video_path: str, session=None):
     # First, create the video material
     material = create_video_material(video_path, doc)
     if material is None:
         logger.error("Failed to create material from video.")
         return False
+    if session is not None:
+        session.record_material(material, asset=video_path)
 
     # Now create the background object and apply the material
     background = c4d.BaseObject(c4d.Obackground)
@@ -81,6 +94,9 @@ def create_background_with_video_material(doc, video_path: str):
     background.InsertTag(textureTag)
     background.SetName('Background_Omni')
     doc.InsertObject(background)
+    doc.AddUndo(c4d.UNDOTYPE_NEW, background)
+    if session is not None:
+        session.record_object(background, "background", asset=video_path)
     c4d.EventAdd()
 
     return True
@@ -121,6 +137,29 @@ def create_video_material(video_path: str, doc: c4d.documents.BaseDocument):
     mat.SetParameter(c4d.MATERIAL_CAUSTICS_RECEIVE, False, c4d.DESCFLAGS_SET_0)
 
     doc.InsertMaterial(mat)
+    doc.AddUndo(c4d.UNDOTYPE_NEW, mat)
     c4d.EventAdd()
 
-    return mat
\ No newline at end of file
+    return mat
+
+def update_video_material(material, video_path: str, doc: c4d.documents.BaseDocument):
+    """
+    Points an existing video material at another video, so the material and every link to it are kept.
+
+    Returns:
+    - True if the material was updated, False if it has no video shader.
+    """
+    shader = material[c4d.MATERIAL_LUMINANCE_SHADER]
+    if shader is None or shader.GetType() != c4d.Xbitmap:
+        return False
+
+    doc.AddUndo(c4d.UNDOTYPE_CHANGE, material)
+    doc.AddUndo(c4d.UNDOTYPE_CHANGE, shader)
+    forget_proxy(material)
+    material.SetName("Omni_{}".format(os.path.basename(video_path)))
+    shader[c4d.BITMAPSHADER_FILENAME] = video_path
+    calculate_and_set_frame_range(shader, video_path, doc)
+    material.Message(c4d.MSG_UPDATE)
+    c4d.EventAdd()
+
+    return True
@@ -0,0 +1,198 @@
+import logging
+import os
+import struct
+from importTrace import count, span
+
+logger = logging.getLogger(__name__)
+
+_HEADER_SIZE = 8
+
+_probe_cache = {}
+
+class MovieProbeError(Exception):
+    """Raised when a movie's container headers cannot be read."""
+
+class MovieInfo:
+    """Frame count, frame rate, duration in seconds and resolution of a movie."""
+
+    def __init__(self, frame_count, fps, duration, width=None, height=None, source="header"):
+        self.frame_count = frame_count
+        self.fps = fps
+        self.duration = duration
+        self.width = width
+        self.height = height
+        self.source = source
+
+    def __repr__(self):
+        return "MovieInfo({} frames, {:.3f} fps, {:.3f} s, {}x{}, from {})".format(
+            self.frame_count, self.fps, self.duration, self.width, self.height, self.source)
+
+def _iter_atoms(data, start=0, end=None):
+    """Yields (type, payload start, payload end) of the atoms in data[start:end]."""
+    end = len(data) if end is None else end
+    offset = start
+    while offset + _HEADER_SIZE <= end:
+        size, kind = struct.unpack_from(">I4s", data, offset)
+        header = _HEADER_SIZE
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            raise MovieProbeError("Atom '{}' overruns its parent.".format(kind.decode("latin-1")))
+        yield kind, offset + header, offset + size
+        offset += size
+
+def _find_atom(data, kind, start=0, end=None):
+    for atom, payload_start, payload_end in _iter_atoms(data, start, end):
+        if atom == kind:
+            return payload_start, payload_end
+    return None
+
+def read_moov(file_path):
+    """Returns the content of the top-level 'moov' atom, seeking over the media data instead of reading it."""
+    with open(file_path, "rb") as file:
+        file_size = os.fstat(file.fileno()).st_size
+        offset = 0
+        while offset + _HEADER_SIZE <= file_size:
+            file.seek(offset)
+            header = file.read(16)
+            size, kind = struct.unpack_from(">I4s", header)
+            header_size = _HEADER_SIZE
+            if size == 1:
+                size = struct.unpack_from(">Q", header, 8)[0]
+                header_size = 16
+            elif size == 0:
+                size = file_size - offset
+            if size < header_size:
+                raise MovieProbeError("Invalid atom size at offset {}.".format(offset))
+            if kind == b"moov":
+                file.seek(offset + header_size)
+                data = file.read(size - header_size)
+                count("bytes read", len(data))
+                return data
+            offset += size
+    raise MovieProbeError("No 'moov' atom found in '{}'.".format(file_path))
+
+def _media_header(data, start, end):
+    """Returns (timescale, duration) of an 'mdhd' or 'mvhd' atom."""
+    version = data[start]
+    if version == 1:
+        timescale, duration = struct.unpack_from(">IQ", data, start + 20)
+    else:
+        timescale, duration = struct.unpack_from(">II", data, start + 12)
+    return timescale, duration
+
+def _track_size(data, start, end):
+    """Returns the (width, height) stored as 16.16 fixed point at the end of a 'tkhd' atom."""
+    width, height = struct.unpack_from(">II", data, end - 8)
+    return width >> 16, height >> 16
+
+def _sample_entry_size(data, start, end):
+    """Returns the (width, height) of the first visual sample entry of an 'stsd' atom, or None."""
+    if end - start < 8 + 36:
+        return None
+    # Full atom header, entry count, entry size and format, then the visual sample entry fields
+    width, height = struct.unpack_from(">HH", data, start + 8 + 8 + 24)
+    return width, height
+
+def _sample_durations(data, start, end):
+    """Returns the (sample count, sample delta) runs of an 'stts' atom."""
+    entry_count = struct.unpack_from(">I", data, start + 4)[0]
+    if start + 8 + entry_count * 8 > end:
+        raise MovieProbeError("Truncated 'stts' atom.")
+    values = struct.unpack_from(">{}I".format(entry_count * 2), data, start + 8)
+    return list(zip(values[0::2], values[1::2]))
+
+def _video_track(data, start, end):
+    """Returns the metadata atoms of a 'trak' if it is a video track, otherwise None."""
+    mdia = _find_atom(data, b"mdia", start, end)
+    if mdia is None:
+        return None
+    hdlr = _find_atom(data, b"hdlr", *mdia)
+    if hdlr is None or data[hdlr[0] + 8:hdlr[0] + 12] != b"vide":
+        return None
+    atoms = {b"tkhd": _find_atom(data, b"tkhd", start, end), b"mdhd": _find_atom(data, b"mdhd", *mdia)}
+    minf = _find_atom(data, b"minf", *mdia)
+    stbl = _find_atom(data, b"stbl", *minf) if minf is not None else None
+    if stbl is not None:
+        atoms[b"stts"] = _find_atom(data, b"stts", *stbl)
+        atoms[b"stsd"] = _find_atom(data, b"stsd", *stbl)
+    return atoms
+
+def probe_movie_header(file_path):
+    """
+    Reads the frame count, frame rate, duration and resolution of a QuickTime or MP4 movie from its 'moov'
+    atom, without opening a decoder.
+
+    Raises:
+    - MovieProbeError if the container has no readable video track.
+    """
+    try:
+        moov = read_moov(file_path)
+    except (OSError, struct.error) as e:
+        raise MovieProbeError("Failed to read '{}': {}".format(file_path, e)) from e
+
+    try:
+        for kind, start, end in _iter_atoms(moov):
+            if kind != b"trak":
+                continue
+            atoms = _video_track(moov, start, end)
+            if atoms is None or atoms.get(b"stts") is None or atoms.get(b"mdhd") is None:
+                continue
+
+            timescale, media_duration = _media_header(moov, *atoms[b"mdhd"])
+            runs = _sample_durations(moov, *atoms[b"stts"])
+            frame_count = sum(count for count, _ in runs)
+            if not timescale or not frame_count:
+                continue
+            deltas = {delta for count, delta in runs if count}
+            if len(deltas) == 1:
+                # Constant frame rate, exact even for rates like 24000/1001
+                fps = timescale / float(deltas.pop())
+            else:
+                fps = frame_count * timescale / float(media_duration)
+
+            size = None
+            if atoms.get(b"stsd") is not None:
+                size = _sample_entry_size(moov, *atoms[b"stsd"])
+            if not size or not all(size):
+                size = _track_size(moov, *atoms[b"tkhd"]) if atoms.get(b"tkhd") is not None else (None, None)
+            return MovieInfo(frame_count, fps, media_duration / float(timescale), size[0], size[1])
+    except (struct.error, IndexError, ZeroDivisionError) as e:
+        raise MovieProbeError("Malformed movie header in '{}': {}".format(file_path, e)) from e
+    raise MovieProbeError("No video track found in '{}'.".format(file_path))
+
+def probe_movie(file_path, fallback=None):
+    """
+    Returns the MovieInfo of a movie, memoized per path, size and modification time.
+
+    The container headers are read first. fallback is called with the path when they cannot be read and must
+    return a MovieInfo or None.
+
+    Returns:
+    - The MovieInfo, or None if neither the headers nor the fallback could describe the movie.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError as e:
+        logger.error("Failed to access video file {}: {}".format(file_path, e))
+        return None
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if key in _probe_cache:
+        return _probe_cache[key]
+
+    with span("video probe", file=os.path.basename(file_path)) as probe_span:
+        try:
+            info = probe_movie_header(file_path)
+        except MovieProbeError as e:
+            logger.info("Movie header probe failed, falling back to the decoder: {}".format(e))
+            probe_span.set(fallback=True)
+            info = fallback(file_path) if fallback is not None else None
+    if info is not None:
+        _probe_cache[key] = info
+    return info
+
+def clear_probe_cache():
+    _probe_cache.clear()
@@ -0,0 +1,449 @@
+import c4d
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from OmniscientMessage import VIDEO_PROXY_EVENT_ID
+from scanCache import default_cache_directory
+from shotRecord import fingerprint_hash
+
+logger = logging.getLogger(__name__)
+
+# Environment variable pointing at an ffmpeg executable, otherwise ffmpeg is looked up on the PATH
+FFMPEG_ENV = "OMNISCIENT_FFMPEG"
+# Container ID of the original and proxy paths in the data of a video material, the message plugin's ID
+PROXY_DATA_ID = 1063029
+PROXY_ORIGINAL_PATH = 1
+PROXY_FRAMES_PATH = 2
+
+# Bump whenever the proxy layout or encoding changes, older proxies are then generated again
+PROXY_VERSION = 1
+DEFAULT_PROXY_WIDTH = 960
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024 * 1024
+FRAME_PATTERN = "frame_%05d.jpg"
+PROXY_INFO_NAME = "proxy.json"
+JPEG_QUALITY = 80
+
+_PROGRESS_INTERVAL = 0.25
+
+def proxy_cache_directory():
+    """Returns the per-user directory of the video proxies, next to the scan cache."""
+    return os.path.join(os.path.dirname(default_cache_directory()), "video_proxies")
+
+def find_ffmpeg():
+    """Returns the ffmpeg executable from OMNISCIENT_FFMPEG or the PATH, or None."""
+    executable = os.environ.get(FFMPEG_ENV)
+    if executable and os.path.isfile(executable):
+        return executable
+    return shutil.which("ffmpeg")
+
+def proxy_width(option, video_width):
+    """
+    Returns the width of the proxy requested by the video_proxy import option, or None when no proxy is needed.
+
+    option is True for the default width or a width in pixels. Videos no wider than that are used as they are.
+    """
+    if not option:
+        return None
+    width = DEFAULT_PROXY_WIDTH if option is True else int(option)
+    if video_width and video_width <= width:
+        return None
+    # Even, so the height of the downscaled frames stays even for the encoder
+    return width - width % 2
+
+class VideoProxy:
+    """A downscaled JPEG sequence of a video, one image per video frame, numbered from 0."""
+
+    def __init__(self, directory, frame_count, width, height):
+        self.directory = directory
+        self.frame_count = frame_count
+        self.width = width
+        self.height = height
+
+    @property
+    def first_frame(self):
+        return os.path.join(self.directory, FRAME_PATTERN % 0)
+
+    @classmethod
+    def load(cls, directory):
+        """Returns the complete proxy in a directory, or None."""
+        try:
+            with open(os.path.join(directory, PROXY_INFO_NAME), "r") as file:
+                info = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if info.get("version") != PROXY_VERSION:
+            return None
+        return cls(directory, info["frames"], info["width"], info["height"])
+
+    def save(self, source):
+        info = {"version": PROXY_VERSION, "frames": self.frame_count, "width": self.width, "height": self.height,
+                "source": source}
+        with open(os.path.join(self.directory, PROXY_INFO_NAME), "w") as file:
+            json.dump(info, file)
+
+class VideoProxyCache:
+    """
+    Persistent cache of video proxies.
+
+    Each proxy is a directory keyed by the video's content hash and the proxy width, holding the frames and a
+    proxy.json written last, so only complete proxies are found. The least recently used proxies are evicted
+    above max_bytes.
+
+    Parameters:
+    - directory: Cache directory, defaults to the per-user cache directory.
+    - max_bytes: Size cap of all proxies together.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or proxy_cache_directory()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def proxy_directory(self, video_path, width):
+        content_hash = fingerprint_hash(video_path, os.path.getsize(video_path))
+        return os.path.join(self.directory, "{}-{}-v{}".format(content_hash, width, PROXY_VERSION))
+
+    def load(self, proxy_directory):
+        """Returns the cached VideoProxy of a directory, or None on a miss."""
+        proxy = VideoProxy.load(proxy_directory)
+        if proxy is not None:
+            # The modification time doubles as the last use for LRU eviction
+            try:
+                os.utime(proxy_directory, None)
+            except OSError:
+                pass
+        return proxy
+
+    def entries(self):
+        """Returns (path, size, last use) of every proxy, least recently used first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp") or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+                entries.append((path, size, os.stat(path).st_mtime))
+            except OSError:
+                continue
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def evict(self, keep=None):
+        """Removes least recently used proxies, except keep, until the cache fits max_bytes. Returns the bytes freed."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for path, size, _ in entries:
+            if total - freed <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            freed += size
+        if freed:
+            logger.info("Evicted {:.1f} MB of video proxies.".format(freed / 1024.0 / 1024.0))
+        return freed
+
+class ProxyCancelled(Exception):
+    pass
+
+def jpeg_size(path):
+    """Returns (width, height) of a JPEG file from its frame header, or None."""
+    with open(path, "rb") as file:
+        if file.read(2) != b"\xff\xd8":
+            return None
+        while True:
+            marker = file.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            length = int.from_bytes(file.read(2), "big")
+            # Start of frame markers, except DHT (C4), JPG (C8) and DAC (CC)
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                header = file.read(5)
+                return int.from_bytes(header[3:5], "big"), int.from_bytes(header[1:3], "big")
+            file.seek(length - 2, os.SEEK_CUR)
+
+def _frame_count_from_progress(line):
+    # ffmpeg -progress writes key=value lines, frame=N after every batch of frames
+    if line.startswith("frame="):
+        try:
+            return int(line[6:])
+        except ValueError:
+            return None
+    return None
+
+def decode_with_ffmpeg(executable, video_path, output_directory, width, frame_count, progress, cancelled):
+    """Decodes every frame of a video into a downscaled JPEG sequence with ffmpeg. Returns (frames, width, height)."""
+    command = [executable, "-nostdin", "-v", "error", "-progress", "pipe:1", "-i", video_path,
+               "-vf", "scale={}:-2".format(width), "-vsync", "0", "-q:v", "4", "-start_number", "0",
+               os.path.join(output_directory, FRAME_PATTERN)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    try:
+        for line in process.stdout:
+            if cancelled.is_set():
+                raise ProxyCancelled()
+            frames = _frame_count_from_progress(line.strip())
+            if frames is not None and frame_count:
+                progress(min(1.0, frames / float(frame_count)))
+        errors = process.stderr.read()
+        if process.wait() != 0:
+            raise RuntimeError("ffmpeg failed: {}".format(errors.strip() or process.returncode))
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    frames = len([name for name in os.listdir(output_directory) if name.endswith(".jpg")])
+    size = jpeg_size(os.path.join(output_directory, FRAME_PATTERN % 0)) if frames else None
+    if size is None:
+        raise RuntimeError("ffmpeg wrote no readable frames.")
+    return (frames,) + size
+
+def decode_with_movie_loader(video_path, output_directory, width, frame_count, progress, cancelled):
+    """Decodes every frame of a video into a downscaled JPEG sequence with Cinema 4D's MovieLoader."""
+    loader = c4d.bitmaps.MovieLoader()
+    if not loader.Open(video_path):
+        raise RuntimeError("Cinema 4D can't open the video.")
+    try:
+        frame_count, _ = loader.GetInfo()
+        settings = c4d.BaseContainer()
+        settings[c4d.JPGSAVER_QUALITY] = JPEG_QUALITY
+        scaled = None
+        for frame in range(frame_count):
+            if cancelled.is_set():
+                raise ProxyCancelled()
+            result, bitmap = loader.Read(frame)
+            if result != c4d.IMAGERESULT_OK or bitmap is None:
+                raise RuntimeError("Failed to read frame {}.".format(frame))
+            if scaled is None:
+                height = max(2, int(round(bitmap.GetBh() * width / float(bitmap.GetBw()) / 2.0)) * 2)
+                scaled = c4d.bitmaps.BaseBitmap()
+                scaled.Init(width, height)
+            bitmap.ScaleIt(scaled, 256, True, False)
+            path = os.path.join(output_directory, FRAME_PATTERN % frame)
+            if scaled.Save(path, c4d.FILTER_JPG, settings) != c4d.IMAGERESULT_OK:
+                raise RuntimeError("Failed to write '{}'.".format(path))
+            progress((frame + 1) / float(frame_count))
+    finally:
+        loader.Close()
+    if scaled is None:
+        raise RuntimeError("The video has no frames.")
+    return frame_count, scaled.GetBw(), scaled.GetBh()
+
+def generate_proxy(video_path, proxy_directory, width, frame_count=None, progress=None, cancelled=None):
+    """
+    Decodes a video into a VideoProxy in proxy_directory, atomically.
+
+    Frames are decoded with ffmpeg when it is available and with Cinema 4D's MovieLoader otherwise, into a
+    temporary directory that is renamed once complete.
+
+    Parameters:
+    - video_path: The path to the video file.
+    - proxy_directory: The directory of the proxy, see VideoProxyCache.proxy_directory().
+    - width: The width of the proxy frames in pixels.
+    - frame_count: Optional frame count of the video, for the progress of ffmpeg.
+    - progress: Optional function called with the completed fraction.
+    - cancelled: Optional threading.Event stopping the decoding when set.
+
+    Returns:
+    - The VideoProxy.
+    """
+    progress = progress or (lambda fraction: None)
+    cancelled = cancelled or threading.Event()
+    temporary_directory = "{}.{}.{}.tmp".format(proxy_directory, os.getpid(), threading.get_ident())
+    os.makedirs(temporary_directory)
+    try:
+        executable = find_ffmpeg()
+        if executable is not None:
+            frames, proxy_width, proxy_height = decode_with_ffmpeg(executable, video_path, temporary_directory, width,
+                                                                   frame_count, progress, cancelled)
+        else:
+            frames, proxy_width, proxy_height = decode_with_movie_loader(video_path, temporary_directory, width,
+                                                                         frame_count, progress, cancelled)
+        VideoProxy(temporary_directory, frames, proxy_width, proxy_height).save(os.path.basename(video_path))
+        try:
+            os.rename(temporary_directory, proxy_directory)
+        except OSError:
+            # Another import finished the same proxy first
+            if VideoProxy.load(proxy_directory) is None:
+                raise
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(temporary_directory, ignore_errors=True)
+        raise
+    return VideoProxy.load(proxy_directory)
+
+class VideoProxyJob(threading.Thread):
+    """
+    Generates the proxy of a video material in the background, or finds it in the cache.
+
+    Progress and completion are announced with a VIDEO_PROXY_EVENT_ID core message, on which the main thread
+    calls update_video_proxies() to show the progress and switch finished materials to their proxy.
+    """
+
+    def __init__(self, material, video_path, width, frame_count=None, cache=None):
+        super().__init__(name="Omniscient video proxy", daemon=True)
+        self.material = material
+        self.video_path = video_path
+        self.width = width
+        self.frame_count = frame_count
+        self.cache = cache or VideoProxyCache()
+        self.progress = 0.0
+        self.proxy = None
+        self.error = None
+        self.cancelled = threading.Event()
+        self._last_event = 0.0
+
+    def _report(self, fraction):
+        self.progress = fraction
+        now = time.monotonic()
+        if now - self._last_event >= _PROGRESS_INTERVAL:
+            self._last_event = now
+            c4d.SpecialEventAdd(VIDEO_PROXY_EVENT_ID)
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            proxy_directory = self.cache.proxy_directory(self.video_path, self.width)
+            self.proxy = self.cache.load(proxy_directory)
+            if self.proxy is None:
+                self.proxy = generate_proxy(self.video_path, proxy_directory, self.width, self.frame_count,
+                                            self._report, self.cancelled)
+                logger.info("Generated a {}x{} proxy of '{}' in {:.1f} s.".format(
+                    self.proxy.width, self.proxy.height, os.path.basename(self.video_path), time.perf_counter() - start))
+                self.cache.evict(keep=proxy_directory)
+            else:
+                logger.info("Using the cached proxy of '{}'.".format(os.path.basename(self.video_path)))
+        except ProxyCancelled:
+            logger.info("Cancelled the proxy of '{}'.".format(os.path.basename(self.video_path)))
+        except Exception as e:
+            self.error = e
+            logger.warning("Failed to generate the proxy of '{}', the viewport keeps the original video: {}".format(
+                self.video_path, e))
+        self.progress = 1.0
+        c4d.SpecialEventAdd(VIDEO_PROXY_EVENT_ID)
+
+# Jobs started on the main thread that update_video_proxies() hasn't applied yet
+_jobs = []
+
+def start_video_proxy(material, video_path, width, frame_count=None, cache=None):
+    """
+    Starts generating the proxy of a video material in the background. A running job of the material is cancelled.
+
+    Returns:
+    - The VideoProxyJob.
+    """
+    for job in _jobs:
+        if job.material is material:
+            job.cancelled.set()
+    job = VideoProxyJob(material, video_path, width, frame_count, cache)
+    _jobs.append(job)
+    job.start()
+    return job
+
+def update_video_proxies():
+    """
+    Shows the progress of the running proxy jobs in the status bar and switches the materials of finished jobs to
+    their proxy. Must be called on the main thread.
+
+    Returns:
+    - The number of materials switched to a proxy.
+    """
+    switched = 0
+    for job in [job for job in _jobs if not job.is_alive()]:
+        _jobs.remove(job)
+        if job.proxy is None or job.cancelled.is_set():
+            continue
+        # The material may have been deleted, or pointed at another video, while the proxy was generated
+        if job.material.GetDocument() is None or proxy_original_path(job.material) not in (None, job.video_path):
+            continue
+        if use_proxy_frames(job.material, job.video_path, job.proxy):
+            switched += 1
+    running = [job for job in _jobs if job.is_alive()]
+    if running:
+        percent = int(100 * sum(job.progress for job in running) / len(running))
+        c4d.StatusSetText("Generating video proxy... {}%".format(percent))
+        c4d.StatusSetBar(percent)
+    elif switched or not _jobs:
+        c4d.StatusClear()
+    if switched:
+        c4d.EventAdd()
+    return switched
+
+def wait_for_video_proxies(timeout=None):
+    """Waits for the running proxy jobs and applies them, for headless imports without core messages."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for job in list(_jobs):
+        job.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+    return update_video_proxies()
+
+def cancel_video_proxies():
+    for job in _jobs:
+        job.cancelled.set()
+
+def _luminance_bitmap_shader(material):
+    shader = material[c4d.MATERIAL_LUMINANCE_SHADER]
+    if shader is None or shader.GetType() != c4d.Xbitmap:
+        return None
+    return shader
+
+def proxy_original_path(material):
+    """Returns the original video of a material using a proxy, or None."""
+    data = material.GetDataInstance().GetContainerInstance(PROXY_DATA_ID)
+    if data is None:
+        return None
+    return data.GetString(PROXY_ORIGINAL_PATH) or None
+
+def use_proxy_frames(material, video_path, proxy):
+    """
+    Points the video shader of a material at the frames of its proxy, remembering the original video for renders.
+
+    Returns:
+    - True if the material was switched, False if it has no video shader.
+    """
+    shader = _luminance_bitmap_shader(material)
+    if shader is None:
+        return False
+    data = c4d.BaseContainer()
+    data.SetString(PROXY_ORIGINAL_PATH, video_path)
+    data.SetString(PROXY_FRAMES_PATH, proxy.first_frame)
+    material.GetDataInstance().SetContainer(PROXY_DATA_ID, data)
+    shader[c4d.BITMAPSHADER_FILENAME] = proxy.first_frame
+    material.Message(c4d.MSG_UPDATE)
+    logger.info("'{}' shows the {}x{} proxy in the viewport.".format(material.GetName(), proxy.width, proxy.height))
+    return True
+
+def forget_proxy(material):
+    """Drops the proxy of a material, e.g. when it is pointed at another video."""
+    material.GetDataInstance().RemoveData(PROXY_DATA_ID)
+
+def set_video_proxies(doc, enabled):
+    """
+    Switches the video materials of a document between their proxies and the original videos.
+
+    Called with enabled False when a render or a save starts, so renders always use the full-resolution video and
+    saved scenes never reference the proxy cache, and with True when it ends.
+
+    Returns:
+    - The number of materials switched.
+    """
+    switched = 0
+    material = doc.GetFirstMaterial()
+    while material is not None:
+        data = material.GetDataInstance().GetContainerInstance(PROXY_DATA_ID)
+        shader = _luminance_bitmap_shader(material) if data is not None else None
+        if shader is not None:
+            path = data.GetString(PROXY_FRAMES_PATH if enabled else PROXY_ORIGINAL_PATH)
+            # A proxy deleted from the cache falls back to the original video
+            if enabled and not os.path.isfile(path):
+                path = data.GetString(PROXY_ORIGINAL_PATH)
+            if path and shader[c4d.BITMAPSHADER_FILENAME] != path:
+                shader[c4d.BITMAPSHADER_FILENAME] = path
+                material.Message(c4d.MSG_UPDATE)
+                switched += 1
+        material = material.GetNext()
+    return switched
@@ -8,6 +8,7 @@ enum
     OMNISCIENTSCENECONTROL_VIEWPORT_GRID_VISIBILITY = 1000003,
 
     OMNISCIENTSCENECONTROL_BACKGROUND_LINK = 1000004,
+    OMNISCIENTSCENECONTROL_REIMPORT = 1000005,
 
     OMNISCIENTSCENECONTROL_VIEW_THROUGH_CAMERA = 2000,
     OMNISCIENTSCENECONTROL_ALWAYS = 2001,
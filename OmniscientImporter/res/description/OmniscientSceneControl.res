@@ -46,5 +46,7 @@ CONTAINER OmniscientSceneControl
             ACCEPT { Obackground; }
             ANIM OFF;
         }
+
+        BUTTON OMNISCIENTSCENECONTROL_REIMPORT { }
     }
 }
@@ -0,0 +1,238 @@
+"""
+Benchmark of the importer's hot paths on a synthetic shot, against the c4d stand-in in fake_c4d.
+
+Measures per stage the wall time (best of --repeat runs), the peak of the memory allocated by Python during the
+stage (tracemalloc, in a separate run) and the number of C4D API calls made. The stand-in does no scene work of
+its own, so the numbers cover the importer's side of each stage and show regressions on machines without
+Cinema 4D.
+
+Stages:
+- import_omni_file: the whole import of the shot into a new document.
+- bake_alembic_camera_animation: baking the Alembic camera of the shot.
+- create_video_material: the video material, including probing the video.
+- OmniscientSceneControl.Execute: the scene control tag evaluated once per frame, leaving the camera view halfway.
+
+Usage: python bench_import.py [--frames N] [--triangles N] [--chunks N] [--workers N] [--repeat N] [--json PATH]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARK_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIRECTORY, "..", "OmniscientImporter", "lib"))
+sys.path.insert(0, os.path.join(BENCHMARK_DIRECTORY, "fake_c4d"))
+
+import c4d
+
+from bench_obj_loader import peak_rss_mb
+from synthetic_shot import write_shot
+
+import OmniscientImporter as omniscient_importer
+import OmniscientSceneControl as scene_control
+from cameraBaker import bake_alembic_camera_animation
+from videoBackground import create_video_material
+from videoProbe import clear_probe_cache
+
+TOP_CALLS = 8
+
+class StageResult:
+    """Wall time, peak traced memory and C4D API calls of one benchmark stage."""
+
+    def __init__(self, name, seconds, peak_bytes, calls, details=None):
+        self.name = name
+        self.seconds = seconds
+        self.peak_bytes = peak_bytes
+        self.calls = calls
+        self.details = details or {}
+
+    @property
+    def call_count(self):
+        return sum(self.calls.values())
+
+    def to_dict(self):
+        return {"seconds": self.seconds, "peak_bytes": self.peak_bytes, "call_count": self.call_count,
+                "calls": dict(self.calls), "details": self.details}
+
+    def __str__(self):
+        lines = ["{:<32} {:>9.3f} s {:>9.1f} MB {:>10} calls".format(
+            self.name, self.seconds, self.peak_bytes / 1024.0 / 1024.0, self.call_count)]
+        top = ", ".join("{} {}".format(name, count) for name, count in self.calls.most_common(TOP_CALLS))
+        if top:
+            lines.append("    " + top)
+        if self.details:
+            lines.append("    " + ", ".join("{} {}".format(key, value) for key, value in self.details.items()))
+        return "\n".join(lines)
+
+def measure_stage(name, prepare, repeat=1):
+    """
+    Runs a stage repeat times for the wall time and C4D calls, then once more under tracemalloc for its memory.
+
+    prepare() sets up a fresh run, outside of the measurement, and returns the function to measure. That
+    function may return a dict of details to report.
+    """
+    best = None
+    details = None
+    for _ in range(max(1, repeat)):
+        run = prepare()
+        c4d.reset_calls()
+        start = time.perf_counter()
+        details = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    calls = c4d.calls.copy()
+
+    run = prepare()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return StageResult(name, best, peak, calls, details)
+
+def new_document(frame_count, fps):
+    doc = c4d.documents.BaseDocument()
+    doc.SetFps(int(fps))
+    doc.SetMinTime(c4d.BaseTime(1, int(fps)))
+    doc.SetMaxTime(c4d.BaseTime(frame_count, int(fps)))
+    return doc
+
+def prepare_import(manifest_path, import_options):
+    def prepare():
+        doc = c4d.documents.BaseDocument()
+
+        def run():
+            if not omniscient_importer.import_omni_file(doc, manifest_path, import_options):
+                raise RuntimeError("Import of {} failed.".format(manifest_path))
+            with c4d.not_recorded():
+                return {"objects": len(doc.GetObjects()), "materials": len(doc.GetMaterials())}
+        return run
+    return prepare
+
+def prepare_bake(camera_path, frame_count, fps, position_tolerance=None, rotation_tolerance=None):
+    def prepare():
+        doc = new_document(frame_count, fps)
+        generator = c4d.documents.LoadDocument(camera_path, c4d.SCENEFILTER_OBJECTS).GetFirstObject()
+        generator.Remove()
+        doc.InsertObject(generator)
+
+        def run():
+            camera = bake_alembic_camera_animation(doc, generator, camera_path=camera_path,
+                                                   position_tolerance=position_tolerance,
+                                                   rotation_tolerance=rotation_tolerance)
+            with c4d.not_recorded():
+                return {"keys": sum(track.GetCurve().GetKeyCount() for track in camera.GetCTracks())}
+        return run
+    return prepare
+
+def prepare_video_material(video_path, frame_count, fps):
+    def prepare():
+        doc = new_document(frame_count, fps)
+        # Probe results are memoized per file, every run starts cold
+        clear_probe_cache()
+
+        def run():
+            if create_video_material(video_path, doc) is None:
+                raise RuntimeError("Failed to create the video material of {}.".format(video_path))
+        return run
+    return prepare
+
+def prepare_scene_control(frame_count, fps):
+    def prepare():
+        doc = new_document(frame_count, fps)
+        camera = c4d.BaseObject(c4d.Ocamera)
+        background = c4d.BaseObject(c4d.Obackground)
+        doc.InsertObject(background)
+        doc.InsertObject(camera)
+        tag = c4d.BaseTag(omniscient_importer.OMNISCIENT_SCENE_CONTROL_TAG_ID)
+        camera.InsertTag(tag)
+        tag_data = scene_control.OmniscientSceneControl()
+        tag_data.Init(tag)
+        tag[c4d.OMNISCIENTSCENECONTROL_BACKGROUND_LINK] = background
+        base_draw = doc.GetActiveBaseDraw()
+        base_draw.SetSceneCamera(camera)
+        scene_control.reset_execute_statistics()
+
+        times = [c4d.BaseTime(frame, int(fps)) for frame in range(frame_count)]
+
+        def run():
+            for frame, time in enumerate(times):
+                with c4d.not_recorded():
+                    if frame == frame_count // 2:
+                        # The user leaves the camera view
+                        base_draw.SetSceneCamera(None)
+                    doc.SetTime(time)
+                tag_data.Execute(tag, doc, camera, time, 0, 0)
+            return dict(scene_control.execute_statistics)
+        return run
+    return prepare
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(description="Benchmark the importer on a synthetic shot without Cinema 4D.")
+    parser.add_argument("--frames", type=int, default=300, help="frame count of the shot")
+    parser.add_argument("--triangles", type=int, default=200000, help="triangle count of all scans together")
+    parser.add_argument("--chunks", type=int, default=1, help="number of geometry files the scan is split into")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--workers", type=int, default=1, help="decode workers of the import, 1 decodes on the main thread")
+    parser.add_argument("--scan-triangle-budget", type=int, help="give scans above this triangle count a viewport proxy")
+    parser.add_argument("--position-tolerance", type=float, help="key simplification tolerance of the camera position")
+    parser.add_argument("--rotation-tolerance", type=float, help="key simplification tolerance of the camera rotation in degrees")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per stage, the fastest is reported")
+    parser.add_argument("--directory", help="keep the synthetic shot in this directory instead of a temporary one")
+    parser.add_argument("--json", help="write the results as JSON to this file")
+    return parser.parse_args(arguments)
+
+def run_benchmark(args, directory):
+    start = time.perf_counter()
+    manifest_path = write_shot(directory, args.frames, args.triangles, args.chunks, args.fps)
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    print("Synthetic shot: {} frames, {} triangles in {} chunks, {:.1f} MB, written in {:.1f} s".format(
+        args.frames, args.triangles, args.chunks, size / 1024.0 / 1024.0, time.perf_counter() - start))
+
+    import_options = {
+        "workers": args.workers,
+        "scan_cache": False,
+        "scan_triangle_budget": args.scan_triangle_budget,
+        "position_tolerance": args.position_tolerance,
+        "rotation_tolerance": args.rotation_tolerance
+    }
+    stages = [
+        ("import_omni_file", prepare_import(manifest_path, import_options)),
+        ("bake_alembic_camera_animation", prepare_bake(os.path.join(directory, "camera.abc"), args.frames, args.fps,
+                                                       args.position_tolerance, args.rotation_tolerance)),
+        ("create_video_material", prepare_video_material(os.path.join(directory, "video.mov"), args.frames, args.fps)),
+        ("OmniscientSceneControl.Execute", prepare_scene_control(args.frames, args.fps))
+    ]
+    results = []
+    for name, prepare in stages:
+        result = measure_stage(name, prepare, args.repeat)
+        print(result)
+        results.append(result)
+
+    peak = peak_rss_mb()
+    if peak is not None:
+        print("Peak RSS of the benchmark: {:.1f} MB".format(peak))
+    return results
+
+def main(arguments=None):
+    args = parse_arguments(sys.argv[1:] if arguments is None else arguments)
+    # The importer logs every step at INFO level
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.directory:
+        results = run_benchmark(args, args.directory)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            results = run_benchmark(args, directory)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"arguments": vars(args), "stages": {result.name: result.to_dict() for result in results}}, file, indent=4)
+
+if __name__ == "__main__":
+    main()
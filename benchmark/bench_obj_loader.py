@@ -0,0 +1,112 @@
+"""
+Benchmark of the native OBJ scan loader against Cinema 4D's OBJ importer (MergeDocument).
+
+Writes a synthetic LiDAR-like scan (a displaced grid with UVs and normals) and measures decoding time and
+peak resident memory of objReader, and of a scan cache hit. When run with c4dpy, building the polygon object and the MergeDocument
+path are measured too.
+
+Usage: python bench_obj_loader.py [triangle_count]
+"""
+import math
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "OmniscientImporter", "lib"))
+
+import objReader
+import scanCache
+
+try:
+    import c4d
+except ImportError:
+    c4d = None
+
+def write_synthetic_scan(path, triangle_count, with_uvs=True, with_normals=True):
+    """Writes a displaced grid with about triangle_count triangles and returns the actual count."""
+    side = max(1, int(math.sqrt(triangle_count / 2.0)))
+    columns = side + 1
+    with open(path, "w") as file:
+        file.write("# synthetic scan\n")
+        for row in range(columns):
+            lines = []
+            for column in range(columns):
+                x = column * 0.01
+                z = row * 0.01
+                y = 0.05 * math.sin(x * 3.0) * math.cos(z * 2.0)
+                lines.append("v {:.6f} {:.6f} {:.6f}\n".format(x, y, z))
+            file.writelines(lines)
+        if with_uvs:
+            for row in range(columns):
+                file.writelines("vt {:.6f} {:.6f}\n".format(column / float(side), row / float(side)) for column in range(columns))
+        if with_normals:
+            for row in range(columns):
+                file.writelines("vn 0.000000 1.000000 0.000000\n" for _ in range(columns))
+        for row in range(side):
+            lines = []
+            for column in range(side):
+                a = row * columns + column + 1
+                b = a + 1
+                c = a + columns
+                d = c + 1
+                if with_uvs and with_normals:
+                    lines.append("f {0}/{0}/{0} {1}/{1}/{1} {2}/{2}/{2}\n".format(a, b, d))
+                    lines.append("f {0}/{0}/{0} {1}/{1}/{1} {2}/{2}/{2}\n".format(a, d, c))
+                else:
+                    lines.append("f {} {} {}\n".format(a, b, d))
+                    lines.append("f {} {} {}\n".format(a, d, c))
+            file.writelines(lines)
+    return side * side * 2
+
+def peak_rss_mb():
+    """Peak resident memory of the process so far, None where the resource module is missing (Windows)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return peak / 1024.0 / 1024.0 if sys.platform == "darwin" else peak / 1024.0
+
+def measure(label, function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+    print("{:<34} {:>9.2f} s   peak RSS {}".format(label, elapsed, "n/a" if peak is None else "{:.1f} MB".format(peak)))
+    return result
+
+def main():
+    triangle_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "geometry_1.obj")
+        triangles = write_synthetic_scan(path, triangle_count)
+        size = os.path.getsize(path)
+        print("{} triangles, {:.1f} MB on disk".format(triangles, size / 1024.0 / 1024.0))
+        baseline = peak_rss_mb()
+        if baseline is not None:
+            print("baseline peak RSS {:.1f} MB".format(baseline))
+
+        mesh = measure("objReader.read_obj", lambda: objReader.read_obj(path))
+        print("decoded arrays: {:.1f} MB".format(mesh.nbytes / 1024.0 / 1024.0))
+
+        cache_entry = os.path.join(directory, "geometry_1" + scanCache.ENTRY_SUFFIX)
+        measure("scanCache.write_entry", lambda: scanCache.write_entry(cache_entry, mesh))
+        measure("scanCache.read_entry (cache hit)", lambda: scanCache.read_entry(cache_entry))
+
+        if c4d is None:
+            print("c4d not available, skipping object construction and MergeDocument (run with c4dpy to compare).")
+            return
+
+        import scanBuilder
+        measure("scanBuilder.build_polygon_object", lambda: scanBuilder.build_polygon_object(mesh, "Scan_Omni"))
+
+        doc = c4d.documents.BaseDocument()
+        measure("MergeDocument", lambda: c4d.documents.MergeDocument(doc, path, c4d.SCENEFILTER_OBJECTS | c4d.SCENEFILTER_MATERIALS))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark of the plugin's startup cost: what running OmniscientImporter.pyp at Cinema 4D's startup imports and
+how long it takes, against the c4d stand-in in fake_c4d or with c4dpy.
+
+Every run starts a fresh interpreter that imports c4d first, as Cinema 4D has it loaded already, then runs the
+.pyp the way Cinema 4D does and reports the wall time, the modules it imported and which of them belong to the
+plugin. With -X importtime the interpreter's own per-module import times are printed too.
+
+Usage: python bench_startup.py [--runs N] [--python PATH] [--importtime] [--json PATH]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCHMARK_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_DIRECTORY = os.path.join(BENCHMARK_DIRECTORY, "..", "OmniscientImporter")
+PLUGIN_FILE = os.path.join(PLUGIN_DIRECTORY, "OmniscientImporter.pyp")
+
+# Runs in the fresh interpreter, prints the measurement of one startup as JSON
+_CHILD = """
+import json, os, pkgutil, runpy, sys, time
+sys.path.insert(0, {fake_c4d!r})
+import c4d
+lib_directory = os.path.normcase(os.path.abspath({lib!r}))
+before = set(sys.modules)
+start = time.perf_counter()
+runpy.run_path({plugin!r}, run_name="__main__")
+seconds = time.perf_counter() - start
+loaded = sorted(set(sys.modules) - before)
+plugin_modules = [name for name in loaded if os.path.normcase(os.path.abspath(
+    getattr(sys.modules[name], "__file__", None) or "")).startswith(lib_directory)]
+print(json.dumps({{"seconds": seconds, "modules": loaded, "plugin_modules": plugin_modules}}))
+"""
+
+def run_startup(python, importtime=False):
+    """Runs the plugin's startup in a fresh interpreter. Returns the measurement and the -X importtime output."""
+    code = _CHILD.format(fake_c4d=os.path.join(BENCHMARK_DIRECTORY, "fake_c4d"), lib=os.path.join(PLUGIN_DIRECTORY, "lib"),
+                         plugin=PLUGIN_FILE)
+    command = [python] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    # Keeps the runs from writing __pycache__ folders into the plugin
+    environment = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+                             env=environment, check=True)
+    return json.loads(process.stdout.strip().splitlines()[-1]), process.stderr
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(description="Measure what the plugin imports and costs at Cinema 4D's startup.")
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters to start, the median is reported")
+    parser.add_argument("--python", default=sys.executable, help="interpreter to run the startup with, e.g. c4dpy")
+    parser.add_argument("--importtime", action="store_true", help="print the slowest imports of the last run")
+    parser.add_argument("--json", help="write the results as JSON to this file")
+    return parser.parse_args(arguments)
+
+def main(arguments=None):
+    args = parse_arguments(sys.argv[1:] if arguments is None else arguments)
+    results = [run_startup(args.python)[0] for _ in range(max(1, args.runs))]
+    seconds = [result["seconds"] for result in results]
+    last = results[-1]
+    print("Plugin startup: median {:.1f} ms, min {:.1f} ms over {} runs".format(
+        statistics.median(seconds) * 1000.0, min(seconds) * 1000.0, len(seconds)))
+    print("Modules imported: {}, of the plugin: {}".format(len(last["modules"]), len(last["plugin_modules"])))
+    print("    " + ", ".join(last["plugin_modules"]))
+
+    if args.importtime:
+        _, importtime = run_startup(args.python, importtime=True)
+        # Lines of -X importtime: "import time: self [us] | cumulative | imported package"
+        timings = []
+        for line in importtime.splitlines():
+            parts = line.split("|")
+            if line.startswith("import time:") and len(parts) == 3 and parts[1].strip().isdigit():
+                timings.append((int(parts[1]), parts[2].rstrip()))
+        for cumulative, name in sorted(timings, reverse=True)[:15]:
+            print("{:>9.1f} ms {}".format(cumulative / 1000.0, name))
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"runs": len(seconds), "median_seconds": statistics.median(seconds), "min_seconds": min(seconds),
+                       "modules": last["modules"], "plugin_modules": last["plugin_modules"]}, file, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Micro-benchmark of the matrix -> position/HPB conversion used by the camera baker.
+
+Compares the whole-shot conversion of cameraTransforms against the former per-frame path
+(one c4d.Matrix and one c4d.utils.MatrixToHPB call per frame). Run it with c4dpy to include the
+per-frame path; with a plain Python interpreter only the stack conversion is measured.
+
+Usage: python bench_transforms.py [frame_count]
+"""
+import math
+import os
+import random
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "OmniscientImporter", "lib"))
+
+import cameraTransforms
+
+try:
+    import c4d
+except ImportError:
+    c4d = None
+
+def make_shot(frame_count, seed=0):
+    """Returns a matrix stack of a handheld-like camera path that keeps turning past +-180 degrees."""
+    rng = random.Random(seed)
+    positions = tuple(array('d') for _ in range(3))
+    rotations = tuple(array('d') for _ in range(3))
+    for frame in range(frame_count):
+        t = frame / 60.0
+        positions[0].append(math.sin(t * 0.3) * 300.0 + rng.gauss(0.0, 0.2))
+        positions[1].append(150.0 + rng.gauss(0.0, 0.2))
+        positions[2].append(t * 10.0)
+        rotations[0].append(t * 0.8 + rng.gauss(0.0, 0.002))
+        rotations[1].append(math.sin(t) * 0.4 + rng.gauss(0.0, 0.002))
+        rotations[2].append(rng.gauss(0.0, 0.01))
+    return cameraTransforms.position_hpb_to_matrices(positions, rotations)
+
+def bench(label, function, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print("{:<32} {:>10.2f} ms".format(label, best * 1000.0))
+    return result, best
+
+def per_frame_path(matrices):
+    stride = cameraTransforms.MATRIX_STRIDE
+    positions = []
+    rotations = []
+    for base in range(0, len(matrices), stride):
+        m = matrices[base:base + stride]
+        matrix = c4d.Matrix(c4d.Vector(m[12], m[13], m[14]), c4d.Vector(m[0], m[1], m[2]),
+                            c4d.Vector(m[4], m[5], m[6]), c4d.Vector(m[8], m[9], m[10]))
+        positions.append(matrix.off)
+        rotations.append(c4d.utils.MatrixToHPB(matrix))
+    return positions, rotations
+
+def main():
+    frame_count = int(sys.argv[1]) if len(sys.argv) > 1 else 36000
+    matrices = make_shot(frame_count)
+    print("{} frames".format(frame_count))
+
+    (positions, rotations), stack_time = bench("stack conversion + unwrap", lambda: cameraTransforms.matrices_to_position_hpb(matrices))
+    bench("stack conversion, no unwrap", lambda: cameraTransforms.matrices_to_position_hpb(matrices, unwrap=False))
+
+    round_trip = cameraTransforms.position_hpb_to_matrices(positions, rotations)
+    print("round trip max error: {:.3g}".format(cameraTransforms.max_matrix_difference(matrices, round_trip)))
+
+    if c4d is None:
+        print("c4d not available, skipping the per-frame MatrixToHPB path (run with c4dpy to compare).")
+        return
+
+    (_, scalar_rotations), scalar_time = bench("per-frame MatrixToHPB", lambda: per_frame_path(matrices))
+    scalar_flips = sum(1 for i in range(1, len(scalar_rotations)) if abs(scalar_rotations[i].x - scalar_rotations[i - 1].x) > math.pi)
+    stack_flips = sum(1 for i in range(1, len(rotations[0])) if abs(rotations[0][i] - rotations[0][i - 1]) > math.pi)
+    print("heading flips: {} per-frame, {} unwrapped".format(scalar_flips, stack_flips))
+    print("speed-up: {:.1f}x".format(scalar_time / stack_time))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,981 @@
+"""
+Stand-in for Cinema 4D's c4d module, for benchmarking the importer on machines without Cinema 4D.
+
+Covers only what the importer uses, with plain Python containers behind it, and counts every API call in
+`calls` as "Class.Method", "Class()" for constructors, "Class[]"/"Class[]=" for parameter access and the bare
+name for module functions. Parameter IDs without a fixed value below get a stable, unique integer on first use.
+
+This is not a simulation of Cinema 4D: it neither evaluates scenes nor draws, so its timings only cover the
+importer's own work and the number of calls it makes.
+"""
+import collections
+import copy
+import functools
+import itertools
+import os
+import re
+import sys
+import types
+
+calls = collections.Counter()
+# Calls made by the stand-in itself, e.g. the Vectors of a new Matrix, are not counted
+_depth = 0
+
+def reset_calls():
+    calls.clear()
+
+def _counted(name, function, *args, **kwargs):
+    global _depth
+    if _depth:
+        return function(*args, **kwargs)
+    calls[name] += 1
+    _depth += 1
+    try:
+        return function(*args, **kwargs)
+    finally:
+        _depth -= 1
+
+class not_recorded:
+    """Context manager for calls of the benchmark itself, which are not counted."""
+
+    def __enter__(self):
+        global _depth
+        _depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        global _depth
+        _depth -= 1
+
+def _record(name, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return _counted(name, function, *args, **kwargs)
+    return wrapper
+
+def _record_method(name, function):
+    # Keyed by the class of the instance, so inherited methods are counted under the class actually used
+    if name == "__init__":
+        suffix = "()"
+    elif name == "__getitem__":
+        suffix = "[]"
+    elif name == "__setitem__":
+        suffix = "[]="
+    else:
+        suffix = "." + name
+
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        return _counted(type(self).__name__ + suffix, function, self, *args, **kwargs)
+    return wrapper
+
+class _Recorded(type):
+    """Metaclass counting the calls of the CamelCase methods, constructors and parameter access of a class."""
+
+    def __new__(mcs, name, bases, namespace):
+        # Subclasses defined by the plugin, such as its TagData, are plugin code and not counted
+        if namespace.get("__module__") != __name__:
+            return super().__new__(mcs, name, bases, namespace)
+        for attribute, value in list(namespace.items()):
+            if callable(value) and (attribute[0].isupper() or attribute in ("__init__", "__getitem__", "__setitem__")):
+                namespace[attribute] = _record_method(attribute, value)
+        return super().__new__(mcs, name, bases, namespace)
+
+# Constants
+
+NOTOK = -1
+MODE_ON = 0
+MODE_OFF = 1
+MODE_UNDEF = 2
+OBJECT_ON = 0
+OBJECT_OFF = 1
+OBJECT_UNDEF = 2
+DTYPE_REAL = 19
+DTYPE_VECTOR = 23
+FILEERROR_NONE = 0
+UNDOTYPE_NEW = 1
+BFM_INPUT_VALUE = 1800
+IMAGERESULT_OK = 1
+
+Ocamera = 5103
+Obackground = 5122
+Opolygon = 5100
+Onull = 5140
+Oinstance = 5126
+Tphong = 5612
+Ttexture = 5616
+Tuvw = 5671
+Tnormal = 5711
+Tvertexcolor = 431000045
+Omgmatrix = 1018545
+Mmaterial = 5703
+Xbitmap = 5833
+
+DOCUMENT_UNIT_KM = 1
+DOCUMENT_UNIT_M = 2
+DOCUMENT_UNIT_CM = 3
+DOCUMENT_UNIT_MM = 4
+DOCUMENT_UNIT_UM = 5
+DOCUMENT_UNIT_NM = 6
+DOCUMENT_UNIT_MILE = 7
+DOCUMENT_UNIT_YARD = 8
+DOCUMENT_UNIT_FOOT = 9
+DOCUMENT_UNIT_INCH = 10
+
+ALEMBIC_GENERATOR_ID = 1028083
+# Used by the stand-in itself, module level lookups don't go through __getattr__
+DOCUMENT_DOCUNIT = 1900001
+ALEMBIC_ANIMATION_OFFSET = 1900002
+ALEMBIC_ANIMATION_SPEED = 1900003
+CINTERPOLATION_SPLINE = 1
+CINTERPOLATION_LINEAR = 2
+CINTERPOLATION_STEP = 3
+
+_CONSTANT_PATTERN = re.compile(r"^[A-Z][A-Z0-9_]*$")
+_constant_ids = itertools.count(2000000)
+
+def __getattr__(name):
+    # Description and flag IDs: any unique value works, they are only compared and used as keys
+    if _CONSTANT_PATTERN.match(name):
+        value = next(_constant_ids)
+        globals()[name] = value
+        return value
+    raise AttributeError("module 'c4d' has no attribute '{}'".format(name))
+
+# Math and time
+
+class Vector(metaclass=_Recorded):
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x=0.0, y=None, z=None):
+        if y is None:
+            y = z = x
+        self.x = float(x)
+        self.y = float(y)
+        self.z = float(z)
+
+    def __eq__(self, other):
+        return isinstance(other, Vector) and (self.x, self.y, self.z) == (other.x, other.y, other.z)
+
+    def __repr__(self):
+        return "Vector({}, {}, {})".format(self.x, self.y, self.z)
+
+class Matrix(metaclass=_Recorded):
+    def __init__(self, off=None, v1=None, v2=None, v3=None):
+        self.off = off if off is not None else Vector(0.0)
+        self.v1 = v1 if v1 is not None else Vector(1.0, 0.0, 0.0)
+        self.v2 = v2 if v2 is not None else Vector(0.0, 1.0, 0.0)
+        self.v3 = v3 if v3 is not None else Vector(0.0, 0.0, 1.0)
+
+class BaseTime(metaclass=_Recorded):
+    def __init__(self, value=0.0, fps=None):
+        # BaseTime(frame, fps) or BaseTime(seconds)
+        self._seconds = float(value) / fps if fps else float(value)
+
+    def Get(self):
+        return self._seconds
+
+    def GetFrame(self, fps):
+        return int(round(self._seconds * fps))
+
+    def __eq__(self, other):
+        return isinstance(other, BaseTime) and self._seconds == other._seconds
+
+    def __repr__(self):
+        return "BaseTime({})".format(self._seconds)
+
+class UnitScaleData(metaclass=_Recorded):
+    def __init__(self):
+        self._scale = 1.0
+        self._unit = DOCUMENT_UNIT_CM
+
+    def SetUnitScale(self, scale, unit):
+        self._scale = scale
+        self._unit = unit
+
+    def GetUnitScale(self):
+        return self._scale, self._unit
+
+class DescLevel(metaclass=_Recorded):
+    def __init__(self, id, dtype=0, creator=0):
+        self.id = id
+        self.dtype = dtype
+        self.creator = creator
+
+class DescID(metaclass=_Recorded):
+    def __init__(self, *levels):
+        self.levels = levels
+
+class BaseContainer(metaclass=_Recorded):
+    def __init__(self, id=0):
+        self._id = id
+        self._values = {}
+
+    def GetId(self):
+        return self._id
+
+    def __getitem__(self, id):
+        return self._values.get(id)
+
+    def __setitem__(self, id, value):
+        self._values[id] = value
+
+    def SetString(self, id, value):
+        self._values[id] = value
+
+    def GetString(self, id, preset=""):
+        return self._values.get(id, preset)
+
+    def SetInt32(self, id, value):
+        self._values[id] = value
+
+    def GetInt32(self, id, preset=0):
+        return self._values.get(id, preset)
+
+    def SetFloat(self, id, value):
+        self._values[id] = float(value)
+
+    def GetFloat(self, id, preset=0.0):
+        return self._values.get(id, preset)
+
+    def SetContainer(self, id, container):
+        self._values[id] = container.GetClone()
+
+    def RemoveData(self, id):
+        return self._values.pop(id, None) is not None
+
+    def GetContainer(self, id):
+        container = self._values.get(id)
+        return container.GetClone() if isinstance(container, BaseContainer) else BaseContainer()
+
+    def GetContainerInstance(self, id):
+        container = self._values.get(id)
+        return container if isinstance(container, BaseContainer) else None
+
+    def GetClone(self, flags=0):
+        clone = BaseContainer(self._id)
+        clone._values = dict(self._values)
+        return clone
+
+# Nodes
+
+_guids = itertools.count(1)
+
+class GeListNode(metaclass=_Recorded):
+    """A node of a list, with its parameters in a dict."""
+
+    def __init__(self, type_id=0):
+        self._type = type_id
+        self._name = ""
+        self._guid = next(_guids)
+        self._parameters = {}
+        self._siblings = None
+        self._parent = None
+        self._children = []
+        self._data = None
+        self._document = None
+        # Bumped by every change, whatever the dirty flags asked for
+        self._dirty = 0
+
+    def __getitem__(self, key):
+        return self._parameters.get(key)
+
+    def __setitem__(self, key, value):
+        self._parameters[key] = value
+        self._dirty += 1
+
+    def __bool__(self):
+        return True
+
+    def GetType(self):
+        return self._type
+
+    def GetName(self):
+        return self._name
+
+    def SetName(self, name):
+        self._name = name
+        self._dirty += 1
+
+    def GetDirty(self, flags):
+        return self._dirty
+
+    def GetGUID(self):
+        return self._guid
+
+    def GetParameter(self, key, flags=0):
+        return self._parameters.get(key)
+
+    def SetParameter(self, key, value, flags=0):
+        self._parameters[key] = value
+        self._dirty += 1
+        return True
+
+    def Message(self, message_id, data=None):
+        return True
+
+    def GetDataInstance(self):
+        if self._data is None:
+            self._data = BaseContainer()
+        return self._data
+
+    def GetDocument(self):
+        node = self
+        while node._parent is not None:
+            node = node._parent
+        return node._document if node._siblings is not None else None
+
+    def GetNext(self):
+        siblings = self._siblings
+        if siblings is None:
+            return None
+        index = siblings.index(self) + 1
+        return siblings[index] if index < len(siblings) else None
+
+    def GetPred(self):
+        siblings = self._siblings
+        if siblings is None:
+            return None
+        index = siblings.index(self)
+        return siblings[index - 1] if index > 0 else None
+
+    def GetUp(self):
+        return self._parent
+
+    def GetDown(self):
+        return self._children[0] if self._children else None
+
+    def GetChildren(self):
+        return list(self._children)
+
+    def GetClone(self, flags=0):
+        clone = copy.copy(self)
+        clone._guid = next(_guids)
+        clone._parameters = dict(self._parameters)
+        clone._data = self._data.GetClone() if self._data is not None else None
+        clone._siblings = clone._parent = clone._document = None
+        clone._children = []
+        for child in self._children:
+            child.GetClone(flags).InsertUnderLast(clone)
+        return clone
+
+    def InsertUnder(self, parent):
+        self._attach(parent._children, None, parent)
+
+    def InsertUnderLast(self, parent):
+        self._attach(parent._children, parent._children[-1] if parent._children else None, parent)
+
+    def Remove(self):
+        if self._siblings is not None:
+            self._siblings.remove(self)
+        self._siblings = None
+        self._parent = None
+        self._document = None
+
+    def _attach(self, siblings, pred, parent=None):
+        # Like Cinema 4D, nodes still in a list must be removed before they are inserted elsewhere
+        if self._siblings is not None:
+            raise AssertionError("{} is already in a list.".format(self._name))
+        index = siblings.index(pred) + 1 if pred is not None else 0
+        siblings.insert(index, self)
+        self._siblings = siblings
+        self._parent = parent
+
+class BaseList2D(GeListNode):
+    def GetData(self):
+        """The name, parameters and data container, which the real BaseContainer holds together."""
+        return {"name": self._name, "parameters": dict(self._parameters),
+                "data": self._data.GetClone() if self._data is not None else None}
+
+    def SetData(self, data):
+        self._name = data["name"]
+        self._parameters.update(data["parameters"])
+        self._data = data["data"].GetClone() if data["data"] is not None else None
+        self._dirty += 1
+        return True
+
+    def TransferGoal(self, dst, undolink):
+        """Points the parameters of every object of the document that link to this node at dst."""
+        doc = self.GetDocument()
+        stack = list(doc._objects) if doc is not None else []
+        while stack:
+            node = stack.pop()
+            stack.extend(node._children)
+            for key, value in node._parameters.items():
+                if value is self:
+                    node._parameters[key] = dst
+
+class BaseTag(BaseList2D):
+    def __init__(self, type_id=0):
+        super().__init__(type_id)
+        self._object = None
+
+    def GetObject(self):
+        return self._object
+
+    def GetDocument(self):
+        return self._object.GetDocument() if self._object is not None else None
+
+    def Remove(self):
+        if self._object is not None:
+            self._object._tags.remove(self)
+        self._object = None
+
+class TextureTag(BaseTag):
+    def __init__(self):
+        super().__init__(Ttexture)
+        self._material = None
+
+    def SetMaterial(self, material):
+        self._material = material
+
+    def GetMaterial(self):
+        return self._material
+
+class _VariableTag(BaseTag):
+    _record_size = 0
+
+    def __init__(self, type_id, count):
+        super().__init__(type_id)
+        self._data = bytearray(count * self._record_size)
+
+    def GetDataCount(self):
+        return len(self._data) // self._record_size
+
+    def GetDataSize(self):
+        return self._record_size
+
+    def GetLowlevelDataAddressW(self):
+        return memoryview(self._data)
+
+class UVWTag(_VariableTag):
+    # Four UVW vectors of single precision floats per polygon
+    _record_size = 4 * 3 * 4
+
+    def __init__(self, count):
+        super().__init__(Tuvw, count)
+
+class NormalTag(_VariableTag):
+    # Four normals of three 16 bit integers per polygon
+    _record_size = 4 * 3 * 2
+
+    def __init__(self, count):
+        super().__init__(Tnormal, count)
+
+class VertexColorTag(_VariableTag):
+    # One RGBA color of single precision floats per point, in per-point mode
+    _record_size = 4 * 4
+
+    def __init__(self, count):
+        super().__init__(Tvertexcolor, count)
+        self._per_point = False
+
+    def SetPerPointMode(self, per_point):
+        self._per_point = per_point
+
+    def IsPerPointColor(self):
+        return self._per_point
+
+class BaseObject(BaseList2D):
+    def __init__(self, type_id=Onull):
+        super().__init__(type_id)
+        self._tags = []
+        self._tracks = []
+        self._mg = Matrix()
+
+    def GetClone(self, flags=0):
+        clone = super().GetClone(flags)
+        clone._tags = []
+        clone._tracks = []
+        for tag in reversed(self._tags):
+            tag_clone = copy.copy(tag)
+            tag_clone._parameters = dict(tag._parameters)
+            clone.InsertTag(tag_clone)
+        return clone
+
+    def InsertTag(self, tag, pred=None):
+        if tag in self._tags:
+            self._tags.remove(tag)
+        index = self._tags.index(pred) + 1 if pred is not None else 0
+        self._tags.insert(index, tag)
+        tag._object = self
+        return True
+
+    def MakeTag(self, type_id, pred=None):
+        tag = TextureTag() if type_id == Ttexture else BaseTag(type_id)
+        self.InsertTag(tag, pred)
+        return tag
+
+    def GetTag(self, type_id, nr=0):
+        matching = [tag for tag in self._tags if tag.GetType() == type_id]
+        return matching[nr] if nr < len(matching) else None
+
+    def GetTags(self):
+        return list(self._tags)
+
+    def InsertTrackSorted(self, track):
+        self._tracks.append(track)
+        track._object = self
+        return True
+
+    def GetCTracks(self):
+        return list(self._tracks)
+
+    def GetMg(self):
+        return self._mg
+
+    def SetMg(self, matrix):
+        self._mg = matrix
+        self._dirty += 1
+
+class PolygonObject(BaseObject):
+    def __init__(self, point_count, polygon_count):
+        super().__init__(Opolygon)
+        self._points = [None] * point_count
+        self._polygons = [None] * polygon_count
+
+    def GetPointCount(self):
+        return len(self._points)
+
+    def GetPolygonCount(self):
+        return len(self._polygons)
+
+    def SetAllPoints(self, points):
+        self._points = list(points)
+        self._dirty += 1
+        return True
+
+    def GetAllPoints(self):
+        return list(self._points)
+
+    def SetPoint(self, index, point):
+        self._points[index] = point
+        self._dirty += 1
+        return True
+
+    def SetPolygon(self, index, polygon):
+        self._polygons[index] = polygon
+        self._dirty += 1
+        return True
+
+    def GetAllPolygons(self):
+        return list(self._polygons)
+
+    def ResizeObject(self, point_count, polygon_count):
+        self._points = (self._points + [None] * point_count)[:point_count]
+        self._polygons = (self._polygons + [None] * polygon_count)[:polygon_count]
+        return True
+
+class CPolygon(metaclass=_Recorded):
+    __slots__ = ("a", "b", "c", "d")
+
+    def __init__(self, a, b, c, d=None):
+        self.a = a
+        self.b = b
+        self.c = c
+        self.d = c if d is None else d
+
+class BaseMaterial(BaseList2D):
+    def __init__(self, type_id=Mmaterial):
+        super().__init__(type_id)
+        self._shaders = []
+
+    def InsertShader(self, shader, pred=None):
+        self._shaders.append(shader)
+        return True
+
+    def GetFirstShader(self):
+        return self._shaders[0] if self._shaders else None
+
+class BaseShader(BaseList2D):
+    pass
+
+class CKey(metaclass=_Recorded):
+    def __init__(self, time):
+        self._time = time
+        self._value = 0.0
+        self._interpolation = CINTERPOLATION_SPLINE
+
+    def GetTime(self):
+        return self._time
+
+    def GetValue(self):
+        return self._value
+
+    def SetValue(self, curve, value):
+        self._value = value
+
+    def GetInterpolation(self):
+        return self._interpolation
+
+    def SetInterpolation(self, curve, interpolation):
+        self._interpolation = interpolation
+
+class CCurve(metaclass=_Recorded):
+    def __init__(self):
+        self._keys = []
+
+    def AddKey(self, time, bUndo=True, bSynchronize=False):
+        key = CKey(time)
+        self._keys.append(key)
+        return {"key": key, "nIdx": len(self._keys) - 1}
+
+    def GetKeyCount(self):
+        return len(self._keys)
+
+    def GetKey(self, index):
+        return self._keys[index]
+
+class CTrack(BaseList2D):
+    def __init__(self, obj, description_id):
+        super().__init__()
+        self._description_id = description_id
+        self._curve = CCurve()
+        self._object = None
+
+    def GetCurve(self, type=0, bCreate=True):
+        return self._curve
+
+    def GetDescriptionID(self):
+        return self._description_id
+
+    def Remove(self):
+        if self._object is not None:
+            self._object._tracks.remove(self)
+        self._object = None
+
+class BaseDraw(BaseList2D):
+    def __init__(self):
+        super().__init__()
+        self._scene_camera = None
+        self._editor_camera = BaseObject(Ocamera)
+        self._editor_camera.SetName("Editor Camera")
+
+    def GetSceneCamera(self, doc):
+        return self._scene_camera
+
+    def SetSceneCamera(self, camera, animate=False):
+        self._scene_camera = camera
+
+    def GetEditorCamera(self):
+        return self._editor_camera
+
+class RenderData(BaseList2D):
+    pass
+
+class BasePlugin(BaseList2D):
+    def Message(self, message_id, data=None):
+        # Scene loaders and savers hand out their settings on MSG_RETRIEVEPRIVATEDATA
+        if isinstance(data, dict):
+            data["imexporter"] = BaseList2D(self._type)
+        return True
+
+def _function(function):
+    return _record(function.__name__, function)
+
+@_function
+def EventAdd(flags=0):
+    pass
+
+@_function
+def SpecialEventAdd(message_id, p1=0, p2=0):
+    return True
+
+@_function
+def StatusSetText(text):
+    pass
+
+@_function
+def StatusSetBar(percent):
+    pass
+
+@_function
+def StatusClear():
+    pass
+
+@_function
+def GetC4DVersion():
+    return 2024000
+
+# Submodules
+
+def _submodule(name, **members):
+    module = types.ModuleType("c4d." + name)
+    for member_name, member in members.items():
+        if isinstance(member, types.FunctionType):
+            member = _record(name + "." + member_name, member)
+        setattr(module, member_name, member)
+    sys.modules[module.__name__] = module
+    globals()[name] = module
+    return module
+
+class BaseDocument(BaseList2D):
+    def __init__(self):
+        super().__init__()
+        self._objects = []
+        self._materials = []
+        self._fps = 30
+        self._min_time = BaseTime(0.0)
+        self._max_time = BaseTime(90, 30)
+        self._loop_min_time = self._min_time
+        self._loop_max_time = self._max_time
+        self._time = self._min_time
+        self._render_data = RenderData()
+        self._base_draw = BaseDraw()
+        self._document_name = ""
+        # Undo groups of (undo type, node), only UNDOTYPE_NEW is actually undone, enough to undo an import
+        self._undo_depth = 0
+        self._undo_groups = []
+        self._alive = True
+        self._document_path = ""
+        self._parameters[DOCUMENT_DOCUNIT] = UnitScaleData()
+
+    def InsertObject(self, obj, parent=None, pred=None, checknames=False):
+        if parent is not None:
+            obj._attach(parent._children, pred, parent)
+        else:
+            obj._attach(self._objects, pred)
+            obj._document = self
+
+    def InsertMaterial(self, material, pred=None, checknames=False):
+        material._attach(self._materials, pred)
+        material._document = self
+
+    def GetFirstObject(self):
+        return self._objects[0] if self._objects else None
+
+    def GetObjects(self):
+        return list(self._objects)
+
+    def GetFirstMaterial(self):
+        return self._materials[0] if self._materials else None
+
+    def GetMaterials(self):
+        return list(self._materials)
+
+    def SearchObject(self, name):
+        stack = list(reversed(self._objects))
+        while stack:
+            obj = stack.pop()
+            if obj.GetName() == name:
+                return obj
+            stack.extend(reversed(obj._children))
+        return None
+
+    def GetFps(self):
+        return self._fps
+
+    def SetFps(self, fps):
+        self._fps = fps
+
+    def GetMinTime(self):
+        return self._min_time
+
+    def SetMinTime(self, time):
+        self._min_time = time
+
+    def GetMaxTime(self):
+        return self._max_time
+
+    def SetMaxTime(self, time):
+        self._max_time = time
+
+    def GetLoopMinTime(self):
+        return self._loop_min_time
+
+    def SetLoopMinTime(self, time):
+        self._loop_min_time = time
+
+    def GetLoopMaxTime(self):
+        return self._loop_max_time
+
+    def SetLoopMaxTime(self, time):
+        self._loop_max_time = time
+
+    def GetTime(self):
+        return self._time
+
+    def SetTime(self, time):
+        self._time = time
+
+    def GetActiveRenderData(self):
+        return self._render_data
+
+    def GetActiveBaseDraw(self):
+        return self._base_draw
+
+    def GetRenderBaseDraw(self):
+        return self._base_draw
+
+    def StartUndo(self):
+        if self._undo_depth == 0:
+            self._undo_groups.append([])
+        self._undo_depth += 1
+        return True
+
+    def EndUndo(self):
+        self._undo_depth = max(0, self._undo_depth - 1)
+        # Groups without entries don't become undo steps
+        if self._undo_depth == 0 and self._undo_groups and not self._undo_groups[-1]:
+            self._undo_groups.pop()
+        return True
+
+    def AddUndo(self, undo_type, node):
+        if self._undo_depth == 0:
+            return False
+        self._undo_groups[-1].append((undo_type, node))
+        return True
+
+    def GetUndoPtr(self):
+        for group in reversed(self._undo_groups):
+            if group:
+                return group[-1][1]
+        return None
+
+    def DoUndo(self, multiple=False):
+        if self._undo_depth or not self._undo_groups:
+            return False
+        for undo_type, node in reversed(self._undo_groups.pop()):
+            if undo_type == UNDOTYPE_NEW:
+                node.Remove()
+        return True
+
+    def IsAlive(self):
+        return self._alive
+
+    def ExecutePasses(self, bt, animation, expressions, caches, flags):
+        return True
+
+    def SetDocumentName(self, name):
+        self._document_name = name
+
+    def GetDocumentName(self):
+        return self._document_name
+
+    def SetDocumentPath(self, path):
+        self._document_path = path
+
+    def GetDocumentPath(self):
+        return self._document_path
+
+_active_document = BaseDocument()
+
+def _load_file(path):
+    """Objects an importer would create for a file: an Alembic generator per .abc, a polygon object per .obj."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".abc":
+        generator = BaseObject(ALEMBIC_GENERATOR_ID)
+        generator.SetName(name)
+        generator[ALEMBIC_ANIMATION_OFFSET] = BaseTime(0.0)
+        generator[ALEMBIC_ANIMATION_SPEED] = 1.0
+        # Camera properties of the generator's camera: focal length, aperture, film offset and projection
+        for property_id, value in ((500, 36.0), (1006, 36.0), (1118, 0.0), (1119, 0.0), (1001, 0)):
+            generator[1028637, 1057516, property_id] = value
+        return [generator]
+    if extension == ".obj":
+        obj = PolygonObject(0, 0)
+        obj.SetName(name)
+        return [obj]
+    return None
+
+def _LoadDocument(name, loadflags, thread=None):
+    if not os.path.isfile(name):
+        return None
+    objects = _load_file(name)
+    if objects is None:
+        return None
+    doc = BaseDocument()
+    previous = None
+    for obj in objects:
+        doc.InsertObject(obj, pred=previous)
+        previous = obj
+    return doc
+
+def _MergeDocument(doc, name, loadflags, thread=None):
+    if not os.path.isfile(name):
+        return False
+    objects = _load_file(name)
+    if objects is None:
+        return False
+    for obj in objects:
+        doc.InsertObject(obj)
+    return True
+
+def _SaveDocument(doc, name, saveflags, format):
+    return True
+
+def _KillDocument(doc):
+    doc._objects = []
+    doc._materials = []
+
+def _SetActiveDocument(doc):
+    global _active_document
+    _active_document = doc
+
+def _GetActiveDocument():
+    return _active_document
+
+_submodule("documents", BaseDocument=BaseDocument, LoadDocument=_LoadDocument, MergeDocument=_MergeDocument,
+           SaveDocument=_SaveDocument, KillDocument=_KillDocument, SetActiveDocument=_SetActiveDocument,
+           GetActiveDocument=_GetActiveDocument)
+
+class MovieLoader(metaclass=_Recorded):
+    """Opens nothing, the importer reads frame count and fps from the container headers."""
+
+    def Open(self, path):
+        return False
+
+    def GetInfo(self):
+        return 0, 0.0
+
+    def Close(self):
+        pass
+
+class BaseBitmap(metaclass=_Recorded):
+    def InitWith(self, path):
+        return IMAGERESULT_OK, False
+
+_submodule("bitmaps", MovieLoader=MovieLoader, BaseBitmap=BaseBitmap)
+
+def _MessageDialog(text, type=0):
+    return True
+
+def _QuestionDialog(text):
+    return True
+
+def _GetInputState(askdevice, askchannel, res):
+    res[BFM_INPUT_VALUE] = False
+    return True
+
+def _SizePix(pixels):
+    return pixels
+
+class GeDialog(metaclass=_Recorded):
+    def Open(self, dlgtype, pluginid=0, xpos=-1, ypos=-1, defaultw=0, defaulth=0, subid=0):
+        return True
+
+    def Close(self):
+        return True
+
+_submodule("gui", MessageDialog=_MessageDialog, QuestionDialog=_QuestionDialog, SizePix=_SizePix, GeDialog=GeDialog,
+           GetInputState=_GetInputState)
+
+class _PluginData(metaclass=_Recorded):
+    pass
+
+def _FindPlugin(id, type=0):
+    return BasePlugin(id)
+
+def _register(*args, **kwargs):
+    return True
+
+_submodule("plugins", TagData=type("TagData", (_PluginData,), {}), MessageData=type("MessageData", (_PluginData,), {}),
+           CommandData=type("CommandData", (_PluginData,), {}), SceneLoaderData=type("SceneLoaderData", (_PluginData,), {}),
+           FindPlugin=_FindPlugin, RegisterTagPlugin=_register, RegisterCommandPlugin=_register,
+           RegisterMessagePlugin=_register, RegisterSceneLoaderPlugin=_register)
+
+def _LoadDialog(type=0, title="", flags=0, force_suffix="", def_path="", def_file=""):
+    return None
+
+_submodule("storage", LoadDialog=_LoadDialog)
@@ -0,0 +1,171 @@
+"""
+Generator of synthetic Omniscient shots: a .omni manifest, a QuickTime header-only video, an Alembic camera
+and LiDAR-like OBJ scans split into chunks.
+
+Usage: python synthetic_shot.py output_directory [--frames N] [--triangles N] [--chunks N] [--fps N]
+"""
+import argparse
+import json
+import math
+import os
+import struct
+
+from bench_obj_loader import write_synthetic_scan
+
+_DATA_FLAG = 0x8000000000000000
+
+class _OgawaWriter:
+    """Minimal writer of the Ogawa container Alembic archives are stored in."""
+
+    def __init__(self):
+        self.buffer = bytearray(b"Ogawa" + bytes([0xff]) + struct.pack("<H", 1) + struct.pack("<Q", 0))
+
+    def data(self, payload):
+        if not payload:
+            return _DATA_FLAG
+        offset = len(self.buffer)
+        self.buffer += struct.pack("<Q", len(payload)) + payload
+        return offset | _DATA_FLAG
+
+    def group(self, children):
+        offset = len(self.buffer)
+        self.buffer += struct.pack("<Q", len(children)) + struct.pack("<{}Q".format(len(children)), *children)
+        return offset
+
+    def samples(self, fmt, rows):
+        # Every sample starts with a 16 byte digest, left empty
+        return self.group([self.data(b"\0" * 16 + struct.pack("<" + fmt, *row)) for row in rows])
+
+    def compound(self, properties):
+        children = [child for _, child in properties]
+        headers = b"".join(header for header, _ in properties)
+        return self.group(children + [self.data(headers)])
+
+def _property_header(name, property_type, pod=0, extent=0, sample_count=0, time_sampling=0, metadata=""):
+    # 32 bit size hint, no metadata index
+    info = property_type | (2 << 2) | (0xff << 20)
+    fields = b""
+    if property_type != 0:
+        info |= (pod << 4) | (extent << 12)
+        if time_sampling:
+            info |= 0x100
+        fields += struct.pack("<I", sample_count)
+        if time_sampling:
+            fields += struct.pack("<I", time_sampling)
+    name = name.encode()
+    metadata = metadata.encode()
+    return struct.pack("<I", info) + fields + struct.pack("<I", len(name)) + name + struct.pack("<I", len(metadata)) + metadata
+
+def _object_headers(children):
+    headers = b""
+    for name, metadata in children:
+        name = name.encode()
+        metadata = metadata.encode()
+        headers += struct.pack("<I", len(name)) + name + bytes([0xff]) + struct.pack("<I", len(metadata)) + metadata
+    # Hashes of the object's properties and children
+    return headers + b"\0" * 32
+
+def camera_path_matrices(frame_count):
+    """A handheld-like orbit: row-major matrices in the row-vector convention, one per frame."""
+    matrices = []
+    for frame in range(frame_count):
+        t = frame / 30.0
+        heading = 0.4 * math.sin(t * 0.5) + t * 0.2
+        pitch = -0.1 + 0.03 * math.sin(t * 3.1)
+        ch, sh, cp, sp = math.cos(heading), math.sin(heading), math.cos(pitch), math.sin(pitch)
+        x_axis = (ch, 0.0, -sh)
+        y_axis = (sh * sp, cp, ch * sp)
+        z_axis = (sh * cp, -sp, ch * cp)
+        position = (2.0 * math.sin(t * 0.3), 1.5 + 0.02 * math.sin(t * 7.0), 3.0 + t * 0.1)
+        matrices.append(x_axis + (0.0,) + y_axis + (0.0,) + z_axis + (0.0,) + position + (1.0,))
+    return matrices
+
+def write_camera_abc(path, matrices, fps=30.0, start=0.0):
+    """Writes an Alembic archive with an animated camera under an Xform, like the ones exported by the app."""
+    writer = _OgawaWriter()
+    count = len(matrices)
+    xform = writer.compound([
+        (_property_header(".inherits", 1, pod=0, extent=1, sample_count=1), writer.samples("?", [(True,)])),
+        (_property_header(".ops", 1, pod=1, extent=1, sample_count=1), writer.samples("B", [(0x30,)])),
+        (_property_header(".vals", 1, pod=11, extent=16, sample_count=count, time_sampling=1), writer.samples("16d", matrices)),
+    ])
+    xform_properties = writer.compound([(_property_header(".xform", 0, metadata="schema=AbcGeom_Xform_v3"), xform)])
+    core = (26.0, 3.6, 0.0, 2.4, 0.0, 1.0, 0, 0, 0, 0, 5.6, 5.0, 0, 0.5, 0.1, 1000.0)
+    geometry = writer.compound([(_property_header(".core", 1, pod=11, extent=16, sample_count=1), writer.samples("16d", [core]))])
+    camera_properties = writer.compound([(_property_header(".geom", 0, metadata="schema=AbcGeom_Camera_v1"), geometry)])
+    camera = writer.group([camera_properties])
+    transform = writer.group([xform_properties, camera, writer.data(_object_headers([("cameraShape", "schema=AbcGeom_Camera_v1")]))])
+    top = writer.group([writer.compound([]), transform, writer.data(_object_headers([("camera", "schema=AbcGeom_Xform_v3")]))])
+    time_sampling = struct.pack("<Id", count, 1.0 / fps) + struct.pack("<Id", 1, start)
+    root = writer.group([writer.data(struct.pack("<i", 1)), writer.data(struct.pack("<i", 10703)), top,
+                         writer.data(b"_ai_Application=synthetic"), writer.data(time_sampling), writer.data(b"")])
+    struct.pack_into("<Q", writer.buffer, 8, root)
+    with open(path, "wb") as file:
+        file.write(writer.buffer)
+
+def _atom(kind, payload):
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+def _full_atom(kind, payload):
+    return _atom(kind, b"\0\0\0\0" + payload)
+
+def write_movie_header(path, frame_count, fps, width, height, media_bytes=4096):
+    """Writes a QuickTime file with a video track's headers and a placeholder 'mdat', not decodable."""
+    timescale = int(round(fps * 1000))
+    delta = 1000
+    media_header = _full_atom(b"mdhd", struct.pack(">IIII", 0, 0, timescale, frame_count * delta) + b"\0" * 4)
+    handler = _full_atom(b"hdlr", b"mhlr" + b"vide" + b"\0" * 13)
+    sample_times = _full_atom(b"stts", struct.pack(">III", 1, frame_count, delta))
+    entry = struct.pack(">I4s", 86, b"apcn") + b"\0" * 6 + struct.pack(">H", 1) + b"\0" * 16 + struct.pack(">HH", width, height) + b"\0" * 50
+    sample_descriptions = _full_atom(b"stsd", struct.pack(">I", 1) + entry)
+    media = _atom(b"mdia", media_header + handler + _atom(b"minf", _atom(b"stbl", sample_times + sample_descriptions)))
+    track_header = _full_atom(b"tkhd", b"\0" * 76 + struct.pack(">II", width << 16, height << 16))
+    movie = _atom(b"moov", _full_atom(b"mvhd", b"\0" * 96) + _atom(b"trak", track_header + media))
+    with open(path, "wb") as file:
+        file.write(_atom(b"ftyp", b"qt  \0\0\0\0qt  "))
+        file.write(_atom(b"mdat", b"\0" * media_bytes))
+        file.write(movie)
+
+def write_shot(directory, frame_count=300, triangle_count=200000, chunk_count=1, fps=30.0, width=1920, height=1080):
+    """
+    Writes a synthetic shot into directory.
+
+    Returns:
+    - The path of the .omni manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+    write_movie_header(os.path.join(directory, "video.mov"), frame_count, fps, width, height)
+    write_camera_abc(os.path.join(directory, "camera.abc"), camera_path_matrices(frame_count), fps)
+
+    geometry = []
+    for chunk in range(chunk_count):
+        name = "geometry_{}.obj".format(chunk + 1)
+        write_synthetic_scan(os.path.join(directory, name), max(2, triangle_count // chunk_count))
+        geometry.append("./" + name)
+
+    manifest = {
+        "version": "2.0.0",
+        "cinema4d": {"minimum_plugin_version": "1.0.0", "ideal_plugin_version": "1.0.0"},
+        "data": {
+            "video": {"relative_path": "./video.mov", "resolution": {"width": width, "height": height}, "fps": fps},
+            "camera": {"relative_path": "./camera.abc", "fps": fps},
+            "geometry": {"relative_path": geometry}
+        }
+    }
+    manifest_path = os.path.join(directory, "shot.omni")
+    with open(manifest_path, "w") as file:
+        json.dump(manifest, file, indent=4)
+    return manifest_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic Omniscient shot.")
+    parser.add_argument("directory")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--triangles", type=int, default=200000)
+    parser.add_argument("--chunks", type=int, default=1)
+    parser.add_argument("--fps", type=float, default=30.0)
+    args = parser.parse_args()
+    print(write_shot(args.directory, args.frames, args.triangles, args.chunks, args.fps))
+
+if __name__ == "__main__":
+    main()
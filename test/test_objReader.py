@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "OmniscientImporter", "lib"))
+
+from objReader import ObjReadError, count_obj_elements, read_obj
+
+POINTS = "v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nv 2 0 0\nv 2 1 0\n"
+
+class ObjReaderTest(unittest.TestCase):
+    def write_obj(self, text):
+        handle, path = tempfile.mkstemp(suffix=".obj")
+        with os.fdopen(handle, "w") as file:
+            file.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_mixed_corner_counts(self):
+        # 4 + 5 + 3 corners add up to three quads' worth of tokens
+        path = self.write_obj(POINTS + "f 1 2 3 4\nf 1 2 5 6 3\nf 1 2 3\n")
+        mesh = read_obj(path)
+        self.assertEqual(list(mesh.polygons), [0, 3, 2, 1, 0, 4, 1, 1, 0, 5, 4, 4, 0, 2, 5, 5, 0, 2, 1, 1])
+        self.assertEqual(count_obj_elements(path).polygons, mesh.polygon_count)
+
+    def test_mixed_value_counts(self):
+        mesh = read_obj(self.write_obj("v 1 2 3 0.5\nv 4 5\nv 7 8 9\n"))
+        self.assertEqual(list(mesh.points), [1.0, 2.0, -3.0, 4.0, 5.0, 0.0, 7.0, 8.0, -9.0])
+
+    def test_missing_texture_coordinate(self):
+        with self.assertRaises(ObjReadError):
+            read_obj(self.write_obj(POINTS + "vt 0 0\nf 1/1 2/5 3/1\n"))
+
+if __name__ == "__main__":
+    unittest.main()